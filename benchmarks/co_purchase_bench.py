@@ -0,0 +1,98 @@
+"""Construcción, actualización y consulta de recomendaciones "también compraron"."""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+from itertools import accumulate, islice
+from typing import Iterator, List, Optional
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from monitoring.metrics import Histogram
+from recommendations.co_purchase import CoPurchaseEngine
+
+
+def generate_orders(items: int, products: int, max_size: int, seed: int) -> Iterator[List[int]]:
+    """
+    Órdenes sintéticas con popularidad tipo Zipf (unos pocos productos
+    concentran la mayoría de las compras) hasta sumar `items` items.
+    """
+    rng = random.Random(seed)
+    catalog = range(1, products + 1)
+    cumulative = list(accumulate(1 / rank for rank in catalog))
+    while items > 0:
+        size = min(items, rng.randint(1, max_size))
+        items -= size
+        yield rng.choices(catalog, cum_weights=cumulative, k=size)
+
+
+def max_rss_mb() -> float:
+    """Memoria residente máxima del proceso en MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada."""
+    parser = argparse.ArgumentParser(description="Recomendaciones por co-ocurrencia de compras")
+    parser.add_argument("--items", type=int, default=10_000_000, help="Items de órdenes del histórico")
+    parser.add_argument("--products", type=int, default=50_000, help="Productos del catálogo")
+    parser.add_argument("--max-order-size", type=int, default=8, help="Items máximos por orden")
+    parser.add_argument("--k", type=int, default=20, help="Recomendaciones guardadas por producto")
+    parser.add_argument("--incremental", type=int, default=100_000, help="Órdenes nuevas con add_order")
+    parser.add_argument("--queries", type=int, default=100_000, help="Consultas also_bought")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    engine = CoPurchaseEngine(k=args.k)
+    start = time.perf_counter()
+    engine.build(generate_orders(args.items, args.products, args.max_order_size, args.seed))
+    build_seconds = time.perf_counter() - start
+    print(f"build: {args.items:,} items, {engine.orders:,} órdenes en {build_seconds:.1f} s "
+          f"({args.items / build_seconds:,.0f} items/s, generación incluida)")
+    print(f"       {len(engine):,} pares distintos, memoria máx. {max_rss_mb():,.0f} MB")
+
+    new_orders = list(islice(
+        generate_orders(args.incremental * args.max_order_size, args.products, args.max_order_size, args.seed + 1),
+        args.incremental
+    ))
+    start = time.perf_counter()
+    for order in new_orders:
+        engine.add_order(order)
+    add_seconds = time.perf_counter() - start
+    print(f"add_order: {len(new_orders):,} órdenes en {add_seconds:.2f} s "
+          f"({len(new_orders) / add_seconds:,.0f} órdenes/s)")
+
+    rng = random.Random(args.seed + 2)
+    latencies = Histogram()
+    for _ in range(args.queries):
+        product_id = rng.randint(1, args.products)
+        start_ns = time.perf_counter_ns()
+        engine.also_bought(product_id, 10)
+        latencies.record(time.perf_counter_ns() - start_ns)
+    print(f"also_bought: p50 {latencies.percentile(0.5) / 1e3:.1f} us, "
+          f"p99 {latencies.percentile(0.99) / 1e3:.1f} us")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({
+                "items": args.items,
+                "orders": engine.orders,
+                "products": args.products,
+                "pairs": len(engine),
+                "build_seconds": round(build_seconds, 2),
+                "add_orders_per_sec": round(len(new_orders) / add_seconds, 1),
+                "query_p50_us": round(latencies.percentile(0.5) / 1e3, 2),
+                "query_p99_us": round(latencies.percentile(0.99) / 1e3, 2),
+                "max_rss_mb": round(max_rss_mb(), 1)
+            }, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Latencia de encolado y rendimiento de vaciado de la cola de trabajos."""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from controllers.payment_controller import PaymentController
+from models.payment import PaymentMethod
+from monitoring.metrics import Histogram
+from repositories.payment_repository import PaymentRepository
+from jobs.job_queue import JobQueue, JobWorkerPool, payment_handlers
+
+
+def measure_enqueue(job_queue: JobQueue, payment_ids: List[int]) -> Histogram:
+    """Encola un trabajo por pago midiendo cada llamada."""
+    latency = Histogram()
+    for payment_id in payment_ids:
+        start = time.perf_counter_ns()
+        job_queue.enqueue("process_payment", {"payment_id": payment_id})
+        latency.record(time.perf_counter_ns() - start)
+    return latency
+
+
+def measure_drain(job_queue: JobQueue, controller: PaymentController, workers: int,
+                  batch_size: int, gateway_latency: float) -> float:
+    """Segundos hasta que el pool vacía la cola."""
+    if gateway_latency:
+        process = controller._process_with_gateway
+        controller._process_with_gateway = (
+            lambda payment, key=None: time.sleep(gateway_latency) or process(payment, key)
+        )
+    pool = JobWorkerPool(job_queue, payment_handlers(controller), workers=workers,
+                         batch_size=batch_size, poll_interval=0.05)
+    start = time.perf_counter()
+    pool.start()
+    while True:
+        counts = job_queue.counts()
+        if not counts["queued"] and not counts["running"]:
+            break
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    pool.stop()
+    return elapsed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada."""
+    parser = argparse.ArgumentParser(description="Rendimiento de la cola de trabajos")
+    parser.add_argument("--jobs", type=int, default=10_000, help="Trabajos a encolar")
+    parser.add_argument("--workers", default="1,4,16", help="Números de hilos a probar")
+    parser.add_argument("--batch-size", type=int, default=10, help="Trabajos reclamados por consulta")
+    parser.add_argument("--gateway-latency", type=float, default=0.002,
+                        help="Latencia simulada del gateway en segundos")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    print(f"{args.jobs:,} trabajos, lotes de {args.batch_size}, gateway {args.gateway_latency * 1000:.1f} ms\n")
+    print(f"{'hilos':>6} {'encolar p50':>12} {'p99':>9} {'vaciado/s':>11}")
+    results = []
+    for workers in [int(n) for n in args.workers.split(",") if n]:
+        with tempfile.TemporaryDirectory() as directory:
+            controller = PaymentController(PaymentRepository())
+            payment_ids = [
+                controller.create_payment(i, 1, 10.0, PaymentMethod.CREDIT_CARD).payment_id
+                for i in range(args.jobs)
+            ]
+            job_queue = JobQueue(os.path.join(directory, "jobs.db"))
+            latency = measure_enqueue(job_queue, payment_ids)
+            elapsed = measure_drain(job_queue, controller, workers, args.batch_size, args.gateway_latency)
+            job_queue.close()
+        p50, p99 = latency.percentile(0.5) / 1e3, latency.percentile(0.99) / 1e3
+        rate = args.jobs / elapsed
+        print(f"{workers:>6} {p50:>10.1f}us {p99:>7.1f}us {rate:>11,.0f}")
+        results.append({"workers": workers, "enqueue_p50_us": round(p50, 1),
+                        "enqueue_p99_us": round(p99, 1), "drain_per_sec": round(rate, 1)})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"jobs": args.jobs, "batch_size": args.batch_size, "results": results},
+                      output, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
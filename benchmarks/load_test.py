@@ -0,0 +1,235 @@
+"""Generador de carga local para la API HTTP/JSON."""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_CONCURRENCY = (1, 4, 16, 64)
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+class Connection:
+    """Conexión keep-alive que envía peticiones y lee respuestas en orden."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> "Connection":
+        """Abre una conexión TCP."""
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    def send(self, method: str, path: str, body: Optional[dict] = None) -> None:
+        """Escribe una petición sin esperar la respuesta."""
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(payload)}\r\n\r\n"
+        self.writer.write(head.encode() + payload)
+
+    async def receive(self) -> Tuple[int, bytes]:
+        """Lee una respuesta completa: (código, cuerpo)."""
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ")[1])
+        length = 0
+        for line in lines[1:]:
+            if line.lower().startswith("content-length:"):
+                length = int(line.split(":", 1)[1])
+        body = await self.reader.readexactly(length) if length else b""
+        return status, body
+
+    async def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+        """Envía una petición y espera su respuesta."""
+        self.send(method, path, body)
+        return await self.receive()
+
+    def close(self) -> None:
+        """Cierra la conexión."""
+        self.writer.close()
+
+
+async def seed(host: str, port: int, users: int, products: int) -> None:
+    """Crea usuarios y productos para la carga de lectura."""
+    connection = await Connection.open(host, port)
+    for i in range(users):
+        await connection.request("POST", "/users", {
+            "username": f"load{i}", "email": f"load{i}@bench.local",
+            "password": "password123", "full_name": f"Load User {i}"
+        })
+    for i in range(products):
+        await connection.request("POST", "/products", {
+            "name": f"Producto {i}", "description": "Producto de carga",
+            "price": round(1 + (i * 37 % 1000) / 10, 2), "category": "electronics",
+            "stock_quantity": 100, "sku": f"LOAD-{i:06d}"
+        })
+    connection.close()
+
+
+def next_request(rng: random.Random, users: int, products: int) -> Tuple[str, str, Optional[dict]]:
+    """Mezcla de operaciones: lecturas, autenticación, listados y pagos."""
+    roll = rng.random()
+    if roll < 0.4:
+        return "GET", f"/products/{rng.randint(1, products)}", None
+    if roll < 0.6:
+        return "GET", f"/users/{rng.randint(1, users)}", None
+    if roll < 0.8:
+        i = rng.randrange(users)
+        return "POST", "/auth", {"username": f"load{i}", "password": "password123"}
+    if roll < 0.9:
+        low = rng.randint(1, 90)
+        return "GET", f"/products?min_price={low}&max_price={low + 5}&page_size=10", None
+    return "POST", "/payments", {
+        "order_id": rng.randint(1, 10_000), "user_id": rng.randint(1, users),
+        "amount": 10.0, "payment_method": "credit_card"
+    }
+
+
+async def worker(
+    host: str,
+    port: int,
+    deadline: float,
+    pipeline: int,
+    users: int,
+    products: int,
+    latencies: List[float],
+    errors: List[int],
+    seed_value: int
+) -> None:
+    """Envía peticiones por una conexión hasta el plazo."""
+    rng = random.Random(seed_value)
+    connection = await Connection.open(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            for _ in range(pipeline):
+                connection.send(*next_request(rng, users, products))
+            for _ in range(pipeline):
+                status, _ = await connection.receive()
+                if status >= 500:
+                    errors.append(status)
+            # Con pipelining la latencia de cada petición es la del lote
+            elapsed = time.perf_counter() - start
+            latencies.extend([elapsed] * pipeline)
+    finally:
+        connection.close()
+
+
+async def run_level(
+    host: str,
+    port: int,
+    concurrency: int,
+    duration: float,
+    pipeline: int,
+    users: int,
+    products: int
+) -> Dict:
+    """Mide un nivel de concurrencia."""
+    latencies: List[float] = []
+    errors: List[int] = []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        worker(host, port, deadline, pipeline, users, products, latencies, errors, n)
+        for n in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3, 3) if latencies else 0.0
+
+    return {
+        "concurrency": concurrency,
+        "pipeline": pipeline,
+        "requests": len(latencies),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(latencies[-1] * 1e3, 3) if latencies else 0.0,
+        "server_errors": len(errors)
+    }
+
+
+def free_port() -> int:
+    """Puerto TCP libre en localhost."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Arranca la API en un proceso aparte y espera a que acepte conexiones."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(SRC, "main.py"), "--serve", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        # Sin límites de ritmo: todas las conexiones salen de 127.0.0.1
+        env={**os.environ, "PYTHONPATH": SRC, "SG_RATE_LIMIT": "0"}
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("La API no arrancó")
+
+
+async def run(args: argparse.Namespace, host: str, port: int) -> List[Dict]:
+    """Siembra datos y recorre los niveles de concurrencia."""
+    await seed(host, port, args.users, args.products)
+    results = []
+    print(f"{'conc':>5} {'pipe':>5} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'5xx':>5}")
+    for concurrency in args.concurrency:
+        row = await run_level(host, port, concurrency, args.duration, args.pipeline, args.users, args.products)
+        results.append(row)
+        print(f"{row['concurrency']:>5} {row['pipeline']:>5} {row['requests_per_sec']:>10} "
+              f"{row['p50_ms']:>9} {row['p99_ms']:>9} {row['max_ms']:>9} {row['server_errors']:>5}")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada."""
+    parser = argparse.ArgumentParser(description="Generador de carga para la API del Sistema de Gestión")
+    parser.add_argument("--host", default="127.0.0.1", help="Host de una API ya arrancada")
+    parser.add_argument("--port", type=int, help="Puerto de una API ya arrancada (sin él se arranca una local)")
+    parser.add_argument("--concurrency", default=",".join(map(str, DEFAULT_CONCURRENCY)),
+                        help="Conexiones simultáneas por nivel (por defecto 1,4,16,64)")
+    parser.add_argument("--duration", type=float, default=3.0, help="Segundos por nivel")
+    parser.add_argument("--pipeline", type=int, default=1, help="Peticiones encadenadas por conexión")
+    parser.add_argument("--users", type=int, default=200, help="Usuarios a crear")
+    parser.add_argument("--products", type=int, default=500, help="Productos a crear")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c]
+
+    process = None
+    port = args.port
+    if port is None:
+        port = free_port()
+        process = start_server(port)
+    try:
+        results = asyncio.run(run(args, args.host, port))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=15)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"results": results}, output, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Rendimiento de la conciliación de liquidaciones con 1 a N procesos."""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from typing import List, Optional
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.payment import Payment, PaymentMethod, PaymentStatus
+from repositories.payment_repository import PaymentRepository
+from jobs.reconciliation import SettlementReconciler
+
+
+def build_repository(payments: int, seed: int) -> PaymentRepository:
+    """Repositorio con pagos completados con ID de transacción."""
+    rng = random.Random(seed)
+    repository = PaymentRepository()
+    for i in range(payments):
+        payment = Payment(repository.get_next_id(), i, i % 1000, round(rng.uniform(1, 500), 2),
+                          PaymentMethod.CREDIT_CARD, f"TX{i:012d}")
+        payment.status = PaymentStatus.COMPLETED
+        repository.save(payment)
+    return repository
+
+
+def write_settlements(path: str, rows: int, payments: int, seed: int) -> None:
+    """
+    Archivo CSV de liquidaciones: la mayoría coinciden con un pago, y un
+    0,1 % tiene importe distinto y otro 0,1 % no tiene pago. Si hay más
+    filas que pagos, los IDs se repiten y cuentan como duplicados.
+    """
+    rng = random.Random(seed)
+    amounts = random.Random(seed)
+    expected = [round(amounts.uniform(1, 500), 2) for _ in range(payments)]
+    with open(path, "w", encoding="utf-8") as settlements:
+        settlements.write("transaction_id,amount,settled_at\n")
+        for row in range(rows):
+            roll = rng.random()
+            if roll < 0.001:
+                settlements.write(f"ORPHAN{row:012d},10.00,2024-01-01\n")
+                continue
+            index = row % payments
+            amount = expected[index] + (1.0 if roll < 0.002 else 0.0)
+            settlements.write(f"TX{index:012d},{amount:.2f},2024-01-01\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada."""
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Rendimiento de la conciliación")
+    parser.add_argument("--payments", type=int, default=1_000_000, help="Pagos en el repositorio")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Filas del archivo de liquidaciones")
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, cores})),
+                        help="Números de procesos a probar (por defecto 1,2,4 y los núcleos)")
+    parser.add_argument("--file", help="Reutilizar o guardar aquí el archivo generado")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+    worker_counts = [int(n) for n in args.workers.split(",") if n]
+
+    path = args.file or os.path.join(tempfile.gettempdir(), f"settlements_{args.rows}.csv")
+    if not os.path.exists(path):
+        print(f"Generando {args.rows:,} liquidaciones en {path}...")
+        write_settlements(path, args.rows, args.payments, seed=7)
+    print(f"Cargando {args.payments:,} pagos...")
+    reconciler = SettlementReconciler(build_repository(args.payments, seed=7))
+    size_mb = os.path.getsize(path) / 1e6
+
+    print(f"\n{args.rows:,} filas ({size_mb:,.0f} MB), {cores} núcleos\n")
+    print(f"{'procesos':>8} {'segundos':>10} {'filas/s':>12} {'MB/s':>8} {'vs 1':>6}")
+    results = []
+    baseline = None
+    for workers in worker_counts:
+        report = reconciler.reconcile(path, workers=workers)
+        baseline = baseline or report.rows_per_sec
+        print(f"{workers:>8} {report.elapsed:>10.2f} {report.rows_per_sec:>12,.0f} "
+              f"{size_mb / report.elapsed:>8.1f} {report.rows_per_sec / baseline:>5.2f}x")
+        results.append({"workers": workers, **report.to_dict()})
+    print("\n" + report.summary())
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"cores": cores, "payments": args.payments, "rows": args.rows, "results": results},
+                      output, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
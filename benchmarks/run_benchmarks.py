@@ -0,0 +1,318 @@
+"""Benchmarks de escalabilidad de repositorios y controladores."""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.user import UserRole
+from models.product import ProductCategory
+from models.payment import PaymentMethod, PaymentStatus
+from controllers.user_controller import UserController
+from controllers.product_controller import ProductController
+from controllers.payment_controller import PaymentController
+from repositories.user_repository import UserRepository
+from repositories.product_repository import ProductRepository
+from repositories.payment_repository import PaymentRepository
+from monitoring.metrics import MetricsRegistry, instrument
+
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+CATEGORIES = list(ProductCategory)
+
+# Registro usado con --instrument (None = sin instrumentación)
+_metrics: Optional[MetricsRegistry] = None
+
+
+def instrumented(controller, name: str, repository_attribute: str):
+    """Instrumenta controlador y repositorio si se pidió --instrument."""
+    if _metrics is not None:
+        repository = getattr(controller, repository_attribute)
+        instrument(repository, "repository", name.replace("controller", "repository"), _metrics)
+        instrument(controller, "controller", name, _metrics)
+    return controller
+
+
+def current_rss_mb() -> Optional[float]:
+    """Memoria residente del proceso en MB (None si no se puede medir)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss es el pico (KB en Linux, bytes en macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def percentile(sorted_values: List[int], fraction: float) -> int:
+    """Percentil por el método del rango más cercano."""
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(operation: Callable[[int], object], max_ops: int, time_budget: float) -> Dict[str, float]:
+    """
+    Ejecuta una operación repetidamente midiendo cada llamada.
+
+    Se detiene al llegar a `max_ops` o al agotar el presupuesto de
+    tiempo (con un mínimo de 5 llamadas para las operaciones O(n)).
+
+    Args:
+        operation: Función que recibe el número de iteración
+        max_ops: Máximo de llamadas
+        time_budget: Segundos máximos de medición
+
+    Returns:
+        ops, ops_per_sec, p50_us, p99_us y max_us
+    """
+    latencies = []
+    clock = time.perf_counter_ns
+    deadline = clock() + int(time_budget * 1e9)
+    gc.disable()
+    try:
+        for i in range(max_ops):
+            start = clock()
+            operation(i)
+            end = clock()
+            latencies.append(end - start)
+            if end > deadline and len(latencies) >= 5:
+                break
+    finally:
+        gc.enable()
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "ops_per_sec": round(len(latencies) / (total / 1e9), 1) if total else 0.0,
+        "p50_us": round(percentile(latencies, 0.50) / 1000, 2),
+        "p99_us": round(percentile(latencies, 0.99) / 1000, 2),
+        "max_us": round(latencies[-1] / 1000, 2) if latencies else 0.0
+    }
+
+
+def populate_users(controller: UserController, size: int) -> None:
+    """Registra `size` usuarios."""
+    for i in range(size):
+        controller.register_user(f"user{i}", f"user{i}@bench.com", f"pw{i}", UserRole.CLIENT, f"Usuario Bench {i}")
+
+
+def populate_products(controller: ProductController, size: int) -> None:
+    """Crea `size` productos repartidos entre categorías."""
+    rng = random.Random(size)
+    for i in range(size):
+        controller.create_product(
+            f"Producto {i}",
+            f"Descripción del producto de prueba {i}",
+            round(rng.uniform(1, 1000), 2),
+            CATEGORIES[i % len(CATEGORIES)],
+            rng.randint(0, 100),
+            f"SKU-{i}"
+        )
+
+
+def populate_payments(controller: PaymentController, size: int) -> None:
+    """Crea `size` pagos y procesa la mitad."""
+    for i in range(size):
+        payment = controller.create_payment(i, i % 1000, 10.0 + i % 500, PaymentMethod.CREDIT_CARD)
+        if i % 2 == 0:
+            controller.process_payment(payment.payment_id)
+
+
+def bench_users(size: int, max_ops: int, budget: float) -> List[Dict]:
+    """Registro, autenticación y listado de usuarios."""
+    controller = instrumented(UserController(UserRepository()), "user_controller", "user_repository")
+    populate_users(controller, size)
+    rss = current_rss_mb()
+    rng = random.Random(1)
+
+    def authenticate(i: int) -> None:
+        n = rng.randrange(size)
+        controller.authenticate(f"user{n}", f"pw{n}")
+
+    results = [
+        ("users.register", measure(
+            lambda i: controller.register_user(f"new{i}", f"new{i}@bench.com", "pw", UserRole.CLIENT, f"Nuevo {i}"),
+            max_ops, budget)),
+        ("users.authenticate", measure(authenticate, max_ops, budget)),
+        ("users.list_all", measure(lambda i: controller.list_all_users(), max_ops, budget))
+    ]
+    return [dict(scenario=name, size=size, rss_mb=rss, **stats) for name, stats in results]
+
+
+def bench_products(size: int, max_ops: int, budget: float) -> List[Dict]:
+    """Alta de productos, búsqueda por SKU y listados."""
+    controller = instrumented(ProductController(ProductRepository()), "product_controller", "product_repository")
+    populate_products(controller, size)
+    repository = controller.product_repository
+    rss = current_rss_mb()
+    rng = random.Random(2)
+    results = [
+        ("products.create", measure(
+            lambda i: controller.create_product(f"Nuevo {i}", "Nuevo", 9.99, ProductCategory.OTHER, 1, f"NEW-{i}"),
+            max_ops, budget)),
+        ("products.find_by_sku", measure(
+            lambda i: repository.find_by_sku(f"SKU-{rng.randrange(size)}"), max_ops, budget)),
+        ("products.list_by_category", measure(
+            lambda i: controller.list_by_category(CATEGORIES[i % len(CATEGORIES)]), max_ops, budget)),
+        ("products.cheapest_10", measure(
+            lambda i: controller.list_cheapest(10, CATEGORIES[i % len(CATEGORIES)]), max_ops, budget)),
+        ("products.list_all", measure(lambda i: controller.list_all_products(), max_ops, budget))
+    ]
+    return [dict(scenario=name, size=size, rss_mb=rss, **stats) for name, stats in results]
+
+
+def bench_payments(size: int, max_ops: int, budget: float) -> List[Dict]:
+    """Creación, procesamiento y reembolso de pagos, y listados."""
+    random.seed(3)  # el gateway simulado usa random
+    controller = instrumented(PaymentController(PaymentRepository()), "payment_controller", "payment_repository")
+    populate_payments(controller, size)
+    rss = current_rss_mb()
+    pending = []
+    completed = [p.payment_id for p in controller.list_payments_by_status(PaymentStatus.COMPLETED)]
+
+    def create(i: int) -> None:
+        pending.append(controller.create_payment(i, i % 1000, 25.0, PaymentMethod.PAYPAL).payment_id)
+
+    results = [("payments.create", measure(create, max_ops, budget))]
+    results.append(("payments.process", measure(
+        lambda i: controller.process_payment(pending[i % len(pending)]), len(pending), budget)))
+    results.append(("payments.refund", measure(
+        lambda i: controller.refund_payment(completed[i % len(completed)]), min(max_ops, len(completed)), budget)))
+    results.append(("payments.list_by_user", measure(
+        lambda i: controller.list_payments_by_user(i % 1000), max_ops, budget)))
+    results.append(("payments.list_by_status", measure(
+        lambda i: controller.list_payments_by_status(PaymentStatus.PENDING), max_ops, budget)))
+    return [dict(scenario=name, size=size, rss_mb=rss, **stats) for name, stats in results]
+
+
+SUITES = {
+    "users": bench_users,
+    "products": bench_products,
+    "payments": bench_payments
+}
+
+
+def run(sizes: List[int], suites: List[str], max_ops: int, budget: float) -> Dict:
+    """Ejecuta las suites pedidas para cada tamaño."""
+    results = []
+    for size in sizes:
+        for suite in suites:
+            started = time.perf_counter()
+            suite_results = SUITES[suite](size, max_ops, budget)
+            gc.collect()
+            for row in suite_results:
+                print(
+                    f"{row['scenario']:<28} n={size:>9,}  {row['ops_per_sec']:>12,.1f} ops/s  "
+                    f"p50={row['p50_us']:>10,.1f}µs  p99={row['p99_us']:>10,.1f}µs  rss={row['rss_mb']} MB"
+                )
+            print(f"  ({suite} n={size:,} en {time.perf_counter() - started:.1f}s)")
+            results.extend(suite_results)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "max_ops": max_ops,
+            "time_budget": budget
+        },
+        "results": results
+    }
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """
+    Compara con una línea base y lista las regresiones.
+
+    Una regresión es una caída de ops/s o una subida de p99 mayor que
+    `max_regression` (fracción, 0.2 = 20 %) en el mismo escenario y tamaño.
+
+    Args:
+        current: Resultados actuales
+        baseline: Resultados de referencia (mismo formato JSON)
+        max_regression: Tolerancia relativa
+
+    Returns:
+        Lista de descripciones de regresiones (vacía si no hay)
+    """
+    reference = {(r["scenario"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for row in current["results"]:
+        base = reference.get((row["scenario"], row["size"]))
+        if base is None:
+            continue
+        if base["ops_per_sec"] and row["ops_per_sec"] < base["ops_per_sec"] * (1 - max_regression):
+            regressions.append(
+                f"{row['scenario']} n={row['size']}: ops/s {base['ops_per_sec']} -> {row['ops_per_sec']}"
+            )
+        if base["p99_us"] and row["p99_us"] > base["p99_us"] * (1 + max_regression):
+            regressions.append(
+                f"{row['scenario']} n={row['size']}: p99 {base['p99_us']}µs -> {row['p99_us']}µs"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada; devuelve 1 si hay regresiones."""
+    parser = argparse.ArgumentParser(description="Benchmarks de escalabilidad del Sistema de Gestión")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Tamaños separados por comas (por defecto 1000,100000,1000000)")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help="Suites a ejecutar: users,products,payments")
+    parser.add_argument("--max-ops", type=int, default=2000, help="Máximo de operaciones por escenario")
+    parser.add_argument("--time-budget", type=float, default=2.0, help="Segundos de medición por escenario")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Medir con la instrumentación de métricas activa (para calcular su sobrecoste)")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--baseline", help="JSON de referencia con el que comparar")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Regresión tolerada frente a la referencia (0.25 = 25 %%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    suites = [s for s in args.suites.split(",") if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Suites desconocidas: {', '.join(sorted(unknown))}")
+
+    global _metrics
+    if args.instrument:
+        _metrics = MetricsRegistry()
+    report = run(sizes, suites, args.max_ops, args.time_budget)
+    report["meta"]["instrumented"] = args.instrument
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.max_regression)
+        if regressions:
+            print("\n❌ Regresiones detectadas:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\n✓ Sin regresiones frente a la referencia")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Escalado del despliegue fragmentado de 1 a N procesos."""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.user import UserRole
+from models.payment import PaymentMethod, PaymentStatus
+from controllers.user_controller import UserController
+from controllers.payment_controller import PaymentController
+from repositories.user_repository import UserRepository
+from repositories.payment_repository import PaymentRepository
+from sharding.pool import ShardPool
+from sharding.controllers import ShardedUserController, ShardedPaymentController
+
+
+def user_rows(start: int, count: int) -> List[tuple]:
+    """Filas de registro de usuarios."""
+    return [
+        (f"user{i}", f"user{i}@bench.local", "password123", UserRole.CLIENT, f"Usuario {i}")
+        for i in range(start, start + count)
+    ]
+
+
+def run_in_process(entities: int, batch: int) -> Dict[str, float]:
+    """Referencia: mismos pasos en un solo proceso, sin fragmentos."""
+    users = UserController(UserRepository())
+    payments = PaymentController(PaymentRepository())
+    timings = {}
+
+    start = time.perf_counter()
+    user_ids = []
+    for offset in range(0, entities, batch):
+        user_ids.extend(user.user_id for user in (
+            users.register_user(*row) for row in user_rows(offset, min(batch, entities - offset))
+        ))
+    timings["register_users"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    payment_ids = [
+        payments.create_payment(i, user_ids[i % len(user_ids)], 10.0, PaymentMethod.CREDIT_CARD).payment_id
+        for i in range(entities)
+    ]
+    timings["create_payments"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payment_id in payment_ids:
+        payments.process_payment(payment_id)
+    timings["process_payments"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    payments.list_payments_by_status(PaymentStatus.FAILED)
+    timings["list_by_status"] = time.perf_counter() - start
+    return timings
+
+
+def run_sharded(shards: int, entities: int, batch: int) -> Dict[str, float]:
+    """Mismos pasos sobre N fragmentos, enviando lotes de `batch` llamadas."""
+    timings = {}
+    with ShardPool(shards) as pool:
+        users = ShardedUserController(pool)
+        payments = ShardedPaymentController(pool)
+
+        start = time.perf_counter()
+        user_ids = []
+        for offset in range(0, entities, batch):
+            created = users.register_users(user_rows(offset, min(batch, entities - offset)))
+            user_ids.extend(user.user_id for user in created)
+        timings["register_users"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        payment_ids = []
+        for offset in range(0, entities, batch):
+            rows = [
+                (i, user_ids[i % len(user_ids)], 10.0, PaymentMethod.CREDIT_CARD)
+                for i in range(offset, min(offset + batch, entities))
+            ]
+            payment_ids.extend(payment.payment_id for payment in payments.create_payments(rows))
+        timings["create_payments"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for offset in range(0, entities, batch):
+            payments.process_payments(payment_ids[offset:offset + batch])
+        timings["process_payments"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        payments.list_payments_by_status(PaymentStatus.FAILED)
+        timings["list_by_status"] = time.perf_counter() - start
+    return timings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada."""
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Escalado del despliegue fragmentado")
+    parser.add_argument("--shards", default=",".join(str(n) for n in sorted({1, 2, 4, cores})),
+                        help="Números de fragmentos a probar (por defecto 1,2,4 y los núcleos)")
+    parser.add_argument("--entities", type=int, default=50_000, help="Usuarios y pagos a crear")
+    parser.add_argument("--batch", type=int, default=1000, help="Llamadas por lote")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+    shard_counts = [int(n) for n in args.shards.split(",") if n]
+
+    print(f"{args.entities} usuarios y pagos, lotes de {args.batch}, {cores} núcleos\n")
+    print(f"{'modo':<14} {'operación':<18} {'ops/s':>12} {'vs 1 frag.':>11}")
+    results = []
+    baseline: Dict[str, float] = {}
+    runs = [("en proceso", None)] + [(f"{n} fragmentos", n) for n in shard_counts]
+    for label, shards in runs:
+        if shards is None:
+            timings = run_in_process(args.entities, args.batch)
+        else:
+            timings = run_sharded(shards, args.entities, args.batch)
+        for operation, seconds in timings.items():
+            count = 1 if operation == "list_by_status" else args.entities
+            rate = count / seconds if seconds else 0.0
+            if shards == shard_counts[0]:
+                baseline[operation] = rate
+            speedup = f"{rate / baseline[operation]:.2f}x" if shards and baseline.get(operation) else ""
+            print(f"{label:<14} {operation:<18} {rate:>12,.0f} {speedup:>11}")
+            results.append({"shards": shards, "operation": operation, "ops_per_sec": round(rate, 1)})
+        print()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"cores": cores, "entities": args.entities, "batch": args.batch, "results": results},
+                      output, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
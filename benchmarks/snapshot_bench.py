@@ -0,0 +1,134 @@
+"""Lecturas largas y escrituras concurrentes: instantáneas frente a un cerrojo global."""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from controllers.product_controller import ProductController
+from models.product import ProductCategory
+from monitoring.metrics import Histogram
+from repositories.product_repository import ProductRepository
+
+
+def build_catalog(products: int) -> ProductController:
+    """Controlador con un catálogo de productos."""
+    controller = ProductController(ProductRepository())
+    categories = list(ProductCategory)
+    for i in range(products):
+        controller.create_product(
+            f"Producto {i}", "", 10.0 + i % 500, categories[i % len(categories)], 100, f"SKU-{i:08d}"
+        )
+    return controller
+
+
+def stock_report(products) -> int:
+    """Informe largo: recorre el catálogo entero."""
+    return sum(product.stock_quantity for product in products)
+
+
+def run(controller: ProductController, mode: str, writers: int, readers: int, duration: float) -> Dict[str, float]:
+    """
+    Ejecuta escritores (add_stock) y lectores (informe completo) a la vez.
+
+    Args:
+        controller: Controlador con el catálogo
+        mode: "lock" (cerrojo global en lecturas y escrituras) o
+            "snapshot" (lecturas sobre snapshot(), escrituras optimistas)
+        writers: Hilos escritores
+        readers: Hilos lectores
+        duration: Segundos de medición
+
+    Returns:
+        Escrituras/s, informes/s y p99 de escritura
+    """
+    repository = controller.product_repository
+    global_lock = threading.Lock()
+    product_count = repository.count()
+    stop = threading.Event()
+    writes = [0] * writers
+    reports = [0] * readers
+    latencies = [Histogram() for _ in range(writers)]
+
+    if mode == "lock":
+        def write(product_id: int) -> None:
+            with global_lock:
+                controller.add_stock(product_id, 1)
+
+        def read() -> int:
+            with global_lock:
+                return stock_report(repository._products.values())
+    else:
+        def write(product_id: int) -> None:
+            controller.add_stock(product_id, 1)
+
+        def read() -> int:
+            return stock_report(repository.snapshot())
+
+    def writer(n: int) -> None:
+        product_id = n
+        while not stop.is_set():
+            product_id = product_id % product_count + 1
+            start = time.perf_counter_ns()
+            write(product_id)
+            latencies[n].record(time.perf_counter_ns() - start)
+            writes[n] += 1
+            product_id += writers
+
+    def reader(n: int) -> None:
+        while not stop.is_set():
+            read()
+            reports[n] += 1
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        "writes_per_sec": round(sum(writes) / duration, 1),
+        "reports_per_sec": round(sum(reports) / duration, 2),
+        "write_p99_us": round(max(h.percentile(0.99) for h in latencies) / 1e3, 1),
+        "write_max_ms": round(max(h.max() for h in latencies) / 1e6, 1)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada."""
+    parser = argparse.ArgumentParser(description="Instantáneas MVCC frente a un cerrojo global")
+    parser.add_argument("--products", type=int, default=100_000, help="Productos en el catálogo")
+    parser.add_argument("--writers", type=int, default=4, help="Hilos escritores")
+    parser.add_argument("--readers", default="0,1,2", help="Números de hilos lectores a probar")
+    parser.add_argument("--duration", type=float, default=3.0, help="Segundos por escenario")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    controller = build_catalog(args.products)
+    print(f"{args.products:,} productos, {args.writers} escritores, {args.duration:.0f} s por escenario\n")
+    print(f"{'modo':>9} {'lectores':>9} {'escrituras/s':>13} {'informes/s':>11} {'p99 escr.':>10} {'máx escr.':>10}")
+    results = []
+    for readers in [int(n) for n in args.readers.split(",") if n]:
+        for mode in ("lock", "snapshot"):
+            row = run(controller, mode, args.writers, readers, args.duration)
+            print(f"{mode:>9} {readers:>9} {row['writes_per_sec']:>13,.0f} {row['reports_per_sec']:>11.2f} "
+                  f"{row['write_p99_us']:>8.1f}us {row['write_max_ms']:>8.1f}ms")
+            results.append({"mode": mode, "readers": readers, **row})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"products": args.products, "writers": args.writers, "results": results},
+                      output, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
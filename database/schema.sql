@@ -13,6 +13,7 @@ CREATE TABLE IF NOT EXISTS users (
     role VARCHAR(20) NOT NULL CHECK (role IN ('admin', 'manager', 'employee', 'client')),
     full_name VARCHAR(100) NOT NULL,
     is_active BOOLEAN DEFAULT 1,
+    version INTEGER NOT NULL DEFAULT 0,  -- concurrencia optimista: UPDATE ... WHERE version = ?
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -79,6 +80,8 @@ CREATE TABLE IF NOT EXISTS products (
     sku VARCHAR(50) UNIQUE NOT NULL,
     supplier_id INTEGER,
     is_available BOOLEAN DEFAULT 1,
+    reorder_threshold INTEGER CHECK (reorder_threshold >= 0),  -- punto de pedido (NULL sin umbral)
+    version INTEGER NOT NULL DEFAULT 0,  -- concurrencia optimista: UPDATE ... WHERE version = ?
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (supplier_id) REFERENCES suppliers(supplier_id) ON DELETE SET NULL
@@ -87,6 +90,8 @@ CREATE TABLE IF NOT EXISTS products (
 CREATE INDEX idx_products_sku ON products(sku);
 CREATE INDEX idx_products_category ON products(category);
 CREATE INDEX idx_products_supplier_id ON products(supplier_id);
+-- Solo los productos que necesitan reposición
+CREATE INDEX idx_products_low_stock ON products(stock_quantity) WHERE stock_quantity <= reorder_threshold;
 
 -- ============================================
 -- Tabla: product_reviews
@@ -103,7 +108,9 @@ CREATE TABLE IF NOT EXISTS product_reviews (
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
-CREATE INDEX idx_product_reviews_product_id ON product_reviews(product_id);
+-- Páginas de reseñas por fecha y por estrellas (paginación por clave)
+CREATE INDEX idx_product_reviews_recent ON product_reviews(product_id, created_at, review_id);
+CREATE INDEX idx_product_reviews_rating ON product_reviews(product_id, rating, created_at, review_id);
 CREATE INDEX idx_product_reviews_user_id ON product_reviews(user_id);
 
 -- ============================================
@@ -153,6 +160,7 @@ CREATE TABLE IF NOT EXISTS payments (
     payment_method VARCHAR(20) NOT NULL CHECK (payment_method IN ('credit_card', 'debit_card', 'paypal', 'bank_transfer', 'cash')),
     payment_status VARCHAR(20) DEFAULT 'pending' CHECK (payment_status IN ('pending', 'processing', 'completed', 'failed', 'refunded', 'cancelled')),
     transaction_id VARCHAR(100),
+    version INTEGER NOT NULL DEFAULT 0,  -- concurrencia optimista: UPDATE ... WHERE version = ?
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     processed_at TIMESTAMP,
     refunded_at TIMESTAMP,
@@ -179,6 +187,45 @@ CREATE TABLE IF NOT EXISTS payment_details (
 
 CREATE INDEX idx_payment_details_payment_id ON payment_details(payment_id);
 
+-- ============================================
+-- Tabla: payment_retries
+-- Reintentos programados de pagos fallidos
+-- ============================================
+CREATE TABLE IF NOT EXISTS payment_retries (
+    payment_id INTEGER PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    status VARCHAR(20) NOT NULL CHECK (status IN ('scheduled', 'running', 'succeeded', 'exhausted', 'discarded')),
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    FOREIGN KEY (payment_id) REFERENCES payments(payment_id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_payment_retries_due ON payment_retries(status, next_attempt_at);
+
+-- ============================================
+-- Tabla: jobs
+-- Cola de trabajos en segundo plano
+-- ============================================
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind VARCHAR(50) NOT NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    leased_by VARCHAR(50),
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX idx_jobs_available ON jobs(status, available_at);
+CREATE INDEX idx_jobs_lease ON jobs(status, lease_until);
+
 -- ============================================
 -- Triggers para actualizar updated_at
 -- ============================================
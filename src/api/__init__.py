@@ -0,0 +1,12 @@
+"""API HTTP/JSON del Sistema de Gestión."""
+
+__all__ = [
+    'HttpServer',
+    'HttpError',
+    'BadRequest',
+    'Request',
+    'Response',
+    'Router',
+    'build_router',
+    'to_json'
+]
@@ -0,0 +1,416 @@
+"""Rutas de la API JSON sobre los controladores."""
+
+import math
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Collection, Dict, Optional
+
+from controllers.user_controller import UserController
+from controllers.product_controller import ProductController
+from controllers.payment_controller import PaymentController
+from models.user import UserRole
+from models.product import ProductCategory
+from models.payment import PaymentMethod, PaymentStatus
+from monitoring.metrics import REGISTRY
+from api.server import BadRequest, HttpError, Request, Response, Router
+from jobs.job_queue import JobQueue
+from ratelimit.limiter import RateLimitExceeded
+
+
+# Atributos que nunca se envían al cliente
+_HIDDEN_ATTRIBUTES = {"password_hash"}
+
+
+def to_json(value: Any) -> Any:
+    """
+    Convierte entidades del modelo en estructuras serializables.
+
+    Los enums se envían por su valor, las fechas en ISO 8601 y los
+    objetos por sus atributos públicos (sin password_hash).
+
+    Args:
+        value: Entidad, lista o valor simple
+
+    Returns:
+        Valor serializable con json.dumps
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    return {
+        name: to_json(attribute)
+        for name, attribute in vars(value).items()
+        if not name.startswith("_") and name not in _HIDDEN_ATTRIBUTES
+    }
+
+
+def build_router(
+    user_controller: UserController,
+    product_controller: ProductController,
+    payment_controller: PaymentController,
+    job_queue: Optional[JobQueue] = None,
+    job_kinds: Optional[Collection[str]] = None
+) -> Router:
+    """
+    Crea la tabla de rutas de la API.
+
+    Args:
+        user_controller: Controlador de usuarios
+        product_controller: Controlador de productos
+        payment_controller: Controlador de pagos
+        job_queue: Cola de trabajos (añade las rutas /jobs)
+        job_kinds: Tipos de trabajo con manejador; POST /jobs rechaza
+            los demás con 400 (None para aceptar cualquiera, p. ej. si
+            los trabajadores corren en otro proceso)
+
+    Returns:
+        Router con las rutas de usuarios, productos, pagos, trabajos,
+        /health y /metrics
+    """
+    router = Router()
+
+    # --- Usuarios ---
+
+    def create_user(request: Request) -> Response:
+        data = request.json()
+        user = user_controller.register_user(
+            _text(data, "username"),
+            _text(data, "email"),
+            _text(data, "password"),
+            _parse(UserRole, data.get("role", UserRole.CLIENT.value), "role"),
+            _text(data, "full_name")
+        )
+        if user is None:
+            raise HttpError(409, "El username o el email ya existen")
+        return Response.json(to_json(user), 201)
+
+    def authenticate(request: Request) -> Response:
+        data = request.json()
+        try:
+            user = user_controller.authenticate(
+                _text(data, "username"), _text(data, "password"), request.client
+            )
+        except RateLimitExceeded as error:
+            raise _too_many_requests(error)
+        if user is None:
+            raise HttpError(401, "Credenciales inválidas")
+        return Response.json(to_json(user))
+
+    def list_users(request: Request) -> Response:
+        query = request.query.get("q")
+        if query is not None:
+            matches = user_controller.search_users(query, limit=_int(request, "limit", 10))
+            return Response.json([
+                {"user": to_json(user), "similarity": round(score, 4)} for user, score in matches
+            ])
+        return Response.json(to_json(user_controller.list_all_users()))
+
+    def get_user(request: Request, user_id: int) -> Response:
+        return Response.json(to_json(_found(user_controller.get_user(user_id), "Usuario")))
+
+    def delete_user(request: Request, user_id: int) -> Response:
+        _succeeded(user_controller.delete_user(user_id), 404, "Usuario no encontrado")
+        return Response(204)
+
+    def activate_user(request: Request, user_id: int) -> Response:
+        _succeeded(user_controller.activate_user(user_id), 404, "Usuario no encontrado")
+        return Response.json(to_json(user_controller.get_user(user_id)))
+
+    def deactivate_user(request: Request, user_id: int) -> Response:
+        _succeeded(user_controller.deactivate_user(user_id), 404, "Usuario no encontrado")
+        return Response.json(to_json(user_controller.get_user(user_id)))
+
+    router.add("POST", "/users", create_user, blocking=True)
+    router.add("GET", "/users", list_users)
+    router.add("POST", "/auth", authenticate, blocking=True)
+    router.add("GET", "/users/{user_id}", get_user)
+    router.add("DELETE", "/users/{user_id}", delete_user)
+    router.add("POST", "/users/{user_id}/activate", activate_user)
+    router.add("POST", "/users/{user_id}/deactivate", deactivate_user)
+
+    # --- Productos ---
+
+    def create_product(request: Request) -> Response:
+        data = request.json()
+        threshold = data.get("reorder_threshold")
+        product = product_controller.create_product(
+            _text(data, "name"),
+            _text(data, "description", ""),
+            _parse(float, _required(data, "price"), "price"),
+            _parse(ProductCategory, _required(data, "category"), "category"),
+            _parse(int, data.get("stock_quantity", 0), "stock_quantity"),
+            _text(data, "sku"),
+            None if threshold is None else _parse(int, threshold, "reorder_threshold")
+        )
+        if product is None:
+            raise HttpError(409, "El SKU ya existe o los datos no son válidos")
+        return Response.json(to_json(product), 201)
+
+    def list_products(request: Request) -> Response:
+        query = request.query
+        category = _parse(ProductCategory, query["category"], "category") if "category" in query else None
+        if "q" in query:
+            products = product_controller.search_products(
+                query["q"], page=_int(request, "page", 1), page_size=_int(request, "page_size", 20)
+            )
+        elif "min_price" in query or "max_price" in query:
+            after = None
+            if "after_price" in query and "after_id" in query:
+                after = (
+                    _parse(float, query["after_price"], "after_price"),
+                    _parse(int, query["after_id"], "after_id")
+                )
+            products = product_controller.list_by_price_range(
+                _float(request, "min_price"),
+                _float(request, "max_price"),
+                category=category,
+                page_size=_int(request, "page_size", 20),
+                after=after,
+                descending=query.get("order") == "desc"
+            )
+        elif category is not None:
+            products = product_controller.list_by_category(category)
+        else:
+            products = product_controller.list_all_products()
+        return Response.json(to_json(products))
+
+    def get_product(request: Request, product_id: int) -> Response:
+        return Response.json(to_json(_found(product_controller.get_product(product_id), "Producto")))
+
+    def delete_product(request: Request, product_id: int) -> Response:
+        _succeeded(product_controller.delete_product(product_id), 404, "Producto no encontrado")
+        return Response(204)
+
+    def update_price(request: Request, product_id: int) -> Response:
+        _found(product_controller.get_product(product_id), "Producto")
+        price = _parse(float, _required(request.json(), "price"), "price")
+        _succeeded(product_controller.update_price(product_id, price), 400, "Precio inválido")
+        return Response.json(to_json(product_controller.get_product(product_id)))
+
+    def change_stock(request: Request, product_id: int) -> Response:
+        _found(product_controller.get_product(product_id), "Producto")
+        delta = _parse(int, _required(request.json(), "delta"), "delta")
+        if delta >= 0:
+            changed = product_controller.add_stock(product_id, delta)
+        else:
+            changed = product_controller.reduce_stock(product_id, -delta)
+        _succeeded(changed, 409, "Stock insuficiente o cantidad inválida")
+        return Response.json(to_json(product_controller.get_product(product_id)))
+
+    def list_low_stock(request: Request) -> Response:
+        return Response.json(to_json(product_controller.list_low_stock(_int(request, "limit", 10))))
+
+    def set_reorder_threshold(request: Request, product_id: int) -> Response:
+        _found(product_controller.get_product(product_id), "Producto")
+        threshold = request.json().get("reorder_threshold")
+        threshold = None if threshold is None else _parse(int, threshold, "reorder_threshold")
+        _succeeded(product_controller.set_reorder_threshold(product_id, threshold), 400, "Umbral inválido")
+        return Response.json(to_json(product_controller.get_product(product_id)))
+
+    def list_reviews(request: Request, product_id: int) -> Response:
+        _found(product_controller.get_product(product_id), "Producto")
+        query = request.query
+        try:
+            reviews = product_controller.list_reviews(
+                product_id,
+                order_by=query.get("order_by", "recent"),
+                rating=_parse(int, query["rating"], "rating") if "rating" in query else None,
+                page_size=_int(request, "page_size", 20),
+                after=_parse(int, query["after"], "after") if "after" in query else None,
+                descending=query.get("order") != "asc"
+            )
+        except ValueError as error:
+            raise BadRequest(str(error))
+        return Response.json(to_json(reviews))
+
+    def add_review(request: Request, product_id: int) -> Response:
+        _found(product_controller.get_product(product_id), "Producto")
+        data = request.json()
+        review = product_controller.add_review(
+            product_id,
+            _parse(int, _required(data, "user_id"), "user_id"),
+            _parse(int, _required(data, "rating"), "rating"),
+            _text(data, "comment", "")
+        )
+        if review is None:
+            raise BadRequest("El rating debe estar entre 1 y 5")
+        return Response.json(to_json(review), 201)
+
+    def get_rating(request: Request, product_id: int) -> Response:
+        _found(product_controller.get_product(product_id), "Producto")
+        return Response.json(to_json(product_controller.get_rating_summary(product_id)))
+
+    router.add("POST", "/products", create_product)
+    router.add("GET", "/products", list_products)
+    router.add("GET", "/products/low-stock", list_low_stock)
+    router.add("GET", "/products/{product_id}", get_product)
+    router.add("DELETE", "/products/{product_id}", delete_product)
+    router.add("PUT", "/products/{product_id}/price", update_price)
+    router.add("POST", "/products/{product_id}/stock", change_stock)
+    router.add("PUT", "/products/{product_id}/reorder-threshold", set_reorder_threshold)
+    router.add("GET", "/products/{product_id}/reviews", list_reviews)
+    router.add("POST", "/products/{product_id}/reviews", add_review)
+    router.add("GET", "/products/{product_id}/rating", get_rating)
+
+    # --- Pagos ---
+
+    def create_payment(request: Request) -> Response:
+        data = request.json()
+        try:
+            payment = payment_controller.create_payment(
+                _parse(int, _required(data, "order_id"), "order_id"),
+                _parse(int, _required(data, "user_id"), "user_id"),
+                _parse(float, _required(data, "amount"), "amount"),
+                _parse(PaymentMethod, _required(data, "payment_method"), "payment_method"),
+                data.get("transaction_id"),
+                request.client
+            )
+        except RateLimitExceeded as error:
+            raise _too_many_requests(error)
+        if payment is None:
+            raise BadRequest("No se pudo crear el pago")
+        return Response.json(to_json(payment), 201)
+
+    def list_payments(request: Request) -> Response:
+        query = request.query
+        if "user_id" in query:
+            payments = payment_controller.list_payments_by_user(_parse(int, query["user_id"], "user_id"))
+        elif "status" in query:
+            payments = payment_controller.list_payments_by_status(_parse(PaymentStatus, query["status"], "status"))
+        else:
+            raise BadRequest("Indique user_id o status")
+        return Response.json(to_json(payments))
+
+    def get_payment(request: Request, payment_id: int) -> Response:
+        return Response.json(to_json(_found(payment_controller.get_payment(payment_id), "Pago")))
+
+    def transition(action: str):
+        def handler(request: Request, payment_id: int) -> Response:
+            _found(payment_controller.get_payment(payment_id), "Pago")
+            succeeded = getattr(payment_controller, action)(payment_id)
+            payment = to_json(payment_controller.get_payment(payment_id))
+            return Response.json(payment, 200 if succeeded else 409)
+        return handler
+
+    def transition_many(request: Request) -> Response:
+        data = request.json()
+        payment_ids = _required(data, "payment_ids")
+        if not isinstance(payment_ids, list):
+            raise BadRequest("payment_ids debe ser una lista")
+        payment_ids = [_parse(int, pid, "payment_ids") for pid in payment_ids]
+        try:
+            outcomes = payment_controller.transition_many(
+                payment_ids, _text(data, "action"), atomic=bool(data.get("atomic", False))
+            )
+        except ValueError as error:
+            raise BadRequest(str(error))
+        applied = sum(1 for reason in outcomes.values() if reason is None)
+        body = {"applied": applied, "results": {str(pid): reason for pid, reason in outcomes.items()}}
+        return Response.json(body, 200 if applied == len(outcomes) else 409 if applied == 0 else 207)
+
+    router.add("POST", "/payments", create_payment)
+    router.add("POST", "/payments/transitions", transition_many)
+    router.add("GET", "/payments", list_payments)
+    router.add("GET", "/payments/{payment_id}", get_payment)
+    # Llaman al gateway de pagos
+    router.add("POST", "/payments/{payment_id}/process", transition("process_payment"), blocking=True)
+    router.add("POST", "/payments/{payment_id}/retry", transition("retry_payment"), blocking=True)
+    router.add("POST", "/payments/{payment_id}/refund", transition("refund_payment"))
+    router.add("POST", "/payments/{payment_id}/cancel", transition("cancel_payment"))
+
+    # --- Trabajos en segundo plano ---
+
+    if job_queue is not None:
+        def enqueue_job(request: Request) -> Response:
+            data = request.json()
+            payload = data.get("payload") or {}
+            if not isinstance(payload, dict):
+                raise BadRequest("payload debe ser un objeto")
+            kind = _text(data, "kind")
+            if job_kinds is not None and kind not in job_kinds:
+                raise BadRequest(f"Tipo de trabajo desconocido: {kind}")
+            job_id = job_queue.enqueue(kind, payload)
+            return Response.json({"job_id": job_id, "status": "queued"}, 202)
+
+        def get_job(request: Request, job_id: int) -> Response:
+            return Response.json(_found(job_queue.get(job_id), "Trabajo").to_dict())
+
+        def process_later(request: Request, payment_id: int) -> Response:
+            _found(payment_controller.get_payment(payment_id), "Pago")
+            job_id = job_queue.enqueue("process_payment", {"payment_id": payment_id})
+            return Response.json({"job_id": job_id, "status": "queued"}, 202)
+
+        router.add("POST", "/jobs", enqueue_job)
+        router.add("GET", "/jobs/{job_id}", get_job)
+        router.add("POST", "/payments/{payment_id}/process-async", process_later)
+
+    # --- Operación ---
+
+    router.add("GET", "/health", lambda request: Response.json({"status": "ok"}))
+    router.add("GET", "/metrics", lambda request: Response.text(REGISTRY.expose()))
+    return router
+
+
+def _required(data: Dict[str, Any], field: str) -> Any:
+    """Valor obligatorio del cuerpo (400 si falta)."""
+    if data.get(field) is None:
+        raise BadRequest(f"Falta el campo '{field}'")
+    return data[field]
+
+
+def _text(data: Dict[str, Any], field: str, default: Optional[str] = None) -> str:
+    """Texto del cuerpo (400 si no es texto o falta y no hay valor por defecto)."""
+    value = _required(data, field) if default is None else data.get(field, default)
+    if not isinstance(value, str):
+        raise BadRequest(f"El campo '{field}' debe ser texto")
+    return value
+
+
+def _parse(converter: Callable[[Any], Any], value: Any, field: str) -> Any:
+    """
+    Convierte un valor de la petición (número, enum...); 400 si no es
+    válido. Los números deben ser finitos: float() acepta "nan" e "inf".
+    """
+    try:
+        result = converter(value)
+    except (ValueError, TypeError, OverflowError):
+        raise BadRequest(f"Valor no válido para '{field}': {value!r}")
+    if isinstance(result, float) and not math.isfinite(result):
+        raise BadRequest(f"Valor no válido para '{field}': {value!r}")
+    return result
+
+
+def _found(entity: Any, label: str) -> Any:
+    """Devuelve la entidad o lanza 404."""
+    if entity is None:
+        raise HttpError(404, f"{label} no encontrado")
+    return entity
+
+
+def _succeeded(result: bool, status: int, message: str) -> None:
+    """Lanza HttpError si la operación del controlador falló."""
+    if not result:
+        raise HttpError(status, message)
+
+
+def _too_many_requests(error: RateLimitExceeded) -> HttpError:
+    """Error 429 con Retry-After en segundos enteros."""
+    return HttpError(429, str(error), {"Retry-After": str(max(1, math.ceil(error.retry_after)))})
+
+
+def _int(request: Request, name: str, default: int) -> int:
+    """Parámetro entero de la query string."""
+    return _parse(int, request.query.get(name, default), name)
+
+
+def _float(request: Request, name: str) -> Optional[float]:
+    """Parámetro decimal opcional de la query string."""
+    value = request.query.get(name)
+    return _parse(float, value, name) if value is not None else None
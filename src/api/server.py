@@ -0,0 +1,496 @@
+"""Servidor HTTP/1.1 mínimo sobre asyncio para la API JSON."""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import re
+import signal
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+
+_logger = logging.getLogger(__name__)
+
+
+class HttpError(Exception):
+    """Error que se devuelve al cliente con un código HTTP y un mensaje."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        """
+        Inicializa el error.
+
+        Args:
+            status: Código HTTP
+            message: Mensaje para el cliente
+            headers: Cabeceras adicionales (Retry-After...)
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class BadRequest(HttpError):
+    """Datos de la petición inválidos (400)."""
+
+    def __init__(self, message: str):
+        """
+        Inicializa el error.
+
+        Args:
+            message: Mensaje para el cliente
+        """
+        super().__init__(400, message)
+
+
+class Request:
+    """Petición HTTP ya leída."""
+
+    def __init__(
+        self,
+        method: str,
+        target: str,
+        version: str,
+        headers: Dict[str, str],
+        body: bytes = b"",
+        client: Optional[str] = None
+    ):
+        """
+        Inicializa la petición.
+
+        Args:
+            method: Método (GET, POST...)
+            target: Ruta con query string
+            version: "HTTP/1.1" o "HTTP/1.0"
+            headers: Cabeceras con nombres en minúsculas
+            body: Cuerpo
+            client: Dirección IP del cliente, si se conoce
+        """
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query: Dict[str, str] = dict(parse_qsl(parts.query))
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.client = client
+
+    @property
+    def keep_alive(self) -> bool:
+        """True si el cliente admite reutilizar la conexión."""
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self) -> Dict[str, Any]:
+        """
+        Decodifica el cuerpo como objeto JSON.
+
+        Raises:
+            BadRequest: Si el cuerpo no es un objeto JSON válido
+        """
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body, parse_constant=_reject_constant)
+        except ValueError as error:
+            raise BadRequest(f"JSON inválido: {error}")
+        if not isinstance(data, dict):
+            raise BadRequest("Se esperaba un objeto JSON")
+        return data
+
+
+class Response:
+    """Respuesta HTTP."""
+
+    def __init__(
+        self,
+        status: int = 200,
+        body: bytes = b"",
+        content_type: str = "application/json",
+        headers: Optional[Dict[str, str]] = None
+    ):
+        """
+        Inicializa la respuesta.
+
+        Args:
+            status: Código HTTP
+            body: Cuerpo ya codificado
+            content_type: Tipo de contenido
+            headers: Cabeceras adicionales
+        """
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    @classmethod
+    def json(cls, data: Any, status: int = 200) -> "Response":
+        """Respuesta con un cuerpo JSON."""
+        return cls(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    @classmethod
+    def text(cls, text: str, status: int = 200) -> "Response":
+        """Respuesta de texto plano."""
+        return cls(status, text.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+
+    def encode(self, keep_alive: bool) -> bytes:
+        """Serializa la respuesta con sus cabeceras."""
+        lines = [
+            f"HTTP/1.1 {self.status} {_reason(self.status)}",
+            f"Content-Type: {self.content_type}",
+            f"Content-Length: {len(self.body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + self.body
+
+
+Handler = Callable[..., Any]
+
+
+class Router:
+    """
+    Tabla de rutas con parámetros de ruta.
+
+    Los patrones usan llaves para los parámetros: "/users/{user_id}". Un
+    parámetro cuyo nombre termina en "_id" solo admite dígitos y llega al
+    manejador como int.
+
+    Los manejadores registrados con blocking=True (los que esperan a un
+    servicio externo o hacen trabajo de CPU, como el gateway de pagos o
+    el hash de contraseñas) se ejecutan en el pool de hilos del bucle de
+    eventos, para no detener las demás conexiones mientras tanto.
+    """
+
+    def __init__(self):
+        """Inicializa una tabla vacía."""
+        self._routes: List[Tuple[re.Pattern, Dict[str, Handler], str]] = []
+
+    def add(self, method: str, pattern: str, handler: Handler, blocking: bool = False) -> None:
+        """
+        Registra un manejador.
+
+        Args:
+            method: Método HTTP
+            pattern: Ruta con parámetros entre llaves
+            handler: Función (request, **parámetros) -> Response; puede
+                ser una corrutina
+            blocking: Ejecutar el manejador (síncrono) en un hilo, fuera
+                del bucle de eventos
+        """
+        if blocking:
+            handler = _in_executor(handler)
+        for regex, handlers, existing in self._routes:
+            if existing == pattern:
+                handlers[method] = handler
+                return
+
+        def parameter(match: "re.Match") -> str:
+            name = match.group(1)
+            return f"(?P<{name}>\\d+)" if name.endswith("_id") else f"(?P<{name}>[^/]+)"
+
+        regex = re.compile("^" + re.sub(r"\{(\w+)\}", parameter, pattern) + "$")
+        self._routes.append((regex, {method: handler}, pattern))
+
+    def resolve(self, method: str, path: str) -> Tuple[Handler, Dict[str, Any], str]:
+        """
+        Busca el manejador de una petición.
+
+        Returns:
+            (manejador, parámetros, patrón de la ruta)
+
+        Raises:
+            HttpError: 404 si no hay ruta, 405 si no admite el método
+        """
+        for regex, handlers, pattern in self._routes:
+            match = regex.match(path)
+            if match is None:
+                continue
+            handler = handlers.get(method)
+            if handler is None:
+                raise HttpError(405, f"Método no permitido; use {', '.join(sorted(handlers))}")
+            params = {
+                name: int(value) if name.endswith("_id") else value
+                for name, value in match.groupdict().items()
+            }
+            return handler, params, pattern
+        raise HttpError(404, f"Ruta no encontrada: {path}")
+
+
+class HttpServer:
+    """
+    Servidor HTTP/1.1 con keep-alive, pipelining acotado y apagado ordenado.
+
+    Cada conexión tiene una tarea lectora que analiza peticiones y las
+    deja en una cola de `pipeline_depth` posiciones; las respuestas se
+    escriben en orden. Si el cliente encadena más peticiones de las que
+    caben, se deja de leer el socket hasta que haya sitio (contrapresión
+    TCP) en lugar de acumularlas en memoria.
+
+    Los manejadores se ejecutan en el bucle de eventos: las operaciones de
+    los controladores son en memoria y duran microsegundos. Los que
+    bloquean se registran con blocking=True y van a un hilo (ver Router).
+    """
+
+    def __init__(
+        self,
+        router: Router,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        pipeline_depth: int = 16,
+        keep_alive_timeout: float = 15.0,
+        max_requests_per_connection: int = 10_000,
+        max_header_bytes: int = 16 * 1024,
+        max_body_bytes: int = 1024 * 1024,
+        shutdown_timeout: float = 10.0,
+        tracer: Any = None
+    ):
+        """
+        Inicializa el servidor.
+
+        Args:
+            router: Tabla de rutas
+            host: Dirección de escucha
+            port: Puerto (0 para uno libre)
+            pipeline_depth: Peticiones encadenadas que se leen por
+                adelantado en cada conexión
+            keep_alive_timeout: Segundos que se mantiene una conexión ociosa
+            max_requests_per_connection: Peticiones antes de cerrar la
+                conexión
+            max_header_bytes: Tamaño máximo de línea de petición y cabeceras
+            max_body_bytes: Tamaño máximo del cuerpo
+            shutdown_timeout: Segundos para terminar las peticiones en
+                curso al apagar
+            tracer: monitoring.tracing.Tracer opcional; cada petición abre
+                un span raíz
+        """
+        if pipeline_depth < 1:
+            raise ValueError("pipeline_depth debe ser al menos 1")
+        self.router = router
+        self.host = host
+        self.port = port
+        self.pipeline_depth = pipeline_depth
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_requests_per_connection = max_requests_per_connection
+        self.max_header_bytes = max_header_bytes
+        self.max_body_bytes = max_body_bytes
+        self.shutdown_timeout = shutdown_timeout
+        self.tracer = tracer
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._queues: Set[asyncio.Queue] = set()
+        self._closing = False
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """Empieza a aceptar conexiones."""
+        self._closing = False
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=self.max_header_bytes
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Atiende hasta recibir SIGINT/SIGTERM y entonces apaga en orden."""
+        if self._server is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, lambda: asyncio.ensure_future(self.shutdown()))
+            except (NotImplementedError, RuntimeError):
+                # Windows o hilo secundario: queda KeyboardInterrupt
+                pass
+        await self._stopped.wait()
+
+    async def shutdown(self) -> None:
+        """
+        Apaga en orden: deja de aceptar conexiones, cierra las ociosas y
+        espera (hasta shutdown_timeout) a que terminen las peticiones ya
+        leídas, que se responden con "Connection: close".
+        """
+        if self._closing or self._server is None:
+            return
+        self._closing = True
+        self._server.close()
+        for queue in list(self._queues):
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                # Tiene peticiones pendientes: cerrará tras responderlas
+                pass
+        if self._connections:
+            _, pending = await asyncio.wait(set(self._connections), timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        await self._server.wait_closed()
+        self._stopped.set()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Atiende una conexión hasta que se cierre."""
+        if self._closing:
+            writer.close()
+            return
+        task = asyncio.current_task()
+        queue: asyncio.Queue = asyncio.Queue(self.pipeline_depth)
+        self._connections.add(task)
+        self._queues.add(queue)
+        peer = writer.get_extra_info("peername")
+        client = peer[0] if isinstance(peer, tuple) else None
+        read_task = asyncio.ensure_future(self._read_requests(reader, queue, client))
+        try:
+            served = 0
+            while True:
+                if queue.empty():
+                    try:
+                        item = await asyncio.wait_for(queue.get(), self.keep_alive_timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+                if item is None:
+                    break
+
+                served += 1
+                if isinstance(item, HttpError):
+                    response, keep_alive = self._error(item), False
+                else:
+                    response = await self._dispatch(item)
+                    keep_alive = (
+                        item.keep_alive
+                        and not self._closing
+                        and served < self.max_requests_per_connection
+                    )
+                writer.write(response.encode(keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            read_task.cancel()
+            self._queues.discard(queue)
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_requests(
+        self,
+        reader: asyncio.StreamReader,
+        queue: asyncio.Queue,
+        client: Optional[str] = None
+    ) -> None:
+        """Analiza peticiones del socket y las encola (None al terminar)."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await queue.put(HttpError(431, "Cabeceras demasiado grandes"))
+                    return
+                try:
+                    request = self._parse_head(head)
+                    request.client = client
+                    length = int(request.headers.get("content-length", "0"))
+                except (ValueError, UnicodeDecodeError):
+                    await queue.put(HttpError(400, "Petición mal formada"))
+                    return
+                if "chunked" in request.headers.get("transfer-encoding", "").lower():
+                    await queue.put(HttpError(501, "Transfer-Encoding chunked no soportado"))
+                    return
+                if length < 0 or length > self.max_body_bytes:
+                    await queue.put(HttpError(413, "Cuerpo demasiado grande"))
+                    return
+                if length:
+                    request.body = await reader.readexactly(length)
+                await queue.put(request)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        await queue.put(None)
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Request:
+        """Analiza la línea de petición y las cabeceras."""
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ")
+        if not version.startswith("HTTP/1."):
+            raise ValueError(version)
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        return Request(method, target, version, headers)
+
+    async def _dispatch(self, request: Request) -> Response:
+        """
+        Ejecuta el manejador de la petición y convierte los errores.
+
+        Los manejadores validan sus argumentos y lanzan BadRequest (400)
+        u otro HttpError; cualquier otra excepción es un fallo del
+        servidor: se registra con su traza y se responde 500.
+        """
+        try:
+            handler, params, pattern = self.router.resolve(request.method, request.path)
+            if self.tracer is None:
+                return await _call(handler, request, params)
+            with self.tracer.span(f"http {request.method} {pattern}", layer="http") as span:
+                response = await _call(handler, request, params)
+                if span is not None:
+                    span.set_attribute("status", response.status)
+                return response
+        except HttpError as error:
+            return self._error(error)
+        except Exception:
+            _logger.exception("Error no controlado en %s %s", request.method, request.path)
+            return self._error(HttpError(500, "Error interno del servidor"))
+
+    @staticmethod
+    def _error(error: HttpError) -> Response:
+        """Respuesta JSON de error."""
+        response = Response.json({"error": error.message}, error.status)
+        response.headers.update(error.headers)
+        return response
+
+
+async def _call(handler: Handler, request: Request, params: Dict[str, Any]) -> Response:
+    """Llama a un manejador síncrono o asíncrono."""
+    result = handler(request, **params)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _in_executor(handler: Handler) -> Handler:
+    """Envuelve un manejador síncrono para ejecutarlo en el pool de hilos del bucle."""
+
+    @functools.wraps(handler)
+    async def run(request: Request, **params: Any) -> Response:
+        # Con el contexto actual, para que el span de la petición siga activo
+        call = functools.partial(contextvars.copy_context().run, handler, request, **params)
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+
+    return run
+
+
+def _reject_constant(constant: str) -> float:
+    """parse_constant de json.loads: NaN e Infinity no son JSON válido."""
+    raise ValueError(f"{constant} no es un número válido")
+
+
+def _reason(status: int) -> str:
+    """Frase estándar de un código HTTP."""
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return "Unknown"
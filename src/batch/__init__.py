@@ -0,0 +1,7 @@
+"""Modo por lotes (no interactivo) del Sistema de Gestión."""
+
+__all__ = [
+    'BatchRunner',
+    'BatchReport',
+    'BatchError'
+]
@@ -0,0 +1,345 @@
+"""Ejecución no interactiva de comandos sobre los controladores."""
+
+import json
+import shlex
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from controllers.user_controller import UserController
+from controllers.product_controller import ProductController
+from controllers.payment_controller import PaymentController
+from models.user import UserRole
+from models.product import ProductCategory
+from models.payment import PaymentMethod
+from monitoring.metrics import Histogram
+
+
+# Errores de línea que se guardan para el informe
+_MAX_ERRORS = 50
+
+_REQUIRED = object()
+
+
+class BatchError(ValueError):
+    """Comando mal formado (desconocido, argumento ausente o inválido)."""
+
+
+class CommandStats:
+    """Resultados y latencias de un tipo de comando."""
+
+    def __init__(self):
+        """Inicializa contadores a cero."""
+        self.count = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumen serializable (latencias en microsegundos)."""
+        return {
+            "count": self.count,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "errors": self.errors,
+            "total_ms": round(self.latency.total / 1e6, 3),
+            "mean_us": round(self.latency.total / self.latency.count / 1e3, 2) if self.latency.count else 0.0,
+            "p50_us": round(self.latency.percentile(0.5) / 1e3, 2),
+            "p99_us": round(self.latency.percentile(0.99) / 1e3, 2),
+            "max_us": round(self.latency.max() / 1e3, 2)
+        }
+
+
+class BatchReport:
+    """Informe de una ejecución por lotes."""
+
+    def __init__(self):
+        """Inicializa un informe vacío."""
+        self.commands: Dict[str, CommandStats] = {}
+        self.errors: List[Tuple[int, str]] = []
+        self.lines = 0
+        self.elapsed = 0.0
+
+    @property
+    def error_count(self) -> int:
+        """Comandos que no se pudieron ejecutar."""
+        return sum(stats.errors for stats in self.commands.values())
+
+    def record_error(self, line_number: int, message: str) -> None:
+        """Guarda el mensaje de una línea con error (hasta _MAX_ERRORS)."""
+        if len(self.errors) < _MAX_ERRORS:
+            self.errors.append((line_number, message))
+
+    def summary(self) -> str:
+        """Tabla de resultados por tipo de comando."""
+        executed = sum(stats.count for stats in self.commands.values())
+        rate = executed / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"{executed} comandos en {self.elapsed:.3f} s ({rate:,.0f} comandos/s)",
+            "",
+            f"{'Comando':<20} {'Total':>8} {'OK':>8} {'Fallo':>8} {'Error':>6} "
+            f"{'Media µs':>10} {'p50 µs':>10} {'p99 µs':>10}"
+        ]
+        for name in sorted(self.commands):
+            data = self.commands[name].to_dict()
+            lines.append(
+                f"{name:<20} {data['count']:>8} {data['succeeded']:>8} {data['failed']:>8} "
+                f"{data['errors']:>6} {data['mean_us']:>10} {data['p50_us']:>10} {data['p99_us']:>10}"
+            )
+        for line_number, message in self.errors:
+            lines.append(f"  línea {line_number}: {message}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Informe serializable."""
+        return {
+            "lines": self.lines,
+            "elapsed_s": round(self.elapsed, 6),
+            "commands": {name: stats.to_dict() for name, stats in sorted(self.commands.items())},
+            "errors": [{"line": line, "message": message} for line, message in self.errors]
+        }
+
+
+class BatchRunner:
+    """
+    Ejecuta comandos leídos de un archivo o de stdin.
+
+    Cada línea es un objeto JSON ({"cmd": "create_product", "name": ...})
+    o un comando con argumentos clave=valor:
+
+        register_user username=ana email=ana@x.com password=secreto123 full_name="Ana Gil"
+        create_product name=Mouse price=19.9 category=electronics sku=MOU-1 stock_quantity=5
+        add_stock sku=MOU-1 quantity=10
+        create_payment order_id=1 user_id=@last amount=19.9 payment_method=credit_card
+        process_payment payment_id=@last
+
+    Las líneas vacías y las que empiezan por # se ignoran. "@last" se
+    sustituye por el último ID creado de ese tipo de entidad. Un comando
+    cuenta como fallido si el controlador devuelve None o False, y como
+    error si no se pudo ejecutar (comando desconocido, argumentos
+    inválidos o excepción).
+    """
+
+    def __init__(
+        self,
+        user_controller: UserController,
+        product_controller: ProductController,
+        payment_controller: PaymentController
+    ):
+        """
+        Inicializa el ejecutor.
+
+        Args:
+            user_controller: Controlador de usuarios
+            product_controller: Controlador de productos
+            payment_controller: Controlador de pagos
+        """
+        self.user_controller = user_controller
+        self.product_controller = product_controller
+        self.payment_controller = payment_controller
+        self._last: Dict[str, int] = {}
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "register_user": self._register_user,
+            "authenticate": lambda args: user_controller.authenticate(
+                _arg(args, "username"), _arg(args, "password")
+            ),
+            "activate_user": lambda args: user_controller.activate_user(self._user_id(args)),
+            "deactivate_user": lambda args: user_controller.deactivate_user(self._user_id(args)),
+            "delete_user": lambda args: user_controller.delete_user(self._user_id(args)),
+            "create_product": self._create_product,
+            "add_stock": lambda args: product_controller.add_stock(
+                self._product_id(args), _arg(args, "quantity", int)
+            ),
+            "reduce_stock": lambda args: product_controller.reduce_stock(
+                self._product_id(args), _arg(args, "quantity", int)
+            ),
+            "update_price": lambda args: product_controller.update_price(
+                self._product_id(args), _arg(args, "price", float)
+            ),
+            "delete_product": lambda args: product_controller.delete_product(self._product_id(args)),
+            "create_payment": self._create_payment,
+            "process_payment": lambda args: payment_controller.process_payment(self._payment_id(args)),
+            "complete_payment": lambda args: payment_controller.complete_payment(self._payment_id(args)),
+            "retry_payment": lambda args: payment_controller.retry_payment(self._payment_id(args)),
+            "refund_payment": lambda args: payment_controller.refund_payment(self._payment_id(args)),
+            "cancel_payment": lambda args: payment_controller.cancel_payment(self._payment_id(args))
+        }
+
+    @property
+    def command_names(self) -> List[str]:
+        """Comandos disponibles."""
+        return sorted(self._handlers)
+
+    def run(self, lines: Iterable[str], stop_on_error: bool = False) -> BatchReport:
+        """
+        Ejecuta todas las líneas.
+
+        Args:
+            lines: Líneas del script (archivo abierto, stdin o lista)
+            stop_on_error: Detenerse en el primer error
+
+        Returns:
+            Informe con resultados y latencias por comando
+        """
+        report = BatchReport()
+        clock = time.perf_counter_ns
+        started = time.perf_counter()
+        for line_number, line in enumerate(lines, start=1):
+            report.lines = line_number
+            try:
+                parsed = self.parse(line)
+            except BatchError as error:
+                report.commands.setdefault("(inválida)", CommandStats()).errors += 1
+                report.record_error(line_number, str(error))
+                if stop_on_error:
+                    break
+                continue
+            if parsed is None:
+                continue
+
+            name, args = parsed
+            stats = report.commands.get(name)
+            if stats is None:
+                stats = report.commands[name] = CommandStats()
+            stats.count += 1
+            start = clock()
+            try:
+                result = self._handlers[name](args)
+            except Exception as error:
+                stats.latency.record(clock() - start)
+                stats.errors += 1
+                message = str(error) if isinstance(error, BatchError) else f"{type(error).__name__}: {error}"
+                report.record_error(line_number, f"{name}: {message}")
+                if stop_on_error:
+                    break
+                continue
+            stats.latency.record(clock() - start)
+            if result is None or result is False:
+                stats.failed += 1
+            else:
+                stats.succeeded += 1
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def parse(self, line: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Analiza una línea.
+
+        Returns:
+            (comando, argumentos) o None si la línea está vacía o es un
+            comentario
+
+        Raises:
+            BatchError: Si la línea está mal formada o el comando no existe
+        """
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return None
+        if line.startswith("{"):
+            try:
+                args = json.loads(line)
+            except ValueError as error:
+                raise BatchError(f"JSON inválido: {error}")
+            if not isinstance(args, dict):
+                raise BatchError("Se esperaba un objeto JSON")
+            name = args.pop("cmd", None)
+            if not isinstance(name, str):
+                raise BatchError(f"'cmd' debe ser el nombre de un comando: {name!r}")
+        else:
+            try:
+                tokens = shlex.split(line)
+            except ValueError as error:
+                raise BatchError(f"Línea mal formada: {error}")
+            name, args = tokens[0], {}
+            for token in tokens[1:]:
+                key, separator, value = token.partition("=")
+                if not separator:
+                    raise BatchError(f"Argumento sin valor: {token}")
+                args[key] = value
+        if name not in self._handlers:
+            raise BatchError(f"Comando desconocido: {name}")
+        return name, args
+
+    def _register_user(self, args: Dict[str, Any]) -> Any:
+        user = self.user_controller.register_user(
+            _arg(args, "username"),
+            _arg(args, "email"),
+            _arg(args, "password"),
+            _arg(args, "role", UserRole, UserRole.CLIENT),
+            _arg(args, "full_name")
+        )
+        if user is not None:
+            self._last["user"] = user.user_id
+        return user
+
+    def _create_product(self, args: Dict[str, Any]) -> Any:
+        product = self.product_controller.create_product(
+            _arg(args, "name"),
+            _arg(args, "description", str, ""),
+            _arg(args, "price", float),
+            _arg(args, "category", ProductCategory),
+            _arg(args, "stock_quantity", int, 0),
+            _arg(args, "sku")
+        )
+        if product is not None:
+            self._last["product"] = product.product_id
+        return product
+
+    def _create_payment(self, args: Dict[str, Any]) -> Any:
+        payment = self.payment_controller.create_payment(
+            _arg(args, "order_id", int),
+            self._reference(args, "user_id", "user"),
+            _arg(args, "amount", float),
+            _arg(args, "payment_method", PaymentMethod),
+            _arg(args, "transaction_id", str, None)
+        )
+        if payment is not None:
+            self._last["payment"] = payment.payment_id
+        return payment
+
+    def _user_id(self, args: Dict[str, Any]) -> int:
+        """ID de usuario por user_id (o @last) o por username."""
+        if "username" in args:
+            user = self.user_controller.user_repository.find_by_username(args["username"])
+            if user is None:
+                raise BatchError(f"Usuario no encontrado: {args['username']}")
+            return user.user_id
+        return self._reference(args, "user_id", "user")
+
+    def _product_id(self, args: Dict[str, Any]) -> int:
+        """ID de producto por product_id (o @last) o por sku."""
+        if "sku" in args:
+            product = self.product_controller.product_repository.find_by_sku(args["sku"])
+            if product is None:
+                raise BatchError(f"Producto no encontrado: {args['sku']}")
+            return product.product_id
+        return self._reference(args, "product_id", "product")
+
+    def _payment_id(self, args: Dict[str, Any]) -> int:
+        """ID de pago por payment_id (o @last)."""
+        return self._reference(args, "payment_id", "payment")
+
+    def _reference(self, args: Dict[str, Any], name: str, entity: str) -> int:
+        """Argumento de ID que admite @last."""
+        if args.get(name) == "@last":
+            if entity not in self._last:
+                raise BatchError(f"{name}=@last sin {entity} creado antes")
+            return self._last[entity]
+        return _arg(args, name, int)
+
+
+def _arg(args: Dict[str, Any], name: str, convert: Callable = str, default: Any = _REQUIRED) -> Any:
+    """
+    Argumento convertido al tipo esperado.
+
+    Raises:
+        BatchError: Si falta un argumento obligatorio o no es válido
+    """
+    if name not in args or args[name] is None:
+        if default is _REQUIRED:
+            raise BatchError(f"Falta el argumento '{name}'")
+        return default
+    try:
+        return convert(args[name])
+    except (ValueError, TypeError):
+        raise BatchError(f"Valor inválido para '{name}': {args[name]!r}")
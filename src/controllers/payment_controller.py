@@ -1,8 +1,41 @@
 """Controlador de pagos."""
 
-from typing import Optional, List
+import copy
+import math
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, List
 from models.payment import Payment, PaymentMethod, PaymentStatus
 from repositories.payment_repository import PaymentRepository
+from repositories.versioning import VersionConflictError
+from monitoring.metrics import REGISTRY
+from ratelimit.limiter import LoadShedder
+
+
+_GATEWAY_HELP = "Resultados del gateway de pago"
+_GATEWAY_SUCCESS = REGISTRY.counter("payment_gateway_total", _GATEWAY_HELP, outcome="success")
+_GATEWAY_FAILURE = REGISTRY.counter("payment_gateway_total", _GATEWAY_HELP, outcome="failure")
+_REFUNDS = REGISTRY.counter("payment_refunds_total", "Reembolsos realizados")
+_UNRECORDED_HELP = "Cobros aceptados por el gateway que no se pudieron guardar"
+_UNRECORDED_VOIDED = REGISTRY.counter("payment_unrecorded_charges_total", _UNRECORDED_HELP, outcome="refunded")
+_UNRECORDED_PENDING = REGISTRY.counter(
+    "payment_unrecorded_charges_total", _UNRECORDED_HELP, outcome="refund_failed"
+)
+_CONFLICTS = REGISTRY.counter(
+    "update_conflicts_total", "Actualizaciones rechazadas por versión y reintentadas", entity="payment"
+)
+_GATEWAY_ERROR = "Error al procesar con el gateway de pago"
+
+# Acciones de transition_many y la transición de Payment que aplican
+TRANSITIONS: Dict[str, Callable[[Payment], None]] = {
+    "process": Payment.process,
+    "complete": Payment.complete,
+    "refund": Payment.refund,
+    "cancel": Payment.cancel,
+    "retry": Payment.retry,
+    "fail": lambda payment: payment.fail("Marcado como fallido en lote")
+}
 
 
 class PaymentController:
@@ -12,14 +45,25 @@ class PaymentController:
     Maneja la lógica de negocio entre la vista y el repositorio.
     """
     
-    def __init__(self, payment_repository: PaymentRepository):
+    def __init__(self, payment_repository: PaymentRepository, max_attempts: int = 10):
         """
         Inicializa el controlador de pagos.
         
         Args:
             payment_repository: Repositorio de pagos
+            max_attempts: Intentos de una transición ante conflictos de
+                versión
         """
         self.payment_repository = payment_repository
+        self.max_attempts = max_attempts
+        # Se llama con (pago, motivo) cuando el gateway rechaza un pago
+        self.on_payment_failed: Optional[Callable[[Payment, str], None]] = None
+        # Se llama con el pago cuando el gateway lo cobró, no se pudo
+        # guardar como COMPLETED (p. ej. se canceló durante el cobro) y
+        # tampoco se pudo devolver el cobro: requiere revisión manual
+        self.on_unrecorded_charge: Optional[Callable[[Payment], None]] = None
+        # Límite de creación de pagos (None para no limitar)
+        self.create_shedder: Optional[LoadShedder] = None
     
     def create_payment(
         self,
@@ -27,22 +71,32 @@ class PaymentController:
         user_id: int,
         amount: float,
         payment_method: PaymentMethod,
-        transaction_id: Optional[str] = None
+        transaction_id: Optional[str] = None,
+        client: Optional[str] = None
     ) -> Optional[Payment]:
         """
         Crea un nuevo pago.
         
+        Con create_shedder, las peticiones que superan el límite por
+        usuario o por cliente se rechazan antes de tocar el repositorio.
+        
         Args:
             order_id: ID de la orden
             user_id: ID del usuario
             amount: Monto del pago
             payment_method: Método de pago
             transaction_id: ID de transacción externo
+            client: Cliente que hace la petición (dirección de origen)
             
         Returns:
             Pago creado o None si falla
+            
+        Raises:
+            RateLimitExceeded: Si se superó el límite de creación
         """
-        if amount <= 0:
+        if self.create_shedder is not None:
+            self.create_shedder.admit(user_id, client)
+        if not math.isfinite(amount) or amount <= 0:
             return None
         
         payment = Payment(
@@ -70,62 +124,169 @@ class PaymentController:
         Returns:
             True si el pago se procesó correctamente
         """
-        payment = self.get_payment(payment_id)
-        if not payment:
+        payment = self.start_processing(payment_id)
+        if payment is None:
             return False
+        return self.charge(payment)
+    
+    def start_processing(self, payment_id: int, retry: bool = False) -> Optional[Payment]:
+        """
+        Pasa un pago a PROCESSING y lo guarda, sin cobrarlo todavía.
         
-        try:
-            payment.process()
-            self.payment_repository.update(payment)
+        Junto con charge() permite a las colas (RetryScheduler,
+        JobWorkerPool) guardar la transición con su cerrojo tomado y
+        llamar al gateway sin él.
+        
+        Args:
+            payment_id: ID del pago
+            retry: Partir de un pago FAILED (Payment.retry) en vez de
+                uno PENDING
             
-            # Simulación de procesamiento
-            success = self._process_with_gateway(payment)
+        Returns:
+            Pago guardado en PROCESSING, o None si no existe o no admite
+            la transición
+        """
+        if retry:
+            return self._modify(payment_id, lambda payment: (payment.retry(), payment.process()))
+        return self._modify(payment_id, Payment.process)
+    
+    def charge(self, payment: Payment, lock: Optional[threading.Lock] = None) -> bool:
+        """
+        Cobra con el gateway un pago en procesamiento y guarda el resultado.
+        
+        Lo usan process_payment y las colas que procesan pagos en
+        segundo plano (RetryScheduler, JobWorkerPool): la llamada al
+        gateway se hace sin `lock`, de modo que varios hilos esperan al
+        gateway a la vez, y el pago pasa a COMPLETED o FAILED con `lock`
+        tomado. Un error del gateway cuenta como rechazo.
+        
+        El cobro lleva una clave de idempotencia (ID y versión del pago en
+        PROCESSING): si se repite para el mismo pago, p. ej. al reentregar
+        un trabajo, el gateway devuelve el resultado del primero en vez de
+        cobrar otra vez. Un reintento tras un fallo es un cobro nuevo con
+        otra clave, porque el pago cambió de versión.
+        
+        Si el pago ya no admite el resultado (p. ej. se canceló mientras
+        se esperaba al gateway), el resultado no se guarda; si el gateway
+        llegó a cobrarlo, el cobro se devuelve (o, si la devolución falla,
+        se avisa a on_unrecorded_charge).
+        
+        Args:
+            payment: Pago en PROCESSING, ya guardado
+            lock: Cerrojo que protege el repositorio de pagos, si se
+                comparte con otros hilos
             
+        Returns:
+            True si el gateway aceptó el pago y quedó guardado como
+            COMPLETED
+        """
+        key = _charge_key(payment)
+        try:
+            success = self._process_with_gateway(payment, key)
+        except Exception:
+            success = False
+        with lock or nullcontext():
+            stored = self._finish_processing(payment.payment_id, success)
+        if stored is None:
             if success:
-                payment.complete()
-            else:
-                payment.fail("Error al procesar con el gateway de pago")
+                self._void_charge(payment, key)
+            return False
+        return success
+    
+    def retry_payment(self, payment_id: int) -> bool:
+        """
+        Reintenta un pago fallido: lo devuelve a pendiente y lo procesa.
+        
+        Args:
+            payment_id: ID del pago
             
-            self.payment_repository.update(payment)
-            return success
-        except ValueError:
+        Returns:
+            True si el pago se procesó correctamente
+        """
+        payment = self.start_processing(payment_id, retry=True)
+        if payment is None:
             return False
+        return self.charge(payment)
     
     def complete_payment(self, payment_id: int) -> bool:
         """Marca un pago como completado."""
-        payment = self.get_payment(payment_id)
-        if payment:
-            try:
-                payment.complete()
-                self.payment_repository.update(payment)
-                return True
-            except ValueError:
-                return False
-        return False
+        return self._modify(payment_id, Payment.complete) is not None
     
     def refund_payment(self, payment_id: int) -> bool:
         """Reembolsa un pago."""
-        payment = self.get_payment(payment_id)
-        if payment:
-            try:
-                payment.refund()
-                self.payment_repository.update(payment)
-                return True
-            except ValueError:
-                return False
-        return False
+        if self._modify(payment_id, Payment.refund) is None:
+            return False
+        _REFUNDS.inc()
+        return True
     
     def cancel_payment(self, payment_id: int) -> bool:
         """Cancela un pago."""
-        payment = self.get_payment(payment_id)
-        if payment:
+        return self._modify(payment_id, Payment.cancel) is not None
+    
+    def transition_many(
+        self,
+        payment_ids: Iterable[int],
+        action: str,
+        atomic: bool = False
+    ) -> Dict[int, Optional[str]]:
+        """
+        Aplica la misma transición a muchos pagos.
+        
+        Valida cada transición con las reglas de Payment, sobre copias,
+        en una sola pasada y guarda todos los pagos cambiados con un
+        único update_many del repositorio, que mantiene los índices. Si
+        otro escritor cambió alguno entretanto, el lote se vuelve a
+        validar con los pagos recién leídos, hasta max_attempts veces.
+        
+        Args:
+            payment_ids: IDs de los pagos
+            action: "process", "complete", "refund", "cancel", "retry"
+                o "fail"
+            atomic: Si algún pago no admite la transición, no se aplica
+                a ninguno
+            
+        Returns:
+            Resultado por ID: None si se aplicó, o el motivo del rechazo
+        """
+        transition = TRANSITIONS.get(action)
+        if transition is None:
+            raise ValueError(f"Acción desconocida: {action}")
+        
+        payment_ids = list(dict.fromkeys(payment_ids))
+        for _ in range(self.max_attempts):
+            outcomes: Dict[int, Optional[str]] = {}
+            changed: List[Payment] = []
+            for payment_id in payment_ids:
+                current = self.payment_repository.find_by_id(payment_id)
+                if current is None:
+                    outcomes[payment_id] = "El pago no existe"
+                    continue
+                payment = _copy(current)
+                try:
+                    transition(payment)
+                except ValueError as error:
+                    outcomes[payment_id] = str(error)
+                    continue
+                outcomes[payment_id] = None
+                changed.append(payment)
+            
+            if atomic and len(changed) < len(outcomes):
+                for payment in changed:
+                    outcomes[payment.payment_id] = "No aplicado: otro pago del lote no admite la transición"
+                return outcomes
+            
             try:
-                payment.cancel()
-                self.payment_repository.update(payment)
-                return True
-            except ValueError:
-                return False
-        return False
+                self.payment_repository.update_many(changed)
+            except VersionConflictError:
+                _CONFLICTS.inc()
+                continue
+            if action == "refund":
+                _REFUNDS.inc(len(changed))
+            return outcomes
+        
+        for payment in changed:
+            outcomes[payment.payment_id] = "No aplicado: el pago cambió durante la operación"
+        return outcomes
     
     def list_payments_by_user(self, user_id: int) -> List[Payment]:
         """Lista pagos de un usuario."""
@@ -135,16 +296,98 @@ class PaymentController:
         """Lista pagos por estado."""
         return self.payment_repository.find_by_status(status)
     
+    def list_payments_created_between(
+        self,
+        start: datetime,
+        end: datetime,
+        status: Optional[PaymentStatus] = None
+    ) -> List[Payment]:
+        """Lista pagos creados entre dos fechas (incluidas)."""
+        return self.payment_repository.find_created_between(start, end, status)
+    
+    def list_payments_processed_between(
+        self,
+        start: datetime,
+        end: datetime,
+        status: Optional[PaymentStatus] = None
+    ) -> List[Payment]:
+        """Lista pagos procesados entre dos fechas (incluidas)."""
+        return self.payment_repository.find_processed_between(start, end, status)
+    
+    def _finish_processing(self, payment_id: int, success: bool) -> Optional[Payment]:
+        """
+        Completa o marca como fallido un pago según el gateway.
+        
+        Returns:
+            Pago guardado, o None si ya no admitía la transición
+        """
+        if success:
+            _GATEWAY_SUCCESS.inc()
+            return self._modify(payment_id, Payment.complete)
+        _GATEWAY_FAILURE.inc()
+        payment = self._modify(payment_id, lambda payment: payment.fail(_GATEWAY_ERROR))
+        if payment is not None and self.on_payment_failed is not None:
+            self.on_payment_failed(payment, _GATEWAY_ERROR)
+        return payment
+    
+    def _void_charge(self, payment: Payment, charge_key: str) -> None:
+        """Devuelve un cobro aceptado que no se pudo guardar en el pago."""
+        try:
+            refunded = self._refund_with_gateway(payment, f"void-{charge_key}")
+        except Exception:
+            refunded = False
+        if refunded:
+            _UNRECORDED_VOIDED.inc()
+            return
+        _UNRECORDED_PENDING.inc()
+        if self.on_unrecorded_charge is not None:
+            self.on_unrecorded_charge(payment)
+    
+    def _modify(self, payment_id: int, change: Callable[[Payment], object]) -> Optional[Payment]:
+        """
+        Lee, modifica y guarda un pago con concurrencia optimista.
+        
+        Como ProductController._modify: el cambio se aplica a una copia,
+        de modo que el pago guardado (y las instantáneas que lo ven) no
+        cambia hasta que update lo sustituye; ante un conflicto de
+        versión se vuelve a empezar con el pago recién leído, hasta
+        max_attempts veces.
+        
+        Args:
+            payment_id: ID del pago
+            change: Transición (lanza ValueError si no es válida)
+            
+        Returns:
+            Pago guardado, o None si no existe, la transición no es
+            válida o se agotaron los intentos
+        """
+        for _ in range(self.max_attempts):
+            current = self.get_payment(payment_id)
+            if current is None:
+                return None
+            payment = _copy(current)
+            try:
+                change(payment)
+            except ValueError:
+                return None
+            try:
+                return self.payment_repository.update(payment)
+            except VersionConflictError:
+                _CONFLICTS.inc()
+        return None
+    
     @staticmethod
-    def _process_with_gateway(payment: Payment) -> bool:
+    def _process_with_gateway(payment: Payment, idempotency_key: Optional[str] = None) -> bool:
         """
         Procesa el pago con el gateway externo.
         
         Esta es una simulación. En producción se conectaría
-        con un gateway de pago real (Stripe, PayPal, etc.).
+        con un gateway de pago real (Stripe, PayPal, etc.), enviando
+        idempotency_key para que repetir el cobro no cobre dos veces.
         
         Args:
             payment: Pago a procesar
+            idempotency_key: Clave que identifica el cobro
             
         Returns:
             True si el procesamiento fue exitoso
@@ -152,3 +395,36 @@ class PaymentController:
         # Simulación: 90% de éxito
         import random
         return random.random() > 0.1
+    
+    @staticmethod
+    def _refund_with_gateway(payment: Payment, idempotency_key: Optional[str] = None) -> bool:
+        """
+        Solicita al gateway externo el reembolso de un pago.
+        
+        Esta es una simulación. En producción se llamaría al endpoint de
+        reembolsos del gateway con idempotency_key, para que repetir la
+        petición tras una interrupción no reembolse dos veces.
+        
+        Args:
+            payment: Pago a reembolsar
+            idempotency_key: Clave que identifica el reembolso
+            
+        Returns:
+            True si el gateway aceptó el reembolso
+        """
+        # Simulación: 95% de éxito
+        import random
+        return random.random() > 0.05
+
+
+def _charge_key(payment: Payment) -> str:
+    """Clave de idempotencia del cobro de un pago en PROCESSING."""
+    return f"charge-{payment.payment_id}-{payment.version}"
+
+
+def _copy(payment: Payment) -> Payment:
+    """Copia de un pago (con sus detalles) para modificarla sin tocar la guardada."""
+    duplicate = copy.copy(payment)
+    if payment.payment_details is not None:
+        duplicate.payment_details = copy.copy(payment.payment_details)
+    return duplicate
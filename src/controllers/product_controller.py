@@ -1,8 +1,21 @@
 """Controlador de productos."""
 
-from typing import Optional, List
-from models.product import Product, ProductCategory
+import copy
+import math
+from typing import Callable, Dict, Optional, List, Tuple
+from models.product import Product, ProductCategory, ProductReview
 from repositories.product_repository import ProductRepository
+from repositories.review_repository import ORDER_RECENT, ReviewRepository
+from repositories.versioning import VersionConflictError
+from monitoring.metrics import REGISTRY
+
+
+_CONFLICTS = REGISTRY.counter(
+    "update_conflicts_total", "Actualizaciones rechazadas por versión y reintentadas", entity="product"
+)
+_LOW_STOCK_ALERTS = REGISTRY.counter(
+    "low_stock_alerts_total", "Productos que llegaron a su punto de pedido"
+)
 
 
 class ProductController:
@@ -12,14 +25,27 @@ class ProductController:
     Maneja la lógica de negocio entre la vista y el repositorio.
     """
     
-    def __init__(self, product_repository: ProductRepository):
+    def __init__(
+        self,
+        product_repository: ProductRepository,
+        max_attempts: int = 10,
+        review_repository: Optional[ReviewRepository] = None
+    ):
         """
         Inicializa el controlador de productos.
         
         Args:
             product_repository: Repositorio de productos
+            max_attempts: Intentos de una modificación ante conflictos de
+                versión
+            review_repository: Repositorio de reseñas (uno en memoria si
+                no se indica)
         """
         self.product_repository = product_repository
+        self.max_attempts = max_attempts
+        self.review_repository = review_repository or ReviewRepository()
+        # Se llama con el producto cuando su stock llega al punto de pedido
+        self.on_low_stock: Optional[Callable[[Product], None]] = None
     
     def create_product(
         self,
@@ -28,7 +54,8 @@ class ProductController:
         price: float,
         category: ProductCategory,
         stock_quantity: int,
-        sku: str
+        sku: str,
+        reorder_threshold: Optional[int] = None
     ) -> Optional[Product]:
         """
         Crea un nuevo producto.
@@ -40,6 +67,7 @@ class ProductController:
             category: Categoría
             stock_quantity: Cantidad en stock
             sku: Código SKU
+            reorder_threshold: Punto de pedido (None sin umbral)
             
         Returns:
             Producto creado o None si falla
@@ -48,8 +76,11 @@ class ProductController:
         if self.product_repository.find_by_sku(sku):
             return None
         
-        # Validar precio positivo
-        if price < 0:
+        # Validar precio positivo (NaN desordenaría el índice de precios)
+        if not math.isfinite(price) or price < 0:
+            return None
+        
+        if reorder_threshold is not None and reorder_threshold < 0:
             return None
         
         product = Product(
@@ -59,7 +90,8 @@ class ProductController:
             price=price,
             category=category,
             stock_quantity=stock_quantity,
-            sku=sku
+            sku=sku,
+            reorder_threshold=reorder_threshold
         )
         
         return self.product_repository.save(product)
@@ -73,8 +105,11 @@ class ProductController:
         return self.product_repository.update(product)
     
     def delete_product(self, product_id: int) -> bool:
-        """Elimina un producto."""
-        return self.product_repository.delete(product_id)
+        """Elimina un producto y sus reseñas."""
+        if not self.product_repository.delete(product_id):
+            return False
+        self.review_repository.delete_by_product(product_id)
+        return True
     
     def list_all_products(self) -> List[Product]:
         """Lista todos los productos."""
@@ -84,47 +119,214 @@ class ProductController:
         """Lista productos por categoría."""
         return self.product_repository.find_by_category(category)
     
+    def search_products(
+        self,
+        query: str,
+        match_all: bool = True,
+        page: int = 1,
+        page_size: int = 20
+    ) -> List[Product]:
+        """
+        Busca productos por nombre y descripción.
+        
+        Args:
+            query: Texto a buscar
+            match_all: True si deben aparecer todas las palabras
+            page: Número de página (desde 1)
+            page_size: Productos por página
+            
+        Returns:
+            Productos de la página ordenados por relevancia
+        """
+        if page < 1 or page_size < 1:
+            return []
+        product_ids = self.product_repository.search(
+            query,
+            match_all=match_all,
+            limit=page_size,
+            offset=(page - 1) * page_size
+        )
+        return [self.product_repository.find_by_id(pid) for pid in product_ids]
+    
+    def suggest_search_terms(self, prefix: str, limit: int = 10) -> List[str]:
+        """Sugiere palabras para completar una búsqueda."""
+        return self.product_repository.suggest_terms(prefix, limit)
+    
+    def list_by_price_range(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        category: Optional[ProductCategory] = None,
+        page_size: int = 20,
+        after: Optional[Tuple[float, int]] = None,
+        descending: bool = False
+    ) -> List[Product]:
+        """
+        Lista productos por rango de precio, paginando por clave.
+        
+        Args:
+            min_price: Precio mínimo incluido
+            max_price: Precio máximo incluido
+            category: Limitar a una categoría
+            page_size: Productos por página
+            after: (precio, product_id) del último producto de la página
+                anterior, o None para la primera página
+            descending: True para ordenar de mayor a menor precio
+            
+        Returns:
+            Productos de la página ordenados por precio
+        """
+        if page_size < 1:
+            return []
+        return self.product_repository.find_by_price_range(
+            min_price,
+            max_price,
+            category=category,
+            limit=page_size,
+            after=after,
+            descending=descending
+        )
+    
+    def list_cheapest(self, n: int = 10, category: Optional[ProductCategory] = None) -> List[Product]:
+        """Lista los N productos más baratos."""
+        return self.product_repository.find_cheapest(n, category)
+    
+    def list_most_expensive(self, n: int = 10, category: Optional[ProductCategory] = None) -> List[Product]:
+        """Lista los N productos más caros."""
+        return self.product_repository.find_most_expensive(n, category)
+    
     def update_price(self, product_id: int, new_price: float) -> bool:
         """Actualiza el precio de un producto."""
-        product = self.get_product(product_id)
-        if product:
-            try:
-                product.update_price(new_price)
-                self.product_repository.update(product)
-                return True
-            except ValueError:
-                return False
-        return False
+        return self._modify(product_id, lambda product: product.update_price(new_price))
     
     def add_stock(self, product_id: int, quantity: int) -> bool:
         """Agrega stock a un producto."""
-        product = self.get_product(product_id)
-        if product:
-            try:
-                product.add_stock(quantity)
-                self.product_repository.update(product)
-                return True
-            except ValueError:
-                return False
-        return False
+        return self._modify(product_id, lambda product: product.add_stock(quantity))
     
     def reduce_stock(self, product_id: int, quantity: int) -> bool:
         """Reduce stock de un producto."""
-        product = self.get_product(product_id)
-        if product:
-            try:
-                product.reduce_stock(quantity)
-                self.product_repository.update(product)
-                return True
-            except ValueError:
-                return False
-        return False
+        return self._modify(product_id, lambda product: product.reduce_stock(quantity))
     
     def set_availability(self, product_id: int, available: bool) -> bool:
         """Establece la disponibilidad de un producto."""
-        product = self.get_product(product_id)
-        if product:
-            product.set_availability(available)
-            self.product_repository.update(product)
+        return self._modify(product_id, lambda product: product.set_availability(available))
+    
+    def set_reorder_threshold(self, product_id: int, threshold: Optional[int]) -> bool:
+        """Establece el punto de pedido de un producto (None para quitarlo)."""
+        return self._modify(product_id, lambda product: product.set_reorder_threshold(threshold))
+    
+    def list_low_stock(self, n: int = 10) -> List[Product]:
+        """Lista los N productos que más urgen reponer."""
+        return self.product_repository.find_low_stock(limit=n)
+    
+    def add_review(
+        self,
+        product_id: int,
+        user_id: int,
+        rating: int,
+        comment: str
+    ) -> Optional[ProductReview]:
+        """
+        Agrega una reseña a un producto.
+        
+        Args:
+            product_id: ID del producto
+            user_id: ID del autor
+            rating: Estrellas (1-5)
+            comment: Comentario
+            
+        Returns:
+            Reseña creada o None si el producto no existe o el rating no
+            es válido
+        """
+        if self.get_product(product_id) is None or not 1 <= rating <= 5:
+            return None
+        review = ProductReview(self.review_repository.get_next_id(), product_id, user_id, rating, comment)
+        return self.review_repository.save(review)
+    
+    def list_reviews(
+        self,
+        product_id: int,
+        order_by: str = ORDER_RECENT,
+        rating: Optional[int] = None,
+        page_size: int = 20,
+        after: Optional[int] = None,
+        descending: bool = True
+    ) -> List[ProductReview]:
+        """
+        Lista las reseñas de un producto, paginando por clave.
+        
+        Args:
+            product_id: ID del producto
+            order_by: "recent" o "rating"
+            rating: Solo las reseñas con ese número de estrellas
+            page_size: Reseñas por página
+            after: review_id de la última reseña de la página anterior
+            descending: True para empezar por las más recientes o las de
+                más estrellas
+            
+        Returns:
+            Reseñas de la página
+        """
+        if page_size < 1:
+            return []
+        return self.review_repository.find_by_product(
+            product_id, order_by=order_by, rating=rating, limit=page_size, after=after, descending=descending
+        )
+    
+    def get_rating_summary(self, product_id: int) -> Dict[str, object]:
+        """
+        Resumen de calificaciones de un producto.
+        
+        Returns:
+            {"average": media, "count": reseñas, "histogram": {estrellas: reseñas}}
+        """
+        histogram = self.review_repository.rating_histogram(product_id)
+        return {
+            "average": round(self.review_repository.average_rating(product_id), 2),
+            "count": sum(histogram.values()),
+            "histogram": histogram
+        }
+    
+    def _modify(self, product_id: int, change: Callable[[Product], None]) -> bool:
+        """
+        Lee, modifica y guarda un producto con concurrencia optimista.
+        
+        El cambio se aplica a una copia; si otro hilo actualizó el
+        producto entretanto, update la rechaza por versión y se vuelve a
+        empezar con el producto recién leído, hasta max_attempts veces.
+        Así los hilos que modifican productos distintos no se bloquean y
+        ninguna modificación se pierde. Si el cambio lleva el producto a
+        su punto de pedido se avisa a on_low_stock.
+        
+        Args:
+            product_id: ID del producto
+            change: Modificación (puede lanzar ValueError si no es válida)
+            
+        Returns:
+            True si se guardó, False si el producto no existe, el cambio
+            no es válido o se agotaron los intentos
+        """
+        for _ in range(self.max_attempts):
+            current = self.get_product(product_id)
+            if current is None:
+                return False
+            product = copy.copy(current)
+            try:
+                change(product)
+            except ValueError:
+                return False
+            try:
+                if self.product_repository.update(product) is None:
+                    return False
+            except VersionConflictError:
+                _CONFLICTS.inc()
+                continue
+            # current es la versión que se reemplazó: el cruce es exacto
+            # aunque otros hilos modifiquen el producto a la vez
+            if product.needs_restock() and not current.needs_restock():
+                _LOW_STOCK_ALERTS.inc()
+                if self.on_low_stock is not None:
+                    self.on_low_stock(product)
             return True
         return False
@@ -1,8 +1,22 @@
 """Controlador de usuarios."""
 
-from typing import Optional, List
+import copy
+from typing import Callable, Optional, List, Tuple
 from models.user import User, UserRole
 from repositories.user_repository import UserRepository
+from repositories.versioning import VersionConflictError
+from monitoring.metrics import REGISTRY
+from ratelimit.limiter import LoadShedder
+
+
+_AUTH_HELP = "Autenticaciones fallidas por motivo"
+_AUTH_UNKNOWN_USER = REGISTRY.counter("auth_failures_total", _AUTH_HELP, reason="unknown_user")
+_AUTH_INACTIVE = REGISTRY.counter("auth_failures_total", _AUTH_HELP, reason="inactive")
+_AUTH_BAD_PASSWORD = REGISTRY.counter("auth_failures_total", _AUTH_HELP, reason="bad_password")
+_AUTH_SUCCESS = REGISTRY.counter("auth_success_total", "Autenticaciones correctas")
+_CONFLICTS = REGISTRY.counter(
+    "update_conflicts_total", "Actualizaciones rechazadas por versión y reintentadas", entity="user"
+)
 
 
 class UserController:
@@ -12,14 +26,19 @@ class UserController:
     Maneja la lógica de negocio entre la vista y el repositorio.
     """
     
-    def __init__(self, user_repository: UserRepository):
+    def __init__(self, user_repository: UserRepository, max_attempts: int = 10):
         """
         Inicializa el controlador de usuarios.
         
         Args:
             user_repository: Repositorio de usuarios
+            max_attempts: Intentos de una modificación ante conflictos de
+                versión
         """
         self.user_repository = user_repository
+        self.max_attempts = max_attempts
+        # Límite de intentos de autenticación (None para no limitar)
+        self.auth_shedder: Optional[LoadShedder] = None
     
     def register_user(
         self,
@@ -63,25 +82,41 @@ class UserController:
         
         return self.user_repository.save(user)
     
-    def authenticate(self, username: str, password: str) -> Optional[User]:
+    def authenticate(self, username: str, password: str, client: Optional[str] = None) -> Optional[User]:
         """
         Autentica un usuario.
         
+        Con auth_shedder, los intentos que superan el límite por username
+        o por cliente se rechazan antes de buscar el usuario y calcular
+        el hash.
+        
         Args:
             username: Nombre de usuario
             password: Contraseña
+            client: Cliente que hace la petición (dirección de origen)
             
         Returns:
             Usuario autenticado o None si falla
+            
+        Raises:
+            RateLimitExceeded: Si se superó el límite de intentos
         """
+        if self.auth_shedder is not None:
+            self.auth_shedder.admit(username, client)
         user = self.user_repository.find_by_username(username)
-        if not user or not user.is_active:
+        if not user:
+            _AUTH_UNKNOWN_USER.inc()
+            return None
+        if not user.is_active:
+            _AUTH_INACTIVE.inc()
             return None
         
         password_hash = self._hash_password(password)
         if user.password_hash == password_hash:
+            _AUTH_SUCCESS.inc()
             return user
         
+        _AUTH_BAD_PASSWORD.inc()
         return None
     
     def get_user(self, user_id: int) -> Optional[User]:
@@ -100,22 +135,62 @@ class UserController:
         """Lista todos los usuarios."""
         return self.user_repository.find_all()
     
+    def search_users(
+        self,
+        query: str,
+        limit: int = 10,
+        threshold: float = 0.3
+    ) -> List[Tuple[User, float]]:
+        """
+        Busca usuarios por nombre, username o email aproximados.
+        
+        Args:
+            query: Nombre parcial o con errores de tipeo
+            limit: Máximo de resultados
+            threshold: Similitud mínima (0 a 1)
+            
+        Returns:
+            Lista de (usuario, similitud) de mayor a menor similitud
+        """
+        if not query.strip():
+            return []
+        return self.user_repository.search_similar(query, limit=limit, threshold=threshold)
+    
     def activate_user(self, user_id: int) -> bool:
         """Activa un usuario."""
-        user = self.get_user(user_id)
-        if user:
-            user.activate()
-            self.user_repository.update(user)
-            return True
-        return False
+        return self._modify(user_id, User.activate)
     
     def deactivate_user(self, user_id: int) -> bool:
         """Desactiva un usuario."""
-        user = self.get_user(user_id)
-        if user:
-            user.deactivate()
-            self.user_repository.update(user)
-            return True
+        return self._modify(user_id, User.deactivate)
+    
+    def _modify(self, user_id: int, change: Callable[[User], None]) -> bool:
+        """
+        Lee, modifica y guarda un usuario con concurrencia optimista.
+        
+        El cambio se aplica a una copia, así el usuario guardado (y las
+        instantáneas que lo ven) no cambia hasta que update lo sustituye;
+        ante un conflicto de versión se vuelve a empezar con el usuario
+        recién leído, hasta max_attempts veces.
+        
+        Args:
+            user_id: ID del usuario
+            change: Modificación
+            
+        Returns:
+            True si se guardó, False si el usuario no existe o se
+            agotaron los intentos
+        """
+        for _ in range(self.max_attempts):
+            current = self.get_user(user_id)
+            if current is None:
+                return False
+            user = copy.copy(current)
+            change(user)
+            try:
+                return self.user_repository.update(user) is not None
+            except VersionConflictError:
+                _CONFLICTS.inc()
         return False
     
     @staticmethod
@@ -0,0 +1,14 @@
+"""Trabajos por lotes sobre los datos del Sistema de Gestión."""
+
+__all__ = [
+    'SettlementReconciler',
+    'ReconciliationReport',
+    'BulkRefundJob',
+    'RefundProgress',
+    'RetryScheduler',
+    'RetryPolicy',
+    'JobQueue',
+    'JobWorkerPool',
+    'Job',
+    'JobError'
+]
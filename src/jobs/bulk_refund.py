@@ -0,0 +1,323 @@
+"""Reembolsos masivos concurrentes, con límite de ritmo y reanudables."""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from controllers.payment_controller import PaymentController
+from models.payment import Order, Payment, PaymentStatus
+from monitoring.tracing import propagate
+from ratelimit.limiter import RateLimiter
+
+
+# Resultados que se anotan en el diario
+REFUNDED = "refunded"
+FAILED = "failed"
+SKIPPED = "skipped"
+# El gateway reembolsó pero el pago no pudo pasar a REFUNDED (cambió
+# entretanto): hay que conciliarlo a mano y nunca se vuelve a enviar
+GATEWAY_REFUNDED = "gateway_refunded"
+
+# Resultados que no se repiten al reanudar (FAILED sí, con retry_failed)
+_RESOLVED = (REFUNDED, SKIPPED, GATEWAY_REFUNDED)
+
+
+class RefundProgress:
+    """Avance e informe final de un reembolso masivo."""
+
+    def __init__(self, total: int):
+        """
+        Inicializa el avance.
+
+        Args:
+            total: Pagos seleccionados
+        """
+        self.total = total
+        self.refunded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.gateway_refunded = 0
+        self.resumed = 0
+        self.refunded_amount = 0.0
+        self.failures: Dict[int, str] = {}
+        self.interrupted = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def done(self) -> int:
+        """Pagos ya resueltos (incluidos los del diario)."""
+        return self.refunded + self.failed + self.skipped + self.gateway_refunded + self.resumed
+
+    @property
+    def rate(self) -> float:
+        """Pagos resueltos por segundo en esta ejecución."""
+        elapsed = self.elapsed or time.perf_counter() - self.started
+        handled = self.done - self.resumed
+        return handled / elapsed if elapsed else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Segundos estimados hasta terminar, o None si aún no se sabe."""
+        rate = self.rate
+        return (self.total - self.done) / rate if rate else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Informe serializable."""
+        return {
+            "total": self.total,
+            "refunded": self.refunded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "gateway_refunded": self.gateway_refunded,
+            "resumed": self.resumed,
+            "refunded_amount": round(self.refunded_amount, 2),
+            "interrupted": self.interrupted,
+            "elapsed_s": round(self.elapsed, 3),
+            "per_sec": round(self.rate, 1),
+            "failures": {str(pid): error for pid, error in self.failures.items()}
+        }
+
+    def __str__(self) -> str:
+        eta = self.eta
+        return (
+            f"{self.done}/{self.total} "
+            f"(reembolsados {self.refunded}, fallidos {self.failed}, omitidos {self.skipped}, "
+            f"por conciliar {self.gateway_refunded}, ya hechos {self.resumed}) {self.rate:.1f}/s"
+            + (f", quedan ~{eta:.0f} s" if eta is not None and self.done < self.total else "")
+        )
+
+
+class BulkRefundJob:
+    """
+    Reembolsa muchos pagos completados tras un incidente.
+
+    Las peticiones al gateway se hacen en paralelo en un pool de hilos,
+    con un máximo de `concurrency` en vuelo y un RateLimiter de
+    `rate_limit` peticiones por segundo. Las transiciones de estado
+    (Payment.refund vía PaymentController.refund_payment) se aplican
+    desde el hilo que ejecuta run() a medida que llegan las respuestas,
+    así el repositorio no se modifica desde varios hilos. Un pago solo
+    pasa a REFUNDED si el gateway aceptó el reembolso; si no, sigue
+    COMPLETED y queda anotado como fallido. Si el gateway lo aceptó pero
+    el pago ya no admite el reembolso local, se anota GATEWAY_REFUNDED
+    para conciliarlo a mano.
+
+    Cada resultado se añade a un diario JSONL: al volver a ejecutar con
+    el mismo diario se omiten los pagos ya resueltos (con retry_failed
+    se reintentan los fallidos, pero nunca los GATEWAY_REFUNDED, que el
+    gateway ya reembolsó). Cada petición lleva
+    la clave de idempotencia "refund-<payment_id>", de modo que los
+    reembolsos que estaban en vuelo al interrumpir se pueden repetir
+    sin duplicarse en el gateway.
+    """
+
+    def __init__(
+        self,
+        payment_controller: PaymentController,
+        journal_path: Optional[str] = None,
+        concurrency: int = 16,
+        rate_limit: float = 50.0,
+        progress: Optional[Callable[[RefundProgress], None]] = None,
+        progress_every: int = 100,
+        retry_failed: bool = False,
+        gateway: Optional[Callable[[Payment, str], bool]] = None
+    ):
+        """
+        Inicializa el trabajo.
+
+        Args:
+            payment_controller: Controlador de pagos
+            journal_path: Diario JSONL para reanudar (None sin diario)
+            concurrency: Peticiones al gateway en vuelo como máximo
+            rate_limit: Peticiones al gateway por segundo
+            progress: Función que recibe el avance periódicamente
+            progress_every: Pagos resueltos entre avisos de avance
+            retry_failed: Reintentar los pagos que el diario da por fallidos
+            gateway: Función (pago, clave de idempotencia) -> bool; por
+                defecto PaymentController._refund_with_gateway
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency debe ser al menos 1")
+        self.payment_controller = payment_controller
+        self.journal_path = journal_path
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.progress = progress
+        self.progress_every = max(1, progress_every)
+        self.retry_failed = retry_failed
+        self.gateway = gateway or (lambda payment, key: payment_controller._refund_with_gateway(payment, key))
+        self._stop = threading.Event()
+
+    def select(
+        self,
+        order_ids: Optional[Iterable[int]] = None,
+        user_ids: Optional[Iterable[int]] = None,
+        product_ids: Optional[Iterable[int]] = None,
+        orders: Optional[Iterable[Order]] = None,
+        processed_from: Optional[datetime] = None,
+        processed_to: Optional[datetime] = None
+    ) -> List[Payment]:
+        """
+        Selecciona los pagos completados a reembolsar.
+
+        Los criterios se combinan (y). Los pagos no guardan productos:
+        para filtrar por producto hay que pasar las órdenes, y se
+        seleccionan las órdenes con algún item de esos productos.
+
+        Args:
+            order_ids: IDs de orden
+            user_ids: IDs de usuario
+            product_ids: IDs de producto (requiere orders)
+            orders: Órdenes con sus items
+            processed_from: Procesados desde (incluido)
+            processed_to: Procesados hasta (incluido)
+
+        Returns:
+            Pagos COMPLETED ordenados por ID
+        """
+        filters: Dict[str, Any] = {"status": PaymentStatus.COMPLETED}
+        if product_ids is not None:
+            if orders is None:
+                raise ValueError("Para seleccionar por producto hay que indicar las órdenes")
+            products = set(product_ids)
+            with_product = {
+                order.order_id for order in orders
+                if any(item.product_id in products for item in order.items)
+            }
+            order_ids = with_product if order_ids is None else with_product & set(order_ids)
+        if order_ids is not None:
+            filters["order_id__in"] = list(order_ids)
+        if user_ids is not None:
+            filters["user_id__in"] = list(user_ids)
+        if processed_from is not None:
+            filters["processed_at__gte"] = processed_from
+        if processed_to is not None:
+            filters["processed_at__lte"] = processed_to
+        return self.payment_controller.payment_repository.find_where(order_by="payment_id", **filters)
+
+    def run(self, payments: Iterable[Payment]) -> RefundProgress:
+        """
+        Reembolsa los pagos dados.
+
+        Se detiene ordenadamente con stop() o Ctrl+C: no envía más
+        peticiones, espera las que están en vuelo y las anota (también
+        si se vuelve a pulsar Ctrl+C mientras las espera).
+
+        Args:
+            payments: Pagos a reembolsar (normalmente de select())
+
+        Returns:
+            Informe final
+        """
+        payments = list(payments)
+        journal = self._load_journal()
+        progress = RefundProgress(len(payments))
+        pending: Dict[Future, Payment] = {}
+        self._stop.clear()
+        journal_file = open(self.journal_path, "a", encoding="utf-8") if self.journal_path else None
+        executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="refund")
+        try:
+            try:
+                for payment in payments:
+                    if self._stop.is_set():
+                        progress.interrupted = True
+                        break
+                    outcome = journal.get(payment.payment_id)
+                    if outcome in _RESOLVED or (outcome == FAILED and not self.retry_failed):
+                        progress.resumed += 1
+                        continue
+                    if payment.status != PaymentStatus.COMPLETED:
+                        self._record(progress, journal_file, payment, SKIPPED, payment.status.value)
+                        continue
+                    while len(pending) >= self.concurrency:
+                        self._collect(pending, progress, journal_file)
+                    self.rate_limiter.acquire()
+                    future = executor.submit(propagate(self.gateway), payment, f"refund-{payment.payment_id}")
+                    pending[future] = payment
+            except KeyboardInterrupt:
+                progress.interrupted = True
+            while pending:
+                try:
+                    self._collect(pending, progress, journal_file)
+                except KeyboardInterrupt:
+                    # Los reembolsos en vuelo se anotan igualmente
+                    progress.interrupted = True
+        finally:
+            executor.shutdown(wait=True)
+            if journal_file is not None:
+                journal_file.close()
+            progress.elapsed = time.perf_counter() - progress.started
+        if self.progress is not None:
+            self.progress(progress)
+        return progress
+
+    def stop(self) -> None:
+        """Pide detener run() (seguro desde otro hilo o un manejador de señal)."""
+        self._stop.set()
+
+    def _collect(self, pending: Dict[Future, Payment], progress: RefundProgress, journal_file) -> None:
+        """Espera respuestas del gateway y aplica sus transiciones."""
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            payment = pending.pop(future)
+            error = future.exception()
+            if error is not None:
+                self._record(progress, journal_file, payment, FAILED, f"{type(error).__name__}: {error}")
+            elif not future.result():
+                self._record(progress, journal_file, payment, FAILED, "Reembolso rechazado por el gateway")
+            elif not self.payment_controller.refund_payment(payment.payment_id):
+                self._record(
+                    progress, journal_file, payment, GATEWAY_REFUNDED,
+                    "Reembolsado en el gateway, pero el pago ya no está completado"
+                )
+            else:
+                self._record(progress, journal_file, payment, REFUNDED)
+
+    def _record(
+        self,
+        progress: RefundProgress,
+        journal_file,
+        payment: Payment,
+        outcome: str,
+        error: Optional[str] = None
+    ) -> None:
+        """Anota un resultado en el avance y en el diario."""
+        if outcome == REFUNDED:
+            progress.refunded += 1
+            progress.refunded_amount += payment.amount
+        elif outcome == FAILED:
+            progress.failed += 1
+            progress.failures[payment.payment_id] = error
+        elif outcome == GATEWAY_REFUNDED:
+            progress.gateway_refunded += 1
+            progress.failures[payment.payment_id] = error
+        else:
+            progress.skipped += 1
+        if journal_file is not None:
+            entry = {"payment_id": payment.payment_id, "outcome": outcome, "at": datetime.now().isoformat()}
+            if error is not None:
+                entry["error"] = error
+            journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            journal_file.flush()
+        if self.progress is not None and (progress.done - progress.resumed) % self.progress_every == 0:
+            self.progress(progress)
+
+    def _load_journal(self) -> Dict[int, str]:
+        """Último resultado anotado por pago."""
+        outcomes: Dict[int, str] = {}
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return outcomes
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                    outcomes[int(entry["payment_id"])] = entry["outcome"]
+                except (ValueError, KeyError, TypeError):
+                    # Línea cortada por una interrupción durante la escritura
+                    continue
+        return outcomes
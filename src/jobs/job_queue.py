@@ -0,0 +1,532 @@
+"""Cola de trabajos duradera en SQLite con arrendamientos (leases)."""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from controllers.payment_controller import PaymentController
+from models.payment import PaymentStatus
+from monitoring.metrics import REGISTRY
+
+
+# Estados de un trabajo
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind VARCHAR(50) NOT NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    leased_by VARCHAR(50),
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_available ON jobs(status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(status, lease_until);
+"""
+
+# Estados de un pago que process_payment ya no tiene que cobrar
+_PROCESSED = (PaymentStatus.COMPLETED, PaymentStatus.FAILED, PaymentStatus.REFUNDED)
+
+_LEASES_LOST = REGISTRY.counter(
+    "job_leases_lost_total", "Trabajos terminados después de perder su arrendamiento"
+)
+
+_COLUMNS = (
+    "job_id, kind, payload, status, attempts, max_attempts, available_at, "
+    "lease_until, leased_by, result, error, created_at, updated_at"
+)
+
+
+class JobError(Exception):
+    """Error definitivo de un trabajo: se marca como fallido sin reintentar."""
+
+
+class Job:
+    """Trabajo de la cola."""
+
+    def __init__(self, row: tuple):
+        """
+        Crea el trabajo a partir de una fila de la tabla jobs.
+
+        Args:
+            row: Fila con las columnas de _COLUMNS
+        """
+        (self.job_id, self.kind, payload, self.status, self.attempts, self.max_attempts,
+         self.available_at, self.lease_until, self.leased_by, result, self.error,
+         self.created_at, self.updated_at) = row
+        self.payload: Dict[str, Any] = json.loads(payload)
+        self.result: Any = json.loads(result) if result is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación serializable."""
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "payload": self.payload,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+    def __repr__(self) -> str:
+        return f"Job(id={self.job_id}, kind={self.kind}, status={self.status})"
+
+
+class JobQueue:
+    """
+    Cola de trabajos persistente en una tabla SQLite.
+
+    enqueue() es un INSERT (modo WAL, synchronous=NORMAL) y devuelve el
+    ID del trabajo. Los trabajadores reclaman lotes con claim(): cada
+    trabajo reclamado queda arrendado durante `lease_seconds`; si el
+    trabajador no lo completa antes (porque murió o se colgó), vuelve a
+    ser visible y otro lo reclama; un trabajador vivo lo mantiene con
+    extend(). Los fallos se reintentan con espera exponencial hasta
+    max_attempts.
+
+    Cada hilo usa su propia conexión, así que varios hilos (y procesos)
+    pueden compartir la cola.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        lease_seconds: float = 30.0,
+        retry_delay: float = 1.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Inicializa la cola y crea la tabla si no existe.
+
+        Args:
+            db_path: Archivo SQLite
+            lease_seconds: Duración del arrendamiento de un trabajo
+            retry_delay: Espera antes del primer reintento (se duplica)
+            clock: Reloj de pared en segundos
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self._clock = clock
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._connection().executescript(_SCHEMA)
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Optional[Dict[str, Any]] = None,
+        delay: float = 0.0,
+        max_attempts: int = 3
+    ) -> int:
+        """
+        Añade un trabajo.
+
+        Args:
+            kind: Tipo de trabajo (elige el manejador)
+            payload: Datos del trabajo (serializables a JSON)
+            delay: Segundos antes de que sea visible
+            max_attempts: Intentos como máximo
+
+        Returns:
+            ID del trabajo
+        """
+        now = self._clock()
+        cursor = self._connection().execute(
+            "INSERT INTO jobs (kind, payload, status, max_attempts, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload or {}), QUEUED, max_attempts, now + delay, now, now)
+        )
+        self.wake_workers()
+        return cursor.lastrowid
+
+    def enqueue_many(self, kind: str, payloads: List[Dict[str, Any]], max_attempts: int = 3) -> List[int]:
+        """
+        Añade muchos trabajos del mismo tipo en una transacción.
+
+        Returns:
+            IDs de los trabajos, en el mismo orden
+        """
+        now = self._clock()
+        connection = self._connection()
+        job_ids = []
+        with _transaction(connection):
+            for payload in payloads:
+                job_ids.append(connection.execute(
+                    "INSERT INTO jobs (kind, payload, status, max_attempts, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (kind, json.dumps(payload), QUEUED, max_attempts, now, now, now)
+                ).lastrowid)
+        self.wake_workers()
+        return job_ids
+
+    def claim(self, worker_id: str, limit: int = 10) -> List[Job]:
+        """
+        Reclama hasta `limit` trabajos visibles: pendientes ya
+        disponibles o en curso con el arrendamiento vencido.
+
+        Args:
+            worker_id: Identificador del trabajador
+            limit: Máximo de trabajos
+
+        Returns:
+            Trabajos arrendados a este trabajador
+        """
+        now = self._clock()
+        connection = self._connection()
+        with _transaction(connection, immediate=True):
+            job_ids = [row[0] for row in connection.execute(
+                "SELECT job_id FROM jobs WHERE status = ? AND available_at <= ? ORDER BY available_at LIMIT ?",
+                (QUEUED, now, limit)
+            )]
+            if len(job_ids) < limit:
+                # Arrendamientos vencidos: el trabajador murió o se colgó
+                connection.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? "
+                    "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                    (FAILED, "Arrendamiento vencido sin intentos restantes", now, RUNNING, now)
+                )
+                job_ids += [row[0] for row in connection.execute(
+                    "SELECT job_id FROM jobs WHERE status = ? AND lease_until < ? LIMIT ?",
+                    (RUNNING, now, limit - len(job_ids))
+                )]
+            if not job_ids:
+                return []
+            placeholders = ", ".join("?" for _ in job_ids)
+            connection.execute(
+                f"UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, leased_by = ?, "
+                f"updated_at = ? WHERE job_id IN ({placeholders})",
+                (RUNNING, now + self.lease_seconds, worker_id, now, *job_ids)
+            )
+            rows = connection.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE job_id IN ({placeholders}) ORDER BY job_id", job_ids
+            ).fetchall()
+        return [Job(row) for row in rows]
+
+    def extend(self, job: Job) -> bool:
+        """
+        Renueva el arrendamiento de un trabajo (latido del trabajador).
+
+        Args:
+            job: Trabajo reclamado
+
+        Returns:
+            False si el arrendamiento ya no es de este trabajador (otro
+            lo reclamó al vencer)
+        """
+        now = self._clock()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? "
+            "WHERE job_id = ? AND status = ? AND leased_by = ? AND attempts = ?",
+            (now + self.lease_seconds, now, job.job_id, RUNNING, job.leased_by, job.attempts)
+        )
+        if cursor.rowcount != 1:
+            return False
+        job.lease_until = now + self.lease_seconds
+        return True
+
+    def complete(self, job: Job, result: Any = None) -> bool:
+        """
+        Marca un trabajo como terminado.
+
+        Args:
+            job: Trabajo reclamado
+            result: Resultado (serializable a JSON)
+
+        Returns:
+            False si el arrendamiento ya no es de este trabajador
+        """
+        return self._finish(job, DONE, json.dumps(result, default=str), None)
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> bool:
+        """
+        Registra el fallo de un trabajo; se reintenta si le quedan intentos.
+
+        Args:
+            job: Trabajo reclamado
+            error: Descripción del error
+            retry: False para no reintentar
+
+        Returns:
+            False si el arrendamiento ya no es de este trabajador
+        """
+        if retry and job.attempts < job.max_attempts:
+            delay = self.retry_delay * 2 ** (job.attempts - 1)
+            return self._finish(job, QUEUED, None, error, available_at=self._clock() + delay)
+        return self._finish(job, FAILED, None, error)
+
+    def get(self, job_id: int) -> Optional[Job]:
+        """Estado de un trabajo, o None si no existe."""
+        row = self._connection().execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        """Número de trabajos por estado."""
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {**{status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}, **dict(rows)}
+
+    def wait_for_work(self, timeout: float) -> None:
+        """Espera a que se encole algo en este proceso, o `timeout` segundos."""
+        with self._wakeup:
+            self._wakeup.wait(timeout)
+
+    def wake_workers(self) -> None:
+        """Despierta a los trabajadores de este proceso que esperan trabajo."""
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def close(self) -> None:
+        """Cierra las conexiones de todos los hilos."""
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _finish(
+        self,
+        job: Job,
+        status: str,
+        result: Optional[str],
+        error: Optional[str],
+        available_at: Optional[float] = None
+    ) -> bool:
+        """Cierra el arrendamiento de un trabajo si sigue siendo nuestro."""
+        now = self._clock()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, "
+            "available_at = COALESCE(?, available_at), updated_at = ? "
+            "WHERE job_id = ? AND status = ? AND leased_by = ? AND attempts = ?",
+            (status, result, error, available_at, now, job.job_id, RUNNING, job.leased_by, job.attempts)
+        )
+        if status == QUEUED:
+            self.wake_workers()
+        return cursor.rowcount == 1
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (en modo autocommit)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+
+class JobWorkerPool:
+    """
+    Hilos que reclaman trabajos por lotes y los ejecutan.
+
+    Cada tipo de trabajo tiene un manejador que recibe el payload y
+    devuelve el resultado. Una excepción reintenta el trabajo; JobError
+    lo marca como fallido sin reintentar. Sin trabajo, los hilos esperan
+    a que se encole algo (o `poll_interval` segundos, para ver lo que
+    encolan otros procesos).
+
+    Los trabajos de un lote se ejecutan uno tras otro, así que el
+    arrendamiento se renueva al empezar cada uno y, mientras el pool está
+    en marcha, un hilo de latido renueva cada `heartbeat_interval` los de
+    todos los trabajos reclamados y aún sin terminar. Un trabajo solo
+    vuelve a entregarse si su trabajador murió o dejó de latir.
+    """
+
+    def __init__(
+        self,
+        job_queue: JobQueue,
+        handlers: Dict[str, Callable[[Dict[str, Any]], Any]],
+        workers: int = 4,
+        batch_size: int = 10,
+        poll_interval: float = 0.5,
+        heartbeat_interval: Optional[float] = None
+    ):
+        """
+        Inicializa el pool.
+
+        Args:
+            job_queue: Cola de trabajos
+            handlers: Tipo de trabajo -> manejador
+            workers: Número de hilos
+            batch_size: Trabajos reclamados por consulta
+            poll_interval: Espera máxima sin trabajo, en segundos
+            heartbeat_interval: Segundos entre renovaciones de los
+                arrendamientos (por defecto, un tercio de lease_seconds)
+        """
+        if workers < 1:
+            raise ValueError("workers debe ser al menos 1")
+        self.job_queue = job_queue
+        self.handlers = handlers
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval or job_queue.lease_seconds / 3
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # Trabajos reclamados y aún sin terminar, por ID
+        self._leased: Dict[int, Job] = {}
+        self._leased_lock = threading.Lock()
+        self._prefix = uuid.uuid4().hex[:8]
+
+    def start(self) -> "JobWorkerPool":
+        """Arranca los hilos."""
+        if self._threads:
+            return self
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, args=(f"{self._prefix}-{n}",), name=f"job-worker-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Detiene los hilos tras terminar el lote en curso.
+
+        Args:
+            timeout: Segundos máximos de espera por hilo
+        """
+        self._stop.set()
+        self.job_queue.wake_workers()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_once(self, worker_id: Optional[str] = None) -> int:
+        """
+        Reclama y ejecuta un lote en el hilo actual.
+
+        Returns:
+            Trabajos ejecutados
+        """
+        jobs = self.job_queue.claim(worker_id or f"{self._prefix}-main", self.batch_size)
+        with self._leased_lock:
+            self._leased.update((job.job_id, job) for job in jobs)
+        for job in jobs:
+            try:
+                self._execute(job)
+            finally:
+                with self._leased_lock:
+                    self._leased.pop(job.job_id, None)
+        return len(jobs)
+
+    def _work(self, worker_id: str) -> None:
+        """Bucle de un hilo: reclama lotes hasta stop(), esperando si no hay trabajo."""
+        while not self._stop.is_set():
+            if not self.run_once(worker_id):
+                self.job_queue.wait_for_work(self.poll_interval)
+
+    def _heartbeat(self) -> None:
+        """Bucle del hilo de latido: renueva los arrendamientos hasta stop()."""
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._leased_lock:
+                jobs = list(self._leased.values())
+            for job in jobs:
+                self.job_queue.extend(job)
+
+    def _execute(self, job: Job) -> None:
+        """Ejecuta un trabajo con su manejador y anota el resultado o el fallo."""
+        if not self.job_queue.extend(job):
+            # Esperó en el lote más que su arrendamiento y otro lo reclamó
+            _LEASES_LOST.inc()
+            return
+        handler = self.handlers.get(job.kind)
+        if handler is None:
+            self.job_queue.fail(job, f"Tipo de trabajo desconocido: {job.kind}", retry=False)
+            return
+        try:
+            result = handler(job.payload)
+        except JobError as error:
+            recorded = self.job_queue.fail(job, str(error), retry=False)
+        except Exception as error:
+            recorded = self.job_queue.fail(job, f"{type(error).__name__}: {error}")
+        else:
+            recorded = self.job_queue.complete(job, result)
+        if not recorded:
+            _LEASES_LOST.inc()
+
+
+def payment_handlers(
+    payment_controller: PaymentController,
+    lock: Optional[threading.Lock] = None
+) -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    """
+    Manejadores de trabajos de pagos ("process_payment").
+
+    La llamada al gateway se hace fuera del cerrojo, de modo que varios
+    trabajadores esperan al gateway a la vez; las transiciones y
+    escrituras en el repositorio se hacen bajo `lock`.
+
+    El manejador es idempotente, porque un trabajo se vuelve a entregar
+    si su trabajador murió con el arrendamiento tomado: un pago ya
+    resuelto (COMPLETED, FAILED o REFUNDED) se da por hecho sin tocarlo,
+    y uno que quedó en PROCESSING se vuelve a cobrar con la misma clave
+    de idempotencia (PaymentController.charge), así que el gateway
+    devuelve el resultado del primer cobro en vez de cobrar otra vez.
+
+    Args:
+        payment_controller: Controlador de pagos
+        lock: Cerrojo que protege el repositorio de pagos
+
+    Returns:
+        Tipo de trabajo -> manejador
+    """
+    lock = lock or threading.Lock()
+
+    def process_payment(payload: Dict[str, Any]) -> Dict[str, Any]:
+        payment_id = int(payload["payment_id"])
+        with lock:
+            payment = payment_controller.get_payment(payment_id)
+            if payment is None:
+                raise JobError(f"El pago {payment_id} no existe")
+            if payment.status in _PROCESSED:
+                # Entrega repetida de un trabajo que ya terminó
+                return {"payment_id": payment_id, "status": payment.status.value}
+            if payment.status != PaymentStatus.PROCESSING:
+                payment = payment_controller.start_processing(payment_id)
+                if payment is None:
+                    raise JobError(f"El pago {payment_id} no está pendiente")
+        payment_controller.charge(payment, lock)
+        payment = payment_controller.get_payment(payment_id) or payment
+        return {"payment_id": payment_id, "status": payment.status.value}
+
+    return {"process_payment": process_payment}
+
+
+class _transaction:
+    """Transacción explícita sobre una conexión en modo autocommit."""
+
+    def __init__(self, connection: sqlite3.Connection, immediate: bool = False):
+        self._connection = connection
+        self._begin = "BEGIN IMMEDIATE" if immediate else "BEGIN"
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._connection.execute(self._begin)
+        return self._connection
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self._connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
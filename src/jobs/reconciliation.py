@@ -0,0 +1,392 @@
+"""Conciliación de liquidaciones del gateway contra los pagos registrados."""
+
+import csv
+import json
+import math
+import multiprocessing
+import os
+import time
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models.payment import PaymentStatus
+from repositories.payment_repository import PaymentRepository
+
+
+# Estados en los que el gateway debió liquidar el pago
+SETTLED_STATUSES = (PaymentStatus.COMPLETED, PaymentStatus.REFUNDED)
+
+# Tipos de discrepancia
+AMOUNT_MISMATCH = "amount_mismatch"
+ORPHANED_SETTLEMENT = "orphaned_settlement"
+MISSING_SETTLEMENT = "missing_settlement"
+DUPLICATE_SETTLEMENT = "duplicate_settlement"
+STATUS_MISMATCH = "status_mismatch"
+INVALID_ROW = "invalid_row"
+
+DISCREPANCY_TYPES = (
+    AMOUNT_MISMATCH, ORPHANED_SETTLEMENT, MISSING_SETTLEMENT,
+    DUPLICATE_SETTLEMENT, STATUS_MISMATCH, INVALID_ROW
+)
+
+# Conciliador que heredan los procesos trabajadores (fork), para no
+# serializar el repositorio en cada tarea
+_WORKER_RECONCILER: Optional["SettlementReconciler"] = None
+
+
+class ReconciliationReport:
+    """Resultado de una conciliación."""
+
+    def __init__(self, sample_limit: int = 100):
+        """
+        Inicializa un informe vacío.
+
+        Args:
+            sample_limit: Discrepancias de ejemplo que se guardan
+        """
+        self.rows = 0
+        self.matched = 0
+        self.counts: Dict[str, int] = {kind: 0 for kind in DISCREPANCY_TYPES}
+        self.samples: List[Dict[str, Any]] = []
+        self.sample_limit = sample_limit
+        self.elapsed = 0.0
+        self.workers = 1
+
+    @property
+    def rows_per_sec(self) -> float:
+        """Filas de liquidación procesadas por segundo."""
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def is_clean(self) -> bool:
+        """True si no hay ninguna discrepancia."""
+        return not any(self.counts.values())
+
+    def add_sample(self, discrepancy: Dict[str, Any]) -> None:
+        """Guarda una discrepancia de ejemplo (hasta sample_limit)."""
+        if len(self.samples) < self.sample_limit:
+            self.samples.append(discrepancy)
+
+    def summary(self) -> str:
+        """Resumen legible."""
+        lines = [
+            f"{self.rows:,} liquidaciones en {self.elapsed:.2f} s "
+            f"({self.rows_per_sec:,.0f} filas/s, {self.workers} procesos)",
+            f"Conciliadas: {self.matched:,}"
+        ]
+        lines.extend(f"{kind}: {count:,}" for kind, count in self.counts.items())
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Informe serializable."""
+        return {
+            "rows": self.rows,
+            "matched": self.matched,
+            "discrepancies": dict(self.counts),
+            "elapsed_s": round(self.elapsed, 3),
+            "rows_per_sec": round(self.rows_per_sec, 1),
+            "workers": self.workers,
+            "samples": self.samples
+        }
+
+
+class SettlementReconciler:
+    """
+    Concilia un archivo de liquidaciones con el PaymentRepository.
+
+    El archivo (CSV con cabecera o JSONL, una liquidación por línea) se
+    lee en streaming y se cruza por transaction_id en lotes de
+    `chunk_size` contra el índice hash del repositorio: la tabla de
+    construcción es el repositorio, que ya está en memoria, y el archivo
+    solo se recorre una vez, así que puede ser mayor que la RAM. Solo se
+    guardan los IDs de los pagos conciliados, para detectar al final los
+    pagos liquidables que el gateway no liquidó.
+
+    Con workers > 1 el archivo se divide en rangos de bytes que procesan
+    procesos hijos creados con fork (heredan el repositorio sin copiarlo);
+    donde fork no existe se procesa en un solo proceso.
+
+    Discrepancias:
+        amount_mismatch: el importe liquidado difiere del del pago
+        orphaned_settlement: liquidación sin pago con ese transaction_id
+        missing_settlement: pago completado o reembolsado sin liquidación
+        duplicate_settlement: transaction_id liquidado más de una vez
+        status_mismatch: liquidación de un pago que no está completado
+            ni reembolsado
+        invalid_row: línea que no se pudo interpretar (no es UTF-8,
+            le falta un campo o el importe no es un número finito)
+    """
+
+    def __init__(
+        self,
+        payment_repository: PaymentRepository,
+        tolerance: float = 0.005,
+        chunk_size: int = 10_000,
+        transaction_field: str = "transaction_id",
+        amount_field: str = "amount",
+        sample_limit: int = 100
+    ):
+        """
+        Inicializa el conciliador.
+
+        Args:
+            payment_repository: Repositorio de pagos
+            tolerance: Diferencia de importe tolerada
+            chunk_size: Liquidaciones por lote de búsqueda
+            transaction_field: Columna o clave del ID de transacción
+            amount_field: Columna o clave del importe
+            sample_limit: Discrepancias de ejemplo en el informe
+        """
+        self.payment_repository = payment_repository
+        self.tolerance = tolerance
+        self.chunk_size = chunk_size
+        self.transaction_field = transaction_field
+        self.amount_field = amount_field
+        self.sample_limit = sample_limit
+
+    def reconcile(
+        self,
+        path: str,
+        workers: int = 1,
+        output_path: Optional[str] = None
+    ) -> ReconciliationReport:
+        """
+        Concilia un archivo de liquidaciones.
+
+        Args:
+            path: Archivo .csv o .jsonl
+            workers: Procesos en paralelo
+            output_path: Archivo JSONL donde escribir todas las
+                discrepancias (opcional)
+
+        Returns:
+            Informe con recuentos, ejemplos y rendimiento
+        """
+        global _WORKER_RECONCILER
+        started = time.perf_counter()
+        layout = self._layout(path)
+        ranges = _split(path, layout[1], workers * 4 if workers > 1 else 1)
+        tasks = [
+            (path, layout, start, end, self._part_path(output_path, n))
+            for n, (start, end) in enumerate(ranges)
+        ]
+
+        context = _fork_context() if workers > 1 else None
+        report = ReconciliationReport(self.sample_limit)
+        if context is None:
+            partials = [self._reconcile_range(*task) for task in tasks]
+        else:
+            report.workers = workers
+            _WORKER_RECONCILER = self
+            try:
+                with context.Pool(workers) as pool:
+                    partials = pool.starmap(_reconcile_in_worker, tasks)
+            finally:
+                _WORKER_RECONCILER = None
+
+        matched = set()
+        output = open(output_path, "w", encoding="utf-8") if output_path else None
+        try:
+            for (_, _, _, _, part), partial in zip(tasks, partials):
+                report.rows += partial["rows"]
+                for kind, count in partial["counts"].items():
+                    report.counts[kind] += count
+                for sample in partial["samples"]:
+                    report.add_sample(sample)
+                for payment_id in partial["matched"]:
+                    if payment_id in matched:
+                        # Repetido entre rangos distintos
+                        report.counts[DUPLICATE_SETTLEMENT] += 1
+                        payment = self.payment_repository.find_by_id(payment_id)
+                        self._emit(report, output, {
+                            "type": DUPLICATE_SETTLEMENT,
+                            "transaction_id": payment.transaction_id if payment else None,
+                            "payment_id": payment_id
+                        })
+                    else:
+                        matched.add(payment_id)
+                if part is not None:
+                    with open(part, encoding="utf-8") as part_file:
+                        for line in part_file:
+                            output.write(line)
+                    os.remove(part)
+
+            report.matched = len(matched)
+            for payment in self.payment_repository.find_where(status__in=list(SETTLED_STATUSES)):
+                if payment.transaction_id is not None and payment.payment_id not in matched:
+                    report.counts[MISSING_SETTLEMENT] += 1
+                    self._emit(report, output, {
+                        "type": MISSING_SETTLEMENT,
+                        "transaction_id": payment.transaction_id,
+                        "payment_id": payment.payment_id,
+                        "amount": payment.amount
+                    })
+        finally:
+            if output is not None:
+                output.close()
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _reconcile_range(
+        self,
+        path: str,
+        layout: Tuple[str, int, Optional[Tuple[int, int]]],
+        start: int,
+        end: int,
+        part_path: Optional[str]
+    ) -> Dict[str, Any]:
+        """Concilia las líneas que empiezan en [start, end)."""
+        repository = self.payment_repository
+        file_format, _, columns = layout
+        counts = {kind: 0 for kind in DISCREPANCY_TYPES}
+        samples: List[Dict[str, Any]] = []
+        matched = array("q")
+        seen = set()
+        rows = 0
+        output = open(part_path, "w", encoding="utf-8") if part_path else None
+
+        def emit(discrepancy: Dict[str, Any]) -> None:
+            counts[discrepancy["type"]] += 1
+            if len(samples) < self.sample_limit:
+                samples.append(discrepancy)
+            if output is not None:
+                output.write(json.dumps(discrepancy, ensure_ascii=False) + "\n")
+
+        def flush(chunk: List[Tuple[str, float, int]]) -> None:
+            found = repository.find_by_transaction_ids([row[0] for row in chunk])
+            for transaction_id, amount, offset in chunk:
+                payment = found.get(transaction_id)
+                if payment is None:
+                    emit({"type": ORPHANED_SETTLEMENT, "transaction_id": transaction_id,
+                          "settled_amount": amount, "offset": offset})
+                    continue
+                if payment.payment_id in seen:
+                    emit({"type": DUPLICATE_SETTLEMENT, "transaction_id": transaction_id,
+                          "payment_id": payment.payment_id, "offset": offset})
+                    continue
+                seen.add(payment.payment_id)
+                matched.append(payment.payment_id)
+                if abs(payment.amount - amount) > self.tolerance:
+                    emit({"type": AMOUNT_MISMATCH, "transaction_id": transaction_id,
+                          "payment_id": payment.payment_id, "amount": payment.amount,
+                          "settled_amount": amount, "offset": offset})
+                if payment.status not in SETTLED_STATUSES:
+                    emit({"type": STATUS_MISMATCH, "transaction_id": transaction_id,
+                          "payment_id": payment.payment_id, "status": payment.status.value, "offset": offset})
+
+        try:
+            chunk: List[Tuple[str, float, int]] = []
+            for offset, line in _lines(path, start, end):
+                rows += 1
+                try:
+                    # UnicodeDecodeError es un ValueError: la fila es inválida
+                    chunk.append(self._parse(file_format, columns, line.decode("utf-8"), offset))
+                except (ValueError, KeyError, IndexError, TypeError):
+                    emit({"type": INVALID_ROW, "offset": offset,
+                          "text": line[:200].decode("utf-8", errors="replace")})
+                    continue
+                if len(chunk) >= self.chunk_size:
+                    flush(chunk)
+                    chunk = []
+            if chunk:
+                flush(chunk)
+        finally:
+            if output is not None:
+                output.close()
+        return {"rows": rows, "counts": counts, "samples": samples, "matched": matched}
+
+    def _parse(
+        self,
+        file_format: str,
+        columns: Optional[Tuple[int, int]],
+        text: str,
+        offset: int
+    ) -> Tuple[str, float, int]:
+        """Convierte una línea en (transaction_id, importe, posición)."""
+        if file_format == "jsonl":
+            record = json.loads(text)
+            return str(record[self.transaction_field]), _amount(record[self.amount_field]), offset
+        fields = next(csv.reader([text])) if '"' in text else text.split(",")
+        return fields[columns[0]].strip(), _amount(fields[columns[1]]), offset
+
+    def _layout(self, path: str) -> Tuple[str, int, Optional[Tuple[int, int]]]:
+        """Formato, inicio de los datos y columnas (CSV) del archivo."""
+        extension = os.path.splitext(path)[1].lower()
+        if extension in (".jsonl", ".ndjson"):
+            return "jsonl", 0, None
+        if extension != ".csv":
+            raise ValueError(f"Formato no soportado: {extension} (use .csv o .jsonl)")
+        with open(path, "rb") as settlements:
+            header_line = settlements.readline()
+        header = [name.strip() for name in next(csv.reader([header_line.decode("utf-8-sig")]))]
+        try:
+            columns = (header.index(self.transaction_field), header.index(self.amount_field))
+        except ValueError:
+            raise ValueError(
+                f"El CSV debe tener las columnas {self.transaction_field} y {self.amount_field}"
+            )
+        return "csv", len(header_line), columns
+
+    @staticmethod
+    def _part_path(output_path: Optional[str], number: int) -> Optional[str]:
+        return f"{output_path}.part{number}" if output_path else None
+
+    @staticmethod
+    def _emit(report: ReconciliationReport, output, discrepancy: Dict[str, Any]) -> None:
+        report.add_sample(discrepancy)
+        if output is not None:
+            output.write(json.dumps(discrepancy, ensure_ascii=False) + "\n")
+
+
+def _reconcile_in_worker(*task) -> Dict[str, Any]:
+    """Tarea de un proceso trabajador."""
+    return _WORKER_RECONCILER._reconcile_range(*task)
+
+
+def _fork_context():
+    """Contexto fork de multiprocessing, o None si la plataforma no lo tiene."""
+    try:
+        return multiprocessing.get_context("fork")
+    except ValueError:
+        return None
+
+
+def _split(path: str, data_start: int, parts: int) -> List[Tuple[int, int]]:
+    """Divide [data_start, tamaño) en rangos de bytes de tamaño similar."""
+    size = os.path.getsize(path)
+    step = max(1, -(-(size - data_start) // parts))
+    return [(start, min(start + step, size)) for start in range(data_start, size, step)] or [(data_start, size)]
+
+
+def _amount(value: Any) -> float:
+    """Importe de una liquidación; ValueError si no es un número finito."""
+    amount = float(value)
+    if not math.isfinite(amount):
+        # Con NaN, abs(importe - nan) > tolerancia es False: pasaría por conciliado
+        raise ValueError(f"Importe no válido: {value!r}")
+    return amount
+
+
+def _lines(path: str, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Líneas que empiezan en [start, end), sin decodificar, con su
+    posición en bytes.
+
+    Si start cae a mitad de una línea, esa línea pertenece al rango
+    anterior y se salta.
+    """
+    with open(path, "rb", buffering=1 << 20) as settlements:
+        if start > 0:
+            settlements.seek(start - 1)
+            position = start - 1 + len(settlements.readline())
+        else:
+            position = 0
+        while position < end:
+            line = settlements.readline()
+            if not line:
+                break
+            offset = position
+            position += len(line)
+            line = line.strip()
+            if line:
+                yield offset, line
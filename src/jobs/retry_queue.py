@@ -0,0 +1,312 @@
+"""Reintentos programados de pagos fallidos, con backoff y persistencia en SQLite."""
+
+import heapq
+import queue
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from controllers.payment_controller import PaymentController
+from models.payment import Payment, PaymentStatus
+
+
+# Estados de un reintento en la tabla payment_retries
+SCHEDULED = "scheduled"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+EXHAUSTED = "exhausted"
+DISCARDED = "discarded"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payment_retries (
+    payment_id INTEGER PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_payment_retries_due ON payment_retries(status, next_attempt_at);
+"""
+
+
+class RetryPolicy:
+    """
+    Backoff exponencial con jitter y número máximo de intentos.
+
+    El intento n espera min(max_delay, base_delay * 2^(n-1)) segundos,
+    reducidos al azar hasta en un `jitter` (0.5 = entre el 50 % y el
+    100 %), para que los pagos que fallaron juntos no se reintenten
+    todos a la vez.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 600.0,
+        jitter: float = 0.5,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        Inicializa la política.
+
+        Args:
+            max_attempts: Reintentos como máximo por pago
+            base_delay: Espera del primer reintento, en segundos
+            max_delay: Espera máxima entre reintentos
+            jitter: Fracción de la espera que se elige al azar (0 a 1)
+            rng: Generador aleatorio (inyectable para pruebas)
+        """
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter debe estar entre 0 y 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> float:
+        """
+        Espera antes de un reintento.
+
+        Args:
+            attempt: Número de reintento (1 para el primero)
+
+        Returns:
+            Segundos de espera
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return ceiling * (1 - self.jitter * self._rng.random())
+
+
+class RetryScheduler:
+    """
+    Cola de reintentos de pagos fallidos.
+
+    Se engancha a PaymentController.on_payment_failed: cada pago que el
+    gateway rechaza se programa para reintentarse según la RetryPolicy.
+    Los reintentos pendientes se guardan en SQLite (tabla
+    payment_retries) y se recargan al arrancar, así que sobreviven a un
+    reinicio; en memoria se ordenan en un montículo por hora del
+    siguiente intento.
+
+    Un hilo despachador duerme en una condición hasta el próximo
+    vencimiento (o indefinidamente si la cola está vacía) y entrega los
+    reintentos vencidos a `workers` hilos. Cada trabajador llama al
+    gateway sin bloquear a los demás; las transiciones del pago y las
+    escrituras en el repositorio se hacen bajo un cerrojo.
+    """
+
+    def __init__(
+        self,
+        payment_controller: PaymentController,
+        db_path: str = ":memory:",
+        policy: Optional[RetryPolicy] = None,
+        workers: int = 4,
+        clock: Callable[[], float] = time.time,
+        lock: Optional[threading.Lock] = None
+    ):
+        """
+        Inicializa la cola y recarga los reintentos guardados.
+
+        Args:
+            payment_controller: Controlador de pagos
+            db_path: Base de datos SQLite (":memory:" sin persistencia)
+            policy: Política de reintentos
+            workers: Hilos que ejecutan reintentos
+            clock: Reloj de pared en segundos (persistido entre reinicios)
+            lock: Cerrojo que protege el repositorio de pagos, si se
+                comparte con otros hilos
+        """
+        if workers < 1:
+            raise ValueError("workers debe ser al menos 1")
+        self.payment_controller = payment_controller
+        self.policy = policy or RetryPolicy()
+        self.workers = workers
+        self._clock = clock
+        self._repository_lock = lock or threading.Lock()
+        self._condition = threading.Condition()
+        self._heap: List[Tuple[float, int]] = []
+        self._due_at: Dict[int, float] = {}
+        self._ready: "queue.Queue[Optional[int]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._load()
+        payment_controller.on_payment_failed = self.schedule
+
+    def schedule(self, payment: Payment, error: Optional[str] = None) -> Optional[float]:
+        """
+        Programa el siguiente reintento de un pago fallido.
+
+        Args:
+            payment: Pago fallido
+            error: Motivo del fallo
+
+        Returns:
+            Hora (epoch) del reintento, o None si agotó los intentos
+        """
+        with self._condition:
+            row = self._db.execute(
+                "SELECT attempts, status FROM payment_retries WHERE payment_id = ?", (payment.payment_id,)
+            ).fetchone()
+            attempts = row[0] + 1 if row and row[1] in (SCHEDULED, RUNNING) else 1
+            now = self._clock()
+            if attempts > self.policy.max_attempts:
+                self._write(payment.payment_id, attempts - 1, now, EXHAUSTED, error)
+                self._due_at.pop(payment.payment_id, None)
+                return None
+            due = now + self.policy.delay(attempts)
+            self._write(payment.payment_id, attempts, due, SCHEDULED, error)
+            self._push(payment.payment_id, due)
+            return due
+
+    def start(self) -> "RetryScheduler":
+        """Arranca el despachador y los trabajadores."""
+        with self._condition:
+            if self._threads:
+                return self
+            self._stopping = False
+        self._threads = [threading.Thread(target=self._dispatch, name="retry-dispatcher", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._work, name=f"retry-worker-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Detiene los hilos; los reintentos pendientes quedan guardados.
+
+        Args:
+            timeout: Segundos máximos de espera por hilo
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for _ in range(len(self._threads) - 1):
+            self._ready.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def close(self) -> None:
+        """Detiene los hilos y cierra la base de datos."""
+        self.stop()
+        with self._condition:
+            self._db.close()
+
+    def pending(self) -> int:
+        """Reintentos programados que aún no se ejecutaron."""
+        with self._condition:
+            return len(self._due_at)
+
+    def stats(self) -> Dict[str, int]:
+        """Número de reintentos por estado."""
+        with self._condition:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM payment_retries GROUP BY status").fetchall()
+        return dict(rows)
+
+    def next_due(self) -> Optional[float]:
+        """Hora (epoch) del próximo reintento, o None si no hay ninguno."""
+        with self._condition:
+            return min(self._due_at.values(), default=None)
+
+    def _load(self) -> None:
+        """Recarga los reintentos programados o interrumpidos."""
+        rows = self._db.execute(
+            "SELECT payment_id, next_attempt_at FROM payment_retries WHERE status IN (?, ?)",
+            (SCHEDULED, RUNNING)
+        ).fetchall()
+        with self._condition:
+            for payment_id, due in rows:
+                self._push(payment_id, due)
+
+    def _push(self, payment_id: int, due: float) -> None:
+        """Añade un vencimiento al montículo (con la condición tomada)."""
+        self._due_at[payment_id] = due
+        heapq.heappush(self._heap, (due, payment_id))
+        if self._heap[0] == (due, payment_id):
+            self._condition.notify()
+
+    def _write(self, payment_id: int, attempts: int, due: float, status: str, error: Optional[str]) -> None:
+        """Guarda el estado de un reintento (con la condición tomada)."""
+        with self._db:
+            self._db.execute(
+                "INSERT INTO payment_retries (payment_id, attempts, next_attempt_at, status, last_error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(payment_id) DO UPDATE SET "
+                "attempts = excluded.attempts, next_attempt_at = excluded.next_attempt_at, "
+                "status = excluded.status, last_error = COALESCE(excluded.last_error, last_error), "
+                "updated_at = excluded.updated_at",
+                (payment_id, attempts, due, status, error, self._clock())
+            )
+
+    def _set_status(self, payment_id: int, status: str) -> None:
+        """Cambia el estado de un reintento ya guardado (toma la condición)."""
+        with self._condition:
+            with self._db:
+                self._db.execute(
+                    "UPDATE payment_retries SET status = ?, updated_at = ? WHERE payment_id = ?",
+                    (status, self._clock(), payment_id)
+                )
+
+    def _dispatch(self) -> None:
+        """Entrega los reintentos vencidos; duerme hasta el próximo."""
+        with self._condition:
+            while not self._stopping:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, payment_id = self._heap[0]
+                if self._due_at.get(payment_id) != due:
+                    # Entrada obsoleta: el pago se reprogramó o terminó
+                    heapq.heappop(self._heap)
+                    continue
+                delay = due - self._clock()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                del self._due_at[payment_id]
+                with self._db:
+                    self._db.execute(
+                        "UPDATE payment_retries SET status = ? WHERE payment_id = ?", (RUNNING, payment_id)
+                    )
+                self._ready.put(payment_id)
+
+    def _work(self) -> None:
+        """Ejecuta reintentos hasta recibir None."""
+        while True:
+            payment_id = self._ready.get()
+            if payment_id is None:
+                return
+            try:
+                self._attempt(payment_id)
+            except Exception as error:
+                # Un error inesperado no debe matar al trabajador
+                with self._condition:
+                    self._write(payment_id, 0, self._clock(), DISCARDED, f"{type(error).__name__}: {error}")
+
+    def _attempt(self, payment_id: int) -> None:
+        """Un reintento: pendiente -> procesando -> gateway -> resultado."""
+        controller = self.payment_controller
+        with self._repository_lock:
+            payment = controller.start_processing(payment_id, retry=True)
+            if payment is None:
+                # Ya no hay nada que reintentar (eliminado, cancelado...)
+                self._set_status(payment_id, DISCARDED)
+                return
+        # Si el gateway lo rechaza, el controlador llama a schedule()
+        if controller.charge(payment, self._repository_lock):
+            self._set_status(payment_id, SUCCEEDED)
+            return
+        current = controller.get_payment(payment_id)
+        if current is None or current.status != PaymentStatus.FAILED:
+            # El resultado no se guardó: se canceló o eliminó durante el cobro
+            self._set_status(payment_id, DISCARDED)
@@ -1,5 +1,11 @@
 """Aplicación principal del Sistema de Gestión."""
 
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Optional
 from models.user import UserRole
 from models.product import ProductCategory
 from models.payment import PaymentMethod
@@ -9,26 +15,71 @@ from controllers.payment_controller import PaymentController
 from repositories.user_repository import UserRepository
 from repositories.product_repository import ProductRepository
 from repositories.payment_repository import PaymentRepository
+from repositories.review_repository import ReviewRepository
+from repositories.cached_repository import CachedRepository
+from repositories.change_feed import ChangeFeed
 from views.console_view import ConsoleView
+from api.server import HttpServer
+from api.routes import build_router
+from batch.runner import BatchReport, BatchRunner
+from jobs.job_queue import JobQueue, JobWorkerPool, payment_handlers
+from monitoring.metrics import REGISTRY, Instrumentation
+from monitoring.tracing import JsonlExporter, Tracer
+from ratelimit.limiter import KeyedRateLimiter, LoadShedder
 
 
 class SistemaGestion:
     """Aplicación principal del Sistema de Gestión."""
     
-    def __init__(self):
-        """Inicializa el sistema con todos sus componentes."""
+    def __init__(self, enable_metrics: Optional[bool] = None, metrics_active_fraction: float = 0.05):
+        """
+        Inicializa el sistema con todos sus componentes.
+        
+        Args:
+            enable_metrics: Medir latencias de controladores y repositorios
+                (None: solo si SG_METRICS_FILE está definida)
+            metrics_active_fraction: Fracción del tiempo con medición de
+                latencias (1 para medir siempre)
+        """
         # Inicializar repositorios
         self.user_repository = UserRepository()
         self.product_repository = ProductRepository()
         self.payment_repository = PaymentRepository()
+        self.review_repository = ReviewRepository()
+        
+        # Flujo de cambios (si SG_CHANGE_LOG está definida)
+        self.change_feed = self._create_change_feed()
+        
+        # Caché de lectura de usuarios y productos (si SG_CACHE_SIZE está definida)
+        self.user_cache = self._create_cache(self.user_repository, "users")
+        self.product_cache = self._create_cache(self.product_repository, "products")
         
         # Inicializar controladores
-        self.user_controller = UserController(self.user_repository)
-        self.product_controller = ProductController(self.product_repository)
+        self.user_controller = UserController(self.user_cache or self.user_repository)
+        self.product_controller = ProductController(
+            self.product_cache or self.product_repository, review_repository=self.review_repository
+        )
         self.payment_controller = PaymentController(self.payment_repository)
         
         # Inicializar vista
         self.view = ConsoleView()
+        
+        # Las trazas se instalan antes que las métricas para que estas
+        # puedan activarse y desactivarse por encima sin quitarlas
+        self.tracer = self._create_tracer()
+        if self.tracer is not None:
+            self._trace()
+        
+        self.instrumentation = Instrumentation(REGISTRY)
+        if enable_metrics is None:
+            enable_metrics = bool(os.environ.get("SG_METRICS_FILE"))
+        if enable_metrics:
+            self._instrument(metrics_active_fraction)
+        
+        # Cola de trabajos en segundo plano (si SG_JOB_DB está definida)
+        self.job_queue: Optional[JobQueue] = None
+        self.job_workers: Optional[JobWorkerPool] = None
+        self._start_job_workers()
     
     def run(self) -> None:
         """Ejecuta el bucle principal de la aplicación."""
@@ -48,6 +99,7 @@ class SistemaGestion:
             elif option == "3":
                 self._payment_management()
             elif option == "4":
+                self._shutdown()
                 self.view.display_info("¡Hasta luego!")
                 break
             else:
@@ -100,6 +152,8 @@ class SistemaGestion:
             elif option == "3":
                 self._list_payments()
             elif option == "4":
+                self._show_job()
+            elif option == "5":
                 break
             else:
                 self.view.display_error("Opción inválida")
@@ -128,8 +182,7 @@ class SistemaGestion:
         """Lista todos los usuarios."""
         users = self.user_controller.list_all_users()
         if users:
-            for user in users:
-                self.view.display_user(user)
+            self.view.display_users(users)
         else:
             self.view.display_info("No hay usuarios registrados")
     
@@ -168,8 +221,7 @@ class SistemaGestion:
         """Lista todos los productos."""
         products = self.product_controller.list_all_products()
         if products:
-            for product in products:
-                self.view.display_product(product)
+            self.view.display_products(products)
         else:
             self.view.display_info("No hay productos registrados")
     
@@ -202,23 +254,247 @@ class SistemaGestion:
             self.view.display_error("No se pudo crear el pago")
     
     def _process_payment(self) -> None:
-        """Procesa un pago."""
+        """Procesa un pago (en segundo plano si hay cola de trabajos)."""
         payment_id = int(self.view.get_input("ID del pago: "))
         
-        if self.payment_controller.process_payment(payment_id):
+        if self.job_queue is not None:
+            if self.payment_controller.get_payment(payment_id) is None:
+                self.view.display_error("El pago no existe")
+                return
+            job_id = self.job_queue.enqueue("process_payment", {"payment_id": payment_id})
+            self.view.display_success(f"Pago en cola: trabajo {job_id}")
+        elif self.payment_controller.process_payment(payment_id):
             self.view.display_success("Pago procesado exitosamente")
         else:
             self.view.display_error("No se pudo procesar el pago")
     
+    def _show_job(self) -> None:
+        """Muestra el estado de un trabajo en segundo plano."""
+        if self.job_queue is None:
+            self.view.display_info("La cola de trabajos no está activa (defina SG_JOB_DB)")
+            return
+        job = self.job_queue.get(int(self.view.get_input("ID del trabajo: ")))
+        if job is None:
+            self.view.display_error("Trabajo no encontrado")
+            return
+        message = f"Trabajo {job.job_id} ({job.kind}): {job.status}, intentos {job.attempts}/{job.max_attempts}"
+        if job.error:
+            message += f" - {job.error}"
+        elif job.result is not None:
+            message += f" - {json.dumps(job.result, ensure_ascii=False)}"
+        self.view.display_info(message)
+    
     def _list_payments(self) -> None:
         """Lista todos los pagos."""
         payments = self.payment_repository.find_all()
         if payments:
-            for payment in payments:
-                self.view.display_payment(payment)
+            self.view.display_payments(payments)
         else:
             self.view.display_info("No hay pagos registrados")
     
+    def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """
+        Atiende la API HTTP/JSON hasta recibir SIGINT o SIGTERM.
+        
+        Args:
+            host: Dirección de escucha
+            port: Puerto
+        """
+        self._create_sample_data()
+        self._configure_rate_limits()
+        router = build_router(
+            self.user_controller, self.product_controller, self.payment_controller, self.job_queue,
+            job_kinds=set(self.job_workers.handlers) if self.job_workers is not None else None
+        )
+        server = HttpServer(router, host, port, tracer=self.tracer)
+        
+        async def run_server() -> None:
+            await server.start()
+            self.view.display_info(f"API escuchando en http://{host}:{server.port} (Ctrl+C para detener)")
+            await server.serve_forever()
+        
+        try:
+            asyncio.run(run_server())
+        except KeyboardInterrupt:
+            pass
+        self._shutdown()
+    
+    def run_batch(self, lines, stop_on_error: bool = False) -> BatchReport:
+        """
+        Ejecuta un script de comandos sin menú (ver BatchRunner).
+        
+        No crea datos de ejemplo, para que los resultados sean
+        reproducibles.
+        
+        Args:
+            lines: Líneas del script (archivo abierto, stdin o lista)
+            stop_on_error: Detenerse en el primer comando con error
+            
+        Returns:
+            Informe con resultados y tiempos por tipo de comando
+        """
+        runner = BatchRunner(self.user_controller, self.product_controller, self.payment_controller)
+        report = runner.run(lines, stop_on_error)
+        self._shutdown()
+        return report
+    
+    def _start_job_workers(self) -> None:
+        """
+        Arranca la cola de trabajos si SG_JOB_DB está definida.
+        
+        SG_JOB_WORKERS fija el número de hilos trabajadores (4 por
+        defecto). El cerrojo serializa las escrituras de los trabajadores
+        en el repositorio de pagos; las llamadas al gateway van en paralelo.
+        """
+        path = os.environ.get("SG_JOB_DB")
+        if not path:
+            return
+        self.job_queue = JobQueue(path)
+        workers = int(os.environ.get("SG_JOB_WORKERS", "4"))
+        self.job_workers = JobWorkerPool(
+            self.job_queue, payment_handlers(self.payment_controller), workers=workers
+        ).start()
+    
+    def _create_change_feed(self) -> Optional[ChangeFeed]:
+        """
+        Publica los cambios de los repositorios si SG_CHANGE_LOG está definida.
+        
+        Los tres repositorios comparten el flujo (una sola secuencia) y
+        lo registran en ese archivo JSONL, desde el que los consumidores
+        se reanudan (python -m repositories.change_feed archivo desde).
+        """
+        path = os.environ.get("SG_CHANGE_LOG")
+        if not path:
+            return None
+        feed = ChangeFeed(path)
+        for repository in (self.user_repository, self.product_repository, self.payment_repository):
+            repository.change_feed = feed
+        REGISTRY.gauge("change_feed_sequence", lambda: feed.sequence, "Último cambio publicado")
+        return feed
+    
+    @staticmethod
+    def _create_cache(repository, name: str) -> Optional[CachedRepository]:
+        """
+        Pone una caché de lectura delante del repositorio si SG_CACHE_SIZE está definida.
+        
+        SG_CACHE_SIZE es el número de entradas por repositorio y
+        SG_CACHE_TTL su vida en segundos (60 por defecto). Los
+        controladores reciben la caché; el repositorio sigue siendo el
+        que se traza y se mide, así que sus latencias cuentan solo los
+        fallos de caché.
+        
+        Args:
+            repository: Repositorio a envolver
+            name: Nombre para las métricas ("users", "products")
+        """
+        capacity = int(os.environ.get("SG_CACHE_SIZE", "0"))
+        if capacity <= 0:
+            return None
+        ttl = float(os.environ.get("SG_CACHE_TTL", "60"))
+        cache = CachedRepository(repository, capacity=capacity, ttl=ttl)
+        for stat in ("hits", "misses", "evictions", "size"):
+            REGISTRY.gauge(
+                f"repository_cache_{stat}", lambda stat=stat: cache.stats()[stat],
+                "Uso de la caché de lectura", repository=name
+            )
+        return cache
+    
+    def _configure_rate_limits(self) -> None:
+        """
+        Limita la autenticación y la creación de pagos de la API.
+        
+        Autenticación: 5 intentos seguidos por username (uno cada 5 s
+        después) y 20 por cliente (5/s). Pagos: ráfagas de 20 por usuario
+        (10/s) y de 100 por cliente (50/s). SG_RATE_LIMIT=0 los desactiva.
+        """
+        if os.environ.get("SG_RATE_LIMIT", "1") == "0":
+            return
+        limiters = {
+            ("authenticate", "key"): KeyedRateLimiter(0.2, burst=5),
+            ("authenticate", "client"): KeyedRateLimiter(5, burst=20),
+            ("create_payment", "key"): KeyedRateLimiter(10, burst=20),
+            ("create_payment", "client"): KeyedRateLimiter(50, burst=100)
+        }
+        self.user_controller.auth_shedder = LoadShedder(
+            "authenticate", limiters["authenticate", "key"], limiters["authenticate", "client"]
+        )
+        self.payment_controller.create_shedder = LoadShedder(
+            "create_payment", limiters["create_payment", "key"], limiters["create_payment", "client"]
+        )
+        for (operation, scope), limiter in limiters.items():
+            REGISTRY.gauge(
+                "rate_limit_buckets", limiter.__len__, "Cubetas de límite de ritmo en memoria",
+                operation=operation, scope=scope
+            )
+    
+    def _shutdown(self) -> None:
+        """Detiene los trabajadores, cierra el flujo de cambios y vuelca métricas y trazas."""
+        if self.job_workers is not None:
+            self.job_workers.stop()
+            self.job_queue.close()
+        if self.change_feed is not None:
+            self.change_feed.close()
+        self._dump_metrics()
+        if self.tracer is not None:
+            self.tracer.exporter.close()
+    
+    def _instrument(self, active_fraction: float) -> None:
+        """Registra latencias por método y el tamaño de cada repositorio."""
+        components = [
+            ("repository", "user_repository", self.user_repository),
+            ("repository", "product_repository", self.product_repository),
+            ("repository", "payment_repository", self.payment_repository),
+            ("repository", "review_repository", self.review_repository),
+            ("controller", "user_controller", self.user_controller),
+            ("controller", "product_controller", self.product_controller),
+            ("controller", "payment_controller", self.payment_controller)
+        ]
+        for layer, component, target in components:
+            self.instrumentation.add(target, layer, component)
+        self.instrumentation.start_sampling(active_fraction)
+        REGISTRY.gauge("repository_entities", self.user_repository.count, "Entidades por repositorio", repository="users")
+        REGISTRY.gauge("repository_entities", self.product_repository.count, repository="products")
+        REGISTRY.gauge("repository_entities", self.payment_repository.count, repository="payments")
+        REGISTRY.gauge("repository_entities", self.review_repository.count, repository="reviews")
+        REGISTRY.gauge(
+            "products_low_stock", self.product_repository.count_low_stock, "Productos en su punto de pedido"
+        )
+    
+    @staticmethod
+    def _create_tracer() -> Optional[Tracer]:
+        """
+        Crea el trazador si SG_TRACE_FILE está definida.
+        
+        SG_TRACE_SAMPLE_RATE fija la fracción de operaciones trazadas
+        (1 por defecto).
+        """
+        path = os.environ.get("SG_TRACE_FILE")
+        if not path:
+            return None
+        sample_rate = float(os.environ.get("SG_TRACE_SAMPLE_RATE", "1"))
+        return Tracer(JsonlExporter(path), sample_rate)
+    
+    def _trace(self) -> None:
+        """Traza controladores, repositorios y el gateway de pagos."""
+        self.tracer.trace(self.user_repository, "user_repository", layer="repository")
+        self.tracer.trace(self.product_repository, "product_repository", layer="repository")
+        self.tracer.trace(self.payment_repository, "payment_repository", layer="repository")
+        self.tracer.trace(self.review_repository, "review_repository", layer="repository")
+        self.tracer.trace(
+            self.payment_controller, "payment_gateway",
+            ["_process_with_gateway", "_refund_with_gateway"], layer="gateway"
+        )
+        self.tracer.trace(self.user_controller, "user_controller", layer="controller")
+        self.tracer.trace(self.product_controller, "product_controller", layer="controller")
+        self.tracer.trace(self.payment_controller, "payment_controller", layer="controller")
+    
+    @staticmethod
+    def _dump_metrics() -> None:
+        """Vuelca las métricas al archivo indicado en SG_METRICS_FILE."""
+        path = os.environ.get("SG_METRICS_FILE")
+        if path:
+            REGISTRY.dump(path)
+    
     def _create_sample_data(self) -> None:
         """Crea datos de ejemplo para demostración."""
         # Crear usuario admin
@@ -252,8 +528,34 @@ class SistemaGestion:
 
 def main():
     """Función principal."""
-    app = SistemaGestion()
-    app.run()
+    parser = argparse.ArgumentParser(description="Sistema de Gestión")
+    parser.add_argument("--serve", action="store_true", help="Atender la API HTTP/JSON en lugar del menú")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección de la API (por defecto 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Puerto de la API (por defecto 8080)")
+    parser.add_argument("--batch", metavar="ARCHIVO",
+                        help="Ejecutar un script de comandos (texto o JSONL); '-' para stdin")
+    parser.add_argument("--report", metavar="ARCHIVO", help="Guardar el informe del lote en JSON")
+    parser.add_argument("--stop-on-error", action="store_true", help="Detener el lote en el primer error")
+    args = parser.parse_args()
+    
+    # La API expone /metrics; el menú y los lotes solo miden si las
+    # métricas se van a volcar (SG_METRICS_FILE)
+    app = SistemaGestion(enable_metrics=True if args.serve else None)
+    if args.batch:
+        if args.batch == "-":
+            report = app.run_batch(sys.stdin, args.stop_on_error)
+        else:
+            with open(args.batch, encoding="utf-8") as script:
+                report = app.run_batch(script, args.stop_on_error)
+        print(report.summary())
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as output:
+                json.dump(report.to_dict(), output, indent=2, ensure_ascii=False)
+        sys.exit(1 if report.error_count else 0)
+    elif args.serve:
+        app.serve(args.host, args.port)
+    else:
+        app.run()
 
 
 if __name__ == "__main__":
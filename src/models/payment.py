@@ -38,6 +38,7 @@ class Payment:
         transaction_id: ID de transacción externo
         created_at: Fecha de creación
         processed_at: Fecha de procesamiento
+        version: Número de versión (lo incrementa cada update)
     """
     
     def __init__(
@@ -60,6 +61,7 @@ class Payment:
         self.processed_at: Optional[datetime] = None
         self.refunded_at: Optional[datetime] = None
         self.payment_details: Optional['PaymentDetails'] = None
+        self.version = 0
     
     def process(self) -> None:
         """Inicia el procesamiento del pago."""
@@ -81,10 +83,18 @@ class Payment:
         Args:
             error_message: Mensaje de error
         """
+        if self.status not in [PaymentStatus.PENDING, PaymentStatus.PROCESSING]:
+            raise ValueError("Solo pueden fallar pagos pendientes o en procesamiento")
         self.status = PaymentStatus.FAILED
         if self.payment_details:
             self.payment_details.error_message = error_message
     
+    def retry(self) -> None:
+        """Devuelve un pago fallido a pendiente para reintentarlo."""
+        if self.status != PaymentStatus.FAILED:
+            raise ValueError("Solo se pueden reintentar pagos fallidos")
+        self.status = PaymentStatus.PENDING
+    
     def refund(self) -> None:
         """Procesa un reembolso del pago."""
         if self.status != PaymentStatus.COMPLETED:
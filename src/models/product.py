@@ -1,8 +1,9 @@
 """Módulo de gestión de productos."""
 
+import math
 from enum import Enum
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional
 
 
 class ProductCategory(Enum):
@@ -30,6 +31,9 @@ class Product:
         sku: Código SKU del producto
         created_at: Fecha de creación
         is_available: Disponibilidad del producto
+        reorder_threshold: Punto de pedido: con stock igual o inferior
+            hay que reponer (None sin umbral)
+        version: Número de versión (lo incrementa cada update)
     """
     
     def __init__(
@@ -41,7 +45,8 @@ class Product:
         category: ProductCategory,
         stock_quantity: int,
         sku: str,
-        is_available: bool = True
+        is_available: bool = True,
+        reorder_threshold: Optional[int] = None
     ):
         self.product_id = product_id
         self.name = name
@@ -52,8 +57,9 @@ class Product:
         self.sku = sku
         self.created_at = datetime.now()
         self.is_available = is_available
+        self.reorder_threshold = reorder_threshold
         self.supplier: Optional['Supplier'] = None
-        self.reviews: List['ProductReview'] = []
+        self.version = 0
     
     def update_price(self, new_price: float) -> None:
         """
@@ -62,8 +68,8 @@ class Product:
         Args:
             new_price: Nuevo precio del producto
         """
-        if new_price < 0:
-            raise ValueError("El precio no puede ser negativo")
+        if not math.isfinite(new_price) or new_price < 0:
+            raise ValueError("El precio debe ser un número finito y no negativo")
         self.price = new_price
     
     def add_stock(self, quantity: int) -> None:
@@ -101,15 +107,31 @@ class Product:
         """Establece la disponibilidad del producto."""
         self.is_available = available
     
-    def add_review(self, review: 'ProductReview') -> None:
-        """Agrega una reseña al producto."""
-        self.reviews.append(review)
+    def set_reorder_threshold(self, threshold: Optional[int]) -> None:
+        """
+        Establece el punto de pedido del producto.
+        
+        Args:
+            threshold: Stock con el que hay que reponer (None sin umbral)
+        """
+        if threshold is not None and threshold < 0:
+            raise ValueError("El umbral no puede ser negativo")
+        self.reorder_threshold = threshold
+    
+    def needs_restock(self) -> bool:
+        """Verifica si el stock está en el punto de pedido o por debajo."""
+        return self.reorder_threshold is not None and self.stock_quantity <= self.reorder_threshold
     
-    def get_average_rating(self) -> float:
-        """Calcula el rating promedio del producto."""
-        if not self.reviews:
+    def restock_urgency(self) -> float:
+        """
+        Fracción del punto de pedido que queda en stock.
+        
+        Returns:
+            0 sin stock, 1 justo en el umbral; menor es más urgente
+        """
+        if not self.reorder_threshold:
             return 0.0
-        return sum(r.rating for r in self.reviews) / len(self.reviews)
+        return self.stock_quantity / self.reorder_threshold
     
     def __repr__(self) -> str:
         return f"Product(id={self.product_id}, name='{self.name}', price={self.price})"
@@ -152,7 +174,8 @@ class ProductReview:
         user_id: ID del usuario que escribió la reseña
         rating: Calificación (1-5)
         comment: Comentario
-        created_at: Fecha de creación
+        created_at: Fecha de creación (ahora si no se indica; la ingesta
+            masiva conserva la original)
     """
     
     def __init__(
@@ -161,7 +184,8 @@ class ProductReview:
         product_id: int,
         user_id: int,
         rating: int,
-        comment: str
+        comment: str,
+        created_at: Optional[datetime] = None
     ):
         if not 1 <= rating <= 5:
             raise ValueError("El rating debe estar entre 1 y 5")
@@ -170,7 +194,7 @@ class ProductReview:
         self.user_id = user_id
         self.rating = rating
         self.comment = comment
-        self.created_at = datetime.now()
+        self.created_at = created_at or datetime.now()
     
     def __repr__(self) -> str:
         return f"ProductReview(id={self.review_id}, rating={self.rating})"
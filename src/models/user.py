@@ -27,6 +27,7 @@ class User:
         created_at: Fecha de creación
         is_active: Estado del usuario
         profile: Información del perfil del usuario
+        version: Número de versión (lo incrementa cada update)
     """
     
     def __init__(
@@ -49,6 +50,7 @@ class User:
         self.is_active = is_active
         self.profile: Optional['UserProfile'] = None
         self.permissions: List[str] = []
+        self.version = 0
     
     def activate(self) -> None:
         """Activa la cuenta del usuario."""
@@ -0,0 +1,15 @@
+"""Monitoreo del Sistema de Gestión."""
+
+__all__ = [
+    'MetricsRegistry',
+    'Histogram',
+    'Counter',
+    'REGISTRY',
+    'Instrumentation',
+    'instrument',
+    'Tracer',
+    'Span',
+    'JsonlExporter',
+    'propagate',
+    'slowest_traces'
+]
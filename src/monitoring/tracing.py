@@ -0,0 +1,319 @@
+"""Trazas por spans con propagación de contexto y exportación a JSONL."""
+
+import contextvars
+import functools
+import inspect
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class Span:
+    """
+    Tramo de trabajo dentro de una traza.
+
+    Guarda su traza, su padre, el inicio (época, en ns), la duración y
+    los atributos. Un span sin padre es la raíz de la traza.
+    """
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "attributes",
+        "start_ns", "duration_ns", "status", "error", "_start_perf"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, **attributes):
+        """
+        Inicia un span.
+
+        Args:
+            name: Nombre (p. ej. "payment_controller.process_payment")
+            trace_id: ID de la traza
+            parent_id: ID del span padre (None para la raíz)
+            **attributes: Atributos adicionales
+        """
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes: Dict[str, Any] = attributes
+        self.start_ns = time.time_ns()
+        self.duration_ns = 0
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._start_perf = time.perf_counter_ns()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Añade o reemplaza un atributo."""
+        self.attributes[key] = value
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Cierra el span y anota la excepción si la hubo."""
+        self.duration_ns = time.perf_counter_ns() - self._start_perf
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación serializable del span."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ns": self.duration_ns,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class JsonlExporter:
+    """
+    Exportador local: un span por línea en un archivo JSONL.
+
+    Es seguro entre hilos y escribe con búfer; flush() y close() vacían
+    el búfer al disco.
+    """
+
+    def __init__(self, path: str):
+        """
+        Abre (en modo append) el archivo de spans.
+
+        Args:
+            path: Ruta del archivo JSONL
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span) -> None:
+        """Escribe un span terminado."""
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self) -> None:
+        """Vacía el búfer al disco."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Cierra el archivo."""
+        with self._lock:
+            self._file.close()
+
+
+# Span activo en el contexto actual (hilo o tarea de asyncio). _UNSAMPLED
+# marca una traza descartada por el muestreo: sus hijos no se crean.
+_UNSAMPLED = object()
+_current: contextvars.ContextVar = contextvars.ContextVar("sg_current_span", default=None)
+
+
+class Tracer:
+    """
+    Trazador con muestreo por traza.
+
+    La decisión de muestreo se toma en el span raíz y la heredan todos
+    sus descendientes, así que una traza se exporta completa o no se
+    exporta. El span activo vive en una ContextVar: se propaga solo a
+    las corrutinas y tareas de asyncio, y a otros hilos con propagate().
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[JsonlExporter] = None,
+        sample_rate: float = 1.0,
+        rng: Callable[[], float] = random.random
+    ):
+        """
+        Inicializa el trazador.
+
+        Args:
+            exporter: Destino de los spans (None para no exportar)
+            sample_rate: Fracción de trazas que se registran (0 a 1)
+            rng: Generador uniforme en [0, 1) (inyectable para pruebas)
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate debe estar entre 0 y 1")
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._rng = rng
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        """Span activo en el contexto actual (None si no hay o no se muestrea)."""
+        span = _current.get()
+        return span if isinstance(span, Span) else None
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Abre un span hijo del activo (o una traza nueva si no hay).
+
+        Args:
+            name: Nombre del span
+            **attributes: Atributos del span
+
+        Yields:
+            El span, o None si la traza no se muestrea
+        """
+        parent = _current.get()
+        if parent is _UNSAMPLED or (parent is None and self._rng() >= self.sample_rate):
+            token = _current.set(_UNSAMPLED)
+            try:
+                yield None
+            finally:
+                _current.reset(token)
+            return
+
+        if parent is None:
+            span = Span(name, f"{random.getrandbits(128):032x}", None, **attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.finish(error)
+            raise
+        else:
+            span.finish()
+        finally:
+            _current.reset(token)
+            if self.exporter is not None:
+                self.exporter.export(span)
+
+    def trace(
+        self,
+        target: Any,
+        component: str,
+        methods: Optional[Iterable[str]] = None,
+        **attributes
+    ) -> Any:
+        """
+        Envuelve métodos de un objeto para que cada llamada abra un span.
+
+        Los spans se llaman "<component>.<método>". Admite métodos
+        síncronos y corrutinas.
+
+        Args:
+            target: Controlador, repositorio o gateway
+            component: Nombre del componente
+            methods: Métodos a trazar (por defecto todos los públicos)
+            **attributes: Atributos comunes (p. ej. layer="repository")
+
+        Returns:
+            El mismo objeto, ya trazado
+        """
+        if methods is None:
+            methods = [
+                name for name in dir(type(target))
+                if not name.startswith("_") and callable(getattr(type(target), name))
+            ]
+        for name in methods:
+            setattr(target, name, self._wrap(getattr(target, name), f"{component}.{name}", attributes))
+        return target
+
+    def _wrap(self, method: Callable, span_name: str, attributes: Dict[str, Any]) -> Callable:
+        """Envoltorio que abre un span por llamada."""
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(*args, **kwargs):
+                if _current.get() is _UNSAMPLED:
+                    return await method(*args, **kwargs)
+                with self.span(span_name, **attributes):
+                    return await method(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if _current.get() is _UNSAMPLED:
+                return method(*args, **kwargs)
+            with self.span(span_name, **attributes):
+                return method(*args, **kwargs)
+        return wrapper
+
+
+def propagate(function: Callable) -> Callable:
+    """
+    Liga una función al contexto actual para ejecutarla en otro hilo.
+
+    Los hilos nuevos (y los de un ThreadPoolExecutor) empiezan con un
+    contexto vacío; así los spans que abran cuelgan de la traza actual:
+
+        executor.submit(propagate(controller.refund_payment), payment_id)
+
+    Args:
+        function: Función a ejecutar en otro hilo
+
+    Returns:
+        Función que se ejecuta dentro de una copia del contexto actual
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(function)
+    def run_in_context(*args, **kwargs):
+        return context.run(function, *args, **kwargs)
+
+    return run_in_context
+
+
+def slowest_traces(path: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Lee un archivo de spans y devuelve las trazas más lentas.
+
+    Para cada traza indica la duración de la raíz y el tiempo total por
+    nombre de span descendiente, de modo que se ve a dónde se fue el
+    tiempo (repositorio, gateway...).
+
+    Args:
+        path: Archivo JSONL generado por JsonlExporter
+        limit: Número de trazas a devolver
+
+    Returns:
+        Lista de {"trace_id", "name", "duration_ms", "status",
+        "breakdown_ms"} ordenada de más lenta a más rápida
+    """
+    roots: Dict[str, Dict[str, Any]] = {}
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, encoding="utf-8") as spans_file:
+        for line in spans_file:
+            if not line.strip():
+                continue
+            span = json.loads(line)
+            if span["parent_id"] is None:
+                roots[span["trace_id"]] = span
+            else:
+                children.setdefault(span["trace_id"], []).append(span)
+
+    slowest = sorted(roots.values(), key=lambda span: span["duration_ns"], reverse=True)[:limit]
+    result = []
+    for root in slowest:
+        breakdown: Dict[str, float] = {}
+        for span in children.get(root["trace_id"], []):
+            breakdown[span["name"]] = breakdown.get(span["name"], 0.0) + span["duration_ns"] / 1e6
+        result.append({
+            "trace_id": root["trace_id"],
+            "name": root["name"],
+            "duration_ms": round(root["duration_ns"] / 1e6, 3),
+            "status": root["status"],
+            "breakdown_ms": {name: round(ms, 3) for name, ms in sorted(
+                breakdown.items(), key=lambda item: item[1], reverse=True
+            )}
+        })
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python -m monitoring.tracing <spans.jsonl> [límite]")
+        sys.exit(2)
+    for trace in slowest_traces(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 10):
+        print(f"{trace['duration_ms']:>10.3f} ms  {trace['name']}  [{trace['status']}]  {trace['trace_id']}")
+        for name, ms in trace["breakdown_ms"].items():
+            print(f"{'':>14}{ms:>10.3f} ms  {name}")
@@ -0,0 +1,8 @@
+"""Limitación de ritmo y descarte de carga."""
+
+__all__ = [
+    'RateLimiter',
+    'KeyedRateLimiter',
+    'LoadShedder',
+    'RateLimitExceeded'
+]
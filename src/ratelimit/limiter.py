@@ -0,0 +1,257 @@
+"""Cubetas de fichas: globales, por clave y descarte de carga."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+from monitoring.metrics import REGISTRY
+
+
+_SHED_HELP = "Peticiones rechazadas por límite de ritmo"
+
+
+class RateLimitExceeded(Exception):
+    """Se superó un límite de ritmo; la petición se rechaza sin atenderla."""
+
+    def __init__(self, operation: str, scope: str, retry_after: float):
+        """
+        Inicializa el error.
+
+        Args:
+            operation: Operación limitada ("authenticate"...)
+            scope: Cubeta agotada ("key" o "client")
+            retry_after: Segundos hasta que vuelva a haber una ficha
+        """
+        super().__init__(f"Demasiadas peticiones ({operation}); reintente en {retry_after:.1f} s")
+        self.operation = operation
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Cubeta de fichas: permite `rate` operaciones por segundo con ráfagas
+    de hasta `burst`. Segura entre hilos.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Inicializa el limitador con la cubeta llena.
+
+        Args:
+            rate: Operaciones por segundo
+            burst: Capacidad de la cubeta (por defecto max(1, rate))
+            clock: Reloj monótono en segundos
+            sleep: Función de espera
+        """
+        if rate <= 0:
+            raise ValueError("rate debe ser mayor que 0")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Toma una ficha si hay alguna disponible, sin esperar."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        """Toma una ficha, esperando lo necesario."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class KeyedRateLimiter:
+    """
+    Una cubeta de fichas por clave (usuario, cliente...), con memoria acotada.
+
+    Las cubetas se guardan en un OrderedDict ordenado por último uso:
+    comprobar una clave es un acceso al diccionario más move_to_end, O(1).
+    Al crear una cubeta se descartan desde el principio las que no se
+    usan desde hace `idle_ttl` segundos; por defecto burst / rate, el
+    tiempo en que una cubeta se vuelve a llenar, así que descartarla no
+    cambia nada (una clave nueva empieza con la cubeta llena). Si aun así
+    se superan `max_keys` cubetas, se descarta la usada hace más tiempo.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None,
+        max_keys: int = 100_000,
+        idle_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Inicializa el limitador sin cubetas.
+
+        Args:
+            rate: Operaciones por segundo y clave
+            burst: Capacidad de cada cubeta (por defecto max(1, rate))
+            max_keys: Cubetas en memoria como máximo
+            idle_ttl: Segundos sin uso tras los que se descarta una cubeta
+            clock: Reloj monótono en segundos
+        """
+        if rate <= 0:
+            raise ValueError("rate debe ser mayor que 0")
+        if max_keys < 1:
+            raise ValueError("max_keys debe ser al menos 1")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.max_keys = max_keys
+        self.idle_ttl = idle_ttl if idle_ttl is not None else self.burst / rate
+        self._clock = clock
+        # clave -> [fichas, último uso]
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: Hashable) -> bool:
+        """Toma una ficha de la cubeta de `key` si hay alguna, sin esperar."""
+        return self.acquire_or_wait_time(key) == 0.0
+
+    def wait_time(self, key: Hashable) -> float:
+        """
+        Consulta la cubeta de `key` sin tomar ninguna ficha.
+
+        Args:
+            key: Clave de la cubeta
+
+        Returns:
+            0 si hay una ficha; si no, segundos hasta que la haya
+        """
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(self.burst)
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def acquire_or_wait_time(self, key: Hashable) -> float:
+        """
+        Toma una ficha de la cubeta de `key`.
+
+        Args:
+            key: Clave de la cubeta
+
+        Returns:
+            0 si se tomó la ficha; si no, segundos hasta que haya una
+        """
+        now = self._clock()
+        with self._lock:
+            buckets = self._buckets
+            bucket = buckets.get(key)
+            if bucket is None:
+                self._evict(now)
+                bucket = buckets[key] = [float(self.burst), now]
+            else:
+                buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        """Cubetas en memoria."""
+        return len(self._buckets)
+
+    def _evict(self, now: float) -> None:
+        """Descarta cubetas ociosas y, si hace falta, la menos reciente."""
+        buckets = self._buckets
+        limit = now - self.idle_ttl
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if bucket[1] > limit:
+                break
+            del buckets[key]
+        if len(buckets) >= self.max_keys:
+            buckets.popitem(last=False)
+
+
+class LoadShedder:
+    """
+    Descarte de carga de una operación: límite por clave y por cliente.
+
+    Se comprueba antes de hacer ningún trabajo (búsquedas, hashes): si
+    alguna de las cubetas está vacía se lanza RateLimitExceeded y se
+    cuenta en requests_shed_total{operation, scope}. Solo se toma ficha
+    de las dos cubetas si ambas la tienen, de modo que una petición
+    rechazada por su clave no gasta la cubeta del cliente (ni al revés).
+    Las cubetas se consultan y se toman con un cerrojo propio, así que
+    cada limitador debe usarse desde un solo LoadShedder.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        per_key: Optional[KeyedRateLimiter] = None,
+        per_client: Optional[KeyedRateLimiter] = None
+    ):
+        """
+        Inicializa el descarte.
+
+        Args:
+            operation: Nombre de la operación en métricas y errores
+            per_key: Límite por clave (usuario)
+            per_client: Límite por cliente (dirección de origen)
+        """
+        self.operation = operation
+        self.per_key = per_key
+        self.per_client = per_client
+        self._shed_key = REGISTRY.counter("requests_shed_total", _SHED_HELP, operation=operation, scope="key")
+        self._shed_client = REGISTRY.counter("requests_shed_total", _SHED_HELP, operation=operation, scope="client")
+        self._lock = threading.Lock()
+
+    def admit(self, key: Hashable, client: Optional[Hashable] = None) -> None:
+        """
+        Admite una petición o la rechaza.
+
+        Args:
+            key: Clave de la petición (username, user_id...)
+            client: Cliente que la hace (None si no se conoce)
+
+        Raises:
+            RateLimitExceeded: Si se agotó la cubeta de la clave o del cliente
+        """
+        buckets = []
+        if client is not None and self.per_client is not None:
+            buckets.append((self.per_client, client, "client", self._shed_client))
+        if self.per_key is not None:
+            buckets.append((self.per_key, key, "key", self._shed_key))
+        with self._lock:
+            for limiter, bucket_key, scope, shed in buckets:
+                wait = limiter.wait_time(bucket_key)
+                if wait:
+                    shed.inc()
+                    raise RateLimitExceeded(self.operation, scope, wait)
+            for limiter, bucket_key, _, _ in buckets:
+                limiter.acquire_or_wait_time(bucket_key)
@@ -0,0 +1,5 @@
+"""Recomendaciones de productos."""
+
+__all__ = [
+    'CoPurchaseEngine'
+]
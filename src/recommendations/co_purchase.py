@@ -0,0 +1,178 @@
+"""Recomendaciones "también compraron" a partir de los items de las órdenes."""
+
+import heapq
+import threading
+from bisect import insort
+from collections import Counter
+from itertools import chain, combinations, groupby, islice, repeat
+from operator import attrgetter
+from typing import Dict, Iterable, List, Tuple
+
+from models.payment import OrderItem
+
+
+# Entrada de la tabla: (-veces juntos, product_id); orden ascendente =
+# más comprado juntos primero, y a igualdad el ID menor
+_Entry = Tuple[int, int]
+
+# Órdenes por bloque en build()
+_BUILD_CHUNK = 100_000
+
+
+def _distinct(product_ids: Iterable[int]) -> List[int]:
+    """Productos distintos de una orden, ordenados (clave canónica de pares)."""
+    return sorted(set(product_ids))
+
+
+class CoPurchaseEngine:
+    """
+    Matriz dispersa de co-ocurrencia de productos y tabla top-k precalculada.
+
+    La matriz es simétrica y solo guarda los pares que aparecen juntos en
+    alguna orden: un Counter de (a, b) con a < b, sin NumPy ni SciPy.
+    Cada producto aparece una vez por orden (la cantidad no cuenta).
+
+    also_bought() lee una tabla con los k productos más comprados junto a
+    cada uno, sin recorrer la matriz. build() la calcula de una vez a
+    partir de un histórico (el recuento de pares va en C: combinations
+    y Counter.update); add_order() la mantiene exacta orden a orden:
+    como los contadores solo crecen, un producto solo puede entrar en el
+    top-k de otro cuando aumenta su propio contador.
+
+    Las lecturas no toman cerrojo: cada actualización sustituye la lista
+    del producto por una nueva.
+    """
+
+    def __init__(self, k: int = 20):
+        """
+        Inicializa un motor vacío.
+
+        Args:
+            k: Recomendaciones guardadas por producto
+        """
+        if k < 1:
+            raise ValueError("k debe ser al menos 1")
+        self.k = k
+        self.orders = 0
+        self._pairs: Counter = Counter()
+        self._product_orders: Counter = Counter()
+        self._top: Dict[int, List[_Entry]] = {}
+        self._lock = threading.Lock()
+
+    def build(self, orders: Iterable[Iterable[int]]) -> None:
+        """
+        Agrega un histórico de órdenes y recalcula la tabla completa.
+
+        Más rápido que add_order() para grandes volúmenes: los pares se
+        cuentan sin pasar por Python y la tabla se calcula al final en
+        una sola pasada por la matriz.
+
+        Args:
+            orders: Productos de cada orden
+        """
+        orders = iter(orders)
+        with self._lock:
+            while True:
+                # Por bloques, para no tener todo el histórico en memoria
+                chunk = [_distinct(products) for products in islice(orders, _BUILD_CHUNK)]
+                if not chunk:
+                    break
+                self.orders += len(chunk)
+                self._product_orders.update(chain.from_iterable(chunk))
+                self._pairs.update(chain.from_iterable(map(combinations, chunk, repeat(2))))
+            self._rebuild()
+
+    def build_from_items(self, items: Iterable[OrderItem]) -> None:
+        """
+        build() a partir de items de órdenes.
+
+        Args:
+            items: Items agrupados por order_id (p. ej. leídos con
+                ORDER BY order_id); no hace falta que quepan en memoria
+        """
+        self.build(
+            map(attrgetter("product_id"), group)
+            for _, group in groupby(items, key=attrgetter("order_id"))
+        )
+
+    def add_order(self, product_ids: Iterable[int]) -> None:
+        """
+        Agrega una orden nueva y actualiza la tabla de sus productos.
+
+        Coste O(n² · k) para una orden de n productos distintos.
+
+        Args:
+            product_ids: Productos de la orden
+        """
+        products = _distinct(product_ids)
+        with self._lock:
+            self.orders += 1
+            self._product_orders.update(products)
+            for a, b in combinations(products, 2):
+                self._pairs[a, b] += 1
+                count = self._pairs[a, b]
+                self._promote(a, b, count)
+                self._promote(b, a, count)
+
+    def also_bought(self, product_id: int, n: int = 10) -> List[Tuple[int, int]]:
+        """
+        Productos comprados con más frecuencia junto a uno dado.
+
+        Args:
+            product_id: ID del producto
+            n: Máximo de recomendaciones (como mucho k)
+
+        Returns:
+            Lista de (product_id, órdenes en que se compraron juntos), de
+            más a menos frecuente
+        """
+        return [(other, -negative) for negative, other in self._top.get(product_id, ())[:n]]
+
+    def times_bought_together(self, a: int, b: int) -> int:
+        """Órdenes que contienen los dos productos."""
+        return self._pairs[min(a, b), max(a, b)] if a != b else self._product_orders[a]
+
+    def orders_with(self, product_id: int) -> int:
+        """Órdenes que contienen el producto."""
+        return self._product_orders[product_id]
+
+    def __len__(self) -> int:
+        """Pares de productos distintos comprados juntos (celdas no nulas)."""
+        return len(self._pairs)
+
+    def _promote(self, product_id: int, other: int, count: int) -> None:
+        """Refleja en el top-k de product_id que el par con other llegó a count."""
+        top = self._top.get(product_id, [])
+        entry = (-count, other)
+        previous = (1 - count, other)
+        if previous in top:
+            updated = [item for item in top if item != previous]
+        elif len(top) < self.k:
+            updated = list(top)
+        elif entry < top[-1]:
+            updated = top[:-1]
+        else:
+            return
+        insort(updated, entry)
+        self._top[product_id] = updated
+
+    def _rebuild(self) -> None:
+        """Recalcula el top-k de todos los productos en una pasada por la matriz."""
+        # Montículos de mínimos de tamaño k con (veces, -product_id): la
+        # raíz es la peor entrada (menos veces, y a igualdad el ID mayor)
+        heaps: Dict[int, List[Tuple[int, int]]] = {}
+        k = self.k
+        for (a, b), count in self._pairs.items():
+            for product_id, other in ((a, b), (b, a)):
+                heap = heaps.get(product_id)
+                if heap is None:
+                    heaps[product_id] = [(count, -other)]
+                elif len(heap) < k:
+                    heapq.heappush(heap, (count, -other))
+                elif (count, -other) > heap[0]:
+                    heapq.heapreplace(heap, (count, -other))
+        self._top = {
+            product_id: sorted((-count, -negative) for count, negative in heap)
+            for product_id, heap in heaps.items()
+        }
+
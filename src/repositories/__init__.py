@@ -3,5 +3,25 @@
 __all__ = [
     'UserRepository',
     'ProductRepository',
-    'PaymentRepository'
+    'PaymentRepository',
+    'ReviewRepository',
+    'InvertedIndex',
+    'TrigramIndex',
+    'SortedIndex',
+    'CachedRepository',
+    'LRUCache',
+    'HashIndex',
+    'QueryPlanner',
+    'QueryPlan',
+    'Eq',
+    'In',
+    'Range',
+    'And',
+    'Or',
+    'VersionConflictError',
+    'PersistentIntMap',
+    'RepositorySnapshot',
+    'ChangeFeed',
+    'ChangeEvent',
+    'Subscription'
 ]
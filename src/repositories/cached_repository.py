@@ -0,0 +1,280 @@
+"""Caché de lectura (LRU con TTL) delante de un repositorio."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+# Buscadores de clave única que se cachean por defecto (incluye negativos)
+DEFAULT_CACHED_FINDERS = ("find_by_username", "find_by_email", "find_by_sku")
+
+
+class LRUCache:
+    """
+    Caché LRU con expiración por tiempo.
+
+    Guarda también resultados None (búsquedas negativas). Lleva
+    contadores de aciertos, fallos, expulsiones y expiraciones para
+    poder dimensionarla.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        ttl: Optional[float] = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        """
+        Inicializa la caché.
+
+        Args:
+            capacity: Máximo de entradas
+            ttl: Segundos de vida de cada entrada (None para no expirar)
+            clock: Reloj monotónico (inyectable para pruebas)
+            on_evict: Función (clave, valor) a la que se avisa cuando una
+                entrada sale por expulsión o expiración (no por
+                invalidate ni clear)
+        """
+        if capacity < 1:
+            raise ValueError("La capacidad debe ser positiva")
+        self.capacity = capacity
+        self.ttl = ttl
+        self._clock = clock
+        self._on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Busca una entrada vigente.
+
+        Args:
+            key: Clave de la entrada
+
+        Returns:
+            (encontrada, valor); el valor puede ser None si se cacheó
+            una búsqueda negativa
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+            self.expirations += 1
+            if self._on_evict is not None:
+                self._on_evict(key, value)
+        self.misses += 1
+        return False, None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Guarda una entrada, expulsando la menos usada si no cabe."""
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            evicted_key, (evicted, _) = self._entries.popitem(last=False)
+            self.evictions += 1
+            if self._on_evict is not None:
+                self._on_evict(evicted_key, evicted)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Elimina una entrada; True si existía."""
+        return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Vacía la caché (los contadores se conservan)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de uso de la caché."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries),
+            "capacity": self.capacity
+        }
+
+
+class CachedRepository:
+    """
+    Envoltorio de lectura con caché para cualquier repositorio.
+
+    Cachea find_by_id y los buscadores de clave única configurados
+    (find_by_username, find_by_email, find_by_sku...), incluidas las
+    búsquedas sin resultado. save/update/delete invalidan las entradas
+    de la entidad afectada. Si varios hilos piden a la vez la misma
+    clave ausente, solo uno consulta el repositorio y el resto espera
+    su resultado (protección contra estampidas). El resto de métodos se
+    delegan sin caché.
+    """
+
+    def __init__(
+        self,
+        repository: Any,
+        capacity: int = 1024,
+        ttl: Optional[float] = 60.0,
+        cached_finders: Iterable[str] = DEFAULT_CACHED_FINDERS,
+        id_attribute: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Inicializa el envoltorio.
+
+        Args:
+            repository: Repositorio a envolver
+            capacity: Máximo de entradas en caché
+            ttl: Segundos de vida de cada entrada (None para no expirar)
+            cached_finders: Métodos find_by_<atributo> a cachear; los que
+                el repositorio no tenga se ignoran
+            id_attribute: Atributo con el ID de la entidad (por defecto
+                "<clase>_id", p. ej. user_id)
+            clock: Reloj monotónico (inyectable para pruebas)
+        """
+        self.repository = repository
+        self.cache = LRUCache(capacity, ttl, clock, on_evict=self._forget)
+        self._finders = {
+            name: name[len("find_by_"):]
+            for name in cached_finders
+            if name.startswith("find_by_") and hasattr(repository, name)
+        }
+        self._id_attribute = id_attribute
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._keys_by_entity: Dict[int, Set[Hashable]] = {}
+        self._version = 0
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._finders:
+            return lambda value: self._read((name, value), getattr(self.repository, name), value)
+        return getattr(self.repository, name)
+
+    def find_by_id(self, entity_id: int) -> Any:
+        """Busca una entidad por ID pasando por la caché."""
+        return self._read(("find_by_id", entity_id), self.repository.find_by_id, entity_id)
+
+    def save(self, entity: Any) -> Any:
+        """Guarda la entidad e invalida sus entradas (incluidas negativas)."""
+        result = self.repository.save(entity)
+        self._invalidate_entity(entity)
+        return result
+
+    def update(self, entity: Any) -> Any:
+        """
+        Actualiza la entidad e invalida sus entradas.
+
+        También se invalidan si update lanza VersionConflictError, para
+        que el siguiente intento lea la versión guardada.
+        """
+        try:
+            return self.repository.update(entity)
+        finally:
+            self._invalidate_entity(entity)
+
+    def update_many(self, entities: Iterable[Any]) -> Any:
+        """Actualiza un lote de entidades e invalida sus entradas."""
+        entities = list(entities)
+        try:
+            return self.repository.update_many(entities)
+        finally:
+            for entity in entities:
+                self._invalidate_entity(entity)
+
+    def delete(self, entity_id: int) -> bool:
+        """Elimina la entidad e invalida sus entradas."""
+        entity = self.repository.find_by_id(entity_id)
+        deleted = self.repository.delete(entity_id)
+        if entity is not None:
+            self._invalidate_entity(entity)
+        else:
+            with self._lock:
+                self._version += 1
+                self.cache.invalidate(("find_by_id", entity_id))
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de aciertos, fallos y expulsiones de la caché."""
+        with self._lock:
+            return self.cache.stats()
+
+    def clear(self) -> None:
+        """Vacía la caché."""
+        with self._lock:
+            self._version += 1
+            self.cache.clear()
+            self._keys_by_entity.clear()
+
+    def _read(self, key: Hashable, loader: Callable[[Any], Any], argument: Any) -> Any:
+        """Lectura con caché y una sola carga concurrente por clave."""
+        while True:
+            with self._lock:
+                found, value = self.cache.get(key)
+                if found:
+                    return value
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    version = self._version
+                    break
+            pending.wait()
+
+        try:
+            value = loader(argument)
+        except Exception:
+            with self._lock:
+                del self._inflight[key]
+                pending.set()
+            raise
+        with self._lock:
+            # Si hubo una escritura durante la carga el valor puede estar
+            # obsoleto: se devuelve pero no se cachea
+            if version == self._version:
+                self.cache.put(key, value)
+                if value is not None:
+                    self._keys_by_entity.setdefault(self._entity_id(value), set()).add(key)
+            del self._inflight[key]
+            pending.set()
+        return value
+
+    def _invalidate_entity(self, entity: Any) -> None:
+        """Elimina las entradas de una entidad por su ID y sus claves."""
+        entity_id = self._entity_id(entity)
+        with self._lock:
+            self._version += 1
+            keys = self._keys_by_entity.pop(entity_id, set())
+            keys.add(("find_by_id", entity_id))
+            for finder, attribute in self._finders.items():
+                if hasattr(entity, attribute):
+                    keys.add((finder, getattr(entity, attribute)))
+            for key in keys:
+                self.cache.invalidate(key)
+
+    def _forget(self, key: Hashable, value: Any) -> None:
+        """Retira de su entidad una clave expulsada o expirada (con el cerrojo tomado)."""
+        if value is None:
+            return
+        entity_id = self._entity_id(value)
+        keys = self._keys_by_entity.get(entity_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_entity[entity_id]
+
+    def _entity_id(self, entity: Any) -> int:
+        """ID de una entidad según `id_attribute`."""
+        attribute = self._id_attribute or f"{type(entity).__name__.lower()}_id"
+        return getattr(entity, attribute)
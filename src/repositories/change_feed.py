@@ -0,0 +1,487 @@
+"""Flujo de cambios (CDC) de los repositorios, con registro persistente opcional."""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+# Operaciones de un cambio
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+TRANSITION = "transition"
+
+# Atributos que nunca salen en el flujo
+_HIDDEN_ATTRIBUTES = {"password_hash"}
+
+_logger = logging.getLogger(__name__)
+
+
+class ChangeEvent:
+    """Un cambio de una entidad, con su número de secuencia global."""
+
+    __slots__ = ("sequence", "timestamp", "entity", "entity_id", "operation", "data", "before")
+
+    def __init__(
+        self,
+        sequence: int,
+        timestamp: float,
+        entity: str,
+        entity_id: int,
+        operation: str,
+        data: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Inicializa el cambio.
+
+        Args:
+            sequence: Número de secuencia (creciente, sin huecos)
+            timestamp: Hora (epoch) de publicación
+            entity: Tipo de entidad ("user", "product", "payment")
+            entity_id: ID de la entidad
+            operation: insert, update, delete o transition
+            data: Atributos de la entidad tras el cambio (None en delete)
+            before: Valores anteriores de los campos que definen la
+                transición (p. ej. {"status": "pending"})
+        """
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.entity = entity
+        self.entity_id = entity_id
+        self.operation = operation
+        self.data = data
+        self.before = before
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma serializable (una línea del registro)."""
+        record = {
+            "seq": self.sequence,
+            "at": self.timestamp,
+            "entity": self.entity,
+            "id": self.entity_id,
+            "op": self.operation,
+            "data": self.data
+        }
+        if self.before is not None:
+            record["before"] = self.before
+        return record
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "ChangeEvent":
+        """Reconstruye un cambio leído del registro."""
+        return cls(
+            record["seq"], record["at"], record["entity"], record["id"],
+            record["op"], record.get("data"), record.get("before")
+        )
+
+    def __repr__(self) -> str:
+        return f"ChangeEvent({self.sequence}, {self.entity} {self.entity_id} {self.operation})"
+
+
+def entity_data(entity: Any) -> Dict[str, Any]:
+    """
+    Atributos simples de una entidad para el flujo.
+
+    Incluye los atributos públicos escalares (enums por valor, fechas en
+    ISO 8601) y omite las relaciones y password_hash.
+
+    Args:
+        entity: Entidad del modelo
+
+    Returns:
+        Diccionario serializable con json.dumps
+    """
+    data = {}
+    for name, value in vars(entity).items():
+        if name.startswith("_") or name in _HIDDEN_ATTRIBUTES:
+            continue
+        if value is None or isinstance(value, (str, int, float, bool)):
+            data[name] = value
+        elif isinstance(value, Enum):
+            data[name] = value.value
+        elif isinstance(value, datetime):
+            data[name] = value.isoformat()
+    return data
+
+
+class ChangeFeed:
+    """
+    Flujo ordenado de cambios de los repositorios.
+
+    Los repositorios con change_feed publican cada save, update y delete
+    (y PaymentRepository, los cambios de estado como "transition") con
+    su cerrojo de escritura tomado, así que el orden de secuencia es el
+    orden en que se aplicaron. Un mismo flujo se comparte entre
+    repositorios y numera todos los cambios en una sola secuencia.
+
+    Con log_path cada cambio se añade a un registro JSONL; al reabrirlo
+    la secuencia continúa donde quedó y los consumidores pueden
+    reanudarse desde un número de secuencia. Los suscriptores en proceso
+    reciben los cambios en su propio hilo (ver Subscription).
+
+    Si el proceso murió a mitad de una escritura, al reabrir el registro
+    se recorta la línea incompleta del final para que el siguiente cambio
+    empiece en una línea nueva.
+    """
+
+    def __init__(self, log_path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        """
+        Inicializa el flujo.
+
+        Args:
+            log_path: Registro JSONL de cambios (None sin registro)
+            clock: Reloj de pared en segundos
+        """
+        self.log_path = log_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._subscriptions: List["Subscription"] = []
+        if log_path:
+            _truncate_partial_line(log_path)
+        self._sequence = _last_sequence(log_path) if log_path else 0
+        self._log = open(log_path, "a", encoding="utf-8") if log_path else None
+
+    @property
+    def sequence(self) -> int:
+        """Número de secuencia del último cambio publicado."""
+        return self._sequence
+
+    def publish(
+        self,
+        entity: str,
+        entity_id: int,
+        operation: str,
+        data: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict[str, Any]] = None
+    ) -> ChangeEvent:
+        """
+        Publica un cambio: lo numera, lo registra y lo entrega.
+
+        Args:
+            entity: Tipo de entidad
+            entity_id: ID de la entidad
+            operation: insert, update, delete o transition
+            data: Atributos tras el cambio
+            before: Valores anteriores de una transición
+
+        Returns:
+            Cambio publicado
+        """
+        with self._lock:
+            self._sequence += 1
+            event = ChangeEvent(self._sequence, self._clock(), entity, entity_id, operation, data, before)
+            if self._log is not None:
+                self._log.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+            for subscription in self._subscriptions:
+                subscription._offer(event)
+        return event
+
+    def subscribe(
+        self,
+        handler: Callable[[ChangeEvent], None],
+        from_sequence: Optional[int] = None,
+        max_lag: int = 10_000,
+        name: Optional[str] = None
+    ) -> "Subscription":
+        """
+        Suscribe un manejador al flujo.
+
+        Args:
+            handler: Función que recibe cada cambio, en orden
+            from_sequence: Primer cambio a recibir; None para recibir solo
+                los nuevos. Los anteriores se leen del registro
+            max_lag: Cambios pendientes en memoria como máximo
+            name: Nombre del suscriptor (hilo y mensajes)
+
+        Returns:
+            Suscripción ya en marcha
+        """
+        with self._lock:
+            position = self._sequence if from_sequence is None else max(0, from_sequence - 1)
+            if position < self._sequence and self.log_path is None:
+                raise ValueError("Sin registro no se pueden recibir cambios anteriores")
+            subscription = Subscription(self, handler, position, max_lag, name, behind=position < self._sequence)
+            self._subscriptions.append(subscription)
+        subscription._start()
+        return subscription
+
+    def read(self, from_sequence: int = 1) -> Iterator[ChangeEvent]:
+        """
+        Cambios del registro desde un número de secuencia.
+
+        Args:
+            from_sequence: Primer cambio a leer
+
+        Returns:
+            Iterador de cambios en orden
+        """
+        if self.log_path is None:
+            raise ValueError("El flujo no tiene registro")
+        self.flush()
+        for event, _ in _read_log(self.log_path):
+            if event.sequence >= from_sequence:
+                yield event
+
+    def flush(self) -> None:
+        """Vacía el búfer del registro al disco."""
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+
+    def close(self) -> None:
+        """Detiene los suscriptores y cierra el registro."""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def _unsubscribe(self, subscription: "Subscription") -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+
+class Subscription:
+    """
+    Suscriptor en proceso: entrega los cambios en orden en su propio hilo.
+
+    Publicar nunca espera al suscriptor: los cambios se dejan en una cola
+    de hasta max_lag. Si el suscriptor se queda más atrás, la cola se
+    vacía y el hilo se pone al día leyendo el registro desde su posición
+    (sin registro, la suscripción se detiene con error). Así la memoria
+    por suscriptor está acotada, no se pierde ningún cambio y los
+    escritores no se frenan por un consumidor lento.
+
+    Si el manejador lanza una excepción, la suscripción se detiene y la
+    guarda en error; position indica el último cambio procesado, desde
+    el que se puede volver a suscribir.
+    """
+
+    def __init__(
+        self,
+        feed: ChangeFeed,
+        handler: Callable[[ChangeEvent], None],
+        position: int,
+        max_lag: int,
+        name: Optional[str] = None,
+        behind: bool = False
+    ):
+        """
+        Inicializa la suscripción (la arranca ChangeFeed.subscribe).
+
+        Args:
+            feed: Flujo de origen
+            handler: Función que recibe cada cambio
+            position: Último cambio ya procesado
+            max_lag: Cambios pendientes en memoria como máximo
+            name: Nombre del suscriptor
+            behind: True si debe empezar leyendo el registro
+        """
+        if max_lag < 1:
+            raise ValueError("max_lag debe ser al menos 1")
+        self.feed = feed
+        self.handler = handler
+        self.position = position
+        self.max_lag = max_lag
+        self.name = name or f"change-subscriber-{id(self):x}"
+        self.error: Optional[BaseException] = None
+        self.catch_ups = 0
+        self._pending: Deque[ChangeEvent] = deque()
+        self._behind = behind
+        self._closed = False
+        self._log_offset = 0
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+
+    @property
+    def lag(self) -> int:
+        """Cambios publicados que aún no se han procesado."""
+        return self.feed.sequence - self.position
+
+    def wait_for(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se procese un cambio.
+
+        Args:
+            sequence: Número de secuencia del cambio
+            timeout: Segundos máximos de espera
+
+        Returns:
+            True si ya se procesó; False si venció el plazo o la
+            suscripción se detuvo antes
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.position >= sequence or self._closed, timeout
+            ) and self.position >= sequence
+
+    def close(self) -> None:
+        """Detiene la suscripción."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.feed._unsubscribe(self)
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _start(self) -> None:
+        self._thread.start()
+
+    def _offer(self, event: ChangeEvent) -> None:
+        """Deja un cambio en la cola (con el cerrojo del flujo tomado)."""
+        with self._condition:
+            if self._closed:
+                return
+            if len(self._pending) >= self.max_lag:
+                # Demasiado atrás: se descarta la cola y se leerá del registro
+                self._pending.clear()
+                self._behind = True
+            else:
+                self._pending.append(event)
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        """Entrega cambios hasta close() o un error del manejador."""
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._pending or self._behind or self._closed)
+                    if self._closed:
+                        return
+                    catch_up, self._behind = self._behind, False
+                    batch = [] if catch_up else list(self._pending)
+                    if not catch_up:
+                        self._pending.clear()
+                if catch_up:
+                    self._catch_up()
+                for event in batch:
+                    if self._closed:
+                        return
+                    self._deliver(event)
+        except BaseException as error:
+            self.error = error
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self.feed._unsubscribe(self)
+
+    def _catch_up(self) -> None:
+        """Entrega desde el registro los cambios que no están en la cola."""
+        if self.feed.log_path is None:
+            raise RuntimeError(f"{self.name} se quedó más de {self.max_lag} cambios atrás y no hay registro")
+        self.catch_ups += 1
+        self.feed.flush()
+        for event, offset in _read_log(self.feed.log_path, self._log_offset):
+            if self._closed:
+                return
+            if event.sequence > self.position:
+                self._deliver(event)
+            self._log_offset = offset
+
+    def _deliver(self, event: ChangeEvent) -> None:
+        if event.sequence <= self.position:
+            # Ya entregado al ponerse al día desde el registro
+            return
+        self.handler(event)
+        with self._condition:
+            self.position = event.sequence
+            self._condition.notify_all()
+
+
+def _read_log(path: str, offset: int = 0) -> Iterator[Tuple[ChangeEvent, int]]:
+    """
+    Lee el registro desde una posición en bytes.
+
+    Se detiene en una última línea incompleta (escritura en curso) y
+    salta, con un aviso en el log, las líneas completas que no son un
+    cambio válido.
+
+    Returns:
+        Iterador de (cambio, posición tras su línea)
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as log:
+        log.seek(offset)
+        for line in log:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            if not line.strip():
+                continue
+            event = _parse_line(line)
+            if event is None:
+                _logger.warning("Línea dañada en %s (termina en el byte %d): se omite", path, offset)
+                continue
+            yield event, offset
+
+
+def _parse_line(line: bytes) -> Optional[ChangeEvent]:
+    """Cambio de una línea del registro, o None si está dañada."""
+    try:
+        return ChangeEvent.from_dict(json.loads(line))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _truncate_partial_line(path: str) -> None:
+    """Recorta el registro hasta su último salto de línea."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r+b") as log:
+        size = log.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - 64 * 1024)
+            log.seek(start)
+            newline = log.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            _logger.warning("Registro %s: se recortan %d bytes de una escritura incompleta", path, size - end)
+            log.truncate(end)
+
+
+def _last_sequence(path: str) -> int:
+    """Número de secuencia del último cambio completo y válido del registro."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as log:
+        log.seek(0, os.SEEK_END)
+        size = log.tell()
+        chunk = min(size, 64 * 1024)
+        while True:
+            log.seek(size - chunk)
+            lines = log.read(chunk).split(b"\n")
+            # La última pieza está vacía o es una línea incompleta, y la
+            # primera puede estar cortada si el bloque no empieza el archivo
+            complete = lines[:-1] if chunk == size else lines[1:-1]
+            for line in reversed(complete):
+                event = _parse_line(line) if line.strip() else None
+                if event is not None:
+                    return event.sequence
+            if chunk == size:
+                return 0
+            chunk = min(size, chunk * 2)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python -m repositories.change_feed <cambios.jsonl> [desde]")
+        sys.exit(2)
+    start = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    for change, _ in _read_log(sys.argv[1]):
+        if change.sequence >= start:
+            print(json.dumps(change.to_dict(), ensure_ascii=False))
@@ -0,0 +1,66 @@
+"""Índice por valor para atributos de baja cardinalidad."""
+
+from typing import Any, Dict, Hashable, Set
+
+
+class HashIndex:
+    """
+    Índice secundario valor -> IDs (estado, categoría, rol...).
+
+    Guarda el valor indexado de cada documento para moverlo de grupo
+    cuando cambia, aunque la entidad se haya modificado en sitio.
+    """
+
+    def __init__(self):
+        """Inicializa un índice vacío."""
+        self._groups: Dict[Hashable, Set[int]] = {}
+        self._values: Dict[int, Hashable] = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, doc_id: int, value: Hashable) -> None:
+        """
+        Indexa (o reindexa) un documento con su valor.
+
+        Args:
+            doc_id: ID del documento
+            value: Valor del atributo indexado
+        """
+        if doc_id in self._values:
+            if self._values[doc_id] == value:
+                return
+            self.remove(doc_id)
+        self._groups.setdefault(value, set()).add(doc_id)
+        self._values[doc_id] = value
+
+    def remove(self, doc_id: int) -> bool:
+        """
+        Retira un documento del índice.
+
+        Args:
+            doc_id: ID del documento
+
+        Returns:
+            True si estaba indexado
+        """
+        if doc_id not in self._values:
+            return False
+        value = self._values.pop(doc_id)
+        group = self._groups[value]
+        group.discard(doc_id)
+        if not group:
+            del self._groups[value]
+        return True
+
+    def value(self, doc_id: int) -> Any:
+        """Valor con el que está indexado un documento (None si no lo está)."""
+        return self._values.get(doc_id)
+
+    def ids(self, value: Any) -> Set[int]:
+        """IDs con un valor (conjunto vacío si no hay ninguno)."""
+        return self._groups.get(value, set())
+
+    def count(self, value: Any) -> int:
+        """Número de documentos con un valor."""
+        return len(self._groups.get(value, ()))
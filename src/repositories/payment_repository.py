@@ -1,7 +1,18 @@
 """Repositorio de pagos."""
 
-from typing import Optional, List, Dict
+import threading
+from datetime import datetime
+from typing import Optional, List, Dict, Iterable, Tuple
 from models.payment import Payment, PaymentStatus
+from repositories.change_feed import ChangeFeed, DELETE, INSERT, TRANSITION, UPDATE, entity_data
+from repositories.hash_index import HashIndex
+from repositories.query import (
+    OrderBy, Predicate, QueryPlan, QueryPlanner, UniqueAccess, HashAccess, SortedAccess,
+    build_predicate, compile_sql, compile_update
+)
+from repositories.sorted_index import SortedIndex
+from repositories.snapshot import PersistentIntMap, RepositorySnapshot
+from repositories.versioning import check_version
 
 
 class PaymentRepository:
@@ -11,10 +22,42 @@ class PaymentRepository:
     Implementa el patrón Repository para abstraer el acceso a datos.
     """
     
-    def __init__(self):
-        """Inicializa el repositorio con almacenamiento en memoria."""
+    def __init__(self, first_id: int = 1, id_step: int = 1):
+        """
+        Inicializa el repositorio con almacenamiento en memoria.
+        
+        Args:
+            first_id: Primer ID que se asigna
+            id_step: Incremento entre IDs; un fragmento k de N usa
+                first_id=k (N si k es 0) e id_step=N, así los IDs de
+                todos los fragmentos no se solapan e id % N indica el
+                fragmento
+        """
         self._payments: Dict[int, Payment] = {}
-        self._next_id = 1
+        # Serializa las escrituras (y la comprobación de versión de update)
+        self._write_lock = threading.Lock()
+        # Versión publicada para instantáneas y find_all (ver snapshot())
+        self._versions = PersistentIntMap()
+        # Flujo al que se publica cada escritura (ver ChangeFeed)
+        self.change_feed: Optional[ChangeFeed] = None
+        self._next_id = first_id
+        self._id_step = id_step
+        self._created_index = SortedIndex()
+        self._processed_index = SortedIndex()
+        self._status_index = HashIndex()
+        self._user_index = HashIndex()
+        self._order_index = HashIndex()
+        self._by_transaction: Dict[str, int] = {}
+        self._indexed_transaction: Dict[int, str] = {}
+        self._planner = QueryPlanner(self._payments, [
+            UniqueAccess("payment_id", lambda pid: pid if pid in self._payments else None),
+            UniqueAccess("transaction_id", self._by_transaction.get),
+            HashAccess("status", self._status_index.ids, self._status_index.count),
+            HashAccess("user_id", self._user_index.ids, self._user_index.count),
+            HashAccess("order_id", self._order_index.ids, self._order_index.count),
+            SortedAccess("created_at", self._created_index),
+            SortedAccess("processed_at", self._processed_index)
+        ], scan=lambda: self._versions.values())
     
     def save(self, payment: Payment) -> Payment:
         """
@@ -26,7 +69,13 @@ class PaymentRepository:
         Returns:
             Pago guardado
         """
-        self._payments[payment.payment_id] = payment
+        with self._write_lock:
+            operation = UPDATE if payment.payment_id in self._payments else INSERT
+            previous_status = self._status_index.value(payment.payment_id)
+            self._payments[payment.payment_id] = payment
+            self._versions = self._versions.set(payment.payment_id, payment)
+            self._index_payment(payment)
+            self._publish(operation, payment.payment_id, payment, previous_status)
         return payment
     
     def find_by_id(self, payment_id: int) -> Optional[Payment]:
@@ -41,6 +90,38 @@ class PaymentRepository:
         """
         return self._payments.get(payment_id)
     
+    def find_by_transaction_id(self, transaction_id: str) -> Optional[Payment]:
+        """
+        Busca un pago por ID de transacción del gateway.
+        
+        Args:
+            transaction_id: ID de transacción externo
+            
+        Returns:
+            Pago encontrado o None si no existe
+        """
+        payment_id = self._by_transaction.get(transaction_id)
+        return self._payments.get(payment_id) if payment_id is not None else None
+    
+    def find_by_transaction_ids(self, transaction_ids: Iterable[str]) -> Dict[str, Payment]:
+        """
+        Busca un lote de pagos por ID de transacción.
+        
+        Args:
+            transaction_ids: IDs de transacción externos
+            
+        Returns:
+            Diccionario transaction_id -> pago con los que existen
+        """
+        by_transaction = self._by_transaction
+        payments = self._payments
+        found = {}
+        for transaction_id in transaction_ids:
+            payment_id = by_transaction.get(transaction_id)
+            if payment_id is not None:
+                found[transaction_id] = payments[payment_id]
+        return found
+    
     def find_by_user_id(self, user_id: int) -> List[Payment]:
         """
         Busca pagos por ID de usuario.
@@ -49,9 +130,9 @@ class PaymentRepository:
             user_id: ID del usuario
             
         Returns:
-            Lista de pagos del usuario
+            Lista de pagos del usuario, por ID
         """
-        return [p for p in self._payments.values() if p.user_id == user_id]
+        return [self._payments[pid] for pid in sorted(self._user_index.ids(user_id))]
     
     def find_by_order_id(self, order_id: int) -> List[Payment]:
         """
@@ -61,9 +142,9 @@ class PaymentRepository:
             order_id: ID de la orden
             
         Returns:
-            Lista de pagos de la orden
+            Lista de pagos de la orden, por ID
         """
-        return [p for p in self._payments.values() if p.order_id == order_id]
+        return [self._payments[pid] for pid in sorted(self._order_index.ids(order_id))]
     
     def find_by_status(self, status: PaymentStatus) -> List[Payment]:
         """
@@ -75,31 +156,224 @@ class PaymentRepository:
         Returns:
             Lista de pagos con ese estado
         """
-        return [p for p in self._payments.values() if p.status == status]
+        return [self._payments[pid] for pid in sorted(self._status_index.ids(status))]
+    
+    def find_created_between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        status: Optional[PaymentStatus] = None,
+        limit: Optional[int] = None
+    ) -> List[Payment]:
+        """
+        Busca pagos creados dentro de un intervalo de tiempo.
+        
+        Usa el índice ordenado de created_at: solo se recorren los
+        pagos del intervalo, no todo el historial.
+        
+        Args:
+            start: Inicio del intervalo, incluido (None sin límite)
+            end: Fin del intervalo, incluido (None sin límite)
+            status: Filtrar además por estado
+            limit: Máximo de pagos (None para todos)
+            
+        Returns:
+            Lista de pagos ordenada por fecha de creación
+        """
+        return self._find_in_range(self._created_index, start, end, status, limit)
+    
+    def find_processed_between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        status: Optional[PaymentStatus] = None,
+        limit: Optional[int] = None
+    ) -> List[Payment]:
+        """
+        Busca pagos procesados dentro de un intervalo de tiempo.
+        
+        Los pagos sin processed_at (aún no completados) no aparecen;
+        entran en el índice cuando se actualizan tras Payment.complete.
+        
+        Args:
+            start: Inicio del intervalo, incluido (None sin límite)
+            end: Fin del intervalo, incluido (None sin límite)
+            status: Filtrar además por estado
+            limit: Máximo de pagos (None para todos)
+            
+        Returns:
+            Lista de pagos ordenada por fecha de procesamiento
+        """
+        return self._find_in_range(self._processed_index, start, end, status, limit)
+    
+    def find_where(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> List[Payment]:
+        """
+        Busca pagos con una consulta declarativa.
+        
+        Ejemplo: find_where(status=PaymentStatus.COMPLETED, created_at__gte=desde, order_by="-amount", limit=20).
+        El planificador usa el índice más selectivo entre payment_id,
+        transaction_id, status, user_id, order_id, created_at y
+        processed_at.
+        
+        Args:
+            predicates: Condiciones Eq/In/Range combinables con & y |
+            order_by: Campo o lista de campos ("-campo" descendente)
+            limit: Máximo de pagos
+            filters: Filtros campo=v, campo__in, __gte, __lte, __between
+            
+        Returns:
+            Lista de pagos que cumplen la consulta
+        """
+        plan = self.explain(*predicates, order_by=order_by, limit=limit, **filters)
+        return self._planner.execute(plan)
+    
+    def explain(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> QueryPlan:
+        """Plan que usaría find_where con los mismos argumentos."""
+        return self._planner.plan(build_predicate(predicates, filters), order_by, limit)
+    
+    def to_sql(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> Tuple[str, list]:
+        """Compila una consulta de find_where a SQL parametrizado (tabla payments)."""
+        return compile_sql(
+            "payments",
+            build_predicate(predicates, filters),
+            order_by,
+            limit,
+            columns={"status": "payment_status"}
+        )
+    
+    def update_sql(self, payment: Payment) -> Tuple[str, list]:
+        """Compila la actualización optimista de un pago (WHERE version = ?)."""
+        return compile_update(
+            "payments",
+            payment,
+            "payment_id",
+            (
+                "order_id", "user_id", "amount", "payment_method", "status",
+                "transaction_id", "processed_at", "refunded_at"
+            ),
+            {"status": "payment_status"}
+        )
     
     def find_all(self) -> List[Payment]:
         """
         Obtiene todos los pagos.
         
+        Se leen de la última versión publicada, así que se pueden listar
+        mientras otros hilos escriben.
+        
         Returns:
             Lista de pagos
         """
-        return list(self._payments.values())
+        return list(self._versions.values())
+    
+    def snapshot(self) -> RepositorySnapshot:
+        """
+        Instantánea de los pagos en O(1) (ver RepositorySnapshot).
+        
+        Returns:
+            Vista de solo lectura que no cambia con escrituras posteriores
+        """
+        return RepositorySnapshot(self._versions)
+    
+    def count(self) -> int:
+        """
+        Cuenta pagos almacenados.
+        
+        Returns:
+            Número de pagos
+        """
+        return len(self._payments)
     
     def update(self, payment: Payment) -> Optional[Payment]:
         """
         Actualiza un pago.
         
+        payment debe ser una copia que conserve la versión del pago
+        guardado: si otro escritor lo cambió entretanto, se rechaza. La versión se
+        incrementa en cada actualización.
+        
         Args:
             payment: Pago a actualizar
             
         Returns:
             Pago actualizado o None si no existe
+            
+        Raises:
+            ValueError: Si payment es el objeto guardado, modificado en el sitio
+            VersionConflictError: Si la versión no coincide con la guardada
         """
-        if payment.payment_id in self._payments:
+        with self._write_lock:
+            stored = self._payments.get(payment.payment_id)
+            if stored is None:
+                return None
+            check_version(stored, payment, payment.payment_id)
+            payment.version = stored.version + 1
+            previous_status = self._status_index.value(payment.payment_id)
             self._payments[payment.payment_id] = payment
-            return payment
-        return None
+            self._versions = self._versions.set(payment.payment_id, payment)
+            self._index_payment(payment)
+            self._publish(UPDATE, payment.payment_id, payment, previous_status)
+        return payment
+    
+    def update_many(self, payments: Iterable[Payment]) -> List[Payment]:
+        """
+        Actualiza un lote de pagos en una sola pasada.
+        
+        Los índices temporales se actualizan con un único add_many por
+        índice, en vez de una inserción ordenada por pago.
+        
+        Las versiones se comprueban todas antes de escribir: si alguna no
+        coincide no se actualiza ninguno.
+        
+        Args:
+            payments: Pagos a actualizar
+            
+        Returns:
+            Pagos actualizados (se omiten los que no existen)
+            
+        Raises:
+            ValueError: Si algún pago es el objeto guardado y no una copia
+            VersionConflictError: Si algún pago cambió desde que se leyó
+        """
+        with self._write_lock:
+            pairs = [(self._payments.get(p.payment_id), p) for p in payments]
+            pairs = [(stored, payment) for stored, payment in pairs if stored is not None]
+            for stored, payment in pairs:
+                check_version(stored, payment, payment.payment_id)
+            updated = []
+            for stored, payment in pairs:
+                payment.version = stored.version + 1
+                previous_status = self._status_index.value(payment.payment_id)
+                self._payments[payment.payment_id] = payment
+                self._versions = self._versions.set(payment.payment_id, payment)
+                self._status_index.add(payment.payment_id, payment.status)
+                self._user_index.add(payment.payment_id, payment.user_id)
+                self._order_index.add(payment.payment_id, payment.order_id)
+                self._publish(UPDATE, payment.payment_id, payment, previous_status)
+                updated.append(payment)
+            self._created_index.add_many((p.payment_id, p.created_at) for p in updated)
+            self._processed_index.add_many((p.payment_id, p.processed_at) for p in updated)
+            for payment in updated:
+                self._index_transaction(payment)
+        return updated
     
     def delete(self, payment_id: int) -> bool:
         """
@@ -111,10 +385,19 @@ class PaymentRepository:
         Returns:
             True si se eliminó, False si no existía
         """
-        if payment_id in self._payments:
+        with self._write_lock:
+            if payment_id not in self._payments:
+                return False
             del self._payments[payment_id]
-            return True
-        return False
+            self._versions = self._versions.delete(payment_id)
+            self._created_index.remove(payment_id)
+            self._processed_index.remove(payment_id)
+            self._status_index.remove(payment_id)
+            self._user_index.remove(payment_id)
+            self._order_index.remove(payment_id)
+            self._unindex_transaction(payment_id)
+            self._publish(DELETE, payment_id)
+        return True
     
     def get_next_id(self) -> int:
         """
@@ -123,6 +406,70 @@ class PaymentRepository:
         Returns:
             Siguiente ID
         """
-        current_id = self._next_id
-        self._next_id += 1
+        with self._write_lock:
+            current_id = self._next_id
+            self._next_id += self._id_step
         return current_id
+    
+    def _publish(
+        self,
+        operation: str,
+        payment_id: int,
+        payment: Optional[Payment] = None,
+        previous_status: Optional[PaymentStatus] = None
+    ) -> None:
+        """
+        Publica un cambio en change_feed, si lo hay (con el cerrojo de
+        escritura tomado). Un cambio de estado de un pago ya guardado se
+        publica como transición, con el estado anterior en before.
+        """
+        if self.change_feed is None:
+            return
+        before = None
+        if payment is not None and previous_status is not None and previous_status != payment.status:
+            operation, before = TRANSITION, {"status": previous_status.value}
+        data = entity_data(payment) if payment is not None else None
+        self.change_feed.publish("payment", payment_id, operation, data, before)
+    
+    def _index_payment(self, payment: Payment) -> None:
+        """Actualiza los índices secundarios de un pago."""
+        self._created_index.add(payment.payment_id, payment.created_at)
+        self._processed_index.add(payment.payment_id, payment.processed_at)
+        self._status_index.add(payment.payment_id, payment.status)
+        self._user_index.add(payment.payment_id, payment.user_id)
+        self._order_index.add(payment.payment_id, payment.order_id)
+        self._index_transaction(payment)
+    
+    def _index_transaction(self, payment: Payment) -> None:
+        """Actualiza el índice de ID de transacción de un pago."""
+        if self._indexed_transaction.get(payment.payment_id) != payment.transaction_id:
+            self._unindex_transaction(payment.payment_id)
+            if payment.transaction_id is not None:
+                self._by_transaction[payment.transaction_id] = payment.payment_id
+                self._indexed_transaction[payment.payment_id] = payment.transaction_id
+    
+    def _unindex_transaction(self, payment_id: int) -> None:
+        """Retira el ID de transacción de un pago del índice."""
+        transaction_id = self._indexed_transaction.pop(payment_id, None)
+        if transaction_id is not None and self._by_transaction.get(transaction_id) == payment_id:
+            del self._by_transaction[transaction_id]
+    
+    def _find_in_range(
+        self,
+        index: SortedIndex,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        status: Optional[PaymentStatus],
+        limit: Optional[int]
+    ) -> List[Payment]:
+        """Resuelve un rango de un índice temporal con filtro de estado."""
+        if status is None:
+            return [self._payments[pid] for pid in index.range(start, end, limit=limit)]
+        payments = []
+        for pid in index.range(start, end):
+            payment = self._payments[pid]
+            if payment.status == status:
+                payments.append(payment)
+                if limit is not None and len(payments) >= limit:
+                    break
+        return payments
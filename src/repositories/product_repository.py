@@ -1,7 +1,17 @@
 """Repositorio de productos."""
 
-from typing import Optional, List, Dict
+import threading
+from typing import Optional, List, Dict, Tuple
 from models.product import Product, ProductCategory
+from repositories.query import (
+    OrderBy, Predicate, QueryPlan, QueryPlanner, UniqueAccess, HashAccess, SortedAccess,
+    build_predicate, compile_sql, compile_update
+)
+from repositories.sorted_index import SortedIndex
+from repositories.text_index import InvertedIndex
+from repositories.change_feed import ChangeFeed, DELETE, INSERT, UPDATE, entity_data
+from repositories.snapshot import PersistentIntMap, RepositorySnapshot
+from repositories.versioning import check_version
 
 
 class ProductRepository:
@@ -14,7 +24,33 @@ class ProductRepository:
     def __init__(self):
         """Inicializa el repositorio con almacenamiento en memoria."""
         self._products: Dict[int, Product] = {}
+        # Serializa las escrituras (y la comprobación de versión de update)
+        self._write_lock = threading.Lock()
+        # Versión publicada para instantáneas y find_all (ver snapshot())
+        self._versions = PersistentIntMap()
+        # Flujo al que se publica cada escritura (ver ChangeFeed)
+        self.change_feed: Optional[ChangeFeed] = None
         self._next_id = 1
+        self._text_index = InvertedIndex()
+        self._price_index = SortedIndex()
+        self._category_price_index: Dict[ProductCategory, SortedIndex] = {
+            category: SortedIndex() for category in ProductCategory
+        }
+        self._indexed_category: Dict[int, ProductCategory] = {}
+        self._by_sku: Dict[str, int] = {}
+        self._indexed_sku: Dict[int, str] = {}
+        # Productos que necesitan reposición, por urgencia (restock_urgency)
+        self._low_stock_index = SortedIndex()
+        self._planner = QueryPlanner(self._products, [
+            UniqueAccess("product_id", lambda pid: pid if pid in self._products else None),
+            UniqueAccess("sku", self._by_sku.get),
+            HashAccess(
+                "category",
+                lambda c: self._category_price_index[c].range() if c in self._category_price_index else [],
+                lambda c: len(self._category_price_index[c]) if c in self._category_price_index else 0
+            ),
+            SortedAccess("price", self._price_index)
+        ], scan=lambda: self._versions.values())
     
     def save(self, product: Product) -> Product:
         """
@@ -26,7 +62,12 @@ class ProductRepository:
         Returns:
             Producto guardado
         """
-        self._products[product.product_id] = product
+        with self._write_lock:
+            operation = UPDATE if product.product_id in self._products else INSERT
+            self._products[product.product_id] = product
+            self._versions = self._versions.set(product.product_id, product)
+            self._index_product(product)
+            self._publish(operation, product.product_id, product)
         return product
     
     def find_by_id(self, product_id: int) -> Optional[Product]:
@@ -51,10 +92,8 @@ class ProductRepository:
         Returns:
             Producto encontrado o None
         """
-        for product in self._products.values():
-            if product.sku == sku:
-                return product
-        return None
+        product_id = self._by_sku.get(sku)
+        return self._products.get(product_id) if product_id is not None else None
     
     def find_by_category(self, category: ProductCategory) -> List[Product]:
         """
@@ -68,29 +107,242 @@ class ProductRepository:
         """
         return [p for p in self._products.values() if p.category == category]
     
+    def search(
+        self,
+        query: str,
+        match_all: bool = True,
+        limit: Optional[int] = 20,
+        offset: int = 0
+    ) -> List[int]:
+        """
+        Busca productos por palabras del nombre y la descripción.
+        
+        La búsqueda ignora mayúsculas y acentos; un término terminado
+        en "*" se trata como prefijo.
+        
+        Args:
+            query: Texto a buscar
+            match_all: True si deben aparecer todas las palabras (AND),
+                False si basta con alguna (OR)
+            limit: Tamaño de página (None para todos)
+            offset: Resultados a saltar
+            
+        Returns:
+            IDs de productos ordenados por relevancia (BM25)
+        """
+        return self._text_index.search(query, match_all=match_all, limit=limit, offset=offset)
+    
+    def suggest_terms(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Sugiere palabras del catálogo que empiezan por un prefijo.
+        
+        Args:
+            prefix: Prefijo escrito por el usuario
+            limit: Máximo de sugerencias
+            
+        Returns:
+            Lista de palabras normalizadas
+        """
+        return self._text_index.complete(prefix, limit)
+    
+    def find_by_price_range(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        category: Optional[ProductCategory] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[float, int]] = None,
+        descending: bool = False
+    ) -> List[Product]:
+        """
+        Busca productos con precio dentro de un rango, ordenados por precio.
+        
+        Usa el índice ordenado de precios, así que solo se leen los
+        productos devueltos.
+        
+        Args:
+            min_price: Precio mínimo incluido (None sin límite)
+            max_price: Precio máximo incluido (None sin límite)
+            category: Limitar a una categoría
+            limit: Máximo de productos (None para todos)
+            after: Cursor (precio, product_id) del último producto de la
+                página anterior para paginar por clave
+            descending: True para ordenar de mayor a menor precio
+            
+        Returns:
+            Lista de productos ordenada por (precio, product_id)
+        """
+        index = self._price_index if category is None else self._category_price_index[category]
+        product_ids = index.range(min_price, max_price, limit=limit, after=after, descending=descending)
+        return [self._products[pid] for pid in product_ids]
+    
+    def find_cheapest(self, n: int = 10, category: Optional[ProductCategory] = None) -> List[Product]:
+        """
+        Obtiene los N productos más baratos.
+        
+        Args:
+            n: Cantidad de productos
+            category: Limitar a una categoría
+            
+        Returns:
+            Lista de productos de menor a mayor precio
+        """
+        return self.find_by_price_range(category=category, limit=n)
+    
+    def find_most_expensive(self, n: int = 10, category: Optional[ProductCategory] = None) -> List[Product]:
+        """
+        Obtiene los N productos más caros.
+        
+        Args:
+            n: Cantidad de productos
+            category: Limitar a una categoría
+            
+        Returns:
+            Lista de productos de mayor a menor precio
+        """
+        return self.find_by_price_range(category=category, limit=n, descending=True)
+    
+    def find_low_stock(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[float, int]] = None
+    ) -> List[Product]:
+        """
+        Obtiene los productos en su punto de pedido o por debajo.
+        
+        El índice solo contiene esos productos y se mantiene en cada
+        escritura, así que se leen solo los k devueltos.
+        
+        Args:
+            limit: Máximo de productos (None para todos)
+            after: Cursor (urgencia, product_id) del último producto de la
+                página anterior
+            
+        Returns:
+            Productos del más urgente (menos stock respecto a su umbral)
+            al menos urgente
+        """
+        product_ids = self._low_stock_index.range(limit=limit, after=after)
+        return [self._products[pid] for pid in product_ids]
+    
+    def count_low_stock(self) -> int:
+        """Cuenta los productos que necesitan reposición."""
+        return len(self._low_stock_index)
+    
+    def find_where(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> List[Product]:
+        """
+        Busca productos con una consulta declarativa.
+        
+        Ejemplo: find_where(category=ProductCategory.FOOD,
+        price__between=(10, 50), order_by="-price", limit=10).
+        El planificador usa el índice más selectivo entre product_id,
+        sku, category y price.
+        
+        Args:
+            predicates: Condiciones Eq/In/Range combinables con & y |
+            order_by: Campo o lista de campos ("-campo" descendente)
+            limit: Máximo de productos
+            filters: Filtros campo=v, campo__in, __gte, __lte, __between
+            
+        Returns:
+            Lista de productos que cumplen la consulta
+        """
+        plan = self.explain(*predicates, order_by=order_by, limit=limit, **filters)
+        return self._planner.execute(plan)
+    
+    def explain(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> QueryPlan:
+        """Plan que usaría find_where con los mismos argumentos."""
+        return self._planner.plan(build_predicate(predicates, filters), order_by, limit)
+    
+    def to_sql(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> Tuple[str, list]:
+        """Compila una consulta de find_where a SQL parametrizado (tabla products)."""
+        return compile_sql("products", build_predicate(predicates, filters), order_by, limit)
+    
+    def update_sql(self, product: Product) -> Tuple[str, list]:
+        """Compila la actualización optimista de un producto (WHERE version = ?)."""
+        return compile_update(
+            "products", product, "product_id",
+            ("name", "description", "price", "category", "stock_quantity", "sku", "is_available",
+             "reorder_threshold")
+        )
+    
     def find_all(self) -> List[Product]:
         """
         Obtiene todos los productos.
         
+        Se leen de la última versión publicada, así que se pueden listar
+        mientras otros hilos escriben.
+        
         Returns:
             Lista de productos
         """
-        return list(self._products.values())
+        return list(self._versions.values())
+    
+    def snapshot(self) -> RepositorySnapshot:
+        """
+        Instantánea de los productos en O(1) (ver RepositorySnapshot).
+        
+        Returns:
+            Vista de solo lectura que no cambia con escrituras posteriores
+        """
+        return RepositorySnapshot(self._versions)
+    
+    def count(self) -> int:
+        """
+        Cuenta productos almacenados.
+        
+        Returns:
+            Número de productos
+        """
+        return len(self._products)
     
     def update(self, product: Product) -> Optional[Product]:
         """
         Actualiza un producto.
         
+        product debe ser una copia que conserve la versión del producto
+        guardado: si otro escritor lo cambió entretanto, se rechaza. La versión se
+        incrementa en cada actualización.
+        
         Args:
             product: Producto a actualizar
             
         Returns:
             Producto actualizado o None si no existe
+            
+        Raises:
+            ValueError: Si product es el objeto guardado, modificado en el sitio
+            VersionConflictError: Si la versión no coincide con la guardada
         """
-        if product.product_id in self._products:
+        with self._write_lock:
+            stored = self._products.get(product.product_id)
+            if stored is None:
+                return None
+            check_version(stored, product, product.product_id)
+            product.version = stored.version + 1
             self._products[product.product_id] = product
-            return product
-        return None
+            self._versions = self._versions.set(product.product_id, product)
+            self._index_product(product)
+            self._publish(UPDATE, product.product_id, product)
+        return product
     
     def delete(self, product_id: int) -> bool:
         """
@@ -102,10 +354,14 @@ class ProductRepository:
         Returns:
             True si se eliminó, False si no existía
         """
-        if product_id in self._products:
+        with self._write_lock:
+            if product_id not in self._products:
+                return False
             del self._products[product_id]
-            return True
-        return False
+            self._versions = self._versions.delete(product_id)
+            self._unindex_product(product_id)
+            self._publish(DELETE, product_id)
+        return True
     
     def get_next_id(self) -> int:
         """
@@ -114,6 +370,43 @@ class ProductRepository:
         Returns:
             Siguiente ID
         """
-        current_id = self._next_id
-        self._next_id += 1
+        with self._write_lock:
+            current_id = self._next_id
+            self._next_id += 1
         return current_id
+    
+    def _publish(self, operation: str, product_id: int, product: Optional[Product] = None) -> None:
+        """Publica un cambio en change_feed, si lo hay (con el cerrojo de escritura tomado)."""
+        if self.change_feed is not None:
+            self.change_feed.publish("product", product_id, operation, entity_data(product) if product is not None else None)
+    
+    def _index_product(self, product: Product) -> None:
+        """Actualiza los índices secundarios de un producto."""
+        self._text_index.add(product.product_id, f"{product.name} {product.description}")
+        self._price_index.add(product.product_id, product.price)
+        old_category = self._indexed_category.get(product.product_id)
+        if old_category is not None and old_category != product.category:
+            self._category_price_index[old_category].remove(product.product_id)
+        self._category_price_index[product.category].add(product.product_id, product.price)
+        self._indexed_category[product.product_id] = product.category
+        old_sku = self._indexed_sku.get(product.product_id)
+        if old_sku is not None and self._by_sku.get(old_sku) == product.product_id:
+            del self._by_sku[old_sku]
+        self._by_sku[product.sku] = product.product_id
+        self._indexed_sku[product.product_id] = product.sku
+        if product.needs_restock():
+            self._low_stock_index.add(product.product_id, product.restock_urgency())
+        else:
+            self._low_stock_index.remove(product.product_id)
+    
+    def _unindex_product(self, product_id: int) -> None:
+        """Retira un producto de los índices secundarios."""
+        self._text_index.remove(product_id)
+        self._price_index.remove(product_id)
+        category = self._indexed_category.pop(product_id, None)
+        if category is not None:
+            self._category_price_index[category].remove(product_id)
+        sku = self._indexed_sku.pop(product_id, None)
+        if sku is not None and self._by_sku.get(sku) == product_id:
+            del self._by_sku[sku]
+        self._low_stock_index.remove(product_id)
@@ -0,0 +1,619 @@
+"""Consultas declarativas sobre repositorios con planificador de índices."""
+
+from enum import Enum
+from typing import Any, Callable, Collection, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from repositories.sorted_index import SortedIndex
+
+
+OrderBy = Union[None, str, Sequence[str]]
+
+
+class Predicate:
+    """
+    Condición sobre los atributos de una entidad.
+
+    Se combinan con & (y) y | (o): Eq("status", s) & Range("amount", 10).
+    """
+
+    def matches(self, entity: Any) -> bool:
+        """True si la entidad cumple la condición."""
+        raise NotImplementedError
+
+    def to_sql(self, columns: Dict[str, str]) -> Tuple[str, List[Any]]:
+        """
+        Compila la condición a SQL con parámetros (estilo "?").
+
+        Args:
+            columns: Atributo -> columna cuando los nombres difieren
+
+        Returns:
+            (fragmento SQL, parámetros)
+        """
+        raise NotImplementedError
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        return And(self, other)
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        return Or(self, other)
+
+
+class Eq(Predicate):
+    """Igualdad: field == value."""
+
+    def __init__(self, field: str, value: Any):
+        self.field = field
+        self.value = value
+
+    def matches(self, entity: Any) -> bool:
+        return getattr(entity, self.field) == self.value
+
+    def to_sql(self, columns: Dict[str, str]) -> Tuple[str, List[Any]]:
+        column = columns.get(self.field, self.field)
+        if self.value is None:
+            return f"{column} IS NULL", []
+        return f"{column} = ?", [_sql_value(self.value)]
+
+    def __repr__(self) -> str:
+        return f"{self.field} = {self.value!r}"
+
+
+class In(Predicate):
+    """Pertenencia: field IN values."""
+
+    def __init__(self, field: str, values: Iterable[Any]):
+        self.field = field
+        self.values = tuple(values)
+
+    def matches(self, entity: Any) -> bool:
+        return getattr(entity, self.field) in self.values
+
+    def to_sql(self, columns: Dict[str, str]) -> Tuple[str, List[Any]]:
+        if not self.values:
+            return "0 = 1", []
+        placeholders = ", ".join("?" for _ in self.values)
+        column = columns.get(self.field, self.field)
+        return f"{column} IN ({placeholders})", [_sql_value(v) for v in self.values]
+
+    def __repr__(self) -> str:
+        return f"{self.field} IN {self.values!r}"
+
+
+class Range(Predicate):
+    """Rango con extremos incluidos: low <= field <= high (None = abierto)."""
+
+    def __init__(self, field: str, low: Any = None, high: Any = None):
+        self.field = field
+        self.low = low
+        self.high = high
+
+    def matches(self, entity: Any) -> bool:
+        value = getattr(entity, self.field)
+        if value is None:
+            return False
+        if self.low is not None and value < self.low:
+            return False
+        return self.high is None or value <= self.high
+
+    def to_sql(self, columns: Dict[str, str]) -> Tuple[str, List[Any]]:
+        column = columns.get(self.field, self.field)
+        parts, params = [], []
+        if self.low is not None:
+            parts.append(f"{column} >= ?")
+            params.append(_sql_value(self.low))
+        if self.high is not None:
+            parts.append(f"{column} <= ?")
+            params.append(_sql_value(self.high))
+        if not parts:
+            return f"{column} IS NOT NULL", []
+        return " AND ".join(parts), params
+
+    def __repr__(self) -> str:
+        text = self.field
+        if self.low is not None:
+            text = f"{self.low!r} <= {text}"
+        if self.high is not None:
+            text = f"{text} <= {self.high!r}"
+        return text
+
+
+class And(Predicate):
+    """Conjunción de condiciones."""
+
+    def __init__(self, *predicates: Predicate):
+        self.predicates: Tuple[Predicate, ...] = tuple(
+            q for p in predicates for q in (p.predicates if isinstance(p, And) else (p,))
+        )
+
+    def matches(self, entity: Any) -> bool:
+        return all(p.matches(entity) for p in self.predicates)
+
+    def to_sql(self, columns: Dict[str, str]) -> Tuple[str, List[Any]]:
+        return _join_sql(self.predicates, " AND ", columns)
+
+    def __repr__(self) -> str:
+        return "(" + " AND ".join(map(repr, self.predicates)) + ")"
+
+
+class Or(Predicate):
+    """Disyunción de condiciones."""
+
+    def __init__(self, *predicates: Predicate):
+        self.predicates: Tuple[Predicate, ...] = tuple(
+            q for p in predicates for q in (p.predicates if isinstance(p, Or) else (p,))
+        )
+
+    def matches(self, entity: Any) -> bool:
+        return any(p.matches(entity) for p in self.predicates)
+
+    def to_sql(self, columns: Dict[str, str]) -> Tuple[str, List[Any]]:
+        return _join_sql(self.predicates, " OR ", columns)
+
+    def __repr__(self) -> str:
+        return "(" + " OR ".join(map(repr, self.predicates)) + ")"
+
+
+def build_predicate(predicates: Sequence[Predicate], filters: Dict[str, Any]) -> Optional[Predicate]:
+    """
+    Combina condiciones explícitas y filtros por palabra clave.
+
+    Los filtros usan sufijos al estilo Django: campo=v, campo__in=[...],
+    campo__gte=v, campo__lte=v, campo__between=(a, b).
+
+    Args:
+        predicates: Condiciones ya construidas
+        filters: Filtros por palabra clave
+
+    Returns:
+        Condición combinada con AND, o None si no hay ninguna
+
+    Raises:
+        ValueError: Si un sufijo no es válido
+    """
+    parts = list(predicates)
+    for key, value in filters.items():
+        field, _, operator = key.partition("__")
+        if not operator:
+            parts.append(Eq(field, value))
+        elif operator == "in":
+            parts.append(In(field, value))
+        elif operator == "gte":
+            parts.append(Range(field, low=value))
+        elif operator == "lte":
+            parts.append(Range(field, high=value))
+        elif operator == "between":
+            low, high = value
+            parts.append(Range(field, low, high))
+        else:
+            raise ValueError(f"Operador de filtro no soportado: {operator}")
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else And(*parts)
+
+
+def compile_sql(
+    table: str,
+    predicate: Optional[Predicate],
+    order_by: OrderBy = None,
+    limit: Optional[int] = None,
+    columns: Optional[Dict[str, str]] = None
+) -> Tuple[str, List[Any]]:
+    """
+    Compila una consulta a SQL parametrizado para SQLite.
+
+    Args:
+        table: Tabla de la entidad
+        predicate: Condición (None para todas las filas)
+        order_by: Campo o campos de orden ("-campo" descendente)
+        limit: Máximo de filas
+        columns: Atributo -> columna cuando los nombres difieren
+
+    Returns:
+        (sentencia SQL, parámetros)
+    """
+    columns = columns or {}
+    sql = f"SELECT * FROM {table}"
+    params: List[Any] = []
+    if predicate is not None:
+        where, params = predicate.to_sql(columns)
+        sql += f" WHERE {where}"
+    keys = _order_keys(order_by)
+    if keys:
+        sql += " ORDER BY " + ", ".join(
+            f"{columns.get(field, field)} {'DESC' if descending else 'ASC'}" for field, descending in keys
+        )
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+def compile_update(
+    table: str,
+    entity: Any,
+    key: str,
+    fields: Sequence[str],
+    columns: Optional[Dict[str, str]] = None
+) -> Tuple[str, List[Any]]:
+    """
+    Compila la actualización optimista de una entidad a SQL para SQLite.
+
+    La sentencia solo modifica la fila si conserva la versión que tenía
+    la entidad al leerse ("WHERE version = ?") y la incrementa; si afecta
+    a 0 filas, otro escritor la cambió antes.
+
+    Args:
+        table: Tabla de la entidad
+        entity: Entidad con los valores nuevos y la versión leída
+        key: Atributo de la clave primaria
+        fields: Atributos a escribir
+        columns: Atributo -> columna cuando los nombres difieren
+
+    Returns:
+        (sentencia SQL, parámetros)
+    """
+    columns = columns or {}
+    assignments = ", ".join(f"{columns.get(field, field)} = ?" for field in fields)
+    sql = (
+        f"UPDATE {table} SET {assignments}, version = version + 1 "
+        f"WHERE {columns.get(key, key)} = ? AND version = ?"
+    )
+    params = [_sql_value(getattr(entity, field)) for field in fields]
+    params += [getattr(entity, key), entity.version]
+    return sql, params
+
+
+class AccessPath:
+    """
+    Forma de obtener IDs candidatos a partir de un índice.
+
+    estimate() devuelve el número aproximado de filas para una condición
+    simple, o None si el índice no sirve para ella.
+    """
+
+    ordered = False
+
+    def __init__(self, field: str, name: str):
+        self.field = field
+        self.name = name
+
+    def estimate(self, predicate: Predicate) -> Optional[int]:
+        raise NotImplementedError
+
+    def lookup(self, predicate: Predicate, descending: bool = False) -> Iterable[int]:
+        raise NotImplementedError
+
+
+class UniqueAccess(AccessPath):
+    """Índice de clave única (ID, username, email, SKU)."""
+
+    def __init__(self, field: str, resolve: Callable[[Any], Optional[int]], name: Optional[str] = None):
+        super().__init__(field, name or f"unique({field})")
+        self._resolve = resolve
+
+    def estimate(self, predicate: Predicate) -> Optional[int]:
+        if isinstance(predicate, Eq):
+            return 1
+        if isinstance(predicate, In):
+            return len(predicate.values)
+        return None
+
+    def lookup(self, predicate: Predicate, descending: bool = False) -> Iterable[int]:
+        values = (predicate.value,) if isinstance(predicate, Eq) else predicate.values
+        ids = []
+        for value in values:
+            doc_id = self._resolve(value)
+            if doc_id is not None:
+                ids.append(doc_id)
+        return ids
+
+
+class HashAccess(AccessPath):
+    """Índice por valor con varios documentos por valor (categoría, estado)."""
+
+    def __init__(
+        self,
+        field: str,
+        ids: Callable[[Any], Collection[int]],
+        count: Callable[[Any], int],
+        name: Optional[str] = None
+    ):
+        super().__init__(field, name or f"hash({field})")
+        self._ids = ids
+        self._count = count
+
+    def estimate(self, predicate: Predicate) -> Optional[int]:
+        if isinstance(predicate, Eq):
+            return self._count(predicate.value)
+        if isinstance(predicate, In):
+            return sum(self._count(v) for v in predicate.values)
+        return None
+
+    def lookup(self, predicate: Predicate, descending: bool = False) -> Iterable[int]:
+        if isinstance(predicate, Eq):
+            # Copia: el conjunto del índice cambia con cada escritura
+            return list(self._ids(predicate.value))
+        ids: List[int] = []
+        for value in predicate.values:
+            ids.extend(self._ids(value))
+        return ids
+
+
+class SortedAccess(AccessPath):
+    """Índice ordenado (precio, fechas): igualdad, IN y rangos, en orden."""
+
+    ordered = True
+
+    def __init__(self, field: str, index: SortedIndex, name: Optional[str] = None):
+        super().__init__(field, name or f"sorted({field})")
+        self._index = index
+
+    def estimate(self, predicate: Predicate) -> Optional[int]:
+        ranges = self._ranges(predicate)
+        if ranges is None:
+            return None
+        return sum(self._index.count(low, high) for low, high in ranges)
+
+    def lookup(self, predicate: Optional[Predicate], descending: bool = False) -> Iterable[int]:
+        ranges = self._ranges(predicate) if predicate is not None else [(None, None)]
+        if len(ranges) > 1:
+            ranges = sorted(ranges, key=lambda r: r[0], reverse=descending)
+        ids: List[int] = []
+        for low, high in ranges:
+            ids.extend(self._index.range(low, high, descending=descending))
+        return ids
+
+    def scan_count(self) -> int:
+        """Filas de un recorrido completo del índice."""
+        return len(self._index)
+
+    @staticmethod
+    def _ranges(predicate: Predicate) -> Optional[List[Tuple[Any, Any]]]:
+        if isinstance(predicate, Range):
+            return [(predicate.low, predicate.high)]
+        if isinstance(predicate, Eq) and predicate.value is not None:
+            return [(predicate.value, predicate.value)]
+        if isinstance(predicate, In) and None not in predicate.values:
+            return [(v, v) for v in sorted(set(predicate.values))]
+        return None
+
+
+class QueryPlan:
+    """
+    Plan elegido para una consulta; str(plan) lo describe.
+
+    Attributes:
+        access: "full_scan", "index", "index_scan" (recorrido ordenado
+            del índice de order_by) o "union" (OR de índices)
+        path: Índice usado (para "index" e "index_scan")
+        predicate: Condición resuelta con el índice
+        branches: Subplanes de un "union"
+        estimated_rows: Filas candidatas estimadas
+        residual: Condición completa que se verifica sobre cada candidato
+        sort: Campos por los que hay que ordenar en memoria
+        limit: Máximo de filas
+    """
+
+    def __init__(
+        self,
+        access: str,
+        estimated_rows: int,
+        path: Optional[AccessPath] = None,
+        predicate: Optional[Predicate] = None,
+        branches: Optional[List["QueryPlan"]] = None
+    ):
+        self.access = access
+        self.estimated_rows = estimated_rows
+        self.path = path
+        self.predicate = predicate
+        self.branches = branches or []
+        self.residual: Optional[Predicate] = None
+        self.sort: List[Tuple[str, bool]] = []
+        self.descending = False
+        self.limit: Optional[int] = None
+
+    @property
+    def is_full_scan(self) -> bool:
+        """True si la consulta recorre todas las entidades."""
+        return self.access == "full_scan"
+
+    def __str__(self) -> str:
+        steps = [self._describe_access()]
+        if self.residual is not None:
+            steps.append(f"FILTER {self.residual!r}")
+        if self.sort:
+            steps.append("SORT " + ", ".join(f"{'-' if d else ''}{f}" for f, d in self.sort))
+        if self.limit is not None:
+            steps.append(f"LIMIT {self.limit}")
+        return " -> ".join(steps)
+
+    def _describe_access(self) -> str:
+        if self.access == "full_scan":
+            return f"FULL SCAN (~{self.estimated_rows} filas)"
+        if self.access == "union":
+            inner = " | ".join(b._describe_access() for b in self.branches)
+            return f"UNION [{inner}] (~{self.estimated_rows} filas)"
+        order = " DESC" if self.descending else ""
+        condition = f" {self.predicate!r}" if self.predicate is not None else ""
+        kind = "INDEX SCAN" if self.access == "index_scan" else "INDEX"
+        return f"{kind} {self.path.name}{condition}{order} (~{self.estimated_rows} filas)"
+
+
+class QueryPlanner:
+    """
+    Planificador de consultas en memoria para un repositorio.
+
+    Para una conjunción elige el índice con menos filas estimadas; un OR
+    usa la unión de índices solo si todas sus ramas tienen uno. Sin
+    índice aplicable recorre todas las entidades. Si la consulta se
+    ordena por el campo de un índice ordenado y este se usa (o no hay
+    filtro indexable), las filas salen ya ordenadas y el límite corta la
+    lectura.
+
+    Los recorridos completos leen `scan()`, que en los repositorios es la
+    última versión publicada del mapa persistente: recorrer el
+    diccionario vivo fallaría si otro hilo inserta a la vez
+    ("dictionary changed size during iteration").
+    """
+
+    def __init__(
+        self,
+        entities: Dict[int, Any],
+        access_paths: Iterable[AccessPath],
+        scan: Optional[Callable[[], Iterable[Any]]] = None
+    ):
+        """
+        Inicializa el planificador.
+
+        Args:
+            entities: Almacenamiento ID -> entidad del repositorio
+            access_paths: Índices disponibles
+            scan: Entidades para un recorrido completo, seguras de
+                recorrer mientras otros hilos escriben (por defecto
+                entities.values())
+        """
+        self._entities = entities
+        self._scan = scan or entities.values
+        self._paths: Dict[str, List[AccessPath]] = {}
+        for path in access_paths:
+            self._paths.setdefault(path.field, []).append(path)
+
+    def plan(
+        self,
+        predicate: Optional[Predicate],
+        order_by: OrderBy = None,
+        limit: Optional[int] = None
+    ) -> QueryPlan:
+        """
+        Elige el plan de ejecución de una consulta.
+
+        Args:
+            predicate: Condición (None para todas)
+            order_by: Campo o campos de orden ("-campo" descendente)
+            limit: Máximo de filas
+
+        Returns:
+            Plan de la consulta
+        """
+        keys = _order_keys(order_by)
+        plan = self._plan_predicate(predicate) if predicate is not None else None
+        sort_path = self._sorted_path(keys[0][0]) if len(keys) == 1 else None
+
+        if plan is None or plan.is_full_scan:
+            if sort_path is not None:
+                plan = QueryPlan("index_scan", sort_path.scan_count(), path=sort_path)
+            elif plan is None:
+                plan = QueryPlan("full_scan", len(self._entities))
+        if plan.access in ("index", "index_scan") and sort_path is plan.path:
+            plan.descending = keys[0][1]
+        elif keys:
+            plan.sort = keys
+        plan.residual = predicate
+        plan.limit = limit
+        return plan
+
+    def execute(self, plan: QueryPlan) -> List[Any]:
+        """
+        Ejecuta un plan.
+
+        Args:
+            plan: Plan obtenido con plan()
+
+        Returns:
+            Entidades que cumplen la consulta
+        """
+        if plan.limit is not None and plan.limit <= 0:
+            return []
+        if plan.access == "full_scan":
+            candidates: Iterable[Any] = self._scan()
+        else:
+            # Un ID del índice puede borrarse entretanto
+            entities = map(self._entities.get, self._candidate_ids(plan))
+            candidates = (entity for entity in entities if entity is not None)
+
+        stream_limit = plan.limit if not plan.sort else None
+        results = []
+        for entity in candidates:
+            if plan.residual is None or plan.residual.matches(entity):
+                results.append(entity)
+                if stream_limit is not None and len(results) >= stream_limit:
+                    return results
+        for field, descending in reversed(plan.sort):
+            results.sort(key=lambda e: _sort_key(getattr(e, field)), reverse=descending)
+        return results[:plan.limit] if plan.limit is not None else results
+
+    def _plan_predicate(self, predicate: Predicate) -> QueryPlan:
+        """Mejor acceso para una condición (full_scan si no hay índice)."""
+        full_scan = QueryPlan("full_scan", len(self._entities))
+        if isinstance(predicate, And):
+            best = full_scan
+            for part in predicate.predicates:
+                candidate = self._plan_predicate(part)
+                if candidate.estimated_rows < best.estimated_rows:
+                    best = candidate
+            return best
+        if isinstance(predicate, Or):
+            branches = [self._plan_predicate(part) for part in predicate.predicates]
+            if any(b.is_full_scan for b in branches):
+                return full_scan
+            total = sum(b.estimated_rows for b in branches)
+            return QueryPlan("union", total, branches=branches) if total < full_scan.estimated_rows else full_scan
+
+        best = full_scan
+        for path in self._paths.get(getattr(predicate, "field", None), []):
+            estimate = path.estimate(predicate)
+            if estimate is not None and estimate < best.estimated_rows:
+                best = QueryPlan("index", estimate, path=path, predicate=predicate)
+        return best
+
+    def _candidate_ids(self, plan: QueryPlan) -> Iterable[int]:
+        """IDs candidatos de un plan por índice o unión."""
+        if plan.access == "union":
+            seen = set()
+            ids = []
+            for branch in plan.branches:
+                for doc_id in self._candidate_ids(branch):
+                    if doc_id not in seen:
+                        seen.add(doc_id)
+                        ids.append(doc_id)
+            return ids
+        return plan.path.lookup(plan.predicate, descending=plan.descending)
+
+    def _sorted_path(self, field: str) -> Optional[SortedAccess]:
+        """Índice ordenado sobre un campo, si existe."""
+        for path in self._paths.get(field, []):
+            if isinstance(path, SortedAccess):
+                return path
+        return None
+
+
+def _order_keys(order_by: OrderBy) -> List[Tuple[str, bool]]:
+    """Normaliza order_by a [(campo, descendente)]."""
+    if order_by is None:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(key.lstrip("-"), key.startswith("-")) for key in order_by]
+
+
+def _sort_key(value: Any) -> Tuple[bool, Any]:
+    """Clave de orden que deja los None al final y ordena enums por valor."""
+    if isinstance(value, Enum):
+        value = value.value
+    return value is None, value
+
+
+def _sql_value(value: Any) -> Any:
+    """Valor de parámetro SQL (los enums se guardan por su valor)."""
+    return value.value if isinstance(value, Enum) else value
+
+
+def _join_sql(predicates: Sequence[Predicate], separator: str, columns: Dict[str, str]) -> Tuple[str, List[Any]]:
+    """Une fragmentos SQL de varias condiciones."""
+    parts, params = [], []
+    for predicate in predicates:
+        sql, values = predicate.to_sql(columns)
+        parts.append(f"({sql})")
+        params.extend(values)
+    return separator.join(parts), params
@@ -0,0 +1,292 @@
+"""Repositorio de reseñas de productos."""
+
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from models.product import ProductReview
+from repositories.sorted_index import SortedIndex
+
+
+# Ordenaciones de find_by_product
+ORDER_RECENT = "recent"
+ORDER_RATING = "rating"
+
+
+class _ProductReviews:
+    """Índices e histograma de las reseñas de un producto."""
+
+    __slots__ = ("recent", "by_rating", "histogram")
+
+    def __init__(self):
+        # created_at -> reseña
+        self.recent = SortedIndex()
+        # (rating, created_at) -> reseña: ordena por estrellas y, dentro
+        # de cada número de estrellas, por fecha
+        self.by_rating = SortedIndex()
+        # Reseñas por número de estrellas (posición 0 sin usar)
+        self.histogram = [0] * 6
+
+
+def _check_rating(review: ProductReview) -> None:
+    """Comprueba el rating antes de indexar (pudo cambiar tras crearla)."""
+    if not 1 <= review.rating <= 5:
+        raise ValueError(f"La reseña {review.review_id} tiene un rating fuera de 1 a 5")
+
+
+class ReviewRepository:
+    """
+    Repositorio para gestionar la persistencia de reseñas.
+
+    Las reseñas se guardan aparte de los productos, con dos índices
+    ordenados por producto (por fecha y por estrellas y fecha) y un
+    histograma de estrellas. Así una página de reseñas, ordenada o
+    filtrada por estrellas, se lee en O(log n + k) sin ordenar todas las
+    reseñas del producto, y la media se calcula en O(1).
+    """
+
+    def __init__(self):
+        """Inicializa el repositorio con almacenamiento en memoria."""
+        self._reviews: Dict[int, ProductReview] = {}
+        self._write_lock = threading.Lock()
+        self._next_id = 1
+        self._by_product: Dict[int, _ProductReviews] = {}
+        # Producto con el que se indexó cada reseña
+        self._indexed_product: Dict[int, int] = {}
+
+    def save(self, review: ProductReview) -> ProductReview:
+        """
+        Guarda una reseña en el repositorio.
+
+        Args:
+            review: Reseña a guardar
+
+        Returns:
+            Reseña guardada
+
+        Raises:
+            ValueError: Si el rating no está entre 1 y 5
+        """
+        _check_rating(review)
+        with self._write_lock:
+            self._unindex(review.review_id)
+            self._reviews[review.review_id] = review
+            self._indexed_product[review.review_id] = review.product_id
+            indexes = self._indexes(review.product_id)
+            indexes.recent.add(review.review_id, review.created_at)
+            indexes.by_rating.add(review.review_id, (review.rating, review.created_at))
+            indexes.histogram[review.rating] += 1
+        return review
+
+    def save_many(self, reviews: Iterable[ProductReview]) -> int:
+        """
+        Guarda un lote de reseñas (ingesta masiva).
+
+        Los índices de cada producto se actualizan con un único add_many
+        en vez de una inserción ordenada por reseña. Si un review_id se
+        repite en el lote se guarda la última; el lote se valida entero
+        antes de tocar el repositorio.
+
+        Args:
+            reviews: Reseñas a guardar
+
+        Returns:
+            Número de reseñas guardadas (distintas)
+
+        Raises:
+            ValueError: Si alguna reseña tiene un rating fuera de 1 a 5
+                (no se guarda ninguna)
+        """
+        latest: Dict[int, ProductReview] = {}
+        for review in reviews:
+            _check_rating(review)
+            latest[review.review_id] = review
+        by_product: Dict[int, List[ProductReview]] = {}
+        for review in latest.values():
+            by_product.setdefault(review.product_id, []).append(review)
+        saved = 0
+        with self._write_lock:
+            for product_id, batch in by_product.items():
+                for review in batch:
+                    self._unindex(review.review_id)
+                    self._reviews[review.review_id] = review
+                    self._indexed_product[review.review_id] = product_id
+                indexes = self._indexes(product_id)
+                indexes.recent.add_many((r.review_id, r.created_at) for r in batch)
+                indexes.by_rating.add_many((r.review_id, (r.rating, r.created_at)) for r in batch)
+                for review in batch:
+                    indexes.histogram[review.rating] += 1
+                saved += len(batch)
+        return saved
+
+    def find_by_id(self, review_id: int) -> Optional[ProductReview]:
+        """
+        Busca una reseña por ID.
+
+        Args:
+            review_id: ID de la reseña
+
+        Returns:
+            Reseña encontrada o None
+        """
+        return self._reviews.get(review_id)
+
+    def find_by_product(
+        self,
+        product_id: int,
+        order_by: str = ORDER_RECENT,
+        rating: Optional[int] = None,
+        limit: Optional[int] = 20,
+        after: Optional[int] = None,
+        descending: bool = True
+    ) -> List[ProductReview]:
+        """
+        Obtiene una página de reseñas de un producto, paginando por clave.
+
+        Args:
+            product_id: ID del producto
+            order_by: "recent" (por fecha) o "rating" (por estrellas y,
+                a igualdad, por fecha)
+            rating: Solo las reseñas con ese número de estrellas (se
+                ordenan por fecha)
+            limit: Máximo de reseñas (None para todas)
+            after: review_id de la última reseña de la página anterior,
+                o None para la primera página
+            descending: True para empezar por las más recientes o las de
+                más estrellas
+
+        Returns:
+            Reseñas de la página
+
+        Raises:
+            ValueError: Si order_by no es válido o la reseña del cursor
+                no es de esta página (no existe o no es del producto)
+        """
+        if order_by not in (ORDER_RECENT, ORDER_RATING):
+            raise ValueError(f"Orden no válido: {order_by}")
+        indexes = self._by_product.get(product_id)
+        if indexes is None:
+            return []
+        if rating is None and order_by == ORDER_RECENT:
+            index, low, high = indexes.recent, None, None
+        else:
+            index = indexes.by_rating
+            low, high = ((rating,), (rating, datetime.max)) if rating is not None else (None, None)
+        cursor = None
+        if after is not None:
+            value = index.value_of(after)
+            if value is None:
+                raise ValueError(f"La reseña {after} no es de este producto")
+            cursor = (value, after)
+        review_ids = index.range(low, high, limit=limit, after=cursor, descending=descending)
+        return [self._reviews[rid] for rid in review_ids]
+
+    def rating_histogram(self, product_id: int) -> Dict[int, int]:
+        """
+        Reseñas de un producto por número de estrellas.
+
+        Args:
+            product_id: ID del producto
+
+        Returns:
+            Diccionario {estrellas: reseñas} de 1 a 5
+        """
+        indexes = self._by_product.get(product_id)
+        histogram = indexes.histogram if indexes is not None else [0] * 6
+        return {stars: histogram[stars] for stars in range(1, 6)}
+
+    def average_rating(self, product_id: int) -> float:
+        """
+        Calcula la calificación media de un producto en O(1).
+
+        Args:
+            product_id: ID del producto
+
+        Returns:
+            Media de estrellas (0.0 sin reseñas)
+        """
+        histogram = self.rating_histogram(product_id)
+        total = sum(histogram.values())
+        if not total:
+            return 0.0
+        return sum(stars * count for stars, count in histogram.items()) / total
+
+    def count_by_product(self, product_id: int) -> int:
+        """Cuenta las reseñas de un producto."""
+        indexes = self._by_product.get(product_id)
+        return len(indexes.recent) if indexes is not None else 0
+
+    def count(self) -> int:
+        """
+        Cuenta reseñas almacenadas.
+
+        Returns:
+            Número de reseñas
+        """
+        return len(self._reviews)
+
+    def delete(self, review_id: int) -> bool:
+        """
+        Elimina una reseña.
+
+        Args:
+            review_id: ID de la reseña
+
+        Returns:
+            True si se eliminó, False si no existía
+        """
+        with self._write_lock:
+            return self._unindex(review_id)
+
+    def delete_by_product(self, product_id: int) -> int:
+        """
+        Elimina todas las reseñas de un producto.
+
+        Args:
+            product_id: ID del producto
+
+        Returns:
+            Número de reseñas eliminadas
+        """
+        with self._write_lock:
+            indexes = self._by_product.pop(product_id, None)
+            if indexes is None:
+                return 0
+            review_ids = indexes.recent.range()
+            for review_id in review_ids:
+                del self._reviews[review_id]
+                del self._indexed_product[review_id]
+        return len(review_ids)
+
+    def get_next_id(self) -> int:
+        """
+        Obtiene el siguiente ID disponible.
+
+        Returns:
+            Siguiente ID
+        """
+        with self._write_lock:
+            current_id = self._next_id
+            self._next_id += 1
+        return current_id
+
+    def _indexes(self, product_id: int) -> _ProductReviews:
+        """Índices del producto (los crea en su primera reseña)."""
+        indexes = self._by_product.get(product_id)
+        if indexes is None:
+            indexes = self._by_product[product_id] = _ProductReviews()
+        return indexes
+
+    def _unindex(self, review_id: int) -> bool:
+        """Retira una reseña guardada y sus índices (con el cerrojo tomado)."""
+        if self._reviews.pop(review_id, None) is None:
+            return False
+        # Se usan los valores indexados: la reseña pudo cambiar en el sitio
+        product_id = self._indexed_product.pop(review_id)
+        indexes = self._by_product[product_id]
+        rating, _ = indexes.by_rating.value_of(review_id)
+        indexes.recent.remove(review_id)
+        indexes.by_rating.remove(review_id)
+        indexes.histogram[rating] -= 1
+        if not len(indexes.recent):
+            del self._by_product[product_id]
+        return True
@@ -0,0 +1,198 @@
+"""Lecturas con instantánea (MVCC) sobre los repositorios en memoria."""
+
+from functools import partial
+from itertools import chain
+from operator import is_not
+from typing import Any, Iterator, List, Optional, Tuple
+
+from repositories.query import OrderBy, Predicate, QueryPlan, QueryPlanner, build_predicate
+
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+
+class PersistentIntMap:
+    """
+    Mapa inmutable de enteros no negativos a valores (trie de 32 ramas).
+
+    set() y delete() devuelven un mapa nuevo que comparte con el
+    anterior todos los nodos salvo los del camino a la clave: copian
+    log32(clave) nodos de 32 entradas (4 para un millón de IDs). Quien
+    tiene una referencia a un mapa lo puede recorrer mientras otros
+    hilos publican versiones nuevas: nunca cambia. El recorrido sale
+    ordenado por clave. Los valores no pueden ser None.
+    """
+
+    __slots__ = ("_root", "_shift", "_size")
+
+    def __init__(self, root: Optional[list] = None, shift: int = 0, size: int = 0):
+        self._root = root
+        self._shift = shift
+        self._size = size
+
+    def get(self, key: int, default: Any = None) -> Any:
+        """Valor de una clave, o default."""
+        node = self._root
+        if node is None or key < 0 or key >> (self._shift + _BITS):
+            return default
+        shift = self._shift
+        while shift:
+            node = node[(key >> shift) & _MASK]
+            if node is None:
+                return default
+            shift -= _BITS
+        value = node[key & _MASK]
+        return default if value is None else value
+
+    def set(self, key: int, value: Any) -> "PersistentIntMap":
+        """
+        Mapa con la clave asociada al valor.
+
+        Args:
+            key: Clave (entero no negativo)
+            value: Valor (no None)
+
+        Returns:
+            Mapa nuevo; este no cambia
+        """
+        if key < 0:
+            raise ValueError("Las claves deben ser enteros no negativos")
+        root, top_shift = self._root or [None] * _WIDTH, self._shift
+        while key >> (top_shift + _BITS):
+            # Crece un nivel: la raíz actual pasa a ser la primera rama
+            root = [root] + [None] * (_WIDTH - 1)
+            top_shift += _BITS
+        new_root = node = list(root)
+        shift = top_shift
+        while shift:
+            index = (key >> shift) & _MASK
+            child = node[index]
+            child = list(child) if child is not None else [None] * _WIDTH
+            node[index] = child
+            node = child
+            shift -= _BITS
+        added = node[key & _MASK] is None
+        node[key & _MASK] = value
+        return PersistentIntMap(new_root, top_shift, self._size + added)
+
+    def delete(self, key: int) -> "PersistentIntMap":
+        """Mapa sin la clave (el mismo si no estaba)."""
+        if self.get(key) is None:
+            return self
+        new_root = node = list(self._root)
+        shift = self._shift
+        while shift:
+            index = (key >> shift) & _MASK
+            node[index] = list(node[index])
+            node = node[index]
+            shift -= _BITS
+        node[key & _MASK] = None
+        return PersistentIntMap(new_root, self._shift, self._size - 1)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: int) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: int) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[int]:
+        return (key for key, _ in self.items())
+
+    def values(self) -> Iterator[Any]:
+        """Valores ordenados por clave."""
+        # Solo se recorren en Python los nodos; las hojas, en C
+        return filter(partial(is_not, None), chain.from_iterable(self._leaves(self._root, self._shift)))
+
+    def items(self) -> Iterator[Tuple[int, Any]]:
+        """Pares (clave, valor) ordenados por clave."""
+        for leaf, base in self._leaves_with_base(self._root, self._shift, 0):
+            for offset, value in enumerate(leaf):
+                if value is not None:
+                    yield base + offset, value
+
+    @classmethod
+    def _leaves(cls, node: Optional[list], shift: int) -> Iterator[list]:
+        if node is None:
+            return
+        if not shift:
+            yield node
+            return
+        for child in node:
+            if child is not None:
+                yield from cls._leaves(child, shift - _BITS)
+
+    @classmethod
+    def _leaves_with_base(cls, node: Optional[list], shift: int, base: int) -> Iterator[Tuple[list, int]]:
+        if node is None:
+            return
+        if not shift:
+            yield node, base
+            return
+        for index, child in enumerate(node):
+            if child is not None:
+                yield from cls._leaves_with_base(child, shift - _BITS, base + (index << shift))
+
+
+class RepositorySnapshot:
+    """
+    Vista de un repositorio en un instante (aislamiento de instantánea).
+
+    Se obtiene con snapshot() del repositorio en O(1): es la versión del
+    mapa persistente publicada por la última escritura. Las escrituras
+    posteriores no la modifican (altas, bajas y entidades reemplazadas
+    con update), así que un informe largo ve un estado coherente sin
+    bloquear a los escritores. update() solo acepta copias (ver
+    check_version), así que los objetos de la vista no cambian mientras
+    no se modifiquen en el sitio fuera del repositorio.
+    """
+
+    def __init__(self, entities: PersistentIntMap):
+        """
+        Inicializa la vista.
+
+        Args:
+            entities: Versión del mapa ID -> entidad
+        """
+        self._entities = entities
+        self._planner = QueryPlanner(entities, [])
+
+    def find_by_id(self, entity_id: int) -> Optional[Any]:
+        """Entidad con ese ID en la instantánea, o None."""
+        return self._entities.get(entity_id)
+
+    def find_all(self) -> List[Any]:
+        """Todas las entidades de la instantánea, ordenadas por ID."""
+        return list(self._entities.values())
+
+    def find_where(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> List[Any]:
+        """
+        Consulta sobre la instantánea (mismos filtros que find_where del
+        repositorio). Recorre todas las entidades: los índices secundarios
+        solo reflejan el estado actual.
+        """
+        plan: QueryPlan = self._planner.plan(build_predicate(predicates, filters), order_by, limit)
+        return self._planner.execute(plan)
+
+    def count(self) -> int:
+        """Entidades en la instantánea."""
+        return len(self._entities)
+
+    def __iter__(self) -> Iterator[Any]:
+        return self._entities.values()
+
+    def __len__(self) -> int:
+        return len(self._entities)
@@ -0,0 +1,165 @@
+"""Índice ordenado para consultas por rango y top-N."""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Cota superior para cualquier ID al buscar el final de un rango
+_MAX_ID = float("inf")
+
+# A partir de cuántos cambios add_many reconstruye la lista en vez de
+# insertar uno a uno (cada insort desplaza O(n) elementos)
+_BULK_THRESHOLD = 64
+
+
+class SortedIndex:
+    """
+    Índice secundario ordenado por un valor (precio, fecha...).
+
+    Guarda las claves (valor, doc_id) en una lista ordenada, de modo que
+    los rangos y los top-N se resuelven con búsqueda binaria más la
+    lectura de los k resultados. El ID desempata valores iguales y sirve
+    como cursor estable para paginación por clave (keyset).
+    """
+
+    def __init__(self):
+        """Inicializa un índice vacío."""
+        self._keys: List[Tuple[Any, int]] = []
+        self._values: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._values
+
+    def add(self, doc_id: int, value: Any) -> None:
+        """
+        Indexa (o reindexa) un documento con su valor.
+
+        Si el valor no cambió no hace nada; un valor None retira el
+        documento (por ejemplo, un pago aún sin procesar).
+
+        Args:
+            doc_id: ID del documento
+            value: Valor por el que se ordena
+        """
+        if value is None:
+            self.remove(doc_id)
+            return
+        if doc_id in self._values:
+            if self._values[doc_id] == value:
+                return
+            self.remove(doc_id)
+        insort(self._keys, (value, doc_id))
+        self._values[doc_id] = value
+
+    def add_many(self, items: Iterable[Tuple[int, Any]]) -> None:
+        """
+        Indexa (o reindexa) muchos documentos de una vez.
+
+        Equivale a llamar a add() por cada par, pero con muchos cambios
+        reconstruye la lista en una sola pasada (O(n + k log k)) en vez
+        de hacer k inserciones de O(n) cada una.
+
+        Args:
+            items: Pares (doc_id, valor); valor None retira el documento
+        """
+        # Si un documento se repite en el lote vale su último valor
+        changes = {
+            doc_id: value for doc_id, value in dict(items).items()
+            if self._values.get(doc_id) != value
+        }
+        if len(changes) < _BULK_THRESHOLD:
+            for doc_id, value in changes.items():
+                self.add(doc_id, value)
+            return
+
+        stale = set()
+        added = []
+        for doc_id, value in changes.items():
+            old = self._values.pop(doc_id, None)
+            if old is not None:
+                stale.add((old, doc_id))
+            if value is not None:
+                added.append((value, doc_id))
+                self._values[doc_id] = value
+        added.sort()
+        kept = [key for key in self._keys if key not in stale] if stale else self._keys
+        self._keys = list(heapq.merge(kept, added))
+
+    def remove(self, doc_id: int) -> bool:
+        """
+        Retira un documento del índice.
+
+        Args:
+            doc_id: ID del documento
+
+        Returns:
+            True si estaba indexado
+        """
+        value = self._values.pop(doc_id, None)
+        if value is None:
+            return False
+        del self._keys[bisect_left(self._keys, (value, doc_id))]
+        return True
+
+    def range(
+        self,
+        low: Any = None,
+        high: Any = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        descending: bool = False
+    ) -> List[int]:
+        """
+        Obtiene los IDs con valor dentro de un rango, en orden.
+
+        Args:
+            low: Valor mínimo incluido (None sin límite)
+            high: Valor máximo incluido (None sin límite)
+            limit: Máximo de resultados (None para todos)
+            after: Cursor (valor, doc_id) del último resultado de la
+                página anterior; se devuelven los que siguen
+            descending: True para recorrer de mayor a menor
+
+        Returns:
+            Lista de IDs ordenada por (valor, doc_id)
+        """
+        start = bisect_left(self._keys, (low,)) if low is not None else 0
+        end = bisect_right(self._keys, (high, _MAX_ID)) if high is not None else len(self._keys)
+        if after is not None:
+            if descending:
+                end = min(end, bisect_left(self._keys, tuple(after)))
+            else:
+                start = max(start, bisect_right(self._keys, tuple(after)))
+        if start >= end:
+            return []
+
+        if descending:
+            if limit is not None:
+                start = max(start, end - limit)
+            return [doc_id for _, doc_id in reversed(self._keys[start:end])]
+        if limit is not None:
+            end = min(end, start + limit)
+        return [doc_id for _, doc_id in self._keys[start:end]]
+
+    def count(self, low: Any = None, high: Any = None) -> int:
+        """
+        Cuenta los documentos con valor dentro de un rango, en O(log n).
+
+        Args:
+            low: Valor mínimo incluido (None sin límite)
+            high: Valor máximo incluido (None sin límite)
+
+        Returns:
+            Número de documentos
+        """
+        start = bisect_left(self._keys, (low,)) if low is not None else 0
+        end = bisect_right(self._keys, (high, _MAX_ID)) if high is not None else len(self._keys)
+        return max(0, end - start)
+
+    def value_of(self, doc_id: int) -> Any:
+        """Valor indexado de un documento (None si no está)."""
+        return self._values.get(doc_id)
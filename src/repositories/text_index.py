@@ -0,0 +1,298 @@
+"""Índice invertido para búsqueda de texto completo."""
+
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Iterable
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Términos nuevos que se acumulan antes de fusionarlos con el vocabulario
+# (cada inserción directa en la lista desplazaría O(V) elementos)
+_VOCABULARY_BUFFER = 256
+
+# Palabras vacías del español que no aportan a la relevancia
+SPANISH_STOP_WORDS = frozenset({
+    "a", "al", "con", "de", "del", "e", "el", "en", "la", "las", "lo",
+    "los", "o", "para", "por", "sin", "su", "sus", "u", "un", "una",
+    "unos", "unas", "y"
+})
+
+
+def fold_accents(text: str) -> str:
+    """
+    Normaliza un texto a minúsculas y sin acentos.
+
+    Args:
+        text: Texto a normalizar
+
+    Returns:
+        Texto en minúsculas sin marcas diacríticas ("Canción" -> "cancion")
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str, stop_words: Iterable[str] = SPANISH_STOP_WORDS) -> List[str]:
+    """
+    Divide un texto en términos normalizados.
+
+    Args:
+        text: Texto a tokenizar
+        stop_words: Palabras a descartar
+
+    Returns:
+        Lista de términos en el orden en que aparecen
+    """
+    return [t for t in _TOKEN_PATTERN.findall(fold_accents(text)) if t not in stop_words]
+
+
+class InvertedIndex:
+    """
+    Índice invertido con ranking BM25.
+
+    Mantiene, por cada término, las frecuencias por documento, y por cada
+    documento sus términos indexados para poder retirarlo sin recorrer
+    todo el vocabulario. El vocabulario se conserva ordenado para
+    resolver completado por prefijo con búsqueda binaria: los términos
+    nuevos van a una lista ordenada pequeña que se fusiona con la
+    principal en una pasada al llenarse, como SortedIndex.add_many.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Inicializa un índice vacío.
+
+        Args:
+            k1: Saturación de la frecuencia del término (BM25)
+            b: Normalización por longitud del documento (BM25)
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Dict[str, int]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._doc_texts: Dict[int, str] = {}
+        self._total_length = 0
+        self._vocabulary: List[str] = []
+        self._new_terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: int, text: str) -> None:
+        """
+        Indexa (o reindexa) un documento.
+
+        Si el texto no cambió desde la última indexación no hace nada,
+        de modo que actualizaciones de stock o precio no tocan el índice.
+
+        Args:
+            doc_id: ID del documento
+            text: Texto a indexar
+        """
+        if self._doc_texts.get(doc_id) == text:
+            return
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+
+        frequencies: Dict[str, int] = {}
+        tokens = tokenize(text)
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        for term, tf in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._add_term(term)
+            postings[doc_id] = tf
+
+        self._doc_terms[doc_id] = frequencies
+        self._doc_lengths[doc_id] = len(tokens)
+        self._doc_texts[doc_id] = text
+        self._total_length += len(tokens)
+
+    def remove(self, doc_id: int) -> bool:
+        """
+        Retira un documento del índice.
+
+        Args:
+            doc_id: ID del documento
+
+        Returns:
+            True si estaba indexado
+        """
+        frequencies = self._doc_terms.pop(doc_id, None)
+        if frequencies is None:
+            return False
+        for term in frequencies:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._remove_term(term)
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        del self._doc_texts[doc_id]
+        return True
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Sugiere términos del vocabulario que empiezan por un prefijo.
+
+        Args:
+            prefix: Prefijo a completar
+            limit: Máximo de sugerencias
+
+        Returns:
+            Términos en orden alfabético
+        """
+        prefix = fold_accents(prefix).strip()
+        if not prefix:
+            return []
+        return self._expand_prefix(prefix, limit)
+
+    def search(
+        self,
+        query: str,
+        match_all: bool = True,
+        limit: Optional[int] = 20,
+        offset: int = 0
+    ) -> List[int]:
+        """
+        Busca documentos y los ordena por relevancia BM25.
+
+        Un término terminado en "*" se expande a todos los términos del
+        vocabulario con ese prefijo (por ejemplo "port*").
+
+        Args:
+            query: Consulta en texto libre
+            match_all: True para AND entre términos, False para OR
+            limit: Tamaño de página (None para todos los resultados)
+            offset: Resultados a saltar (paginación)
+
+        Returns:
+            IDs de documentos de la página solicitada
+        """
+        groups = self._parse_query(query)
+        if not groups:
+            return []
+
+        if match_all:
+            if any(not group for group in groups):
+                return []
+            candidates = self._intersect(groups)
+        else:
+            candidates = set()
+            for group in groups:
+                for term in group:
+                    candidates.update(self._postings[term])
+        if not candidates:
+            return []
+
+        scores = self._score(candidates, groups)
+        if limit is None:
+            ranked = sorted(scores, key=lambda d: (-scores[d], d))
+            return ranked[offset:]
+        top = heapq.nsmallest(offset + limit, scores, key=lambda d: (-scores[d], d))
+        return top[offset:]
+
+    def _parse_query(self, query: str) -> List[List[str]]:
+        """Convierte la consulta en grupos de términos (un grupo por palabra)."""
+        groups = []
+        for raw in query.split():
+            is_prefix = raw.endswith("*")
+            tokens = tokenize(raw)
+            if not tokens:
+                continue
+            for i, token in enumerate(tokens):
+                if is_prefix and i == len(tokens) - 1:
+                    groups.append(self._expand_prefix(token, None))
+                else:
+                    groups.append([token] if token in self._postings else [])
+        return groups
+
+    def _expand_prefix(self, prefix: str, limit: Optional[int]) -> List[str]:
+        """Términos del vocabulario con el prefijo dado."""
+        terms = []
+        for term in heapq.merge(_with_prefix(self._vocabulary, prefix), _with_prefix(self._new_terms, prefix)):
+            if limit is not None and len(terms) >= limit:
+                break
+            terms.append(term)
+        return terms
+
+    def _add_term(self, term: str) -> None:
+        """Agrega un término al vocabulario ordenado."""
+        insort(self._new_terms, term)
+        if len(self._new_terms) > _VOCABULARY_BUFFER:
+            self._vocabulary = list(heapq.merge(self._vocabulary, self._new_terms))
+            self._new_terms = []
+
+    def _remove_term(self, term: str) -> None:
+        """Retira un término del vocabulario ordenado."""
+        i = bisect_left(self._new_terms, term)
+        if i < len(self._new_terms) and self._new_terms[i] == term:
+            del self._new_terms[i]
+        else:
+            del self._vocabulary[bisect_left(self._vocabulary, term)]
+
+    def _group_docs(self, group: List[str]) -> Iterable[int]:
+        """Documentos que contienen algún término del grupo."""
+        if len(group) == 1:
+            return self._postings[group[0]].keys()
+        docs = set()
+        for term in group:
+            docs.update(self._postings[term])
+        return docs
+
+    def _intersect(self, groups: List[List[str]]) -> set:
+        """Intersección de grupos empezando por el más selectivo."""
+        ordered = sorted(
+            groups,
+            key=lambda g: sum(len(self._postings[t]) for t in g)
+        )
+        result = set(self._group_docs(ordered[0]))
+        for group in ordered[1:]:
+            if not result:
+                break
+            if len(group) == 1:
+                postings = self._postings[group[0]]
+                result = {d for d in result if d in postings}
+            else:
+                result &= self._group_docs(group)
+        return result
+
+    def _score(self, candidates: Iterable[int], groups: List[List[str]]) -> Dict[int, float]:
+        """Calcula la puntuación BM25 de cada candidato."""
+        n_docs = len(self._doc_terms)
+        avg_length = self._total_length / n_docs if n_docs else 0.0
+        k1, b = self.k1, self.b
+        terms = {term for group in groups for term in group}
+        scores = dict.fromkeys(candidates, 0.0)
+        for term in terms:
+            postings = self._postings[term]
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            if len(postings) < len(scores):
+                pairs = ((d, tf) for d, tf in postings.items() if d in scores)
+            else:
+                pairs = ((d, postings[d]) for d in scores if d in postings)
+            for doc_id, tf in pairs:
+                length = self._doc_lengths[doc_id]
+                norm = k1 * (1 - b + b * length / avg_length) if avg_length else k1
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+
+def _with_prefix(terms: List[str], prefix: str) -> Iterator[str]:
+    """Términos de una lista ordenada que empiezan por un prefijo, en orden."""
+    for i in range(bisect_left(terms, prefix), len(terms)):
+        if not terms[i].startswith(prefix):
+            return
+        yield terms[i]
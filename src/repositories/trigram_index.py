@@ -0,0 +1,161 @@
+"""Índice de trigramas para búsqueda aproximada."""
+
+import heapq
+import sys
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+from repositories.text_index import fold_accents
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """
+    Obtiene los trigramas de un texto normalizado.
+
+    Cada palabra se rellena con dos espacios al inicio y uno al final,
+    como hace pg_trgm, para que los prefijos pesen más. Los trigramas
+    se internan para que millones de documentos compartan las mismas
+    cadenas.
+
+    Args:
+        text: Texto de entrada
+
+    Returns:
+        Conjunto de trigramas
+    """
+    grams = set()
+    for word in fold_accents(text).replace("@", " ").replace(".", " ").split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(sys.intern(padded[i:i + 3]))
+    return frozenset(grams)
+
+
+class TrigramIndex:
+    """
+    Índice invertido de trigramas sobre uno o más campos por documento.
+
+    La similitud de un documento es la mejor entre sus campos, medida
+    como la fracción de trigramas de la consulta presentes en el campo
+    (así "garcia" encuentra "María García López"); el índice de Jaccard
+    desempata a favor de los campos más parecidos en longitud.
+    """
+
+    def __init__(self):
+        """Inicializa un índice vacío."""
+        self._postings: Dict[str, Set[int]] = {}
+        # Por documento, los trigramas de cada campo como tuplas ordenadas
+        # (ocupan bastante menos que un frozenset por campo)
+        self._fields: Dict[int, Tuple[Tuple[str, ...], ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def add(self, doc_id: int, *fields: str) -> None:
+        """
+        Indexa (o reindexa) un documento.
+
+        Solo se tocan las listas de los trigramas que cambiaron.
+
+        Args:
+            doc_id: ID del documento
+            fields: Textos a indexar (nombre, usuario, email...)
+        """
+        new_fields = tuple(tuple(sorted(trigrams(f or ""))) for f in fields)
+        old_fields = self._fields.get(doc_id)
+        if old_fields == new_fields:
+            return
+        old_grams = frozenset().union(*old_fields) if old_fields else frozenset()
+        new_grams = frozenset().union(*new_fields)
+        for gram in old_grams - new_grams:
+            self._discard(gram, doc_id)
+        for gram in new_grams - old_grams:
+            self._postings.setdefault(gram, set()).add(doc_id)
+        self._fields[doc_id] = new_fields
+
+    def remove(self, doc_id: int) -> bool:
+        """
+        Retira un documento del índice.
+
+        Args:
+            doc_id: ID del documento
+
+        Returns:
+            True si estaba indexado
+        """
+        fields = self._fields.pop(doc_id, None)
+        if fields is None:
+            return False
+        for gram in frozenset().union(*fields):
+            self._discard(gram, doc_id)
+        return True
+
+    def search(self, query: str, limit: int = 10, threshold: float = 0.3) -> List[Tuple[int, float]]:
+        """
+        Busca los documentos más parecidos a la consulta.
+
+        Recorre las listas de los trigramas de la consulta de la más rara
+        a la más común, verificando cada candidato nuevo. Un documento que
+        no aparece en las primeras `p` listas comparte como mucho los
+        trigramas restantes, así que la búsqueda se detiene en cuanto esa
+        cota queda por debajo de `threshold` o del k-ésimo resultado.
+
+        Args:
+            query: Texto aproximado (puede tener errores de tipeo)
+            limit: Número máximo de resultados (top-k)
+            threshold: Similitud mínima entre 0 y 1
+
+        Returns:
+            Lista de (doc_id, similitud) de mayor a menor similitud
+        """
+        query_grams = trigrams(query)
+        if not query_grams or limit <= 0:
+            return []
+
+        present = sorted(
+            (g for g in query_grams if g in self._postings),
+            key=lambda g: len(self._postings[g])
+        )
+        seen: Set[int] = set()
+        top: List[Tuple[Tuple[float, float, int], int]] = []
+        for probed, gram in enumerate(present, start=1):
+            bound = (len(present) - probed + 1) / len(query_grams)
+            if bound < threshold or (len(top) == limit and top[0][0][0] > bound):
+                break
+            for doc_id in self._postings[gram]:
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                coverage, jaccard = self._similarity(query_grams, self._fields[doc_id])
+                if coverage < threshold:
+                    continue
+                entry = ((coverage, jaccard, -doc_id), doc_id)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+
+        top.sort(reverse=True)
+        return [(doc_id, round(key[0], 4)) for key, doc_id in top]
+
+    @staticmethod
+    def _similarity(query_grams: FrozenSet[str], fields: Tuple[Tuple[str, ...], ...]) -> Tuple[float, float]:
+        """Similitud (cobertura, jaccard) del mejor campo."""
+        best = (0.0, 0.0)
+        for grams in fields:
+            if not grams:
+                continue
+            shared = len(query_grams.intersection(grams))
+            if not shared:
+                continue
+            score = (shared / len(query_grams), shared / (len(query_grams) + len(grams) - shared))
+            if score > best:
+                best = score
+        return best
+
+    def _discard(self, gram: str, doc_id: int) -> None:
+        """Retira un documento de la lista de un trigrama."""
+        postings = self._postings.get(gram)
+        if postings is not None:
+            postings.discard(doc_id)
+            if not postings:
+                del self._postings[gram]
@@ -1,7 +1,16 @@
 """Repositorio de usuarios."""
 
-from typing import Optional, List, Dict
+import threading
+from typing import Optional, List, Dict, Tuple
 from models.user import User
+from repositories.query import (
+    OrderBy, Predicate, QueryPlan, QueryPlanner, UniqueAccess,
+    build_predicate, compile_sql, compile_update
+)
+from repositories.trigram_index import TrigramIndex
+from repositories.change_feed import ChangeFeed, DELETE, INSERT, UPDATE, entity_data
+from repositories.snapshot import PersistentIntMap, RepositorySnapshot
+from repositories.versioning import check_version
 
 
 class UserRepository:
@@ -11,10 +20,35 @@ class UserRepository:
     Implementa el patrón Repository para abstraer el acceso a datos.
     """
     
-    def __init__(self):
-        """Inicializa el repositorio con almacenamiento en memoria."""
+    def __init__(self, first_id: int = 1, id_step: int = 1):
+        """
+        Inicializa el repositorio con almacenamiento en memoria.
+        
+        Args:
+            first_id: Primer ID que se asigna
+            id_step: Incremento entre IDs; un fragmento k de N usa
+                first_id=k (N si k es 0) e id_step=N, así los IDs de
+                todos los fragmentos no se solapan e id % N indica el
+                fragmento
+        """
         self._users: Dict[int, User] = {}
-        self._next_id = 1
+        # Serializa las escrituras (y la comprobación de versión de update)
+        self._write_lock = threading.Lock()
+        # Versión publicada para instantáneas y find_all (ver snapshot())
+        self._versions = PersistentIntMap()
+        # Flujo al que se publica cada escritura (ver ChangeFeed)
+        self.change_feed: Optional[ChangeFeed] = None
+        self._next_id = first_id
+        self._id_step = id_step
+        self._by_username: Dict[str, int] = {}
+        self._by_email: Dict[str, int] = {}
+        self._indexed_keys: Dict[int, Tuple[str, str]] = {}
+        self._name_index = TrigramIndex()
+        self._planner = QueryPlanner(self._users, [
+            UniqueAccess("user_id", lambda uid: uid if uid in self._users else None),
+            UniqueAccess("username", self._by_username.get),
+            UniqueAccess("email", self._by_email.get)
+        ], scan=lambda: self._versions.values())
     
     def save(self, user: User) -> User:
         """
@@ -26,7 +60,12 @@ class UserRepository:
         Returns:
             Usuario guardado
         """
-        self._users[user.user_id] = user
+        with self._write_lock:
+            operation = UPDATE if user.user_id in self._users else INSERT
+            self._users[user.user_id] = user
+            self._versions = self._versions.set(user.user_id, user)
+            self._index_user(user)
+            self._publish(operation, user.user_id, user)
         return user
     
     def find_by_id(self, user_id: int) -> Optional[User]:
@@ -51,10 +90,8 @@ class UserRepository:
         Returns:
             Usuario encontrado o None
         """
-        for user in self._users.values():
-            if user.username == username:
-                return user
-        return None
+        user_id = self._by_username.get(username)
+        return self._users.get(user_id) if user_id is not None else None
     
     def find_by_email(self, email: str) -> Optional[User]:
         """
@@ -66,34 +103,143 @@ class UserRepository:
         Returns:
             Usuario encontrado o None
         """
-        for user in self._users.values():
-            if user.email == email:
-                return user
-        return None
+        user_id = self._by_email.get(email)
+        return self._users.get(user_id) if user_id is not None else None
+    
+    def search_similar(
+        self,
+        query: str,
+        limit: int = 10,
+        threshold: float = 0.3
+    ) -> List[Tuple[User, float]]:
+        """
+        Busca usuarios por nombre completo, username o email aproximados.
+        
+        Tolera nombres parciales, errores de tipeo, mayúsculas y acentos.
+        
+        Args:
+            query: Texto a buscar
+            limit: Número máximo de resultados
+            threshold: Similitud mínima (0 a 1)
+            
+        Returns:
+            Lista de (usuario, similitud) de mayor a menor similitud
+        """
+        matches = self._name_index.search(query, limit=limit, threshold=threshold)
+        return [(self._users[user_id], score) for user_id, score in matches]
+    
+    def find_where(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> List[User]:
+        """
+        Busca usuarios con una consulta declarativa.
+        
+        Ejemplo: find_where(role__in=[UserRole.ADMIN, UserRole.MANAGER], is_active=True, order_by="username").
+        Los índices disponibles son user_id, username y email; el resto
+        de campos se filtra recorriendo todos los usuarios.
+        
+        Args:
+            predicates: Condiciones Eq/In/Range combinables con & y |
+            order_by: Campo o lista de campos ("-campo" descendente)
+            limit: Máximo de usuarios
+            filters: Filtros campo=v, campo__in, __gte, __lte, __between
+            
+        Returns:
+            Lista de usuarios que cumplen la consulta
+        """
+        plan = self.explain(*predicates, order_by=order_by, limit=limit, **filters)
+        return self._planner.execute(plan)
+    
+    def explain(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> QueryPlan:
+        """Plan que usaría find_where con los mismos argumentos."""
+        return self._planner.plan(build_predicate(predicates, filters), order_by, limit)
+    
+    def to_sql(
+        self,
+        *predicates: Predicate,
+        order_by: OrderBy = None,
+        limit: Optional[int] = None,
+        **filters
+    ) -> Tuple[str, list]:
+        """Compila una consulta de find_where a SQL parametrizado (tabla users)."""
+        return compile_sql("users", build_predicate(predicates, filters), order_by, limit)
+    
+    def update_sql(self, user: User) -> Tuple[str, list]:
+        """Compila la actualización optimista de un usuario (WHERE version = ?)."""
+        return compile_update(
+            "users", user, "user_id",
+            ("username", "email", "password_hash", "role", "full_name", "is_active")
+        )
     
     def find_all(self) -> List[User]:
         """
         Obtiene todos los usuarios.
         
+        Se leen de la última versión publicada, así que se pueden listar
+        mientras otros hilos escriben.
+        
         Returns:
             Lista de usuarios
         """
-        return list(self._users.values())
+        return list(self._versions.values())
+    
+    def snapshot(self) -> RepositorySnapshot:
+        """
+        Instantánea de los usuarios en O(1) (ver RepositorySnapshot).
+        
+        Returns:
+            Vista de solo lectura que no cambia con escrituras posteriores
+        """
+        return RepositorySnapshot(self._versions)
+    
+    def count(self) -> int:
+        """
+        Cuenta usuarios almacenados.
+        
+        Returns:
+            Número de usuarios
+        """
+        return len(self._users)
     
     def update(self, user: User) -> Optional[User]:
         """
         Actualiza un usuario.
         
+        user debe ser una copia que conserve la versión del usuario
+        guardado: si otro escritor lo cambió entretanto, se rechaza. La versión se
+        incrementa en cada actualización.
+        
         Args:
             user: Usuario a actualizar
             
         Returns:
             Usuario actualizado o None si no existe
+            
+        Raises:
+            ValueError: Si user es el objeto guardado, modificado en el sitio
+            VersionConflictError: Si la versión no coincide con la guardada
         """
-        if user.user_id in self._users:
+        with self._write_lock:
+            stored = self._users.get(user.user_id)
+            if stored is None:
+                return None
+            check_version(stored, user, user.user_id)
+            user.version = stored.version + 1
             self._users[user.user_id] = user
-            return user
-        return None
+            self._versions = self._versions.set(user.user_id, user)
+            self._index_user(user)
+            self._publish(UPDATE, user.user_id, user)
+        return user
     
     def delete(self, user_id: int) -> bool:
         """
@@ -105,10 +251,14 @@ class UserRepository:
         Returns:
             True si se eliminó, False si no existía
         """
-        if user_id in self._users:
+        with self._write_lock:
+            if user_id not in self._users:
+                return False
             del self._users[user_id]
-            return True
-        return False
+            self._versions = self._versions.delete(user_id)
+            self._unindex_user(user_id)
+            self._publish(DELETE, user_id)
+        return True
     
     def get_next_id(self) -> int:
         """
@@ -117,6 +267,36 @@ class UserRepository:
         Returns:
             Siguiente ID
         """
-        current_id = self._next_id
-        self._next_id += 1
+        with self._write_lock:
+            current_id = self._next_id
+            self._next_id += self._id_step
         return current_id
+    
+    def _publish(self, operation: str, user_id: int, user: Optional[User] = None) -> None:
+        """Publica un cambio en change_feed, si lo hay (con el cerrojo de escritura tomado)."""
+        if self.change_feed is not None:
+            self.change_feed.publish("user", user_id, operation, entity_data(user) if user is not None else None)
+    
+    def _index_user(self, user: User) -> None:
+        """Actualiza los índices secundarios de un usuario."""
+        self._unindex_keys(user.user_id)
+        self._by_username[user.username] = user.user_id
+        self._by_email[user.email] = user.user_id
+        self._indexed_keys[user.user_id] = (user.username, user.email)
+        self._name_index.add(user.user_id, user.full_name, user.username, user.email)
+    
+    def _unindex_user(self, user_id: int) -> None:
+        """Retira un usuario de los índices secundarios."""
+        self._unindex_keys(user_id)
+        self._name_index.remove(user_id)
+    
+    def _unindex_keys(self, user_id: int) -> None:
+        """Retira las claves únicas indexadas previamente para un usuario."""
+        keys = self._indexed_keys.pop(user_id, None)
+        if keys is None:
+            return
+        username, email = keys
+        if self._by_username.get(username) == user_id:
+            del self._by_username[username]
+        if self._by_email.get(email) == user_id:
+            del self._by_email[email]
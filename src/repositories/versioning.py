@@ -0,0 +1,51 @@
+"""Control de concurrencia optimista por número de versión."""
+
+from typing import Any
+
+
+class VersionConflictError(Exception):
+    """La entidad cambió desde que se leyó: la actualización se rechaza."""
+
+    def __init__(self, entity: str, entity_id: int, expected: int, actual: int):
+        """
+        Inicializa el error.
+
+        Args:
+            entity: Tipo de entidad ("Product"...)
+            entity_id: ID de la entidad
+            expected: Versión leída por quien actualiza
+            actual: Versión guardada
+        """
+        super().__init__(f"{entity} {entity_id} cambió (versión {expected}, guardada {actual})")
+        self.entity = entity
+        self.entity_id = entity_id
+        self.expected = expected
+        self.actual = actual
+
+
+def check_version(stored: Any, entity: Any, entity_id: int) -> None:
+    """
+    Comprueba la versión de una entidad antes de guardarla.
+
+    `entity` debe ser una copia con la versión de la guardada. El propio
+    objeto guardado se rechaza: modificado en el sitio ya no conserva la
+    versión que se leyó, así que un cambio concurrente se perdería sin
+    conflicto, y las instantáneas verían el cambio a medias. Se llama con
+    el cerrojo de escritura del repositorio tomado; al guardar, el
+    repositorio pone version = stored.version + 1.
+
+    Args:
+        stored: Entidad guardada
+        entity: Entidad nueva
+        entity_id: ID de la entidad
+
+    Raises:
+        ValueError: Si `entity` es el objeto guardado y no una copia
+        VersionConflictError: Si la copia se leyó antes del último cambio
+    """
+    if entity is stored:
+        raise ValueError(
+            f"{type(entity).__name__} {entity_id} se modificó en el sitio: actualiza una copia"
+        )
+    if entity.version != stored.version:
+        raise VersionConflictError(type(entity).__name__, entity_id, entity.version, stored.version)
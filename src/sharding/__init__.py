@@ -0,0 +1,9 @@
+"""Despliegue fragmentado: usuarios y pagos repartidos entre procesos."""
+
+__all__ = [
+    'ShardPool',
+    'ShardError',
+    'EmailRegistry',
+    'ShardedUserController',
+    'ShardedPaymentController'
+]
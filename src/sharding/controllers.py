@@ -0,0 +1,298 @@
+"""Controladores que enrutan las llamadas a los fragmentos de un ShardPool."""
+
+import heapq
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Tuple
+
+from models.user import User, UserRole
+from models.payment import Payment, PaymentMethod, PaymentStatus
+from sharding.pool import ShardPool
+
+
+class ShardedUserController:
+    """
+    Misma interfaz que UserController sobre usuarios repartidos en fragmentos.
+
+    Un usuario vive en el fragmento crc32(username) % N y su ID cumple
+    id % N == fragmento, así que username e ID enrutan a un único
+    fragmento. La unicidad del email la decide el fragmento
+    crc32(email) % N, que guarda los emails en uso (EmailRegistry): el
+    registro reserva el email allí antes de crear el usuario, y la
+    reserva se libera si el registro falla, al cambiar el email o al
+    eliminar el usuario. Las consultas globales se reparten y se mezclan.
+    """
+
+    def __init__(self, pool: ShardPool):
+        """
+        Inicializa el controlador.
+
+        Args:
+            pool: Procesos dueños de los fragmentos
+        """
+        self.pool = pool
+
+    def register_user(
+        self,
+        username: str,
+        email: str,
+        password: str,
+        role: UserRole,
+        full_name: str
+    ) -> Optional[User]:
+        """Registra un usuario en el fragmento de su username (reservando antes su email)."""
+        if not self._reserve_email(email, username):
+            return None
+        user = None
+        try:
+            user = self.pool.call(
+                self.pool.shard_for_key(username), "user_controller", "register_user",
+                username, email, password, role, full_name
+            )
+        finally:
+            if user is None:
+                self._release_email(email, username)
+        return user
+
+    def register_users(self, rows: Iterable[Tuple[str, str, str, UserRole, str]]) -> List[Optional[User]]:
+        """
+        Registra muchos usuarios con un mensaje por fragmento.
+
+        Args:
+            rows: Tuplas (username, email, password, role, full_name)
+
+        Returns:
+            Usuario creado o None por cada fila, en el mismo orden
+        """
+        rows = list(rows)
+        reserved = self.pool.call_many(
+            (self.pool.shard_for_key(email), "email_registry", "reserve", (email, username), {})
+            for username, email, *_ in rows
+        )
+
+        calls, positions = [], []
+        for position, (row, ok) in enumerate(zip(rows, reserved)):
+            if ok is True:
+                calls.append((self.pool.shard_for_key(row[0]), "user_controller", "register_user", row, {}))
+                positions.append(position)
+
+        results: List[Optional[User]] = [None] * len(rows)
+        releases = []
+        for position, user in zip(positions, self.pool.call_many(calls)):
+            if isinstance(user, User):
+                results[position] = user
+            else:
+                username, email = rows[position][:2]
+                releases.append(
+                    (self.pool.shard_for_key(email), "email_registry", "release", (email, username), {})
+                )
+        if releases:
+            self.pool.call_many(releases)
+        return results
+
+    def authenticate(self, username: str, password: str, client: Optional[str] = None) -> Optional[User]:
+        """Autentica en el fragmento del username."""
+        return self.pool.call(
+            self.pool.shard_for_key(username), "user_controller", "authenticate", username, password, client
+        )
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        """Obtiene un usuario por ID."""
+        return self._on_owner(user_id, "get_user")
+
+    def update_user(self, user: User) -> Optional[User]:
+        """
+        Actualiza un usuario en su fragmento.
+
+        Si cambia el email, se reserva el nuevo antes de guardar (None si
+        ya está en uso) y se libera el anterior después.
+        """
+        current = self.get_user(user.user_id)
+        if current is None or current.email == user.email:
+            return self._on_owner(user.user_id, "update_user", user)
+        if not self._reserve_email(user.email, user.username):
+            return None
+        updated = None
+        try:
+            updated = self._on_owner(user.user_id, "update_user", user)
+        finally:
+            if updated is None:
+                self._release_email(user.email, user.username)
+            else:
+                self._release_email(current.email, current.username)
+        return updated
+
+    def delete_user(self, user_id: int) -> bool:
+        """Elimina un usuario y libera su email."""
+        current = self.get_user(user_id)
+        deleted = self._on_owner(user_id, "delete_user")
+        if deleted and current is not None:
+            self._release_email(current.email, current.username)
+        return deleted
+
+    def activate_user(self, user_id: int) -> bool:
+        """Activa un usuario."""
+        return self._on_owner(user_id, "activate_user")
+
+    def deactivate_user(self, user_id: int) -> bool:
+        """Desactiva un usuario."""
+        return self._on_owner(user_id, "deactivate_user")
+
+    def list_all_users(self) -> List[User]:
+        """Lista todos los usuarios ordenados por ID."""
+        shards = self.pool.broadcast("user_controller", "list_all_users")
+        return list(heapq.merge(*(sorted(users, key=_user_id) for users in shards), key=_user_id))
+
+    def search_users(self, query: str, limit: int = 10, threshold: float = 0.3) -> List[Tuple[User, float]]:
+        """Busca en todos los fragmentos y mezcla por similitud."""
+        matches = self.pool.broadcast("user_controller", "search_users", query, limit, threshold)
+        merged = [match for shard_matches in matches for match in shard_matches]
+        merged.sort(key=lambda match: (-match[1], match[0].user_id))
+        return merged[:limit]
+
+    def count(self) -> int:
+        """Número total de usuarios."""
+        return sum(self.pool.broadcast("user_repository", "count"))
+
+    def _on_owner(self, user_id: int, method: str, *args) -> Any:
+        return self.pool.call(
+            self.pool.shard_for_id(user_id), "user_controller", method, *(args or (user_id,))
+        )
+
+    def _reserve_email(self, email: str, username: str) -> bool:
+        """Reserva el email en su fragmento dueño; False si ya está en uso."""
+        return self.pool.call(self.pool.shard_for_key(email), "email_registry", "reserve", email, username)
+
+    def _release_email(self, email: str, username: str) -> None:
+        """Libera la reserva del email hecha por username."""
+        self.pool.call(self.pool.shard_for_key(email), "email_registry", "release", email, username)
+
+
+class ShardedPaymentController:
+    """
+    Misma interfaz que PaymentController sobre pagos repartidos en fragmentos.
+
+    Cada pago se guarda en el fragmento de su usuario (user_id % N) y su
+    ID cumple payment_id % N == fragmento: las operaciones sobre un pago
+    y los listados de un usuario van a un solo fragmento, y los listados
+    por estado o por fecha se reparten y se mezclan ya ordenados.
+    """
+
+    def __init__(self, pool: ShardPool):
+        """
+        Inicializa el controlador.
+
+        Args:
+            pool: Procesos dueños de los fragmentos
+        """
+        self.pool = pool
+
+    def create_payment(
+        self,
+        order_id: int,
+        user_id: int,
+        amount: float,
+        payment_method: PaymentMethod,
+        transaction_id: Optional[str] = None,
+        client: Optional[str] = None
+    ) -> Optional[Payment]:
+        """Crea un pago en el fragmento del usuario."""
+        return self.pool.call(
+            self.pool.shard_for_id(user_id), "payment_controller", "create_payment",
+            order_id, user_id, amount, payment_method, transaction_id, client
+        )
+
+    def create_payments(
+        self,
+        rows: Iterable[Tuple[int, int, float, PaymentMethod]]
+    ) -> List[Optional[Payment]]:
+        """
+        Crea muchos pagos con un mensaje por fragmento.
+
+        Args:
+            rows: Tuplas (order_id, user_id, amount, payment_method)
+
+        Returns:
+            Pago creado (o None) por cada fila, en el mismo orden
+        """
+        return _values(self.pool.call_many(
+            (self.pool.shard_for_id(row[1]), "payment_controller", "create_payment", tuple(row), {})
+            for row in rows
+        ))
+
+    def process_payments(self, payment_ids: Iterable[int]) -> List[bool]:
+        """Procesa muchos pagos con un mensaje por fragmento."""
+        return [result is True for result in self.pool.call_many(
+            (self.pool.shard_for_id(pid), "payment_controller", "process_payment", (pid,), {})
+            for pid in payment_ids
+        )]
+
+    def get_payment(self, payment_id: int) -> Optional[Payment]:
+        """Obtiene un pago por ID."""
+        return self._on_owner(payment_id, "get_payment")
+
+    def process_payment(self, payment_id: int) -> bool:
+        """Procesa un pago."""
+        return self._on_owner(payment_id, "process_payment")
+
+    def complete_payment(self, payment_id: int) -> bool:
+        """Marca un pago como completado."""
+        return self._on_owner(payment_id, "complete_payment")
+
+    def refund_payment(self, payment_id: int) -> bool:
+        """Reembolsa un pago."""
+        return self._on_owner(payment_id, "refund_payment")
+
+    def cancel_payment(self, payment_id: int) -> bool:
+        """Cancela un pago."""
+        return self._on_owner(payment_id, "cancel_payment")
+
+    def list_payments_by_user(self, user_id: int) -> List[Payment]:
+        """Lista los pagos de un usuario (un solo fragmento)."""
+        return self.pool.call(
+            self.pool.shard_for_id(user_id), "payment_controller", "list_payments_by_user", user_id
+        )
+
+    def list_payments_by_status(self, status: PaymentStatus) -> List[Payment]:
+        """Lista los pagos con un estado, ordenados por ID."""
+        shards = self.pool.broadcast("payment_controller", "list_payments_by_status", status)
+        return list(heapq.merge(*shards, key=_payment_id))
+
+    def list_payments_created_between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        status: Optional[PaymentStatus] = None
+    ) -> List[Payment]:
+        """Lista pagos creados en un intervalo, ordenados por fecha."""
+        shards = self.pool.broadcast("payment_controller", "list_payments_created_between", start, end, status)
+        return list(heapq.merge(*shards, key=lambda p: (p.created_at, p.payment_id)))
+
+    def list_payments_processed_between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        status: Optional[PaymentStatus] = None
+    ) -> List[Payment]:
+        """Lista pagos procesados en un intervalo, ordenados por fecha."""
+        shards = self.pool.broadcast("payment_controller", "list_payments_processed_between", start, end, status)
+        return list(heapq.merge(*shards, key=lambda p: (p.processed_at, p.payment_id)))
+
+    def count(self) -> int:
+        """Número total de pagos."""
+        return sum(self.pool.broadcast("payment_repository", "count"))
+
+    def _on_owner(self, payment_id: int, method: str) -> Any:
+        return self.pool.call(self.pool.shard_for_id(payment_id), "payment_controller", method, payment_id)
+
+
+def _user_id(user: User) -> int:
+    return user.user_id
+
+
+def _payment_id(payment: Payment) -> int:
+    return payment.payment_id
+
+
+def _values(results: List[Any]) -> List[Any]:
+    """Sustituye las excepciones de un lote por None."""
+    return [None if isinstance(result, Exception) else result for result in results]
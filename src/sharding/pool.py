@@ -0,0 +1,306 @@
+"""Procesos trabajadores que poseen cada uno un fragmento de los datos."""
+
+import multiprocessing
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from controllers.user_controller import UserController
+from controllers.payment_controller import PaymentController
+from repositories.user_repository import UserRepository
+from repositories.payment_repository import PaymentRepository
+
+
+# Llamada remota: (fragmento, objetivo, método, args, kwargs)
+Call = Tuple[int, str, str, tuple, dict]
+
+
+class ShardError(RuntimeError):
+    """Un trabajador terminó o no respondió."""
+
+
+class EmailRegistry:
+    """
+    Emails en uso cuyo fragmento dueño es crc32(email) % N.
+
+    Cada trabajador atiende sus mensajes de uno en uno, así que reserve()
+    comprueba y reserva en un solo paso: de dos registros con el mismo
+    email solo uno obtiene la reserva, aunque sus usernames vivan en
+    fragmentos distintos.
+    """
+
+    def __init__(self):
+        """Inicializa el registro vacío."""
+        # email -> username que lo reservó
+        self._owners: Dict[str, str] = {}
+
+    def reserve(self, email: str, username: str) -> bool:
+        """
+        Reserva un email para un username.
+
+        Args:
+            email: Correo electrónico
+            username: Usuario que lo reserva
+
+        Returns:
+            True si estaba libre y queda reservado
+        """
+        if email in self._owners:
+            return False
+        self._owners[email] = username
+        return True
+
+    def release(self, email: str, username: str) -> bool:
+        """
+        Libera un email si lo había reservado ese username.
+
+        Returns:
+            True si se liberó
+        """
+        if self._owners.get(email) != username:
+            return False
+        del self._owners[email]
+        return True
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+
+class ShardPool:
+    """
+    N procesos trabajadores, cada uno dueño de un fragmento de usuarios y
+    pagos en memoria.
+
+    Cada trabajador tiene su UserRepository y PaymentRepository (con IDs
+    k, k+N, k+2N... de modo que id % N es el fragmento), los controladores
+    sobre ellos y el EmailRegistry de los emails que le corresponden.
+    El proceso principal envía llamadas por una tubería por trabajador:
+    call() va a un fragmento, broadcast() a todos en paralelo y
+    call_many() agrupa muchas llamadas en un mensaje por fragmento para
+    amortizar el coste de la comunicación.
+
+    Las entidades viajan serializadas: lo que devuelve el pool es una
+    copia, y los cambios se guardan llamando a update() como hacen ya los
+    controladores.
+
+    Cada envío lee todas sus respuestas antes de liberar el cerrojo,
+    aunque un fragmento falle, para que ninguna respuesta quede en la
+    tubería y la reciba la llamada siguiente. Si una llamada se
+    interrumpe con respuestas pendientes (p. ej. con Ctrl+C), el pool
+    queda inutilizable y las llamadas posteriores lanzan ShardError.
+    """
+
+    def __init__(self, num_shards: int, start_method: Optional[str] = None):
+        """
+        Arranca los trabajadores.
+
+        Args:
+            num_shards: Número de fragmentos (procesos)
+            start_method: "fork", "spawn" o "forkserver" (por defecto el
+                de la plataforma)
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards debe ser al menos 1")
+        self.num_shards = num_shards
+        context = multiprocessing.get_context(start_method)
+        self._connections = []
+        self._processes = []
+        for shard in range(num_shards):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_serve_shard,
+                args=(shard, num_shards, child),
+                name=f"shard-{shard}",
+                daemon=True
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+        self._lock = threading.Lock()
+        self._closed = False
+        # Motivo por el que las tuberías ya no están sincronizadas
+        self._broken: Optional[str] = None
+
+    def __enter__(self) -> "ShardPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def shard_for_id(self, entity_id: int) -> int:
+        """Fragmento dueño de un ID de usuario o de pago."""
+        return entity_id % self.num_shards
+
+    def shard_for_key(self, key: str) -> int:
+        """Fragmento asignado a una clave de texto (hash estable entre procesos)."""
+        return zlib.crc32(key.encode("utf-8")) % self.num_shards
+
+    def call(self, shard: int, target: str, method: str, *args, **kwargs) -> Any:
+        """
+        Ejecuta un método en un fragmento.
+
+        Args:
+            shard: Fragmento
+            target: "user_controller", "payment_controller",
+                "user_repository", "payment_repository" o "email_registry"
+            method: Nombre del método
+
+        Returns:
+            Resultado del método (una copia)
+        """
+        with self._lock:
+            reply = self._exchange({shard: (target, method, args, kwargs)})[shard]
+        return _unwrap(reply)
+
+    def broadcast(self, target: str, method: str, *args, **kwargs) -> List[Any]:
+        """
+        Ejecuta un método en todos los fragmentos a la vez.
+
+        Returns:
+            Resultados por fragmento, en orden de fragmento
+        """
+        message = (target, method, args, kwargs)
+        with self._lock:
+            replies = self._exchange({shard: message for shard in range(self.num_shards)})
+        return [_unwrap(replies[shard]) for shard in range(self.num_shards)]
+
+    def call_many(self, calls: Iterable[Call]) -> List[Any]:
+        """
+        Ejecuta un lote de llamadas: un mensaje por fragmento, todos los
+        fragmentos en paralelo.
+
+        Dentro de un fragmento las llamadas se ejecutan en el orden dado.
+        Una llamada que lanza una excepción no detiene al resto: su
+        resultado es la excepción.
+
+        Args:
+            calls: Tuplas (fragmento, objetivo, método, args, kwargs)
+
+        Returns:
+            Resultados en el mismo orden que las llamadas
+        """
+        batches: Dict[int, List[Tuple[int, tuple]]] = {}
+        for position, (shard, target, method, args, kwargs) in enumerate(calls):
+            batches.setdefault(shard, []).append((position, (target, method, args, kwargs)))
+        results: List[Any] = [None] * sum(len(batch) for batch in batches.values())
+        with self._lock:
+            replies = self._exchange({
+                shard: ("__batch__", [message for _, message in batch]) for shard, batch in batches.items()
+            })
+        for shard, batch in batches.items():
+            for (position, _), (_, value) in zip(batch, _unwrap(replies[shard])):
+                results[position] = value
+        return results
+
+    def close(self) -> None:
+        """Detiene los trabajadores."""
+        if self._closed:
+            return
+        self._closed = True
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+
+    def _exchange(self, messages: Dict[int, Any]) -> Dict[int, Tuple[bool, Any]]:
+        """
+        Envía un mensaje a cada fragmento y lee todas las respuestas (con
+        el cerrojo tomado).
+
+        Args:
+            messages: Fragmento -> mensaje
+
+        Returns:
+            Fragmento -> respuesta (ok, valor)
+
+        Raises:
+            ShardError: Si algún fragmento no respondió (tras leer las
+                respuestas de los demás) o el pool quedó inutilizable
+        """
+        if self._broken is not None:
+            raise ShardError(f"El pool no se puede usar: {self._broken}")
+        replies: Dict[int, Tuple[bool, Any]] = {}
+        failure: Optional[ShardError] = None
+        try:
+            sent = []
+            for shard, message in messages.items():
+                try:
+                    self._connections[shard].send(message)
+                except OSError as error:
+                    failure = failure or ShardError(f"El fragmento {shard} no acepta llamadas: {error}")
+                    continue
+                sent.append(shard)
+            for shard in sent:
+                try:
+                    replies[shard] = self._receive(shard)
+                except ShardError as error:
+                    failure = failure or error
+        except BaseException as error:
+            # Quedan respuestas sin leer que recibiría la llamada siguiente
+            self._broken = f"llamada interrumpida con respuestas pendientes ({type(error).__name__})"
+            raise
+        if failure is not None:
+            raise failure
+        return replies
+
+    def _receive(self, shard: int) -> Tuple[bool, Any]:
+        """Respuesta de un fragmento."""
+        try:
+            return self._connections[shard].recv()
+        except (EOFError, OSError) as error:
+            raise ShardError(f"El fragmento {shard} no respondió: {error}") from error
+
+
+def _unwrap(reply: Tuple[bool, Any]) -> Any:
+    """Devuelve el resultado o relanza la excepción remota."""
+    ok, value = reply
+    if not ok:
+        raise value
+    return value
+
+
+def _serve_shard(shard: int, num_shards: int, connection) -> None:
+    """Bucle de un trabajador: ejecuta llamadas hasta recibir None."""
+    first_id = shard or num_shards
+    user_repository = UserRepository(first_id=first_id, id_step=num_shards)
+    payment_repository = PaymentRepository(first_id=first_id, id_step=num_shards)
+    targets = {
+        "user_repository": user_repository,
+        "payment_repository": payment_repository,
+        "user_controller": UserController(user_repository),
+        "payment_controller": PaymentController(payment_repository),
+        "email_registry": EmailRegistry()
+    }
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        if message[0] == "__batch__":
+            reply = (True, [_invoke(targets, *call) for call in message[1]])
+        else:
+            reply = _invoke(targets, *message)
+        try:
+            connection.send(reply)
+        except Exception as error:
+            # El resultado o la excepción no se pudo serializar
+            connection.send((False, ShardError(f"{type(error).__name__}: {error}")))
+    connection.close()
+
+
+def _invoke(targets: Dict[str, Any], target: str, method: str, args: tuple, kwargs: dict) -> Tuple[bool, Any]:
+    """Ejecuta una llamada y captura su excepción."""
+    try:
+        return True, getattr(targets[target], method)(*args, **kwargs)
+    except Exception as error:
+        return False, error
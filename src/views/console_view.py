@@ -1,9 +1,47 @@
 """Vista de consola para el Sistema de Gestión."""
 
-from typing import Optional
+from typing import List, Optional, Sequence
 from models.user import User, UserRole
 from models.product import Product, ProductCategory
 from models.payment import Payment, PaymentMethod
+from views.table_renderer import Column, TableRenderer
+
+
+# Filas por página en los listados
+PAGE_SIZE = 50
+
+_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+USER_COLUMNS = [
+    Column("ID", lambda u: u.user_id, 8, ">"),
+    Column("Username", lambda u: u.username, 20),
+    Column("Email", lambda u: u.email, 30),
+    Column("Nombre", lambda u: u.full_name, 28),
+    Column("Rol", lambda u: u.role.value, 8),
+    Column("Activo", lambda u: 'Sí' if u.is_active else 'No', 6),
+    Column("Creado", lambda u: u.created_at.strftime(_DATE_FORMAT), 19)
+]
+
+PRODUCT_COLUMNS = [
+    Column("ID", lambda p: p.product_id, 8, ">"),
+    Column("SKU", lambda p: p.sku, 14),
+    Column("Nombre", lambda p: p.name, 30),
+    Column("Categoría", lambda p: p.category.value, 11),
+    Column("Precio", lambda p: f"${p.price:.2f}", 12, ">"),
+    Column("Stock", lambda p: p.stock_quantity, 7, ">"),
+    Column("Disp.", lambda p: 'Sí' if p.is_available else 'No', 5)
+]
+
+PAYMENT_COLUMNS = [
+    Column("ID", lambda p: p.payment_id, 8, ">"),
+    Column("Orden", lambda p: p.order_id, 8, ">"),
+    Column("Usuario", lambda p: p.user_id, 8, ">"),
+    Column("Monto", lambda p: f"${p.amount:.2f}", 12, ">"),
+    Column("Método", lambda p: p.payment_method.value, 13),
+    Column("Estado", lambda p: p.status.value, 10),
+    Column("Creado", lambda p: p.created_at.strftime(_DATE_FORMAT), 19),
+    Column("Procesado", lambda p: p.processed_at.strftime(_DATE_FORMAT) if p.processed_at else "", 19)
+]
 
 
 class ConsoleView:
@@ -58,7 +96,8 @@ class ConsoleView:
         print("1. Crear pago")
         print("2. Procesar pago")
         print("3. Listar pagos")
-        print("4. Volver")
+        print("4. Estado de un trabajo")
+        print("5. Volver")
         print()
     
     @staticmethod
@@ -112,6 +151,49 @@ class ConsoleView:
         if payment.processed_at:
             print(f"Procesado: {payment.processed_at.strftime('%Y-%m-%d %H:%M:%S')}")
     
+    @staticmethod
+    def display_users(users: Sequence[User]) -> None:
+        """Muestra usuarios en una tabla paginada."""
+        ConsoleView.display_listing(users, USER_COLUMNS, "usuarios")
+    
+    @staticmethod
+    def display_products(products: Sequence[Product]) -> None:
+        """Muestra productos en una tabla paginada."""
+        ConsoleView.display_listing(products, PRODUCT_COLUMNS, "productos")
+    
+    @staticmethod
+    def display_payments(payments: Sequence[Payment]) -> None:
+        """Muestra pagos en una tabla paginada."""
+        ConsoleView.display_listing(payments, PAYMENT_COLUMNS, "pagos")
+    
+    @staticmethod
+    def display_listing(rows: Sequence, columns: List[Column], label: str) -> None:
+        """
+        Muestra un listado como tabla, página a página.
+        
+        Si no cabe en una página se ofrece antes guardarlo en un archivo,
+        que se escribe por bloques sin pasar por la pantalla.
+        
+        Args:
+            rows: Entidades a mostrar
+            columns: Columnas de la tabla
+            label: Nombre de las entidades para los mensajes
+        """
+        renderer = TableRenderer(columns, PAGE_SIZE, input_func=ConsoleView.get_input)
+        if len(rows) > PAGE_SIZE:
+            path = ConsoleView.get_input(
+                f"Hay {len(rows)} {label}. Archivo donde guardarlos (Enter para verlos aquí): "
+            ).strip()
+            if path:
+                try:
+                    written = renderer.write_to_file(rows, path)
+                except OSError as error:
+                    ConsoleView.display_error(f"No se pudo escribir {path}: {error}")
+                    return
+                ConsoleView.display_success(f"{written} {label} guardados en {path}")
+                return
+        renderer.render(rows, f"{len(rows)} {label}")
+    
     @staticmethod
     def get_input(prompt: str) -> str:
         """
@@ -0,0 +1,186 @@
+"""Tablas alineadas, paginadas y con escritura en bloque."""
+
+import sys
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, TextIO
+
+
+class Column:
+    """Columna de una tabla: cabecera, valor, ancho máximo y alineación."""
+
+    __slots__ = ("header", "value", "width", "align")
+
+    def __init__(self, header: str, value: Callable[[Any], Any], width: int, align: str = "<"):
+        """
+        Inicializa la columna.
+
+        Args:
+            header: Título de la columna
+            value: Función que obtiene el texto de la celda
+            width: Ancho máximo; los valores más largos se recortan
+            align: "<" izquierda o ">" derecha (números)
+        """
+        self.header = header
+        self.value = value
+        self.width = width
+        self.align = align
+
+
+class TableRenderer:
+    """
+    Renderizador de tablas para consola y archivo.
+
+    Cada página se formatea completa en memoria y se escribe con una sola
+    llamada a write(), en lugar de un print por campo. En consola se
+    pagina con una pregunta entre páginas; a archivo se escribe en
+    bloques con anchos fijos, sin cargar el listado completo.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[Column],
+        page_size: int = 50,
+        output: Optional[TextIO] = None,
+        input_func: Callable[[str], str] = input
+    ):
+        """
+        Inicializa el renderizador.
+
+        Args:
+            columns: Columnas de la tabla
+            page_size: Filas por página en consola
+            output: Salida (por defecto sys.stdout)
+            input_func: Función para leer la respuesta del paginador
+        """
+        if page_size < 1:
+            raise ValueError("page_size debe ser positivo")
+        self.columns = list(columns)
+        self.page_size = page_size
+        self.output = output
+        self.input_func = input_func
+
+    def format_rows(self, rows: Sequence[Any], widths: Optional[List[int]] = None) -> str:
+        """
+        Formatea filas como tabla alineada (cabecera incluida).
+
+        Args:
+            rows: Entidades a formatear
+            widths: Anchos de columna; por defecto se ajustan al contenido
+                sin superar el máximo de cada columna
+
+        Returns:
+            Texto de la tabla terminado en salto de línea
+        """
+        cells = [[_cell(column.value(row)) for column in self.columns] for row in rows]
+        if widths is None:
+            widths = [
+                min(column.width, max([len(column.header)] + [len(line[i]) for line in cells]))
+                for i, column in enumerate(self.columns)
+            ]
+        lines = [self._header(widths)]
+        lines.extend(self._line(line, widths) for line in cells)
+        lines.append("")
+        return "\n".join(lines)
+
+    def render(self, rows: Iterable[Any], title: Optional[str] = None) -> int:
+        """
+        Muestra las filas por páginas.
+
+        Entre páginas se pregunta: Enter para seguir, "t" para mostrar
+        todo sin pausas, "q" para salir.
+
+        Args:
+            rows: Entidades (lista o iterable)
+            title: Título opcional sobre la tabla
+
+        Returns:
+            Número de filas mostradas
+        """
+        output = self.output or sys.stdout
+        total = len(rows) if hasattr(rows, "__len__") else None
+        pages = -(-total // self.page_size) if total is not None else None
+        shown = 0
+        paused = True
+        if title:
+            output.write(f"\n{title}\n")
+        chunks = _chunks(rows, self.page_size)
+        page = next(chunks, None)
+        number = 0
+        while page is not None:
+            number += 1
+            output.write(self.format_rows(page))
+            shown += len(page)
+            output.flush()
+            # Se lee la página siguiente antes de preguntar: sin len() es
+            # la única forma de no pausar después de la última
+            page = next(chunks, None)
+            if not paused or page is None:
+                continue
+            status = f"{shown}/{total}" if total is not None else str(shown)
+            answer = self.input_func(
+                f"-- Página {number}{f'/{pages}' if pages else ''} ({status}) -- "
+                "[Enter] siguiente, [t] todo, [q] salir: "
+            ).strip().lower()
+            if answer == "q":
+                break
+            if answer == "t":
+                paused = False
+        return shown
+
+    def write_to_file(self, rows: Iterable[Any], path: str, chunk_size: int = 5000) -> int:
+        """
+        Escribe todas las filas en un archivo, en bloques.
+
+        Usa los anchos máximos de las columnas para que la alineación sea
+        la misma en todo el archivo sin recorrer antes el listado.
+
+        Args:
+            rows: Entidades (lista o iterable)
+            path: Ruta del archivo
+            chunk_size: Filas formateadas por escritura
+
+        Returns:
+            Número de filas escritas
+        """
+        widths = [column.width for column in self.columns]
+        written = 0
+        with open(path, "w", encoding="utf-8", buffering=1 << 20) as output:
+            output.write(self._header(widths) + "\n")
+            for chunk in _chunks(rows, chunk_size):
+                cells = ([_cell(column.value(row)) for column in self.columns] for row in chunk)
+                output.write("\n".join(self._line(line, widths) for line in cells) + "\n")
+                written += len(chunk)
+        return written
+
+    def _header(self, widths: List[int]) -> str:
+        """Cabecera y línea separadora."""
+        header = self._line([column.header for column in self.columns], widths)
+        return header + "\n" + "  ".join("-" * width for width in widths)
+
+    def _line(self, cells: List[str], widths: List[int]) -> str:
+        """Una fila alineada, recortando las celdas demasiado largas."""
+        parts = []
+        for cell, width, column in zip(cells, widths, self.columns):
+            if len(cell) > width:
+                cell = cell[:width - 1] + "…"
+            parts.append(cell.rjust(width) if column.align == ">" else cell.ljust(width))
+        return "  ".join(parts).rstrip()
+
+
+def _cell(value: Any) -> str:
+    """Texto de una celda."""
+    return "" if value is None else str(value)
+
+
+def _chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Divide un iterable en listas de `size` elementos."""
+    if isinstance(rows, list):
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+        return
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,7 @@
+"""Configuración común de las pruebas."""
+
+import os
+import sys
+
+# Agregar el directorio src al path, como en benchmarks/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
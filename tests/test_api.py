@@ -0,0 +1,124 @@
+"""Pruebas de la conversión de errores de la API."""
+
+import asyncio
+import json
+import logging
+import threading
+
+from api.routes import build_router
+from api.server import BadRequest, HttpServer, Request, Response, Router
+from controllers.payment_controller import PaymentController
+from controllers.product_controller import ProductController
+from controllers.user_controller import UserController
+from jobs.job_queue import JobQueue
+from models.payment import PaymentMethod
+from models.product import ProductCategory
+from repositories.payment_repository import PaymentRepository
+from repositories.product_repository import ProductRepository
+from repositories.user_repository import UserRepository
+
+
+def dispatch(router, method, path, body=None):
+    request = Request(method, path, "HTTP/1.1", {}, json.dumps(body).encode() if body is not None else b"")
+    response = asyncio.run(HttpServer(router)._dispatch(request))
+    return response.status, json.loads(response.body) if response.body else None
+
+
+def api_router(job_queue=None, job_kinds=None):
+    return build_router(
+        UserController(UserRepository()),
+        ProductController(ProductRepository()),
+        PaymentController(PaymentRepository()),
+        job_queue,
+        job_kinds=job_kinds
+    )
+
+
+def test_only_bad_request_maps_to_400(caplog):
+    router = Router()
+
+    def bad(request):
+        raise BadRequest("dato inválido")
+
+    def broken(request):
+        return {}["missing"]
+
+    router.add("GET", "/bad", bad)
+    router.add("GET", "/broken", broken)
+    assert dispatch(router, "GET", "/bad") == (400, {"error": "dato inválido"})
+    with caplog.at_level(logging.ERROR, logger="api.server"):
+        status, body = dispatch(router, "GET", "/broken")
+    assert status == 500
+    assert "missing" not in body["error"]
+    assert "GET /broken" in caplog.text and "KeyError" in caplog.text
+
+
+def test_invalid_arguments_are_rejected_with_400():
+    router = api_router()
+    assert dispatch(router, "GET", "/payments?status=desconocido")[0] == 400
+    assert dispatch(router, "GET", "/products?min_price=barato")[0] == 400
+    assert dispatch(router, "POST", "/payments/transitions", {"payment_ids": [1], "action": "x"})[0] == 400
+    status, body = dispatch(router, "POST", "/users", {
+        "username": 7, "email": "a@b.c", "password": "clave123", "full_name": "A"
+    })
+    assert status == 400 and "username" in body["error"]
+
+
+def test_jobs_reject_unknown_kinds(tmp_path):
+    job_queue = JobQueue(str(tmp_path / "jobs.db"))
+    try:
+        router = api_router(job_queue, job_kinds={"process_payment"})
+        status, body = dispatch(router, "POST", "/jobs", {"kind": "borrar_todo", "payload": {}})
+        assert status == 400 and "borrar_todo" in body["error"]
+        assert job_queue.counts().get("queued", 0) == 0
+        status, body = dispatch(router, "POST", "/jobs", {"kind": "process_payment", "payload": {"payment_id": 1}})
+        assert status == 202 and job_queue.get(body["job_id"]).kind == "process_payment"
+    finally:
+        job_queue.close()
+
+
+def test_non_finite_numbers_are_rejected():
+    router = api_router()
+    product = {"name": "Lámpara", "price": 10.0, "category": "electronics", "sku": "L-1"}
+    assert dispatch(router, "POST", "/products", product)[0] == 201
+    for price in ("nan", "inf", "-Infinity"):
+        assert dispatch(router, "POST", "/products", {**product, "sku": "L-2", "price": price})[0] == 400
+        assert dispatch(router, "PUT", "/products/1/price", {"price": price})[0] == 400
+    assert dispatch(router, "GET", "/products?min_price=nan")[0] == 400
+
+    # NaN e Infinity sin comillas no son JSON válido
+    request = Request("PUT", "/products/1/price", "HTTP/1.1", {}, b'{"price": NaN}')
+    assert asyncio.run(HttpServer(router)._dispatch(request)).status == 400
+    request = Request("POST", "/payments", "HTTP/1.1", {},
+                      b'{"order_id": 1, "user_id": 1, "amount": Infinity, "payment_method": "cash"}')
+    assert asyncio.run(HttpServer(router)._dispatch(request)).status == 400
+    assert dispatch(router, "GET", "/products/1")[1]["price"] == 10.0
+
+
+def test_controllers_reject_non_finite_amounts():
+    products = ProductController(ProductRepository())
+    assert products.create_product("A", "", float("nan"), ProductCategory.ELECTRONICS, 1, "A-1") is None
+    product = products.create_product("B", "", 5.0, ProductCategory.ELECTRONICS, 1, "B-1")
+    assert not products.update_price(product.product_id, float("nan"))
+    assert products.get_product(product.product_id).price == 5.0
+    payments = PaymentController(PaymentRepository())
+    assert payments.create_payment(1, 1, float("nan"), PaymentMethod.CASH) is None
+
+
+def test_blocking_handlers_do_not_stall_the_event_loop():
+    router = Router()
+    release = threading.Event()
+    router.add("POST", "/slow", lambda request: release.wait(5) and Response.json({"slow": True}), blocking=True)
+    router.add("GET", "/fast", lambda request: Response.json({"fast": True}))
+    server = HttpServer(router)
+
+    async def scenario():
+        slow = asyncio.ensure_future(server._dispatch(Request("POST", "/slow", "HTTP/1.1", {})))
+        # La petición rápida se atiende mientras la lenta espera en su hilo
+        fast = await asyncio.wait_for(server._dispatch(Request("GET", "/fast", "HTTP/1.1", {})), 2)
+        assert not slow.done()
+        release.set()
+        return fast, await slow
+
+    fast, slow = asyncio.run(scenario())
+    assert fast.status == 200 and slow.status == 200
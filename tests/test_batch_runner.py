@@ -0,0 +1,85 @@
+"""Pruebas del modo por lotes."""
+
+import pytest
+
+from batch.runner import BatchError, BatchRunner
+from controllers.payment_controller import PaymentController
+from controllers.product_controller import ProductController
+from controllers.user_controller import UserController
+from repositories.payment_repository import PaymentRepository
+from repositories.product_repository import ProductRepository
+from repositories.user_repository import UserRepository
+
+
+@pytest.fixture
+def runner():
+    payments = PaymentController(PaymentRepository())
+    payments._process_with_gateway = lambda payment, key=None: True
+    return BatchRunner(UserController(UserRepository()), ProductController(ProductRepository()), payments)
+
+
+def test_parse_accepts_key_value_and_json_lines(runner):
+    assert runner.parse("  # comentario") is None
+    assert runner.parse("") is None
+    assert runner.parse('register_user username=ana full_name="Ana Gil"') == (
+        "register_user", {"username": "ana", "full_name": "Ana Gil"}
+    )
+    assert runner.parse('{"cmd": "add_stock", "sku": "A-1", "quantity": 3}') == (
+        "add_stock", {"sku": "A-1", "quantity": 3}
+    )
+
+
+@pytest.mark.parametrize("line", [
+    'borrar_todo id=1',
+    'add_stock sku',
+    'add_stock sku="A-1',
+    '{"cmd": ["add_stock"]}',
+    '{"cmd": {"x": 1}}',
+    '{"sku": "A-1"}',
+    '["add_stock"]',
+    '{"cmd": "add_stock",',
+])
+def test_parse_rejects_malformed_lines(runner, line):
+    with pytest.raises(BatchError):
+        runner.parse(line)
+
+
+def test_run_reports_results_per_command(runner):
+    report = runner.run([
+        "register_user username=ana email=ana@x.com password=secreto123 full_name=Ana",
+        "create_product name=Mouse price=19.9 category=electronics sku=MOU-1 stock_quantity=5",
+        "add_stock sku=MOU-1 quantity=10",
+        "reduce_stock sku=MOU-1 quantity=100",
+        "create_payment order_id=1 user_id=@last amount=19.9 payment_method=credit_card",
+        "process_payment payment_id=@last",
+        '{"cmd": ["process_payment"]}',
+        "update_price sku=MOU-1 price=barato",
+        "add_stock sku=NO-EXISTE quantity=1",
+    ])
+    assert report.lines == 9
+    counts = {name: (s.count, s.succeeded, s.failed, s.errors) for name, s in report.commands.items()}
+    assert counts == {
+        "register_user": (1, 1, 0, 0),
+        "create_product": (1, 1, 0, 0),
+        "add_stock": (2, 1, 0, 1),
+        "reduce_stock": (1, 0, 1, 0),
+        "create_payment": (1, 1, 0, 0),
+        "process_payment": (1, 1, 0, 0),
+        "update_price": (1, 0, 0, 1),
+        "(inválida)": (0, 0, 0, 1),
+    }
+    assert report.error_count == 3
+    assert [line for line, _ in report.errors] == [7, 8, 9]
+    assert runner.product_controller.product_repository.find_by_sku("MOU-1").stock_quantity == 15
+
+    data = report.to_dict()
+    assert data["lines"] == 9 and len(data["errors"]) == 3
+    assert data["commands"]["add_stock"]["count"] == 2
+    assert "línea 8: update_price" in report.summary()
+
+
+def test_stop_on_error_stops_at_the_first_error(runner):
+    report = runner.run(['{"cmd": 7}', "create_product name=A price=1 category=electronics sku=A-1"],
+                        stop_on_error=True)
+    assert report.lines == 1
+    assert "create_product" not in report.commands
@@ -0,0 +1,71 @@
+"""Pruebas de los reembolsos masivos."""
+
+import json
+import time
+
+from controllers.payment_controller import PaymentController
+from jobs.bulk_refund import GATEWAY_REFUNDED, REFUNDED, BulkRefundJob
+from models.payment import PaymentMethod, PaymentStatus
+from repositories.payment_repository import PaymentRepository
+
+
+def completed_payments(count):
+    controller = PaymentController(PaymentRepository())
+    for order_id in range(1, count + 1):
+        payment = controller.create_payment(order_id, 1, 10.0, PaymentMethod.CREDIT_CARD)
+        controller.transition_many([payment.payment_id], "process")
+        controller.transition_many([payment.payment_id], "complete")
+    return controller
+
+
+def journal(path):
+    with open(path, encoding="utf-8") as lines:
+        return {entry["payment_id"]: entry["outcome"] for entry in map(json.loads, lines)}
+
+
+def test_local_rejection_after_gateway_refund_is_not_resent(tmp_path):
+    controller = completed_payments(3)
+    path = str(tmp_path / "refunds.jsonl")
+
+    def gateway(payment, key):
+        if payment.payment_id == 2:
+            # Otro proceso reembolsa el pago mientras el gateway responde
+            controller.refund_payment(2)
+        return True
+
+    report = BulkRefundJob(controller, path, rate_limit=1000, gateway=gateway).run(
+        controller.list_payments_by_status(PaymentStatus.COMPLETED)
+    )
+    assert (report.refunded, report.gateway_refunded, report.failed) == (2, 1, 0)
+    assert journal(path)[2] == GATEWAY_REFUNDED
+
+    sent = []
+    rerun = BulkRefundJob(
+        controller, path, rate_limit=1000, retry_failed=True,
+        gateway=lambda payment, key: sent.append(payment.payment_id) or True
+    ).run(controller.payment_repository.find_all())
+    assert sent == [] and rerun.resumed == 3
+
+
+def test_interrupt_while_draining_still_records_in_flight_refunds(tmp_path):
+    controller = completed_payments(8)
+    path = str(tmp_path / "refunds.jsonl")
+    interrupts = []
+
+    def progress(report):
+        if not interrupts and report.done:
+            interrupts.append(report.done)
+            raise KeyboardInterrupt
+
+    def gateway(payment, key):
+        time.sleep(0.01)
+        return True
+
+    # Con concurrencia 8 todo se envía antes de recoger la primera respuesta
+    job = BulkRefundJob(controller, path, concurrency=8, rate_limit=1000,
+                        progress=progress, progress_every=1, gateway=gateway)
+    report = job.run(controller.list_payments_by_status(PaymentStatus.COMPLETED))
+    assert interrupts and report.interrupted
+    assert report.refunded == 8
+    assert set(journal(path).values()) == {REFUNDED}
+    assert len(journal(path)) == 8
@@ -0,0 +1,66 @@
+"""Pruebas de la caché de lectura de repositorios."""
+
+from models.product import ProductCategory
+from models.user import User, UserRole
+from repositories.cached_repository import CachedRepository
+from repositories.user_repository import UserRepository
+
+
+def make_users(count):
+    repository = UserRepository()
+    for user_id in range(1, count + 1):
+        repository.save(User(user_id, f"user{user_id}", f"user{user_id}@example.com",
+                             "hash", UserRole.CLIENT, f"User {user_id}"))
+    return repository
+
+
+def indexed_keys(cached):
+    return sum(len(keys) for keys in cached._keys_by_entity.values())
+
+
+def test_evicted_keys_leave_the_entity_map():
+    cached = CachedRepository(make_users(5000), capacity=100)
+    for user_id in range(1, 5001):
+        cached.find_by_id(user_id)
+        cached.find_by_email(f"user{user_id}@example.com")
+        assert indexed_keys(cached) <= 100
+    assert len(cached._keys_by_entity) <= 100
+    assert cached.stats()["evictions"] == 9900
+
+
+def test_expired_keys_leave_the_entity_map():
+    now = [0.0]
+    cached = CachedRepository(make_users(10), capacity=100, ttl=5, clock=lambda: now[0])
+    for user_id in range(1, 11):
+        cached.find_by_id(user_id)
+    now[0] = 10.0
+    for user_id in range(1, 11):
+        assert cached.cache.get(("find_by_id", user_id)) == (False, None)
+    assert cached._keys_by_entity == {}
+    assert cached.find_by_id(3).user_id == 3
+    assert cached._keys_by_entity == {3: {("find_by_id", 3)}}
+
+
+def test_application_reads_through_the_cache_when_configured(monkeypatch):
+    from main import SistemaGestion
+
+    monkeypatch.delenv("SG_CACHE_SIZE", raising=False)
+    app = SistemaGestion(enable_metrics=False)
+    assert app.user_cache is None
+    assert app.user_controller.user_repository is app.user_repository
+
+    monkeypatch.setenv("SG_CACHE_SIZE", "100")
+    app = SistemaGestion(enable_metrics=False)
+    assert app.user_controller.user_repository is app.user_cache
+    assert app.product_controller.product_repository is app.product_cache
+
+    app.user_controller.register_user("ana", "ana@example.com", "secreta1", UserRole.CLIENT, "Ana")
+    assert app.user_controller.authenticate("ana", "secreta1") is not None
+    assert app.user_controller.authenticate("ana", "secreta1") is not None
+    assert app.user_cache.stats()["hits"] >= 1
+
+    product = app.product_controller.create_product("Lámpara", "", 20.0, ProductCategory.FURNITURE, 5, "SKU-1")
+    app.product_controller.get_product(product.product_id)
+    assert app.product_controller.update_price(product.product_id, 25.0)
+    assert app.product_controller.get_product(product.product_id).price == 25.0
+    assert app.product_cache.find_by_sku("SKU-1").price == 25.0
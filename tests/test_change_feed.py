@@ -0,0 +1,77 @@
+"""Pruebas del flujo de cambios (CDC)."""
+
+import json
+
+from repositories.change_feed import INSERT, UPDATE, ChangeFeed
+
+
+def publish(feed, count, entity_id=1):
+    return [feed.publish("user", entity_id, UPDATE, {"n": n}).sequence for n in range(count)]
+
+
+def sequences(feed, from_sequence=1):
+    return [event.sequence for event in feed.read(from_sequence)]
+
+
+def test_reopened_log_continues_the_sequence_and_resumes_subscribers(tmp_path):
+    path = str(tmp_path / "cambios.jsonl")
+    feed = ChangeFeed(path)
+    assert publish(feed, 3) == [1, 2, 3]
+    feed.close()
+
+    feed = ChangeFeed(path)
+    assert feed.sequence == 3
+    received = []
+    subscription = feed.subscribe(lambda event: received.append(event.sequence), from_sequence=2)
+    last = feed.publish("product", 7, INSERT, {"name": "x"}).sequence
+    assert last == 4
+    assert subscription.wait_for(last, timeout=5)
+    assert received == [2, 3, 4]
+    assert sequences(feed, 3) == [3, 4]
+    feed.close()
+
+
+def test_slow_subscriber_catches_up_from_the_log(tmp_path):
+    feed = ChangeFeed(str(tmp_path / "cambios.jsonl"))
+    received = []
+    subscription = feed.subscribe(lambda event: received.append(event.sequence), max_lag=2)
+    publish(feed, 50)
+    assert subscription.wait_for(50, timeout=5)
+    assert received == list(range(1, 51))
+    feed.close()
+
+
+def test_torn_write_is_truncated_on_reopen(tmp_path):
+    path = tmp_path / "cambios.jsonl"
+    feed = ChangeFeed(str(path))
+    publish(feed, 2)
+    feed.close()
+    with open(path, "a", encoding="utf-8") as log:
+        log.write('{"seq": 3, "at"')
+
+    feed = ChangeFeed(str(path))
+    assert feed.sequence == 2
+    assert feed.publish("user", 1, UPDATE).sequence == 3
+    feed.close()
+
+    feed = ChangeFeed(str(path))
+    assert feed.sequence == 3
+    assert sequences(feed) == [1, 2, 3]
+    assert all(json.loads(line) for line in path.read_text(encoding="utf-8").splitlines())
+    feed.close()
+
+
+def test_corrupt_lines_are_skipped(tmp_path):
+    path = tmp_path / "cambios.jsonl"
+    feed = ChangeFeed(str(path))
+    publish(feed, 2)
+    feed.close()
+    with open(path, "a", encoding="utf-8") as log:
+        log.write('{"seq": 3, "at"\n["no es un cambio"]\n')
+
+    feed = ChangeFeed(str(path))
+    assert feed.sequence == 2
+    assert sequences(feed) == [1, 2]
+    assert feed.publish("user", 1, UPDATE).sequence == 3
+    assert sequences(feed) == [1, 2, 3]
+    feed.close()
@@ -0,0 +1,79 @@
+"""Pruebas de las recomendaciones "también compraron"."""
+
+import random
+from collections import Counter
+from itertools import combinations
+
+from models.payment import OrderItem
+from recommendations.co_purchase import CoPurchaseEngine
+
+
+def random_orders(count=3000, products=60, seed=11):
+    rng = random.Random(seed)
+    # Unos pocos productos populares para que haya empates y desplazamientos
+    weights = [1 / (p + 1) for p in range(products)]
+    return [rng.choices(range(products), weights, k=rng.randint(1, 6)) for _ in range(count)]
+
+
+def expected_top(orders, product_id, k):
+    together = Counter()
+    for order in orders:
+        distinct = set(order)
+        if product_id in distinct:
+            together.update(distinct - {product_id})
+    return sorted(together.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+def test_top_k_matches_a_brute_force_count():
+    orders = random_orders()
+    engine = CoPurchaseEngine(k=5)
+    engine.build(orders)
+    for product_id in range(60):
+        assert engine.also_bought(product_id) == expected_top(orders, product_id, 5)
+    assert engine.also_bought(999) == []
+
+
+def test_incremental_orders_match_build():
+    orders = random_orders()
+    built = CoPurchaseEngine(k=8)
+    built.build(orders)
+
+    incremental = CoPurchaseEngine(k=8)
+    for order in orders:
+        incremental.add_order(order)
+
+    mixed = CoPurchaseEngine(k=8)
+    mixed.build(orders[:1000])
+    for order in orders[1000:]:
+        mixed.add_order(order)
+
+    for engine in (incremental, mixed):
+        assert engine._top == built._top
+        assert engine.orders == built.orders == len(orders)
+        assert len(engine) == len(built)
+
+
+def test_counts_ignore_quantities_and_repeated_products():
+    engine = CoPurchaseEngine(k=3)
+    engine.add_order([1, 2, 2, 3])
+    engine.add_order([2, 1])
+    assert engine.times_bought_together(1, 2) == engine.times_bought_together(2, 1) == 2
+    assert engine.times_bought_together(2, 3) == 1
+    assert engine.times_bought_together(2, 2) == engine.orders_with(2) == 2
+    assert engine.also_bought(2) == [(1, 2), (3, 1)]
+    assert engine.also_bought(2, n=1) == [(1, 2)]
+    assert len(engine) == 3
+
+
+def test_build_from_items_groups_by_order():
+    items = [
+        OrderItem(1, 10, 1, 2, 5.0), OrderItem(2, 10, 2, 1, 3.0),
+        OrderItem(3, 11, 1, 1, 5.0), OrderItem(4, 11, 2, 4, 3.0), OrderItem(5, 11, 3, 1, 9.0),
+        OrderItem(6, 12, 3, 1, 9.0),
+    ]
+    engine = CoPurchaseEngine()
+    engine.build_from_items(iter(items))
+    assert engine.orders == 3
+    assert engine.also_bought(1) == [(2, 2), (3, 1)]
+    assert engine.also_bought(3) == [(1, 1), (2, 1)]
+    assert sorted(engine._pairs) == sorted(combinations([1, 2, 3], 2))
@@ -0,0 +1,151 @@
+"""Pruebas de la cola de trabajos."""
+
+import copy
+import threading
+import time
+
+import pytest
+
+from controllers.payment_controller import PaymentController
+from jobs.job_queue import DONE, JobQueue, JobWorkerPool, payment_handlers
+from models.payment import PaymentMethod, PaymentStatus
+from repositories.payment_repository import PaymentRepository
+
+
+@pytest.fixture
+def setup(tmp_path):
+    now = [1000.0]
+    job_queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=30, clock=lambda: now[0])
+    controller = PaymentController(PaymentRepository())
+    charged = []
+    controller._process_with_gateway = lambda payment, key=None: charged.append(payment.payment_id) or True
+    handlers = payment_handlers(controller)
+    pool = JobWorkerPool(job_queue, handlers, workers=1)
+    yield now, job_queue, controller, charged, handlers, pool
+    job_queue.close()
+
+
+def enqueue_payment(job_queue, controller):
+    payment = controller.create_payment(1, 1, 40.0, PaymentMethod.CREDIT_CARD)
+    job_id = job_queue.enqueue("process_payment", {"payment_id": payment.payment_id})
+    return payment.payment_id, job_id
+
+
+def test_redelivery_after_charging_does_not_charge_again(setup):
+    now, job_queue, controller, charged, handlers, pool = setup
+    payment_id, job_id = enqueue_payment(job_queue, controller)
+
+    # El trabajador cobra el pago y muere antes de completar el trabajo
+    [job] = job_queue.claim("muerto")
+    handlers["process_payment"](job.payload)
+    assert charged == [payment_id]
+
+    now[0] += 60
+    assert pool.run_once() == 1
+    job = job_queue.get(job_id)
+    assert job.status == DONE and job.attempts == 2
+    assert job.result == {"payment_id": payment_id, "status": "completed"}
+    assert charged == [payment_id]
+
+
+def test_redelivery_resumes_a_payment_left_processing(setup):
+    now, job_queue, controller, charged, handlers, pool = setup
+    payment_id, job_id = enqueue_payment(job_queue, controller)
+
+    # El trabajador pasa el pago a PROCESSING y muere antes del gateway
+    job_queue.claim("muerto")
+    payment = copy.copy(controller.get_payment(payment_id))
+    payment.process()
+    controller.payment_repository.update(payment)
+
+    now[0] += 60
+    assert pool.run_once() == 1
+    assert job_queue.get(job_id).status == DONE
+    assert controller.get_payment(payment_id).status == PaymentStatus.COMPLETED
+    assert charged == [payment_id]
+
+
+def test_jobs_reclaimed_while_the_batch_runs_are_not_run_twice(setup):
+    now, job_queue, controller, charged, handlers, pool = setup
+    first, first_job = enqueue_payment(job_queue, controller)
+    second, second_job = enqueue_payment(job_queue, controller)
+    stolen = []
+
+    def slow_gateway(payment, key=None):
+        # Sin latido (run_once en este hilo), el primer cobro tarda más
+        # que el arrendamiento y otro trabajador reclama el lote
+        if payment.payment_id == first:
+            now[0] += 60
+            stolen.extend(job_queue.claim("otro"))
+        charged.append(payment.payment_id)
+        return True
+
+    controller._process_with_gateway = slow_gateway
+    assert pool.run_once() == 2
+    assert sorted(job.job_id for job in stolen) == [first_job, second_job]
+    # El segundo trabajo ya no era suyo: no lo ejecuta
+    assert charged == [first]
+
+    for job in stolen:
+        pool._execute(job)
+    assert charged == [first, second]
+    assert job_queue.get(first_job).status == DONE
+    assert job_queue.get(second_job).status == DONE
+
+
+def test_heartbeat_keeps_the_lease_of_a_slow_job(setup):
+    now, job_queue, controller, charged, handlers, pool = setup
+    payment_id, job_id = enqueue_payment(job_queue, controller)
+    in_gateway = threading.Event()
+    release = threading.Event()
+
+    def slow_gateway(payment, key=None):
+        in_gateway.set()
+        release.wait(5)
+        return True
+
+    controller._process_with_gateway = slow_gateway
+    pool = JobWorkerPool(job_queue, handlers, workers=1, heartbeat_interval=0.01)
+    pool.start()
+    try:
+        assert in_gateway.wait(5)
+        for _ in range(3):
+            now[0] += 20
+            time.sleep(0.1)
+        # Sin latido el arrendamiento habría vencido hace 30 s
+        assert job_queue.claim("otro") == []
+    finally:
+        release.set()
+        pool.stop()
+    job = job_queue.get(job_id)
+    assert job.status == DONE and job.attempts == 1
+    assert controller.get_payment(payment_id).status == PaymentStatus.COMPLETED
+
+
+class WorkerDied(BaseException):
+    """El proceso del trabajador murió durante la llamada al gateway."""
+
+
+def test_redelivered_charge_reuses_the_idempotency_key(setup):
+    now, job_queue, controller, charged, handlers, pool = setup
+    keys = []
+
+    def dying_gateway(payment, key=None):
+        keys.append(key)
+        raise WorkerDied()
+
+    controller._process_with_gateway = dying_gateway
+    payment_id, _ = enqueue_payment(job_queue, controller)
+    with pytest.raises(WorkerDied):
+        pool.run_once("muerto")
+    assert controller.get_payment(payment_id).status == PaymentStatus.PROCESSING
+
+    controller._process_with_gateway = lambda payment, key=None: keys.append(key) or False
+    now[0] += 60
+    assert pool.run_once() == 1
+    assert keys[0] == keys[1]
+    assert controller.get_payment(payment_id).status == PaymentStatus.FAILED
+
+    # Un reintento tras el rechazo es otro cobro, con otra clave
+    controller.retry_payment(payment_id)
+    assert len(keys) == 3 and keys[2] != keys[1]
@@ -0,0 +1,69 @@
+"""Pruebas de los puntos de pedido y los avisos de stock bajo."""
+
+import pytest
+
+from controllers.product_controller import ProductController
+from models.product import ProductCategory
+from repositories.product_repository import ProductRepository
+
+
+@pytest.fixture
+def controller():
+    controller = ProductController(ProductRepository())
+    controller.alerts = []
+    controller.on_low_stock = lambda product: controller.alerts.append((product.product_id, product.stock_quantity))
+    return controller
+
+
+def create(controller, stock, threshold=None):
+    count = controller.product_repository.count()
+    return controller.create_product(
+        f"P{count}", "", 10.0, ProductCategory.OTHER, stock, f"SKU-{count}", reorder_threshold=threshold
+    ).product_id
+
+
+def test_alert_fires_once_when_stock_crosses_the_threshold(controller):
+    product_id = create(controller, 10, threshold=4)
+    assert controller.reduce_stock(product_id, 5)
+    assert controller.alerts == []
+    assert controller.reduce_stock(product_id, 1)
+    assert controller.alerts == [(product_id, 4)]
+    assert controller.reduce_stock(product_id, 2)
+    assert controller.alerts == [(product_id, 4)]
+
+    assert controller.add_stock(product_id, 10)
+    assert controller.reduce_stock(product_id, 9)
+    assert controller.alerts == [(product_id, 4), (product_id, 3)]
+
+
+def test_lowering_or_raising_the_threshold(controller):
+    product_id = create(controller, 5)
+    assert controller.list_low_stock() == []
+    assert controller.set_reorder_threshold(product_id, 5)
+    assert controller.alerts == [(product_id, 5)]
+    assert [p.product_id for p in controller.list_low_stock()] == [product_id]
+    assert controller.set_reorder_threshold(product_id, None)
+    assert controller.list_low_stock() == []
+    assert not controller.set_reorder_threshold(product_id, -1)
+
+
+def test_low_stock_is_ordered_by_urgency_and_paged(controller):
+    repository = controller.product_repository
+    ids = {
+        "empty": create(controller, 0, threshold=10),
+        "half": create(controller, 5, threshold=10),
+        "edge": create(controller, 3, threshold=3),
+        "fine": create(controller, 20, threshold=10),
+        "none": create(controller, 0),
+    }
+    expected = [ids["empty"], ids["half"], ids["edge"]]
+    assert [p.product_id for p in controller.list_low_stock()] == expected
+    assert repository.count_low_stock() == 3
+
+    first = repository.find_low_stock(limit=2)
+    cursor = (first[-1].restock_urgency(), first[-1].product_id)
+    assert [p.product_id for p in first + repository.find_low_stock(after=cursor)] == expected
+
+    assert controller.add_stock(ids["empty"], 50)
+    assert controller.delete_product(ids["half"])
+    assert [p.product_id for p in controller.list_low_stock()] == [ids["edge"]]
@@ -0,0 +1,76 @@
+"""Pruebas de los histogramas, contadores y la exposición de métricas."""
+
+import random
+import threading
+
+from monitoring.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_percentiles_are_within_the_bucket_error():
+    histogram = Histogram()
+    values = list(range(1, 100_001))
+    random.Random(7).shuffle(values)
+    for value in values:
+        histogram.record(value * 1000)
+    assert histogram.count == 100_000
+    for fraction in (0.5, 0.9, 0.99, 0.999):
+        exact = int(fraction * 100_000) * 1000
+        assert abs(histogram.percentile(fraction) - exact) <= exact / 32
+    assert abs(histogram.max() - 100_000_000) <= 100_000_000 / 32
+    assert histogram.percentile(0) <= histogram.percentile(0.5) <= histogram.max()
+
+
+def test_small_values_are_exact_and_empty_histogram_is_zero():
+    histogram = Histogram()
+    assert histogram.percentile(0.99) == 0 and histogram.max() == 0
+    for value in (0, 3, 3, 7, 40):
+        histogram.record(value)
+    assert histogram.percentile(0.5) == 3
+    assert histogram.max() == 40
+    histogram.reset()
+    assert histogram.count == 0 and histogram.max() == 0
+
+
+def test_concurrent_updates_and_reads_are_consistent():
+    histogram = Histogram()
+    counter = Counter()
+    errors = []
+
+    def write():
+        for value in range(20_000):
+            histogram.record(value)
+            counter.inc()
+
+    def read():
+        try:
+            for _ in range(200):
+                histogram.percentile(0.99)
+                histogram.max()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write) for _ in range(4)] + [threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert histogram.count == counter.value == 80_000
+
+
+def test_expose_and_reset():
+    registry = MetricsRegistry(prefix="t")
+    registry.histogram("latency_seconds", "Latencia", route="/a").record(2_000_000)
+    registry.counter("hits_total", "Aciertos", route="/a").inc(3)
+    registry.gauge("queue_depth", lambda: 5, "Profundidad")
+    text = registry.expose()
+    assert '# TYPE t_latency_seconds summary' in text
+    assert 't_latency_seconds{route="/a",quantile="0.5"} 0.001998848' in text
+    assert 't_latency_seconds_count{route="/a"} 1' in text
+    assert 't_hits_total{route="/a"} 3' in text
+    assert 't_queue_depth 5' in text
+
+    registry.reset()
+    text = registry.expose()
+    assert 't_hits_total{route="/a"} 0' in text
+    assert 't_latency_seconds_count{route="/a"} 0' in text
@@ -0,0 +1,75 @@
+"""Pruebas de las búsquedas de pagos por intervalo de tiempo."""
+
+import copy
+import random
+from datetime import datetime, timedelta
+
+from models.payment import Payment, PaymentMethod, PaymentStatus
+from repositories.payment_repository import PaymentRepository
+
+
+START = datetime(2026, 3, 1)
+
+
+def payments(count=300):
+    rng = random.Random(5)
+    repository = PaymentRepository()
+    for n in range(1, count + 1):
+        payment = Payment(n, n, n % 9, float(n), PaymentMethod.CASH)
+        payment.created_at = START + timedelta(minutes=rng.randrange(10_000))
+        repository.save(payment)
+    return repository
+
+
+def complete(repository, payment_id, when):
+    payment = copy.copy(repository.find_by_id(payment_id))
+    payment.process()
+    payment.complete()
+    payment.processed_at = when
+    return repository.update(payment)
+
+
+def test_created_range_is_inclusive_and_ordered():
+    repository = payments()
+    low, high = START + timedelta(minutes=2000), START + timedelta(minutes=5000)
+    expected = sorted(
+        (p for p in repository.find_all() if low <= p.created_at <= high),
+        key=lambda p: (p.created_at, p.payment_id)
+    )
+    found = repository.find_created_between(low, high)
+    assert [p.created_at for p in found] == [p.created_at for p in expected]
+    assert {p.payment_id for p in found} == {p.payment_id for p in expected}
+
+    edge = found[0].created_at
+    assert found[0] in repository.find_created_between(edge, edge)
+    assert repository.find_created_between(low, high, limit=5) == found[:5]
+    assert len(repository.find_created_between()) == 300
+
+
+def test_status_filter_and_limit():
+    repository = payments()
+    for payment_id in range(1, 301, 4):
+        payment = copy.copy(repository.find_by_id(payment_id))
+        payment.process()
+        repository.update(payment)
+    processing = repository.find_created_between(status=PaymentStatus.PROCESSING)
+    assert {p.payment_id for p in processing} == set(range(1, 301, 4))
+    assert repository.find_created_between(status=PaymentStatus.PROCESSING, limit=3) == processing[:3]
+
+
+def test_processed_range_follows_updates_and_deletes():
+    repository = payments(20)
+    assert repository.find_processed_between() == []
+    complete(repository, 3, START + timedelta(days=2))
+    complete(repository, 7, START + timedelta(days=1))
+    assert [p.payment_id for p in repository.find_processed_between()] == [7, 3]
+    assert [p.payment_id for p in repository.find_processed_between(START + timedelta(days=1, hours=1))] == [3]
+
+    payment = copy.copy(repository.find_by_id(7))
+    payment.processed_at = START + timedelta(days=3)
+    repository.update(payment)
+    assert [p.payment_id for p in repository.find_processed_between()] == [3, 7]
+
+    repository.delete(3)
+    assert [p.payment_id for p in repository.find_processed_between()] == [7]
+    assert all(p.payment_id != 3 for p in repository.find_created_between())
@@ -0,0 +1,38 @@
+"""Pruebas de las transiciones de pagos."""
+
+import pytest
+
+from controllers.payment_controller import PaymentController
+from models.payment import Payment, PaymentMethod, PaymentStatus
+from repositories.payment_repository import PaymentRepository
+
+
+def payment_in(controller, *actions):
+    payment = controller.create_payment(1, 1, 25.0, PaymentMethod.CREDIT_CARD)
+    for action in actions:
+        assert controller.transition_many([payment.payment_id], action) == {payment.payment_id: None}
+    return payment.payment_id
+
+
+def test_fail_is_only_allowed_before_completion():
+    payment = Payment(1, 1, 1, 10.0, PaymentMethod.CREDIT_CARD)
+    payment.process()
+    payment.complete()
+    with pytest.raises(ValueError):
+        payment.fail("tarde")
+    assert payment.status == PaymentStatus.COMPLETED
+
+
+def test_transition_many_rejects_fail_on_finished_payments():
+    controller = PaymentController(PaymentRepository())
+    refunded = payment_in(controller, "process", "complete", "refund")
+    cancelled = payment_in(controller, "cancel")
+    processing = payment_in(controller, "process")
+
+    outcomes = controller.transition_many([refunded, cancelled, processing], "fail")
+    assert outcomes[refunded] is not None and outcomes[cancelled] is not None
+    assert outcomes[processing] is None
+    assert controller.get_payment(refunded).status == PaymentStatus.REFUNDED
+    assert controller.get_payment(cancelled).status == PaymentStatus.CANCELLED
+    assert controller.get_payment(processing).status == PaymentStatus.FAILED
+    assert controller.payment_repository.find_by_status(PaymentStatus.FAILED) == [controller.get_payment(processing)]
@@ -0,0 +1,103 @@
+"""Pruebas del planificador de consultas en memoria."""
+
+import threading
+
+from models.payment import Payment, PaymentMethod, PaymentStatus
+from models.product import Product, ProductCategory
+from repositories.payment_repository import PaymentRepository
+from repositories.product_repository import ProductRepository
+from repositories.query import Eq
+
+
+def payments(count=60):
+    repository = PaymentRepository()
+    for n in range(1, count + 1):
+        payment = Payment(n, n % 7, n % 5, float(n), PaymentMethod.CASH, f"tx-{n}")
+        if n % 3 == 0:
+            payment.process()
+        repository.save(payment)
+    return repository
+
+
+def scan(repository, **filters):
+    return [p for p in repository.find_all() if all(getattr(p, f) == v for f, v in filters.items())]
+
+
+def ids(payments):
+    return sorted(p.payment_id for p in payments)
+
+
+def test_planner_picks_the_most_selective_index():
+    repository = payments()
+    plan = repository.explain(status=PaymentStatus.PENDING, order_id=2)
+    assert plan.access == "index" and plan.path.field == "order_id"
+    assert str(plan).startswith("INDEX hash(order_id) order_id = 2")
+    assert ids(repository.find_where(status=PaymentStatus.PENDING, order_id=2)) == ids(
+        scan(repository, status=PaymentStatus.PENDING, order_id=2)
+    )
+
+    plan = repository.explain(transaction_id="tx-9", user_id=4)
+    assert plan.path.field == "transaction_id" and plan.estimated_rows == 1
+    assert [p.payment_id for p in repository.find_where(transaction_id="tx-9", user_id=4)] == [9]
+
+
+def test_unindexed_conditions_scan_and_or_uses_a_union_only_when_fully_indexed():
+    repository = payments()
+    assert repository.explain(amount__gte=10).is_full_scan
+    assert str(repository.explain(amount__gte=10)) == "FULL SCAN (~60 filas) -> FILTER 10 <= amount"
+
+    union = repository.explain(Eq("user_id", 1) | Eq("transaction_id", "tx-2"))
+    assert union.access == "union" and len(union.branches) == 2
+    found = repository.find_where(Eq("user_id", 1) | Eq("transaction_id", "tx-2"))
+    assert ids(found) == sorted({p.payment_id for p in scan(repository, user_id=1)} | {2})
+    assert repository.explain(Eq("user_id", 1) | Eq("amount", 3.0)).is_full_scan
+
+
+def test_order_by_a_sorted_index_streams_with_limit():
+    repository = ProductRepository()
+    for n in range(1, 41):
+        category = ProductCategory.ELECTRONICS if n % 2 else ProductCategory.BOOKS
+        repository.save(Product(n, f"P{n}", "", float(n % 13), category, 1, f"SKU-{n}"))
+    plan = repository.explain(order_by="-price", limit=5)
+    assert plan.access == "index_scan" and plan.descending and not plan.sort
+    assert str(plan).endswith("LIMIT 5")
+    top = repository.find_where(order_by="-price", limit=5)
+    assert [p.price for p in top] == sorted((p.price for p in repository.find_all()), reverse=True)[:5]
+
+    plan = repository.explain(category=ProductCategory.BOOKS, order_by="name")
+    assert plan.path.field == "category" and plan.sort == [("name", False)]
+
+
+def test_find_by_user_and_order_use_indexes():
+    repository = payments()
+    assert repository.find_by_user_id(3) == scan(repository, user_id=3)
+    assert repository.find_by_order_id(4) == scan(repository, order_id=4)
+    payment = repository.find_by_id(3)
+    repository.delete(3)
+    assert payment not in repository.find_by_user_id(payment.user_id)
+
+
+def test_full_scan_is_safe_while_another_thread_inserts():
+    repository = payments(200)
+    stop = threading.Event()
+    errors = []
+
+    def insert():
+        n = 1000
+        while not stop.is_set():
+            repository.save(Payment(n, 1, 1, 1.0, PaymentMethod.CASH))
+            repository.find_where(status=PaymentStatus.PENDING)
+            n += 1
+
+    writer = threading.Thread(target=insert)
+    writer.start()
+    try:
+        for _ in range(300):
+            repository.find_where(amount__gte=0)
+            repository.find_where(status=PaymentStatus.PENDING)
+    except RuntimeError as error:
+        errors.append(error)
+    finally:
+        stop.set()
+        writer.join()
+    assert errors == []
@@ -0,0 +1,52 @@
+"""Pruebas del límite de ritmo y el descarte de carga."""
+
+import threading
+
+import pytest
+
+from monitoring.metrics import Counter
+from ratelimit.limiter import KeyedRateLimiter, LoadShedder, RateLimitExceeded
+
+
+def shedder():
+    now = [0.0]
+    clock = lambda: now[0]
+    return LoadShedder(
+        "prueba",
+        per_key=KeyedRateLimiter(1, burst=1, clock=clock),
+        per_client=KeyedRateLimiter(1, burst=1, clock=clock)
+    )
+
+
+def test_rejected_key_does_not_spend_the_client_token():
+    limits = shedder()
+    limits.admit("ana", "10.0.0.1")
+    with pytest.raises(RateLimitExceeded) as error:
+        limits.admit("ana", "10.0.0.2")
+    assert error.value.scope == "key"
+    # La cubeta de 10.0.0.2 sigue llena
+    limits.admit("bruno", "10.0.0.2")
+
+
+def test_rejected_client_does_not_spend_the_key_token():
+    limits = shedder()
+    limits.admit("ana", "10.0.0.1")
+    with pytest.raises(RateLimitExceeded) as error:
+        limits.admit("bruno", "10.0.0.1")
+    assert error.value.scope == "client"
+    limits.admit("bruno", "10.0.0.2")
+
+
+def test_counter_is_exact_across_threads():
+    counter = Counter()
+
+    def increment():
+        for _ in range(20_000):
+            counter.inc()
+
+    threads = [threading.Thread(target=increment) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value == 160_000
@@ -0,0 +1,97 @@
+"""Pruebas de la conciliación de liquidaciones."""
+
+import json
+
+import pytest
+
+from jobs.reconciliation import (
+    AMOUNT_MISMATCH, DUPLICATE_SETTLEMENT, INVALID_ROW, MISSING_SETTLEMENT,
+    ORPHANED_SETTLEMENT, STATUS_MISMATCH, SettlementReconciler
+)
+from models.payment import Payment, PaymentMethod
+from repositories.payment_repository import PaymentRepository
+
+
+def payment(repository, payment_id, amount, complete=True):
+    item = Payment(payment_id, payment_id, 1, amount, PaymentMethod.CREDIT_CARD, f"tx-{payment_id}")
+    if complete:
+        item.process()
+        item.complete()
+    return repository.save(item)
+
+
+@pytest.fixture
+def repository():
+    repository = PaymentRepository()
+    payment(repository, 1, 10.0)
+    payment(repository, 2, 20.0)
+    payment(repository, 3, 30.0)
+    payment(repository, 4, 40.0, complete=False)
+    payment(repository, 5, 50.0)
+    return repository
+
+
+def write_csv(path, rows):
+    path.write_bytes(b"transaction_id,amount\n" + b"".join(row + b"\n" for row in rows))
+    return str(path)
+
+
+def test_every_discrepancy_kind_is_reported(tmp_path, repository):
+    path = write_csv(tmp_path / "liquidaciones.csv", [
+        b"tx-1,10.00",
+        b"tx-2,25.00",
+        b"tx-3,30.00",
+        b"tx-3,30.00",
+        b"tx-4,40.00",
+        b"tx-99,5.00",
+        b"tx-x",
+    ])
+    report = SettlementReconciler(repository).reconcile(path, output_path=str(tmp_path / "d.jsonl"))
+    assert report.rows == 7
+    assert report.matched == 4
+    assert report.counts == {
+        AMOUNT_MISMATCH: 1, ORPHANED_SETTLEMENT: 1, MISSING_SETTLEMENT: 1,
+        DUPLICATE_SETTLEMENT: 1, STATUS_MISMATCH: 1, INVALID_ROW: 1
+    }
+    lines = (tmp_path / "d.jsonl").read_text(encoding="utf-8").splitlines()
+    missing = [json.loads(line) for line in lines if MISSING_SETTLEMENT in line]
+    assert [d["payment_id"] for d in missing] == [5]
+
+
+def test_undecodable_and_non_finite_rows_are_invalid(tmp_path, repository):
+    path = write_csv(tmp_path / "liquidaciones.csv", [
+        b"tx-1,10.00",
+        b"tx-\xff2,20.00",
+        b"tx-2,nan",
+        b"tx-3,inf",
+        b"tx-5,50.00",
+    ])
+    report = SettlementReconciler(repository).reconcile(path)
+    assert report.rows == 5
+    assert report.counts[INVALID_ROW] == 3
+    assert report.counts[AMOUNT_MISMATCH] == 0
+    assert report.matched == 2
+    assert report.counts[MISSING_SETTLEMENT] == 2
+    assert "�" in report.samples[0]["text"]
+
+
+def test_jsonl_with_nan_amount_is_invalid(tmp_path, repository):
+    path = tmp_path / "liquidaciones.jsonl"
+    path.write_text(
+        '{"transaction_id": "tx-1", "amount": NaN}\n{"transaction_id": "tx-2", "amount": 20}\n',
+        encoding="utf-8"
+    )
+    report = SettlementReconciler(repository).reconcile(str(path))
+    assert report.counts[INVALID_ROW] == 1
+    assert report.matched == 1
+
+
+def test_parallel_ranges_match_a_single_pass(tmp_path, repository):
+    rows = [f"tx-{n},{n * 10}.00".encode() for n in (1, 2, 3, 5, 3, 9)] * 50
+    path = write_csv(tmp_path / "liquidaciones.csv", rows)
+    reconciler = SettlementReconciler(repository, chunk_size=7)
+    single = reconciler.reconcile(path)
+    parallel = reconciler.reconcile(path, workers=2)
+    assert parallel.rows == single.rows == 300
+    assert parallel.counts == single.counts
+    assert parallel.matched == single.matched == 4
@@ -0,0 +1,81 @@
+"""Pruebas de los reintentos programados de pagos."""
+
+import time
+
+from controllers.payment_controller import PaymentController
+from jobs.retry_queue import DISCARDED, SUCCEEDED, RetryPolicy, RetryScheduler
+from models.payment import PaymentMethod, PaymentStatus
+from repositories.payment_repository import PaymentRepository
+
+
+def test_due_retry_is_charged_through_the_controller():
+    controller = PaymentController(PaymentRepository())
+    outcomes = iter([False, True])
+    controller._process_with_gateway = lambda payment, key=None: next(outcomes)
+    now = [1000.0]
+    scheduler = RetryScheduler(controller, policy=RetryPolicy(base_delay=1, jitter=0), clock=lambda: now[0])
+    try:
+        payment = controller.create_payment(1, 1, 30.0, PaymentMethod.CREDIT_CARD)
+        assert not controller.process_payment(payment.payment_id)
+        assert scheduler.pending() == 1
+
+        now[0] += 5
+        scheduler.start()
+        deadline = time.monotonic() + 5
+        while scheduler.stats().get(SUCCEEDED) != 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert scheduler.stats() == {SUCCEEDED: 1}
+        assert controller.get_payment(payment.payment_id).status == PaymentStatus.COMPLETED
+    finally:
+        scheduler.close()
+
+
+def test_charge_of_a_payment_cancelled_in_flight_is_refunded():
+    controller = PaymentController(PaymentRepository())
+    refunds = []
+    unrecorded = []
+    controller._refund_with_gateway = lambda payment, key=None: refunds.append(key) or True
+    controller.on_unrecorded_charge = unrecorded.append
+    payment = controller.create_payment(1, 1, 30.0, PaymentMethod.CREDIT_CARD)
+
+    def gateway(payment, key=None):
+        # El pago se cancela mientras se espera al gateway
+        assert controller.cancel_payment(payment.payment_id)
+        return True
+
+    controller._process_with_gateway = gateway
+    assert controller.process_payment(payment.payment_id) is False
+    assert controller.get_payment(payment.payment_id).status == PaymentStatus.CANCELLED
+    assert len(refunds) == 1 and unrecorded == []
+
+    # Si tampoco se puede devolver, se avisa para revisarlo a mano
+    controller._refund_with_gateway = lambda payment, key=None: False
+    other = controller.create_payment(2, 1, 10.0, PaymentMethod.CREDIT_CARD)
+    assert controller.process_payment(other.payment_id) is False
+    assert [p.payment_id for p in unrecorded] == [other.payment_id]
+
+
+def test_retry_of_a_payment_cancelled_in_flight_is_discarded():
+    controller = PaymentController(PaymentRepository())
+    controller._refund_with_gateway = lambda payment, key=None: True
+    now = [1000.0]
+    scheduler = RetryScheduler(controller, policy=RetryPolicy(base_delay=1, jitter=0), clock=lambda: now[0])
+    try:
+        payment = controller.create_payment(1, 1, 30.0, PaymentMethod.CREDIT_CARD)
+        controller._process_with_gateway = lambda payment, key=None: False
+        assert not controller.process_payment(payment.payment_id)
+
+        def gateway(payment, key=None):
+            controller.cancel_payment(payment.payment_id)
+            return True
+
+        controller._process_with_gateway = gateway
+        now[0] += 5
+        scheduler.start()
+        deadline = time.monotonic() + 5
+        while scheduler.stats().get(DISCARDED) != 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert scheduler.stats() == {DISCARDED: 1}
+        assert controller.get_payment(payment.payment_id).status == PaymentStatus.CANCELLED
+    finally:
+        scheduler.close()
@@ -0,0 +1,46 @@
+"""Pruebas del repositorio de reseñas."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.product import ProductReview
+from repositories.review_repository import ORDER_RATING, ReviewRepository
+
+
+START = datetime(2026, 1, 1)
+
+
+def review(review_id, product_id, rating, minutes=0):
+    return ProductReview(review_id, product_id, 1, rating, "", START + timedelta(minutes=minutes))
+
+
+def test_save_many_keeps_the_last_copy_of_a_repeated_review():
+    repository = ReviewRepository()
+    repository.save(review(1, 10, 2))
+    saved = repository.save_many([
+        review(1, 10, 3, minutes=1),
+        review(2, 10, 4, minutes=2),
+        review(1, 20, 5, minutes=3),
+        review(2, 10, 1, minutes=4),
+    ])
+    assert saved == 2
+    assert repository.count() == 2
+    assert repository.find_by_id(1).product_id == 20
+    assert repository.find_by_id(2).rating == 1
+    assert [r.review_id for r in repository.find_by_product(10)] == [2]
+    assert [r.review_id for r in repository.find_by_product(20, order_by=ORDER_RATING)] == [1]
+    assert repository.rating_histogram(10) == {1: 1, 2: 0, 3: 0, 4: 0, 5: 0}
+    assert repository.average_rating(20) == 5.0
+
+
+def test_save_many_rejects_the_whole_batch_on_an_invalid_rating():
+    repository = ReviewRepository()
+    repository.save(review(1, 10, 2))
+    invalid = review(3, 10, 4)
+    invalid.rating = 7
+    with pytest.raises(ValueError):
+        repository.save_many([review(1, 10, 5), review(2, 10, 3), invalid])
+    assert repository.count() == 1
+    assert repository.find_by_id(1).rating == 2
+    assert repository.rating_histogram(10) == {1: 0, 2: 1, 3: 0, 4: 0, 5: 0}
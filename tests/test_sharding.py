@@ -0,0 +1,90 @@
+"""Pruebas del despliegue fragmentado."""
+
+import threading
+
+import pytest
+
+from models.user import UserRole
+from sharding.controllers import ShardedUserController
+from sharding.pool import ShardError, ShardPool
+
+
+@pytest.fixture(scope="module")
+def users():
+    with ShardPool(4) as pool:
+        yield ShardedUserController(pool)
+
+
+def register(users, username, email):
+    return users.register_user(username, email, "clave123", UserRole.CLIENT, username.title())
+
+
+def test_concurrent_registrations_keep_emails_unique(users):
+    # Usernames en fragmentos distintos que compiten por el mismo email
+    winners = []
+
+    def attempt(username):
+        for round_ in range(20):
+            if register(users, f"{username}{round_}", f"race{round_}@example.com") is not None:
+                winners.append(round_)
+
+    threads = [threading.Thread(target=attempt, args=(name,)) for name in ("ana", "bruno", "carla", "dario")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(winners) == list(range(20))
+
+
+def test_batch_registration_rejects_repeated_and_taken_emails(users):
+    register(users, "existente", "taken@example.com")
+    rows = [
+        (name, email, "clave123", UserRole.CLIENT, name)
+        for name, email in [("lote1", "nuevo@example.com"), ("lote2", "nuevo@example.com"),
+                            ("lote3", "taken@example.com"), ("existente", "otro@example.com")]
+    ]
+    created = users.register_users(rows)
+    assert [user is not None for user in created] == [True, False, False, False]
+    # La reserva del username repetido se liberó
+    assert register(users, "lote4", "otro@example.com") is not None
+
+
+def test_email_is_released_on_update_and_delete(users):
+    user = register(users, "mover", "viejo@example.com")
+    user.email = "nuevo-mover@example.com"
+    assert users.update_user(user) is not None
+    assert register(users, "heredero", "viejo@example.com") is not None
+    assert register(users, "intruso", "nuevo-mover@example.com") is None
+    assert users.delete_user(user.user_id)
+    assert register(users, "sucesor", "nuevo-mover@example.com") is not None
+
+
+def test_failed_broadcast_does_not_leave_stale_replies():
+    with ShardPool(3) as pool:
+        pool.call(2, "email_registry", "reserve", "a@example.com", "ana")
+        pool._processes[1].terminate()
+        pool._processes[1].join()
+        with pytest.raises(ShardError):
+            pool.broadcast("email_registry", "__len__")
+        # Las respuestas de los fragmentos 0 y 2 ya se leyeron
+        assert pool.call(2, "email_registry", "__len__") == 1
+        assert pool.call(0, "email_registry", "__len__") == 0
+        with pytest.raises(ShardError):
+            pool.call_many([(0, "email_registry", "__len__", (), {}), (1, "email_registry", "__len__", (), {})])
+        assert pool.call(2, "email_registry", "reserve", "b@example.com", "bea") is True
+
+
+def test_interrupted_call_marks_the_pool_unusable():
+    with ShardPool(2) as pool:
+        receive = pool._receive
+
+        def interrupted(shard):
+            raise KeyboardInterrupt()
+
+        pool._receive = interrupted
+        with pytest.raises(KeyboardInterrupt):
+            pool.broadcast("email_registry", "__len__")
+        pool._receive = receive
+        # Quedan respuestas en las tuberías: no se devuelve una ajena
+        with pytest.raises(ShardError):
+            pool.call(0, "email_registry", "__len__")
@@ -0,0 +1,54 @@
+"""Pruebas de aislamiento de instantáneas frente a las escrituras de los controladores."""
+
+from controllers.payment_controller import PaymentController
+from controllers.user_controller import UserController
+from models.payment import PaymentDetails, PaymentMethod, PaymentStatus
+from models.user import UserRole
+from repositories.payment_repository import PaymentRepository
+from repositories.user_repository import UserRepository
+
+
+def test_payment_writes_do_not_change_an_earlier_snapshot():
+    controller = PaymentController(PaymentRepository())
+    controller._process_with_gateway = lambda payment, key=None: payment.payment_id != 2
+    ids = [controller.create_payment(n, 1, 10.0 * n, PaymentMethod.CREDIT_CARD).payment_id for n in range(1, 7)]
+    controller.get_payment(2).payment_details = PaymentDetails(1, 2)
+    snapshot = controller.payment_repository.snapshot()
+
+    assert controller.process_payment(ids[0])
+    assert not controller.process_payment(ids[1])
+    assert controller.retry_payment(ids[1]) is False
+    assert controller.cancel_payment(ids[2])
+    assert controller.transition_many(ids[3:], "process") == {pid: None for pid in ids[3:]}
+    assert controller.complete_payment(ids[3])
+    assert controller.refund_payment(ids[3])
+    assert controller.transition_many([ids[4]], "fail") == {ids[4]: None}
+
+    before = snapshot.find_all()
+    assert [payment.status for payment in before] == [PaymentStatus.PENDING] * 6
+    assert [payment.version for payment in before] == [0] * 6
+    assert before[1].payment_details.error_message is None
+    assert before[3].refunded_at is None and before[3].processed_at is None
+
+    after = controller.payment_repository.snapshot()
+    assert [payment.status for payment in after.find_all()] == [
+        PaymentStatus.COMPLETED, PaymentStatus.FAILED, PaymentStatus.CANCELLED,
+        PaymentStatus.REFUNDED, PaymentStatus.FAILED, PaymentStatus.PROCESSING
+    ]
+    assert controller.get_payment(ids[1]).payment_details.error_message is not None
+
+
+def test_user_activation_does_not_change_an_earlier_snapshot():
+    controller = UserController(UserRepository())
+    user = controller.register_user("ana", "ana@example.com", "clave123", UserRole.CLIENT, "Ana")
+    snapshot = controller.user_repository.snapshot()
+
+    assert controller.deactivate_user(user.user_id)
+    assert snapshot.find_by_id(user.user_id).is_active
+    assert not controller.get_user(user.user_id).is_active
+
+    inactive = controller.user_repository.snapshot()
+    assert controller.activate_user(user.user_id)
+    assert not inactive.find_by_id(user.user_id).is_active
+    assert controller.get_user(user.user_id).is_active
+    assert not controller.activate_user(999)
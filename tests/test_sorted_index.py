@@ -0,0 +1,78 @@
+"""Pruebas del índice ordenado."""
+
+import random
+
+from repositories.sorted_index import SortedIndex
+
+
+def build(values):
+    index = SortedIndex()
+    for doc_id, value in values.items():
+        index.add(doc_id, value)
+    return index
+
+
+def expected(values, low=None, high=None, descending=False):
+    keys = sorted((v, d) for d, v in values.items()
+                  if (low is None or v >= low) and (high is None or v <= high))
+    if descending:
+        keys.reverse()
+    return [d for _, d in keys]
+
+
+def test_range_matches_sorted_scan():
+    rng = random.Random(1)
+    values = {doc_id: rng.randint(0, 50) for doc_id in range(1, 500)}
+    index = build(values)
+    for low, high in [(None, None), (10, 20), (20, 20), (None, 5), (45, None), (30, 10)]:
+        assert index.range(low, high) == expected(values, low, high)
+        assert index.range(low, high, descending=True) == expected(values, low, high, True)
+    assert index.count(10, 20) == len(expected(values, 10, 20))
+
+
+def test_cursor_pages_cover_range_once():
+    rng = random.Random(2)
+    values = {doc_id: rng.randint(0, 20) for doc_id in range(1, 300)}
+    index = build(values)
+    for descending in (False, True):
+        pages, after = [], None
+        while True:
+            page = index.range(5, 15, limit=7, after=after, descending=descending)
+            if not page:
+                break
+            pages.extend(page)
+            after = (values[page[-1]], page[-1])
+        assert pages == expected(values, 5, 15, descending)
+
+
+def test_reindex_and_remove():
+    index = build({1: 10, 2: 20, 3: 30})
+    index.add(1, 40)
+    assert index.range() == [2, 3, 1]
+    assert index.remove(2)
+    assert not index.remove(2)
+    index.add(3, None)
+    assert index.range() == [1]
+    assert index.value_of(1) == 40
+
+
+
+def test_add_many_matches_individual_adds():
+    rng = random.Random(3)
+    single = SortedIndex()
+    bulk = SortedIndex()
+    for size in (10, 300, 300):
+        changes = [(rng.randint(1, 400), rng.choice([None, rng.randint(0, 100)])) for _ in range(size)]
+        for doc_id, value in changes:
+            single.add(doc_id, value)
+        bulk.add_many(changes)
+        assert bulk.range() == single.range()
+        assert len(bulk) == len(single)
+
+
+def test_add_many_last_value_wins():
+    index = build({1: 5})
+    index.add_many([(1, 7), (1, 5)])
+    assert index.value_of(1) == 5
+    index.add_many([(2, 3), (2, None)])
+    assert 2 not in index
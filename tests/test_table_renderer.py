@@ -0,0 +1,71 @@
+"""Pruebas de las tablas paginadas y la escritura a archivo."""
+
+import io
+import re
+
+from views.table_renderer import Column, TableRenderer
+
+
+COLUMNS = [Column("ID", lambda r: r[0], 4, ">"), Column("Nombre", lambda r: r[1], 8)]
+ROWS = [(n, f"fila{n}") for n in range(1, 8)]
+
+
+def renderer(answers, page_size=3):
+    prompts = []
+    answers = iter(answers)
+
+    def ask(prompt):
+        prompts.append(prompt)
+        return next(answers)
+
+    output = io.StringIO()
+    return TableRenderer(COLUMNS, page_size, output, ask), output, prompts
+
+
+def data_lines(text):
+    return [line for line in text.splitlines() if re.match(r"\s*\d+  ", line)]
+
+
+def test_format_rows_aligns_and_truncates():
+    table = TableRenderer(COLUMNS).format_rows([(1, "corto"), (12, None), (3, "demasiado largo")])
+    assert table.splitlines() == [
+        "ID  Nombre",
+        "--  --------",
+        " 1  corto",
+        "12",
+        " 3  demasia…",
+    ]
+
+
+def test_pager_pauses_between_pages_and_skips_the_last_prompt():
+    table, output, prompts = renderer(["", ""])
+    assert table.render(ROWS, "7 filas") == 7
+    assert len(data_lines(output.getvalue())) == 7
+    assert output.getvalue().startswith("\n7 filas\n")
+    assert [p.split(" --")[0] for p in prompts] == ["-- Página 1/3 (3/7)", "-- Página 2/3 (6/7)"]
+
+
+def test_pager_quit_and_show_all():
+    table, output, prompts = renderer(["q"])
+    assert table.render(ROWS) == 3 and len(prompts) == 1
+
+    table, output, prompts = renderer(["t"])
+    assert table.render(ROWS) == 7 and len(prompts) == 1
+
+
+def test_pager_accepts_iterables_without_length():
+    table, output, prompts = renderer(["", ""])
+    assert table.render(row for row in ROWS) == 7
+    assert [p.split(" --")[0] for p in prompts] == ["-- Página 1 (3)", "-- Página 2 (6)"]
+
+
+def test_write_to_file_uses_fixed_widths_across_chunks(tmp_path):
+    path = tmp_path / "filas.txt"
+    rows = [(n, "x" * (n % 12)) for n in range(1, 26)]
+    assert TableRenderer(COLUMNS).write_to_file(iter(rows), str(path), chunk_size=4) == 25
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[:2] == ["  ID  Nombre", "----  --------"]
+    assert len(lines) == 27
+    assert lines[2] == "   1  x"
+    assert lines[2 + 10] == "  11  xxxxxxx…"
+    assert all(len(line) == 4 or line[4:6] == "  " for line in lines[2:])
@@ -0,0 +1,39 @@
+"""Pruebas del índice invertido de productos."""
+
+import random
+
+from repositories.text_index import InvertedIndex
+
+
+def test_reindexes_when_text_changes():
+    index = InvertedIndex()
+    index.add(1, "Laptop HP")
+    index.add(1, "Mouse Logitech")
+    assert index.search("laptop") == []
+    assert index.search("mouse") == [1]
+
+
+def test_same_text_keeps_postings():
+    index = InvertedIndex()
+    index.add(1, "Laptop HP")
+    index.add(1, "Laptop HP")
+    assert index.search("laptop hp") == [1]
+    assert len(index) == 1
+
+
+def test_completion_matches_vocabulary_after_many_changes():
+    rng = random.Random(7)
+    index = InvertedIndex()
+    texts = {}
+    for step in range(3000):
+        doc_id = rng.randint(1, 400)
+        if rng.random() < 0.2:
+            index.remove(doc_id)
+            texts.pop(doc_id, None)
+        else:
+            text = " ".join(f"t{rng.randint(0, 2000)}" for _ in range(3))
+            index.add(doc_id, text)
+            texts[doc_id] = text
+    vocabulary = sorted({term for text in texts.values() for term in text.split()})
+    assert index.complete("t", limit=None) == vocabulary
+    assert index.complete("t1", limit=5) == [t for t in vocabulary if t.startswith("t1")][:5]
@@ -0,0 +1,112 @@
+"""Pruebas de las trazas por spans y su propagación."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from monitoring.tracing import JsonlExporter, Tracer, propagate, slowest_traces
+
+
+class Collector:
+    """Exportador en memoria."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def by_name(self):
+        return {span.name: span for span in self.spans}
+
+
+class Service:
+    def __init__(self, repository):
+        self.repository = repository
+
+    def handle(self, value):
+        return self.repository.load(value)
+
+    def handle_in_thread(self, executor, value, bind=True):
+        load = propagate(self.repository.load) if bind else self.repository.load
+        return executor.submit(load, value).result()
+
+
+class Repository:
+    def load(self, value):
+        if value < 0:
+            raise ValueError("negativo")
+        return value * 2
+
+
+def traced(sample_rate=1.0, rng=lambda: 0.0):
+    collector = Collector()
+    tracer = Tracer(collector, sample_rate, rng)
+    service = tracer.trace(Service(tracer.trace(Repository(), "repo")), "service")
+    return tracer, collector, service
+
+
+def test_nested_calls_share_the_trace_and_link_to_their_parent():
+    tracer, collector, service = traced()
+    assert service.handle(2) == 4
+    spans = collector.by_name()
+    root, child = spans["service.handle"], spans["repo.load"]
+    assert root.parent_id is None
+    assert child.trace_id == root.trace_id and child.parent_id == root.span_id
+    assert tracer.current_span() is None
+
+
+def test_propagate_carries_the_parent_into_another_thread():
+    tracer, collector, service = traced()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert service.handle_in_thread(executor, 3) == 6
+        root, child = collector.by_name()["service.handle_in_thread"], collector.by_name()["repo.load"]
+        assert child.trace_id == root.trace_id and child.parent_id == root.span_id
+
+        collector.spans.clear()
+        service.handle_in_thread(executor, 3, bind=False)
+        root, child = collector.by_name()["service.handle_in_thread"], collector.by_name()["repo.load"]
+        assert child.parent_id is None and child.trace_id != root.trace_id
+
+
+def test_tasks_inherit_the_active_span():
+    tracer, collector, _ = traced()
+
+    async def work():
+        with tracer.span("request") as root:
+            await asyncio.gather(*(asyncio.create_task(child(i)) for i in range(3)))
+        return root
+
+    async def child(i):
+        with tracer.span(f"child-{i}"):
+            await asyncio.sleep(0)
+
+    root = asyncio.run(work())
+    children = [s for s in collector.spans if s.name.startswith("child-")]
+    assert len(children) == 3
+    assert all(s.parent_id == root.span_id and s.trace_id == root.trace_id for s in children)
+
+
+def test_sampling_decision_applies_to_the_whole_trace():
+    tracer, collector, service = traced(sample_rate=0.5, rng=lambda: 0.9)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        service.handle(1)
+        service.handle_in_thread(executor, 1)
+    assert collector.spans == []
+
+
+def test_errors_are_recorded_and_reraised(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = JsonlExporter(str(path))
+    tracer = Tracer(exporter)
+    service = tracer.trace(Service(tracer.trace(Repository(), "repo")), "service")
+    service.handle(5)
+    with pytest.raises(ValueError):
+        service.handle(-1)
+    exporter.close()
+
+    traces = slowest_traces(str(path))
+    assert len(traces) == 2
+    assert {t["status"] for t in traces} == {"ok", "error"}
+    assert all(list(t["breakdown_ms"]) == ["repo.load"] for t in traces)
@@ -0,0 +1,71 @@
+"""Pruebas del índice de trigramas y la búsqueda aproximada de usuarios."""
+
+import random
+
+from models.user import User, UserRole
+from repositories.trigram_index import TrigramIndex, trigrams
+from repositories.user_repository import UserRepository
+
+
+FIRST = ["María", "José", "Lucía", "Andrés", "Sofía", "Martín", "Elena", "Raúl"]
+LAST = ["García", "López", "Martínez", "Sánchez", "Pérez", "Gómez", "Díaz", "Núñez"]
+
+
+def exhaustive(index, query, limit, threshold):
+    """Top-k puntuando todos los documentos, sin poda."""
+    query_grams = trigrams(query)
+    scored = []
+    for doc_id, fields in index._fields.items():
+        coverage, jaccard = index._similarity(query_grams, fields)
+        if coverage >= threshold:
+            scored.append(((coverage, jaccard, -doc_id), doc_id))
+    scored.sort(reverse=True)
+    return [(doc_id, round(key[0], 4)) for key, doc_id in scored[:limit]]
+
+
+def test_pruned_search_matches_an_exhaustive_scan():
+    rng = random.Random(3)
+    index = TrigramIndex()
+    for doc_id in range(2000):
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {rng.choice(LAST)}"
+        index.add(doc_id, name, f"user{doc_id}")
+    for query in ("garcia", "Maria Lopes", "sanchez perez", "ANDRES", "nunez diaz", "user17", "zzz"):
+        for limit, threshold in ((5, 0.3), (20, 0.5), (1, 0.1)):
+            assert index.search(query, limit, threshold) == exhaustive(index, query, limit, threshold)
+
+
+def test_search_stops_before_scoring_every_candidate():
+    index = TrigramIndex()
+    for doc_id in range(1000):
+        index.add(doc_id, f"Cliente Genérico {doc_id}")
+    index.add(5000, "Zacarías Quiñones")
+    scored = []
+    similarity = index._similarity
+    index._similarity = lambda query, fields: scored.append(1) or similarity(query, fields)
+    assert index.search("zacarias quinones cliente", limit=1, threshold=0.5)[0][0] == 5000
+    assert len(scored) < 10
+
+
+def test_reindex_and_remove_update_the_postings():
+    index = TrigramIndex()
+    index.add(1, "Elena Gómez")
+    assert [doc for doc, _ in index.search("gomez")] == [1]
+    index.add(1, "Elena Díaz")
+    assert index.search("gomez") == []
+    assert [doc for doc, _ in index.search("diaz")] == [1]
+    assert index.remove(1) and not index.remove(1)
+    assert index._postings == {} and len(index) == 0
+
+
+def test_user_search_tolerates_typos_case_and_accents():
+    repository = UserRepository()
+    for user_id, (name, username) in enumerate(
+        [("María García López", "mgarcia"), ("Mario Garzón", "mgarzon"), ("Lucía Pérez", "lperez")], start=1
+    ):
+        repository.save(User(user_id, username, f"{username}@example.com", "hash", UserRole.CLIENT, name))
+    [(best, score), *_] = repository.search_similar("MARIA GRACIA")
+    assert best.user_id == 1 and 0 < score < 1
+    assert [u.user_id for u, _ in repository.search_similar("perez")] == [3]
+    assert repository.search_similar("lperez@example.com")[0][1] == 1.0
+    repository.delete(3)
+    assert repository.search_similar("perez") == []
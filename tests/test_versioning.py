@@ -0,0 +1,92 @@
+"""Pruebas de la concurrencia optimista por versión."""
+
+import copy
+import threading
+
+import pytest
+
+from controllers.product_controller import ProductController
+from models.product import Product, ProductCategory
+from repositories.product_repository import ProductRepository
+from repositories.versioning import VersionConflictError
+
+
+def repository_with_product(stock=10):
+    repository = ProductRepository()
+    repository.save(Product(1, "Lámpara", "", 20.0, ProductCategory.FURNITURE, stock, "SKU-1"))
+    return repository
+
+
+def test_update_of_a_stale_copy_conflicts():
+    repository = repository_with_product()
+    first = copy.copy(repository.find_by_id(1))
+    second = copy.copy(repository.find_by_id(1))
+    first.add_stock(5)
+    assert repository.update(first).version == 1
+
+    second.add_stock(3)
+    with pytest.raises(VersionConflictError) as error:
+        repository.update(second)
+    assert (error.value.expected, error.value.actual) == (0, 1)
+    assert repository.find_by_id(1).stock_quantity == 15
+
+
+def test_update_rejects_the_stored_object_modified_in_place():
+    repository = repository_with_product()
+    snapshot = repository.snapshot()
+    stored = repository.find_by_id(1)
+    with pytest.raises(ValueError):
+        repository.update(stored)
+    assert repository.find_by_id(1).version == 0
+    assert snapshot.find_by_id(1).version == 0
+
+
+def test_modify_retries_after_a_concurrent_writer():
+    repository = repository_with_product()
+    controller = ProductController(repository)
+    update = repository.update
+    calls = []
+
+    def racing_update(product):
+        calls.append(product.stock_quantity)
+        if len(calls) == 1:
+            # Otro escritor guarda su cambio entre la lectura y la escritura
+            rival = copy.copy(repository.find_by_id(1))
+            rival.add_stock(100)
+            update(rival)
+        return update(product)
+
+    repository.update = racing_update
+    assert controller.add_stock(1, 5)
+    assert calls == [15, 115]
+    stored = repository.find_by_id(1)
+    assert stored.stock_quantity == 115 and stored.version == 2
+
+
+def test_modify_gives_up_after_max_attempts():
+    repository = repository_with_product()
+    controller = ProductController(repository, max_attempts=3)
+
+    def always_conflicts(product):
+        raise VersionConflictError("Product", 1, product.version, product.version + 1)
+
+    repository.update = always_conflicts
+    assert not controller.add_stock(1, 5)
+    assert repository.find_by_id(1).stock_quantity == 10
+
+
+def test_concurrent_stock_changes_are_not_lost():
+    repository = repository_with_product(stock=0)
+    controller = ProductController(repository, max_attempts=1000)
+
+    def add():
+        for _ in range(50):
+            assert controller.add_stock(1, 1)
+
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stored = repository.find_by_id(1)
+    assert stored.stock_quantity == 400 and stored.version == 400